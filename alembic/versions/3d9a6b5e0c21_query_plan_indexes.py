@@ -0,0 +1,64 @@
+"""indexes for distribution, notification and track state queries
+
+Revision ID: 3d9a6b5e0c21
+Revises: 8c3e1f7a2b94
+Create Date: 2026-10-16 20:02:41.577310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d9a6b5e0c21'
+down_revision: Union[str, None] = '8c3e1f7a2b94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('blood_banks', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_blood_banks_facility_id'), ['facility_id'], unique=False)
+
+    with op.batch_alter_table('blood_distributions', schema=None) as batch_op:
+        batch_op.create_index('idx_distribution_from_created', ['dispatched_from_id', 'created_at'], unique=False)
+        batch_op.create_index('idx_distribution_to_created', ['dispatched_to_id', 'created_at'], unique=False)
+        batch_op.create_index('idx_distribution_status_created', ['status', 'created_at'], unique=False)
+        batch_op.create_index('idx_distribution_created_at', ['created_at'], unique=False)
+        batch_op.create_index('idx_distribution_from_delivered', ['dispatched_from_id', 'date_delivered'], unique=False)
+        batch_op.create_index('idx_distribution_status_expiry', ['status', 'expiry_date'], unique=False)
+        batch_op.create_index('idx_distribution_tracking_number', ['tracking_number'], unique=False)
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('idx_notification_user_created', ['user_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('idx_notification_user_read_created', ['user_id', 'is_read', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('track_states', schema=None) as batch_op:
+        batch_op.create_index('idx_track_state_request_timestamp', ['blood_request_id', 'timestamp'], unique=False)
+        batch_op.create_index('idx_track_state_distribution_timestamp', ['blood_distribution_id', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('track_states', schema=None) as batch_op:
+        batch_op.drop_index('idx_track_state_distribution_timestamp')
+        batch_op.drop_index('idx_track_state_request_timestamp')
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('idx_notification_user_read_created')
+        batch_op.drop_index('idx_notification_user_created')
+
+    with op.batch_alter_table('blood_distributions', schema=None) as batch_op:
+        batch_op.drop_index('idx_distribution_tracking_number')
+        batch_op.drop_index('idx_distribution_status_expiry')
+        batch_op.drop_index('idx_distribution_from_delivered')
+        batch_op.drop_index('idx_distribution_created_at')
+        batch_op.drop_index('idx_distribution_status_created')
+        batch_op.drop_index('idx_distribution_to_created')
+        batch_op.drop_index('idx_distribution_from_created')
+
+    with op.batch_alter_table('blood_banks', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_blood_banks_facility_id'))
@@ -0,0 +1,51 @@
+"""distribution allocations and FEFO index
+
+Revision ID: 8c3e1f7a2b94
+Revises: 5fe551a339a4
+Create Date: 2026-10-16 19:40:12.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c3e1f7a2b94'
+down_revision: Union[str, None] = '5fe551a339a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('distribution_allocations',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('distribution_id', sa.UUID(), nullable=False),
+    sa.Column('inventory_id', sa.UUID(), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('lot_expiry_date', sa.Date(), nullable=True, comment='Expiry date of the lot at allocation time'),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['distribution_id'], ['blood_distributions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['inventory_id'], ['blood_inventory.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('distribution_allocations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_distribution_allocations_distribution_id'), ['distribution_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_distribution_allocations_inventory_id'), ['inventory_id'], unique=False)
+
+    with op.batch_alter_table('blood_inventory', schema=None) as batch_op:
+        batch_op.create_index('idx_inventory_fefo', ['blood_bank_id', 'blood_product', 'blood_type', 'expiry_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('blood_inventory', schema=None) as batch_op:
+        batch_op.drop_index('idx_inventory_fefo')
+
+    with op.batch_alter_table('distribution_allocations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_distribution_allocations_inventory_id'))
+        batch_op.drop_index(batch_op.f('ix_distribution_allocations_distribution_id'))
+
+    op.drop_table('distribution_allocations')
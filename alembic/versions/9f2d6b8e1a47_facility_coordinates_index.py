@@ -0,0 +1,30 @@
+"""index facility coordinates for nearest-stock searches
+
+Revision ID: 9f2d6b8e1a47
+Revises: e4a1c7d90b35
+Create Date: 2026-10-16 21:52:07.641193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f2d6b8e1a47'
+down_revision: Union[str, None] = 'e4a1c7d90b35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('facilities', schema=None) as batch_op:
+        batch_op.create_index('idx_facility_lat_lng', ['latitude', 'longitude'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('facilities', schema=None) as batch_op:
+        batch_op.drop_index('idx_facility_lat_lng')
@@ -0,0 +1,40 @@
+"""shared sliding-window rate limit counters
+
+Revision ID: b7e2c9d41f06
+Revises: 3d9a6b5e0c21
+Create Date: 2026-10-16 20:41:18.204517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e2c9d41f06'
+down_revision: Union[str, None] = '3d9a6b5e0c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('rate_limit_counters',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('window_index', sa.BigInteger(), nullable=False, comment='Fixed window number (epoch // window)'),
+    sa.Column('current_count', sa.Integer(), nullable=False),
+    sa.Column('previous_count', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.BigInteger(), nullable=False, comment='Epoch second after which the counter no longer affects a limit'),
+    sa.PrimaryKeyConstraint('key')
+    )
+    with op.batch_alter_table('rate_limit_counters', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_rate_limit_counters_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('rate_limit_counters', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_rate_limit_counters_expires_at'))
+
+    op.drop_table('rate_limit_counters')
@@ -0,0 +1,30 @@
+"""index for requester-scoped request status queries
+
+Revision ID: e4a1c7d90b35
+Revises: b7e2c9d41f06
+Create Date: 2026-10-16 21:14:52.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a1c7d90b35'
+down_revision: Union[str, None] = 'b7e2c9d41f06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('blood_requests', schema=None) as batch_op:
+        batch_op.create_index('idx_request_requester_status_date', ['requester_id', 'request_status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('blood_requests', schema=None) as batch_op:
+        batch_op.drop_index('idx_request_requester_status_date')
@@ -28,6 +28,53 @@ class Settings(BaseSettings):
         default=15, env="ACCOUNT_LOCKOUT_DURATION_MINUTES"
     )
 
+    # Authenticated principal cache (get_current_user hot path)
+    PRINCIPAL_CACHE_TTL_SECONDS: int = Field(
+        default=60, env="PRINCIPAL_CACHE_TTL_SECONDS"
+    )
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = Field(
+        default=10000, env="PRINCIPAL_CACHE_MAX_ENTRIES"
+    )
+
+    # Session activity write-behind
+    SESSION_ACTIVITY_FLUSH_SECONDS: float = Field(
+        default=10.0, env="SESSION_ACTIVITY_FLUSH_SECONDS"
+    )
+    SESSION_ACTIVITY_MAX_PENDING: int = Field(
+        default=5000, env="SESSION_ACTIVITY_MAX_PENDING"
+    )
+
+    # Dashboard summary reconciliation (full recompute, reports drift)
+    DASHBOARD_RECONCILE_INTERVAL_MINUTES: int = Field(
+        default=15, env="DASHBOARD_RECONCILE_INTERVAL_MINUTES"
+    )
+
+    # Scheduled purge of expired refresh tokens, sessions and device registrations
+    AUTH_PURGE_INTERVAL_MINUTES: int = Field(default=60, env="AUTH_PURGE_INTERVAL_MINUTES")
+    AUTH_PURGE_CHUNK_SIZE: int = Field(default=1000, env="AUTH_PURGE_CHUNK_SIZE")
+    AUTH_PURGE_MAX_ROWS_PER_RUN: int = Field(
+        default=50000, env="AUTH_PURGE_MAX_ROWS_PER_RUN"
+    )
+    # Ended sessions and abandoned registrations are kept this long for audit
+    AUTH_PURGE_RETENTION_DAYS: int = Field(default=30, env="AUTH_PURGE_RETENTION_DAYS")
+
+    # SSE fan-out across workers: auto | memory | postgres
+    SSE_BROKER_BACKEND: str = Field(default="auto", env="SSE_BROKER_BACKEND")
+    SSE_BROKER_CHANNEL: str = Field(default="sse_events", env="SSE_BROKER_CHANNEL")
+
+    # Pending SSE pushes queued for background dispatch
+    NOTIFICATION_DISPATCH_MAX_QUEUE: int = Field(
+        default=1000, env="NOTIFICATION_DISPATCH_MAX_QUEUE"
+    )
+
+    # Password hashing worker pool
+    PASSWORD_HASH_EXECUTOR: str = Field(default="thread", env="PASSWORD_HASH_EXECUTOR")
+    PASSWORD_HASH_WORKERS: int = Field(default=4, env="PASSWORD_HASH_WORKERS")
+    PASSWORD_HASH_MAX_QUEUE: int = Field(default=32, env="PASSWORD_HASH_MAX_QUEUE")
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = Field(
+        default=2, env="PASSWORD_HASH_RETRY_AFTER_SECONDS"
+    )
+
     # Database
     DATABASE_URL: str = Field(default="", env="DATABASE_URL")
     DATABASE_POOL_SIZE: int = Field(default=10, env="DATABASE_POOL_SIZE")
@@ -74,6 +121,11 @@ class Settings(BaseSettings):
     LOGIN_RATE_LIMIT_PER_MINUTE: int = Field(
         default=5, env="LOGIN_RATE_LIMIT_PER_MINUTE"
     )
+    # Counter store: memory (per worker) | database (shared across workers)
+    RATE_LIMIT_BACKEND: str = Field(default="memory", env="RATE_LIMIT_BACKEND")
+    RATE_LIMIT_SWEEP_INTERVAL_SECONDS: int = Field(
+        default=300, env="RATE_LIMIT_SWEEP_INTERVAL_SECONDS"
+    )
 
     # Logging
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
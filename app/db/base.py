@@ -17,6 +17,10 @@ class UUID(TypeDecorator):
     impl = String(32)
     cache_ok = True
 
+    @property
+    def python_type(self):
+        return uuid_module.UUID
+
     def load_dialect_impl(self, dialect):
         if dialect.name == "postgresql":
             return dialect.type_descriptor(PGUUID(as_uuid=True))
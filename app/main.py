@@ -1,432 +1,518 @@
-import os
-import logging
-from contextlib import asynccontextmanager
-import traceback
-from fastapi import FastAPI, Request, Depends
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.openapi.utils import get_openapi
-from app.routes import router as api_router
-from app.config import settings
-from app.database import engine, async_session, close_db
-from app.dependencies import get_db
-from fastapi.responses import JSONResponse, RedirectResponse
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, text
-from sqlalchemy.orm import selectinload
-from app.models.rbac_model import Role, Permission
-from app.middlewares.logging_middleware import LoggingMiddleware
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
-logger = logging.getLogger(__name__)
-
-# Check if running in serverless environment
-IS_SERVERLESS = os.getenv("VERCEL") == "1"
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """
-    Lifespan context manager for FastAPI application startup and shutdown events.
-    """
-    # Startup
-    logger.info("Application starting up...")
-    logger.info(f"Serverless mode: {IS_SERVERLESS}")
-    logger.info(f"Environment: {settings.ENVIRONMENT}")
-
-    # Only start scheduler in non-serverless environments
-    if not IS_SERVERLESS:
-        try:
-            from app.services.scheduler import start_scheduler
-            from app.tasks.reverse_address import start_periodic_task
-
-            logger.info("Starting scheduler and periodic tasks...")
-            start_scheduler()
-            start_periodic_task()
-        except Exception as e:
-            logger.error(f"Error starting scheduler: {e}")
-    else:
-        logger.info("Skipping scheduler in serverless mode")
-
-    # Seed roles and permissions
-    try:
-        from app.utils.create_user_roles import seed_roles_and_permissions
-
-        async with async_session() as db:
-            try:
-                await seed_roles_and_permissions(db)
-                await db.commit()
-                logger.info("Roles and permissions seeded successfully")
-            except Exception as e:
-                logger.warning(f"Error seeding roles and permissions: {e}")
-                await db.rollback()
-    except Exception as e:
-        logger.warning(f"Could not seed roles and permissions: {e}")
-
-    yield
-
-    # Shutdown
-    logger.info("Application shutting down...")
-
-    # Stop scheduler and periodic tasks
-    if not IS_SERVERLESS:
-        try:
-            from app.services.scheduler import stop_scheduler
-            from app.tasks.reverse_address import stop_periodic_task
-
-            logger.info("Stopping scheduler and periodic tasks...")
-            stop_scheduler()
-            stop_periodic_task()
-        except Exception as e:
-            logger.error(f"Error stopping scheduler: {e}")
-
-    # Close database connections
-    try:
-        await close_db()
-        logger.info("Database connections closed successfully")
-    except Exception as e:
-        logger.error(f"Error closing database connections: {e}")
-
-
-def create_application() -> FastAPI:
-    """Create the FastAPI application"""
-    app = FastAPI(
-        title=settings.PROJECT_NAME,
-        description=settings.PROJECT_DESCRIPTION,
-        version=settings.VERSION,
-        docs_url=settings.DOCS_URL,
-        redoc_url=None,
-        lifespan=lifespan,
-    )
-
-    # Global exception handler to capture all errors
-    @app.exception_handler(Exception)
-    async def global_exception_handler(request: Request, exc: Exception):
-        """Catch all unhandled exceptions and log them with full details"""
-        error_traceback = "".join(
-            traceback.format_exception(type(exc), exc, exc.__traceback__)
-        )
-
-        # Print to stdout for Vercel to capture
-        print(f"\n{'='*80}")
-        print(f"UNHANDLED EXCEPTION")
-        print(f"Path: {request.method} {request.url.path}")
-        print(f"Error Type: {type(exc).__name__}")
-        print(f"Error Message: {str(exc)}")
-        print(f"{'='*80}")
-        print(error_traceback)
-        print(f"{'='*80}\n")
-
-        logger.error(
-            f"Unhandled exception: {type(exc).__name__}: {str(exc)}",
-            extra={
-                "extra_fields": {
-                    "error_type": type(exc).__name__,
-                    "error_message": str(exc),
-                    "path": request.url.path,
-                    "method": request.method,
-                }
-            },
-            exc_info=True,
-        )
-
-        return JSONResponse(
-            status_code=500,
-            content={
-                "detail": f"Internal server error: {type(exc).__name__}",
-                "error": (
-                    str(exc)
-                    if settings.ENVIRONMENT != "production"
-                    else "Internal server error"
-                ),
-            },
-        )
-
-    @app.middleware("http")
-    async def https_redirect(request: Request, call_next):
-        """Redirect HTTP to HTTPS in production"""
-        if request.headers.get("x-forwarded-proto") == "http":
-            url = request.url.replace(scheme="https")
-            return RedirectResponse(url)
-        return await call_next(request)
-
-    # Enhanced CORS setup
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=settings.BACKEND_CORS_ORIGINS,
-        allow_credentials=True,
-        allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
-        allow_headers=[
-            "Content-Type",
-            "Authorization",
-            "Accept",
-            "X-Requested-With",
-            "Origin",
-        ],
-        expose_headers=["Content-Length", "Content-Type", "Set-Cookie"],
-        max_age=600,
-    )
-
-    # Logging middleware
-    app.add_middleware(LoggingMiddleware)
-
-    # Include API routes
-    app.include_router(api_router, prefix=settings.API_PREFIX)
-
-    # SQLAdmin setup (disabled in serverless)
-    if not IS_SERVERLESS:
-        try:
-            from sqladmin import Admin
-            from app.admin.user_admin import UserAdmin
-            from app.admin.facility_admin import FacilityAdmin
-            from app.admin.blood_bank_admin import BloodBankAdmin
-            from app.admin.inventory import BloodInventoryAdmin
-
-            admin = Admin(app, engine, base_url="/admin")
-            admin.add_view(UserAdmin)
-            admin.add_view(FacilityAdmin)
-            admin.add_view(BloodBankAdmin)
-            admin.add_view(BloodInventoryAdmin)
-            logger.info("SQLAdmin enabled")
-        except Exception as e:
-            logger.warning(f"Could not initialize SQLAdmin: {e}")
-    else:
-        logger.info("SQLAdmin disabled in serverless mode")
-
-    # Custom OpenAPI config
-    def custom_openapi():
-        if app.openapi_schema:
-            return app.openapi_schema
-
-        openapi_schema = get_openapi(
-            title=app.title,
-            version=app.version,
-            description=app.description,
-            routes=app.routes,
-        )
-
-        openapi_schema["components"]["securitySchemes"] = {
-            "BearerAuth": {
-                "type": "http",
-                "scheme": "bearer",
-                "bearerFormat": "JWT",
-            }
-        }
-
-        # Protected paths
-        protected_paths = [
-            f"{settings.API_PREFIX}/facilities",
-            f"{settings.API_PREFIX}/blood-bank",
-            f"{settings.API_PREFIX}/users/delete-account",
-            f"{settings.API_PREFIX}/users/me",
-            f"{settings.API_PREFIX}/users/auth/logout",
-            f"{settings.API_PREFIX}/users/auth/sessions",
-            f"{settings.API_PREFIX}/users/update-account",
-            f"{settings.API_PREFIX}/blood-inventory",
-            f"{settings.API_PREFIX}/blood-distributions",
-            f"{settings.API_PREFIX}/track-states",
-            f"{settings.API_PREFIX}/users/staff",
-            f"{settings.API_PREFIX}/requests",
-            f"{settings.API_PREFIX}/patients",
-            f"{settings.API_PREFIX}/stats",
-            f"{settings.API_PREFIX}/dashboard",
-            f"{settings.API_PREFIX}/notifications",
-        ]
-
-        for path_key, path_item in openapi_schema["paths"].items():
-            if any(path_key.startswith(p) for p in protected_paths):
-                for method in path_item.values():
-                    if isinstance(method, dict):
-                        method.setdefault("security", []).append({"BearerAuth": []})
-
-        app.openapi_schema = openapi_schema
-        return app.openapi_schema
-
-    app.openapi = custom_openapi
-
-    # Health check endpoint
-    @app.get("/")
-    def read_root():
-        return {
-            "status": "ok",
-            "serverless": IS_SERVERLESS,
-            "environment": settings.ENVIRONMENT,
-        }
-
-    @app.get("/health")
-    async def health_check(db: AsyncSession = Depends(get_db)):
-        """Health check with database connectivity test"""
-        try:
-            await db.execute(text("SELECT 1"))
-            return {
-                "status": "healthy",
-                "database": "connected",
-                "serverless": IS_SERVERLESS,
-            }
-        except Exception as e:
-            logger.error(f"Health check failed: {e}")
-            return {
-                "status": "unhealthy",
-                "database": "disconnected",
-                "error": str(e),
-                "error_type": type(e).__name__,
-                "serverless": IS_SERVERLESS,
-            }
-
-    @app.get("/debug/db-query")
-    async def test_db_query(db: AsyncSession = Depends(get_db)):
-        """Test a simple database query"""
-        try:
-            from app.models.user_model import User
-
-            result = await db.execute(text("SELECT COUNT(*) FROM users"))
-            count = result.scalar()
-            return {
-                "status": "success",
-                "user_count": count,
-                "serverless": IS_SERVERLESS,
-            }
-        except Exception as e:
-            logger.error(f"DB query test failed: {type(e).__name__}: {e}")
-            import traceback
-
-            return {
-                "status": "error",
-                "error": str(e),
-                "error_type": type(e).__name__,
-                "traceback": traceback.format_exc(),
-                "serverless": IS_SERVERLESS,
-            }
-
-    @app.get("/debug/roles")
-    async def check_roles(db: AsyncSession = Depends(get_db)):
-        """Debug endpoint to check roles"""
-        try:
-            result = await db.execute(
-                select(Role).options(selectinload(Role.permissions))
-            )
-            roles = result.scalars().all()
-
-            roles_data = [
-                {
-                    "id": role.id,
-                    "name": role.name,
-                    "permissions": [perm.name for perm in role.permissions],
-                }
-                for role in roles
-            ]
-
-            return {"total_roles": len(roles), "roles": roles_data}
-        except Exception as e:
-            logger.error(f"Error checking roles: {e}")
-            return {"error": str(e)}
-
-    @app.get("/debug/permissions")
-    async def check_permissions(db: AsyncSession = Depends(get_db)):
-        """Debug endpoint to check permissions"""
-        try:
-            result = await db.execute(select(Permission))
-            permissions = result.scalars().all()
-
-            return {
-                "total_permissions": len(permissions),
-                "permissions": [{"id": p.id, "name": p.name} for p in permissions],
-            }
-        except Exception as e:
-            logger.error(f"Error checking permissions: {e}")
-            return {"error": str(e)}
-
-    @app.options("/{full_path:path}")
-    async def options_handler(full_path: str):
-        """Handle OPTIONS requests for CORS"""
-        return {}
-
-    @app.post("/debug/test-login")
-    async def test_login_flow(db: AsyncSession = Depends(get_db)):
-        """Debug endpoint to test login flow step by step"""
-        results = {}
-
-        try:
-            # Step 1: Test basic query
-            print("Step 1: Testing basic user query...")
-            from app.models.user_model import User
-
-            result = await db.execute(select(User).limit(1))
-            user = result.scalar_one_or_none()
-            results["step1_user_query"] = "SUCCESS" if user else "NO_USERS"
-            print(f"Step 1 result: {results['step1_user_query']}")
-
-            if not user:
-                return {"results": results, "message": "No users in database"}
-
-            # Step 2: Test with relationships
-            print("Step 2: Testing query with relationships...")
-            from sqlalchemy.orm import joinedload
-            from app.models.health_facility_model import Facility
-            from app.models.rbac_model import Role
-
-            result = await db.execute(
-                select(User)
-                .options(joinedload(User.roles), joinedload(User.work_facility))
-                .where(User.id == user.id)
-            )
-            user_with_rels = result.unique().scalar_one_or_none()
-            results["step2_with_relationships"] = "SUCCESS"
-            print("Step 2: SUCCESS")
-
-            # Step 3: Test session creation
-            print("Step 3: Testing session creation...")
-            from app.utils.security import SessionManager
-            from app.models.user_model import UserSession
-            import uuid
-            from datetime import datetime, timedelta
-
-            # Create a simple session manually
-            test_session = UserSession(
-                id=uuid.uuid4(),
-                user_id=user.id,
-                session_token="test_token_" + str(uuid.uuid4()),
-                expires_at=datetime.utcnow() + timedelta(days=7),
-                ip_address="127.0.0.1",
-                user_agent="debug",
-                is_active=True,
-                login_method="test",
-            )
-            db.add(test_session)
-            await db.commit()
-            results["step3_session_creation"] = "SUCCESS"
-            print("Step 3: SUCCESS")
-
-            # Step 4: Test token operations
-            print("Step 4: Testing token operations...")
-            from app.utils.security import TokenManager
-
-            access_token = TokenManager.create_access_token(
-                data={"sub": str(user.id)}, session_id=test_session.id
-            )
-            refresh_token = TokenManager.create_refresh_token(user.id)
-            results["step4_token_creation"] = "SUCCESS"
-            results["access_token_length"] = len(access_token)
-            print("Step 4: SUCCESS")
-
-            # Clean up test session
-            await db.delete(test_session)
-            await db.commit()
-
-            return {"status": "ALL_TESTS_PASSED", "results": results}
-
-        except Exception as e:
-            print(f"ERROR in step: {e}")
-            print(traceback.format_exc())
-            results["error"] = str(e)
-            results["error_type"] = type(e).__name__
-            results["traceback"] = traceback.format_exc()
-            return {"status": "FAILED", "results": results}
-
-    return app
-
-
-# Create and expose the FastAPI app
-app = create_application()
+import os
+import logging
+from contextlib import asynccontextmanager
+import traceback
+from fastapi import FastAPI, Request, Depends
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.openapi.utils import get_openapi
+from app.routes import router as api_router
+from app.config import settings
+from app.database import engine, async_session, close_db
+from app.dependencies import get_db
+from fastapi.responses import JSONResponse, RedirectResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, text
+from sqlalchemy.orm import selectinload
+from app.models.rbac_model import Role, Permission
+from app.middlewares.logging_middleware import LoggingMiddleware
+from app.middlewares.rate_limit_middleware import RateLimitMiddleware
+from app.models.user_model import User
+from app.services.auth_purge import auth_record_purger
+from app.services.inventory_allocator import inventory_allocator
+from app.utils.cache_manager import cache
+from app.utils.logging_config import app_logger
+from app.utils.password_pool import password_pool
+from app.utils.permission_checker import require_permission
+from app.utils.principal_cache import principal_cache
+from app.utils.rate_limiter import rate_limiter
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Check if running in serverless environment
+IS_SERVERLESS = os.getenv("VERCEL") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Lifespan context manager for FastAPI application startup and shutdown events.
+    """
+    # Startup
+    logger.info("Application starting up...")
+    logger.info(f"Serverless mode: {IS_SERVERLESS}")
+    logger.info(f"Environment: {settings.ENVIRONMENT}")
+
+    # Only start scheduler in non-serverless environments
+    if not IS_SERVERLESS:
+        try:
+            from app.services.scheduler import start_scheduler
+            from app.tasks.reverse_address import start_periodic_task
+
+            logger.info("Starting scheduler and periodic tasks...")
+            start_scheduler()
+            start_periodic_task()
+        except Exception as e:
+            logger.error(f"Error starting scheduler: {e}")
+
+        # Batch session activity writes instead of committing per request
+        from app.services.session_activity import session_activity
+
+        session_activity.start()
+
+        # Subscribe this worker to cross-process SSE fan-out
+        try:
+            from app.services.notification_sse import manager
+            from app.services.sse_broker import create_broker
+
+            manager.use_broker(
+                create_broker(
+                    settings.SSE_BROKER_BACKEND,
+                    settings.DATABASE_URL,
+                    settings.SSE_BROKER_CHANNEL,
+                )
+            )
+            await manager.start()
+        except Exception as e:
+            logger.error(f"Error starting SSE broker: {e}")
+
+        # Publish SSE pushes off the request path
+        from app.services.notification_dispatcher import notification_dispatcher
+
+        notification_dispatcher.start()
+    else:
+        logger.info("Skipping scheduler in serverless mode")
+
+    # Seed roles and permissions
+    try:
+        from app.utils.create_user_roles import seed_roles_and_permissions
+
+        async with async_session() as db:
+            try:
+                await seed_roles_and_permissions(db)
+                await db.commit()
+                logger.info("Roles and permissions seeded successfully")
+            except Exception as e:
+                logger.warning(f"Error seeding roles and permissions: {e}")
+                await db.rollback()
+    except Exception as e:
+        logger.warning(f"Could not seed roles and permissions: {e}")
+
+    yield
+
+    # Shutdown
+    logger.info("Application shutting down...")
+
+    # Stop scheduler and periodic tasks
+    if not IS_SERVERLESS:
+        try:
+            from app.services.scheduler import stop_scheduler
+            from app.tasks.reverse_address import stop_periodic_task
+
+            logger.info("Stopping scheduler and periodic tasks...")
+            stop_scheduler()
+            stop_periodic_task()
+        except Exception as e:
+            logger.error(f"Error stopping scheduler: {e}")
+
+        try:
+            from app.services.session_activity import session_activity
+
+            await session_activity.stop()
+        except Exception as e:
+            logger.error(f"Error flushing session activity: {e}")
+
+        try:
+            from app.services.notification_dispatcher import (
+                notification_dispatcher,
+            )
+
+            await notification_dispatcher.stop()
+        except Exception as e:
+            logger.error(f"Error draining notification dispatcher: {e}")
+
+        try:
+            from app.services.notification_sse import manager
+
+            await manager.stop()
+        except Exception as e:
+            logger.error(f"Error stopping SSE broker: {e}")
+
+    password_pool.shutdown()
+
+    # Close database connections
+    try:
+        await close_db()
+        logger.info("Database connections closed successfully")
+    except Exception as e:
+        logger.error(f"Error closing database connections: {e}")
+
+    # Drain the log queue last so the shutdown messages above are written
+    from app.utils.logging_config import shutdown_logging
+
+    shutdown_logging()
+
+
+def create_application() -> FastAPI:
+    """Create the FastAPI application"""
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        description=settings.PROJECT_DESCRIPTION,
+        version=settings.VERSION,
+        docs_url=settings.DOCS_URL,
+        redoc_url=None,
+        lifespan=lifespan,
+    )
+
+    # Global exception handler to capture all errors
+    @app.exception_handler(Exception)
+    async def global_exception_handler(request: Request, exc: Exception):
+        """Catch all unhandled exceptions and log them with full details"""
+        error_traceback = "".join(
+            traceback.format_exception(type(exc), exc, exc.__traceback__)
+        )
+
+        # Print to stdout for Vercel to capture
+        print(f"\n{'='*80}")
+        print(f"UNHANDLED EXCEPTION")
+        print(f"Path: {request.method} {request.url.path}")
+        print(f"Error Type: {type(exc).__name__}")
+        print(f"Error Message: {str(exc)}")
+        print(f"{'='*80}")
+        print(error_traceback)
+        print(f"{'='*80}\n")
+
+        logger.error(
+            f"Unhandled exception: {type(exc).__name__}: {str(exc)}",
+            extra={
+                "extra_fields": {
+                    "error_type": type(exc).__name__,
+                    "error_message": str(exc),
+                    "path": request.url.path,
+                    "method": request.method,
+                }
+            },
+            exc_info=True,
+        )
+
+        return JSONResponse(
+            status_code=500,
+            content={
+                "detail": f"Internal server error: {type(exc).__name__}",
+                "error": (
+                    str(exc)
+                    if settings.ENVIRONMENT != "production"
+                    else "Internal server error"
+                ),
+            },
+        )
+
+    @app.middleware("http")
+    async def https_redirect(request: Request, call_next):
+        """Redirect HTTP to HTTPS in production"""
+        if request.headers.get("x-forwarded-proto") == "http":
+            url = request.url.replace(scheme="https")
+            return RedirectResponse(url)
+        return await call_next(request)
+
+    # Rate limiting, inside CORS so 429 responses still carry CORS headers.
+    # SecurityMiddleware also consults the global limiter, so only one of the
+    # two may be registered or every request would be counted twice.
+    app.add_middleware(RateLimitMiddleware)
+
+    # Enhanced CORS setup
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.BACKEND_CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS"],
+        allow_headers=[
+            "Content-Type",
+            "Authorization",
+            "Accept",
+            "X-Requested-With",
+            "Origin",
+        ],
+        expose_headers=["Content-Length", "Content-Type", "Set-Cookie"],
+        max_age=600,
+    )
+
+    # Logging middleware
+    app.add_middleware(LoggingMiddleware)
+
+    # Include API routes
+    app.include_router(api_router, prefix=settings.API_PREFIX)
+
+    # SQLAdmin setup (disabled in serverless)
+    if not IS_SERVERLESS:
+        try:
+            from sqladmin import Admin
+            from app.admin.user_admin import UserAdmin
+            from app.admin.facility_admin import FacilityAdmin
+            from app.admin.blood_bank_admin import BloodBankAdmin
+            from app.admin.inventory import BloodInventoryAdmin
+
+            admin = Admin(app, engine, base_url="/admin")
+            admin.add_view(UserAdmin)
+            admin.add_view(FacilityAdmin)
+            admin.add_view(BloodBankAdmin)
+            admin.add_view(BloodInventoryAdmin)
+            logger.info("SQLAdmin enabled")
+        except Exception as e:
+            logger.warning(f"Could not initialize SQLAdmin: {e}")
+    else:
+        logger.info("SQLAdmin disabled in serverless mode")
+
+    # Custom OpenAPI config
+    def custom_openapi():
+        if app.openapi_schema:
+            return app.openapi_schema
+
+        openapi_schema = get_openapi(
+            title=app.title,
+            version=app.version,
+            description=app.description,
+            routes=app.routes,
+        )
+
+        openapi_schema["components"]["securitySchemes"] = {
+            "BearerAuth": {
+                "type": "http",
+                "scheme": "bearer",
+                "bearerFormat": "JWT",
+            }
+        }
+
+        # Protected paths
+        protected_paths = [
+            f"{settings.API_PREFIX}/facilities",
+            f"{settings.API_PREFIX}/blood-bank",
+            f"{settings.API_PREFIX}/users/delete-account",
+            f"{settings.API_PREFIX}/users/me",
+            f"{settings.API_PREFIX}/users/auth/logout",
+            f"{settings.API_PREFIX}/users/auth/sessions",
+            f"{settings.API_PREFIX}/users/update-account",
+            f"{settings.API_PREFIX}/blood-inventory",
+            f"{settings.API_PREFIX}/blood-distributions",
+            f"{settings.API_PREFIX}/track-states",
+            f"{settings.API_PREFIX}/users/staff",
+            f"{settings.API_PREFIX}/requests",
+            f"{settings.API_PREFIX}/patients",
+            f"{settings.API_PREFIX}/stats",
+            f"{settings.API_PREFIX}/dashboard",
+            f"{settings.API_PREFIX}/notifications",
+        ]
+
+        for path_key, path_item in openapi_schema["paths"].items():
+            if any(path_key.startswith(p) for p in protected_paths):
+                for method in path_item.values():
+                    if isinstance(method, dict):
+                        method.setdefault("security", []).append({"BearerAuth": []})
+
+        app.openapi_schema = openapi_schema
+        return app.openapi_schema
+
+    app.openapi = custom_openapi
+
+    # Health check endpoint
+    @app.get("/")
+    def read_root():
+        return {
+            "status": "ok",
+            "serverless": IS_SERVERLESS,
+            "environment": settings.ENVIRONMENT,
+        }
+
+    @app.get("/health")
+    async def health_check(db: AsyncSession = Depends(get_db)):
+        """Health check with database connectivity test"""
+        try:
+            await db.execute(text("SELECT 1"))
+            return {
+                "status": "healthy",
+                "database": "connected",
+                "serverless": IS_SERVERLESS,
+            }
+        except Exception as e:
+            logger.error(f"Health check failed: {e}")
+            return {
+                "status": "unhealthy",
+                "database": "disconnected",
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "serverless": IS_SERVERLESS,
+            }
+
+    @app.get("/health/stats")
+    async def health_stats(
+        current_user: User = Depends(require_permission("sys.admin")),
+    ):
+        """Internal pool, limiter and cache statistics for operators"""
+        return {
+            "password_pool": password_pool.get_stats(),
+            "inventory_allocator": inventory_allocator.get_stats(),
+            "auth_purge": auth_record_purger.get_stats(),
+            "rate_limiter": rate_limiter.get_stats(),
+            "logging": app_logger.get_stats(),
+            "cache": cache.get_stats(),
+            "principal_cache": principal_cache.get_stats(),
+        }
+
+    @app.get("/debug/db-query")
+    async def test_db_query(db: AsyncSession = Depends(get_db)):
+        """Test a simple database query"""
+        try:
+            from app.models.user_model import User
+
+            result = await db.execute(text("SELECT COUNT(*) FROM users"))
+            count = result.scalar()
+            return {
+                "status": "success",
+                "user_count": count,
+                "serverless": IS_SERVERLESS,
+            }
+        except Exception as e:
+            logger.error(f"DB query test failed: {type(e).__name__}: {e}")
+            import traceback
+
+            return {
+                "status": "error",
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "traceback": traceback.format_exc(),
+                "serverless": IS_SERVERLESS,
+            }
+
+    @app.get("/debug/roles")
+    async def check_roles(db: AsyncSession = Depends(get_db)):
+        """Debug endpoint to check roles"""
+        try:
+            result = await db.execute(
+                select(Role).options(selectinload(Role.permissions))
+            )
+            roles = result.scalars().all()
+
+            roles_data = [
+                {
+                    "id": role.id,
+                    "name": role.name,
+                    "permissions": [perm.name for perm in role.permissions],
+                }
+                for role in roles
+            ]
+
+            return {"total_roles": len(roles), "roles": roles_data}
+        except Exception as e:
+            logger.error(f"Error checking roles: {e}")
+            return {"error": str(e)}
+
+    @app.get("/debug/permissions")
+    async def check_permissions(db: AsyncSession = Depends(get_db)):
+        """Debug endpoint to check permissions"""
+        try:
+            result = await db.execute(select(Permission))
+            permissions = result.scalars().all()
+
+            return {
+                "total_permissions": len(permissions),
+                "permissions": [{"id": p.id, "name": p.name} for p in permissions],
+            }
+        except Exception as e:
+            logger.error(f"Error checking permissions: {e}")
+            return {"error": str(e)}
+
+    @app.options("/{full_path:path}")
+    async def options_handler(full_path: str):
+        """Handle OPTIONS requests for CORS"""
+        return {}
+
+    @app.post("/debug/test-login")
+    async def test_login_flow(db: AsyncSession = Depends(get_db)):
+        """Debug endpoint to test login flow step by step"""
+        results = {}
+
+        try:
+            # Step 1: Test basic query
+            print("Step 1: Testing basic user query...")
+            from app.models.user_model import User
+
+            result = await db.execute(select(User).limit(1))
+            user = result.scalar_one_or_none()
+            results["step1_user_query"] = "SUCCESS" if user else "NO_USERS"
+            print(f"Step 1 result: {results['step1_user_query']}")
+
+            if not user:
+                return {"results": results, "message": "No users in database"}
+
+            # Step 2: Test with relationships
+            print("Step 2: Testing query with relationships...")
+            from sqlalchemy.orm import joinedload
+            from app.models.health_facility_model import Facility
+            from app.models.rbac_model import Role
+
+            result = await db.execute(
+                select(User)
+                .options(joinedload(User.roles), joinedload(User.work_facility))
+                .where(User.id == user.id)
+            )
+            user_with_rels = result.unique().scalar_one_or_none()
+            results["step2_with_relationships"] = "SUCCESS"
+            print("Step 2: SUCCESS")
+
+            # Step 3: Test session creation
+            print("Step 3: Testing session creation...")
+            from app.utils.security import SessionManager
+            from app.models.user_model import UserSession
+            import uuid
+            from datetime import datetime, timedelta
+
+            # Create a simple session manually
+            test_session = UserSession(
+                id=uuid.uuid4(),
+                user_id=user.id,
+                session_token="test_token_" + str(uuid.uuid4()),
+                expires_at=datetime.utcnow() + timedelta(days=7),
+                ip_address="127.0.0.1",
+                user_agent="debug",
+                is_active=True,
+                login_method="test",
+            )
+            db.add(test_session)
+            await db.commit()
+            results["step3_session_creation"] = "SUCCESS"
+            print("Step 3: SUCCESS")
+
+            # Step 4: Test token operations
+            print("Step 4: Testing token operations...")
+            from app.utils.security import TokenManager
+
+            access_token = TokenManager.create_access_token(
+                data={"sub": str(user.id)}, session_id=test_session.id
+            )
+            refresh_token = TokenManager.create_refresh_token(user.id)
+            results["step4_token_creation"] = "SUCCESS"
+            results["access_token_length"] = len(access_token)
+            print("Step 4: SUCCESS")
+
+            # Clean up test session
+            await db.delete(test_session)
+            await db.commit()
+
+            return {"status": "ALL_TESTS_PASSED", "results": results}
+
+        except Exception as e:
+            print(f"ERROR in step: {e}")
+            print(traceback.format_exc())
+            results["error"] = str(e)
+            results["error_type"] = type(e).__name__
+            results["traceback"] = traceback.format_exc()
+            return {"status": "FAILED", "results": results}
+
+    return app
+
+
+# Create and expose the FastAPI app
+app = create_application()
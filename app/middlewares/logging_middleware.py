@@ -1,12 +1,14 @@
-from fastapi import FastAPI, Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import FastAPI
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import time
 import uuid
-from typing import Callable
+from urllib.parse import parse_qsl
+from app.utils.auth_context import get_scope_auth_context
 from app.utils.logging_config import (
-    get_logger, 
-    LogContext, 
-    log_api_access, 
+    get_logger,
+    LogContext,
+    log_api_access,
     log_security_event,
     log_performance_metric
 )
@@ -14,177 +16,169 @@ from app.utils.logging_config import (
 logger = get_logger(__name__)
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
+class LoggingMiddleware:
     """
-    Middleware to handle request/response logging and context management
+    Pure ASGI middleware for request/response logging and context management.
+
+    It only wraps `send` to observe the status code and body size, so
+    streaming responses (SSE, exports) pass straight through without an extra
+    task or body buffering. The user and session are read from the auth
+    context recorded by `get_current_user` instead of decoding the JWT again,
+    and each request produces a single access record when it finishes.
     """
-    
-    def __init__(self, app: FastAPI, log_requests: bool = True, log_responses: bool = True):
-        super().__init__(app)
+
+    def __init__(self, app: ASGIApp, log_requests: bool = True, log_responses: bool = True):
+        self.app = app
         self.log_requests = log_requests
         self.log_responses = log_responses
-    
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # Generate request ID
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Generate request ID (available to handlers as request.state.request_id)
         request_id = str(uuid.uuid4())
-        
-        # Extract client information
-        client_ip = self.get_client_ip(request)
-        user_agent = request.headers.get("user-agent", "unknown")
-        
-        # Extract user information if available (from JWT token)
-        user_id = None
-        try:
-            # Try to extract user ID from token if authorization header exists
-            auth_header = request.headers.get("authorization")
-            if auth_header and auth_header.startswith("Bearer "):
-                from app.utils.security import TokenManager
-                token = auth_header.split(" ")[1]
-                payload = TokenManager.decode_token(token)
-                user_id = payload.get("sub")
-        except Exception:
-            # Token decode failed, continue without user_id
-            pass
-        
-        # Set up logging context
-        with LogContext(req_id=request_id, usr_id=user_id):
-            start_time = time.time()
-            
-            # Log incoming request
-            if self.log_requests:
-                logger.info(
-                    f"Incoming request: {request.method} {request.url.path}",
-                    extra={
-                        'extra_fields': {
-                            'http_method': request.method,
-                            'path': str(request.url.path),
-                            'query_params': dict(request.query_params),
-                            'client_ip': client_ip,
-                            'user_agent': user_agent,
-                            'request_size_bytes': request.headers.get("content-length", 0),
-                            'action': 'request_received'
-                        }
-                    }
-                )
-            
-            response = None
-            status_code = 500
-            
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        start_time = time.perf_counter()
+        status_code = 500
+        response_started_at = None
+        response_bytes = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_started_at, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_started_at = time.perf_counter()
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        with LogContext(req_id=request_id):
             try:
-                # Process the request
-                response = await call_next(request)
-                status_code = response.status_code
-                
-                # Calculate response time
-                response_time = time.time() - start_time
-                
-                # Log response
-                if self.log_responses:
-                    logger.info(
-                        f"Request completed: {request.method} {request.url.path} - {status_code}",
-                        extra={
-                            'extra_fields': {
-                                'http_method': request.method,
-                                'path': str(request.url.path),
-                                'status_code': status_code,
-                                'response_time_seconds': round(response_time, 4),
-                                'client_ip': client_ip,
-                                'action': 'request_completed'
-                            }
-                        }
-                    )
-                
-                # Log to access logger
-                log_api_access(
-                    method=request.method,
-                    path=str(request.url.path),
-                    status_code=status_code,
-                    response_time=response_time,
+                await self.app(scope, receive, send_wrapper)
+            except Exception as e:
+                self._log_failure(scope, e, time.perf_counter() - start_time)
+                raise
+
+            response_time = time.perf_counter() - start_time
+            self._log_completion(
+                scope,
+                status_code,
+                response_time,
+                time_to_first_byte=(
+                    response_started_at - start_time if response_started_at else None
+                ),
+                response_bytes=response_bytes,
+            )
+
+    def _log_completion(
+        self,
+        scope: Scope,
+        status_code: int,
+        response_time: float,
+        time_to_first_byte,
+        response_bytes: int,
+    ) -> None:
+        method = scope["method"]
+        path = scope["path"]
+        headers = Headers(scope=scope)
+        client_ip = self.get_client_ip(scope, headers)
+        user_agent = headers.get("user-agent", "unknown")
+
+        auth_context = get_scope_auth_context(scope)
+        user_id = str(auth_context.user_id) if auth_context else None
+
+        # One structured record per request: request details plus outcome
+        if self.log_responses:
+            fields = {
+                'response_bytes': response_bytes,
+                'time_to_first_byte_seconds': (
+                    round(time_to_first_byte, 4) if time_to_first_byte is not None else None
+                ),
+                'action': 'request_completed'
+            }
+            if self.log_requests:
+                fields.update({
+                    'query_params': dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"))),
+                    'user_agent': user_agent,
+                    'request_size_bytes': headers.get("content-length", 0),
+                })
+            if auth_context and auth_context.session_id:
+                fields['session_id'] = str(auth_context.session_id)
+
+            log_api_access(
+                method=method,
+                path=path,
+                status_code=status_code,
+                response_time=response_time,
+                user_id=user_id,
+                ip_address=client_ip,
+                additional_fields=fields
+            )
+
+        # Log performance if slow
+        if response_time > 1.0:
+            log_performance_metric(
+                operation=f"{method} {path}",
+                duration_seconds=response_time,
+                additional_metrics={
+                    'status_code': status_code,
+                    'client_ip': client_ip
+                }
+            )
+
+        # Log security events for authentication endpoints
+        if path.startswith("/users/auth/") and "login" in path:
+            if status_code == 400:
+                log_security_event(
+                    event_type="failed_login_attempt",
                     user_id=user_id,
-                    ip_address=client_ip
+                    ip_address=client_ip,
+                    user_agent=user_agent
                 )
-                
-                # Log performance if slow
-                if response_time > 1.0:
-                    log_performance_metric(
-                        operation=f"{request.method} {request.url.path}",
-                        duration_seconds=response_time,
-                        additional_metrics={
-                            'status_code': status_code,
-                            'client_ip': client_ip
-                        }
-                    )
-                
-                # Log security events for authentication endpoints
-                if request.url.path.startswith("/users/auth/"):
-                    if status_code == 400 and "login" in request.url.path:
-                        log_security_event(
-                            event_type="failed_login_attempt",
-                            user_id=user_id,
-                            ip_address=client_ip,
-                            user_agent=user_agent
-                        )
-                    elif status_code == 200 and "login" in request.url.path:
-                        log_security_event(
-                            event_type="successful_login",
-                            user_id=user_id,
-                            ip_address=client_ip,
-                            user_agent=user_agent
-                        )
-                
-                return response
-                
-            except Exception as e:
-                response_time = time.time() - start_time
-                
-                # Log the error
-                logger.error(
-                    f"Request failed: {request.method} {request.url.path}",
-                    extra={
-                        'extra_fields': {
-                            'http_method': request.method,
-                            'path': str(request.url.path),
-                            'error_type': type(e).__name__,
-                            'error_message': str(e),
-                            'response_time_seconds': round(response_time, 4),
-                            'client_ip': client_ip,
-                            'action': 'request_failed'
-                        }
-                    },
-                    exc_info=True
+            elif status_code == 200:
+                log_security_event(
+                    event_type="successful_login",
+                    user_id=user_id,
+                    ip_address=client_ip,
+                    user_agent=user_agent
                 )
-                
-                # Log security event for suspicious activity
-                if status_code in [401, 403]:
-                    log_security_event(
-                        event_type="unauthorized_access_attempt",
-                        user_id=user_id,
-                        ip_address=client_ip,
-                        user_agent=user_agent,
-                        details={
-                            'path': str(request.url.path),
-                            'method': request.method
-                        }
-                    )
-                
-                # Re-raise the exception
-                raise
-    
-    def get_client_ip(self, request: Request) -> str:
+
+    def _log_failure(self, scope: Scope, error: Exception, response_time: float) -> None:
+        logger.error(
+            f"Request failed: {scope['method']} {scope['path']}",
+            extra={
+                'extra_fields': {
+                    'http_method': scope["method"],
+                    'path': scope["path"],
+                    'error_type': type(error).__name__,
+                    'error_message': str(error),
+                    'response_time_seconds': round(response_time, 4),
+                    'client_ip': self.get_client_ip(scope, Headers(scope=scope)),
+                    'action': 'request_failed'
+                }
+            },
+            exc_info=True
+        )
+
+    def get_client_ip(self, scope: Scope, headers: Headers) -> str:
         """Extract client IP address from request"""
         # Check for forwarded headers (common in load balancers)
-        forwarded_for = request.headers.get("x-forwarded-for")
+        forwarded_for = headers.get("x-forwarded-for")
         if forwarded_for:
             return forwarded_for.split(",")[0].strip()
-        
-        real_ip = request.headers.get("x-real-ip")
+
+        real_ip = headers.get("x-real-ip")
         if real_ip:
             return real_ip
-        
+
         # Fallback to direct client IP
-        if request.client:
-            return request.client.host
-        
+        client = scope.get("client")
+        if client:
+            return client[0]
+
         return "unknown"
 
 
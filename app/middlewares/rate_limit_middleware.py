@@ -1,42 +1,45 @@
 from starlette.middleware.base import BaseHTTPMiddleware
 from fastapi import Request, Response
-import time
 from fastapi.responses import JSONResponse
-from typing import Callable
+from typing import Callable, Optional
 
+from app.utils.rate_limiter import (
+    InMemoryRateLimitStore,
+    RateLimiter,
+    RateLimitPolicy,
+    rate_limiter,
+)
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Simple rate limiting middleware"""
 
-    def __init__(self, app, max_requests: int = 60):
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """Sliding-window rate limiting per client IP"""
+
+    def __init__(
+        self,
+        app,
+        max_requests: Optional[int] = None,
+        limiter: Optional[RateLimiter] = None,
+    ):
         super().__init__(app)
-        self.max_requests = max_requests
-        self.requests = {}
+        if limiter is None and max_requests is not None:
+            # Single flat limit for this middleware instance only
+            limiter = RateLimiter(
+                InMemoryRateLimitStore(), RateLimitPolicy("general", max_requests)
+            )
+        self.limiter = limiter or rate_limiter
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         client_ip = request.client.host if request.client else "unknown"
-        current_time = time.time()
-
-        # Clean old entries (simple sliding window)
-        self.requests = {
-            ip: [req_time for req_time in times if current_time - req_time < 60]
-            for ip, times in self.requests.items()
-        }
-
-        # Check rate limit
-        if client_ip in self.requests:
-            if len(self.requests[client_ip]) >= self.max_requests:
-                return JSONResponse(
-                    status_code=429,
-                    content={
-                        "error": "rate_limit_exceeded",
-                        "message": "Too many requests",
-                    },
-                )
-        else:
-            self.requests[client_ip] = []
 
-        # Add current request
-        self.requests[client_ip].append(current_time)
+        decision = await self.limiter.hit(client_ip, request.url.path)
+        if not decision.allowed:
+            return JSONResponse(
+                status_code=429,
+                content={
+                    "error": "rate_limit_exceeded",
+                    "message": "Too many requests",
+                },
+                headers={"Retry-After": str(decision.retry_after)},
+            )
 
         return await call_next(request)
@@ -1,7 +1,7 @@
 import time
 import hashlib
 import ipaddress
-from typing import Callable, Set, Dict, List
+from typing import Callable, Set, Dict
 from datetime import datetime, timedelta, timezone
 
 from fastapi import Request, Response, HTTPException
@@ -10,6 +10,7 @@ from starlette.responses import JSONResponse
 
 from app.config import settings
 from app.utils.logging_config import get_logger, log_security_event
+from app.utils.rate_limiter import rate_limiter
 
 logger = get_logger(__name__)
 
@@ -19,8 +20,7 @@ class SecurityMiddleware(BaseHTTPMiddleware):
     def __init__(self, app, **kwargs):
         super().__init__(app, **kwargs)
         
-        # Rate limiting storage (in production, use Redis)
-        self.request_counts: Dict[str, List[float]] = {}
+        # Temporarily blocked IPs
         self.blocked_ips: Dict[str, float] = {}
         
         # Suspicious activity tracking
@@ -90,7 +90,8 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             
             return JSONResponse(
                 status_code=e.status_code,
-                content={"error": "security_violation", "message": e.detail}
+                content={"error": "security_violation", "message": e.detail},
+                headers=e.headers
             )
             
         except Exception as e:
@@ -139,46 +140,27 @@ class SecurityMiddleware(BaseHTTPMiddleware):
                 del self.blocked_ips[client_ip]
     
     async def _check_rate_limiting(self, client_ip: str, request: Request):
-        """Implement rate limiting per IP"""
-        current_time = time.time()
-        window_start = current_time - 60  # 1 minute window
-        
-        # Clean old entries
-        if client_ip in self.request_counts:
-            self.request_counts[client_ip] = [
-                req_time for req_time in self.request_counts[client_ip]
-                if req_time > window_start
-            ]
-        else:
-            self.request_counts[client_ip] = []
-        
-        # Add current request
-        self.request_counts[client_ip].append(current_time)
-        
-        # Check limits
-        request_count = len(self.request_counts[client_ip])
-        
-        # Different limits for different endpoints
-        if request.url.path.startswith("/api/auth/login"):
-            limit = settings.LOGIN_RATE_LIMIT_PER_MINUTE
-        else:
-            limit = settings.RATE_LIMIT_REQUESTS_PER_MINUTE
-        
-        if request_count > limit:
+        """Implement rate limiting per IP (login and general policies)"""
+        decision = await rate_limiter.hit(client_ip, request.url.path)
+        
+        if not decision.allowed:
+            limit = decision.policy.limit
             log_security_event(
                 event_type="rate_limit_exceeded",
                 ip_address=client_ip,
                 user_agent=request.headers.get("user-agent", ""),
                 details={
                     "path": request.url.path,
-                    "requests_in_window": request_count,
+                    "policy": decision.policy.name,
+                    "requests_in_window": decision.requests_in_window,
                     "limit": limit
                 }
             )
             
             raise HTTPException(
                 status_code=429,
-                detail=f"Rate limit exceeded. Max {limit} requests per minute."
+                detail=f"Rate limit exceeded. Max {limit} requests per minute.",
+                headers={"Retry-After": str(decision.retry_after)}
             )
     
     async def _check_suspicious_requests(self, request: Request):
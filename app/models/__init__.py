@@ -2,9 +2,10 @@ from .user_model import User
 from .health_facility_model import Facility
 from .blood_bank_model import BloodBank
 from .inventory_model import BloodInventory
-from .distribution_model import BloodDistribution
+from .distribution_model import BloodDistribution, DistributionAllocation
 from .tracking_model import TrackState
 from .patient_model import Patient
 from .request_model import BloodRequest
 from .notification_model import Notification
 from .device_model import DeviceTrust, DeviceRegistration, DeviceSecurityEvent
+from .rate_limit_model import RateLimitCounter
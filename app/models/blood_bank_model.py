@@ -28,6 +28,7 @@ class BloodBank(Base):
         PGUUID(as_uuid=True),
         ForeignKey("facilities.id", ondelete="CASCADE"),
         nullable=False,
+        index=True,
     )
     manager_id: Mapped[uuid.UUID] = mapped_column(
         PGUUID(as_uuid=True),
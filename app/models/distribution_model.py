@@ -1,6 +1,6 @@
 import uuid
 from typing import Optional
-from sqlalchemy import String, ForeignKey, DateTime, Enum, Integer, func, Date
+from sqlalchemy import String, ForeignKey, DateTime, Enum, Integer, func, Date, Index
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 from app.db.base import Base
@@ -107,6 +107,11 @@ class BloodDistribution(Base):
         back_populates="blood_distribution",
         cascade="all, delete-orphan",
     )
+    allocations = relationship(
+        "DistributionAllocation",
+        back_populates="distribution",
+        cascade="all, delete-orphan",
+    )
 
     @validates("quantity")
     def validate_quantity(self, key, value):
@@ -344,3 +349,53 @@ class BloodDistribution(Base):
     def __str__(self) -> str:
         request_info = f" (Request: {self.request_id})" if self.request_id else ""
         return f"{self.blood_product} ({self.blood_type}) → {self.dispatched_to.facility_name}{request_info}"
+
+    # --- Table Configuration for Performance ---
+    __table_args__ = (
+        # Per-bank / per-facility listings, newest first
+        Index("idx_distribution_from_created", "dispatched_from_id", "created_at"),
+        Index("idx_distribution_to_created", "dispatched_to_id", "created_at"),
+        Index("idx_distribution_status_created", "status", "created_at"),
+        Index("idx_distribution_created_at", "created_at"),
+        # Delivered-in-range charts and dashboard totals
+        Index("idx_distribution_from_delivered", "dispatched_from_id", "date_delivered"),
+        Index("idx_distribution_status_expiry", "status", "expiry_date"),
+        Index("idx_distribution_tracking_number", "tracking_number"),
+    )
+
+
+class DistributionAllocation(Base):
+    """Units a distribution drew from one inventory lot (FEFO split)"""
+
+    __tablename__ = "distribution_allocations"
+
+    # --- Columns ---
+    id: Mapped[uuid.UUID] = mapped_column(
+        PGUUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+    distribution_id: Mapped[uuid.UUID] = mapped_column(
+        PGUUID(as_uuid=True),
+        ForeignKey("blood_distributions.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    inventory_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        PGUUID(as_uuid=True),
+        ForeignKey("blood_inventory.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    )
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False)
+    lot_expiry_date: Mapped[Optional[Date]] = mapped_column(
+        Date, nullable=True, comment="Expiry date of the lot at allocation time"
+    )
+    created_at: Mapped[DateTime] = mapped_column(DateTime, server_default=func.now())
+
+    # --- Relationships ---
+    distribution = relationship("BloodDistribution", back_populates="allocations")
+    inventory_item = relationship("BloodInventory")
+
+    def __str__(self) -> str:
+        return f"Allocation({self.quantity} units from lot {self.inventory_id})"
@@ -1,6 +1,6 @@
 import uuid
 from typing import Optional
-from sqlalchemy import String, DateTime, Float, func
+from sqlalchemy import String, DateTime, Float, Index, func
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
@@ -96,6 +96,11 @@ class Facility(Base):
         cascade="all, delete-orphan",
     )
 
+    __table_args__ = (
+        # Bounding-box prefilter for nearest-facility searches
+        Index("idx_facility_lat_lng", "latitude", "longitude"),
+    )
+
     # --- Methods ---
     def __str__(self) -> str:
         return f"{self.facility_name} ({self.facility_email})"
@@ -69,4 +69,12 @@ class BloodInventory(Base):
             "blood_type",
             "blood_bank_id",
         ),
+        # FEFO lot picking: equality prefix then expiry order
+        Index(
+            "idx_inventory_fefo",
+            "blood_bank_id",
+            "blood_product",
+            "blood_type",
+            "expiry_date",
+        ),
     )
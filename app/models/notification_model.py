@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import String, DateTime, Boolean, ForeignKey
+from sqlalchemy import String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime, timezone
@@ -38,6 +38,15 @@ class Notification(Base):
         self.is_read = True
         self.updated_at = datetime.now(timezone.utc)
 
+    # --- Table Configuration for Performance ---
+    __table_args__ = (
+        # Inbox listing and keyset paging by (created_at, id), optionally by read state
+        Index("idx_notification_user_created", "user_id", "created_at", "id"),
+        Index(
+            "idx_notification_user_read_created", "user_id", "is_read", "created_at", "id"
+        ),
+    )
+
     def mark_as_unread(self):
         self.is_read = False
         self.updated_at = datetime.now(timezone.utc)
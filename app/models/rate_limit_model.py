@@ -0,0 +1,26 @@
+from sqlalchemy import BigInteger, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+
+class RateLimitCounter(Base):
+    """Sliding-window counter shared by every worker (database rate limit store)"""
+
+    __tablename__ = "rate_limit_counters"
+
+    # --- Columns ---
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    window_index: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, comment="Fixed window number (epoch // window)"
+    )
+    current_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    previous_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    expires_at: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        index=True,
+        comment="Epoch second after which the counter no longer affects a limit",
+    )
+
+    def __str__(self) -> str:
+        return f"RateLimitCounter({self.key}: {self.current_count})"
@@ -220,6 +220,12 @@ class BloodRequest(Base):
         Index("idx_request_created_status", "created_at", "request_status"),
         Index("idx_request_group_master", "request_group_id", "is_master_request"),
         Index("idx_request_requester_date", "requester_id", "created_at"),
+        Index(
+            "idx_request_requester_status_date",
+            "requester_id",
+            "request_status",
+            "created_at",
+        ),
         Index("idx_request_product_facility", "blood_product", "facility_id"),
         Index("idx_request_processing_priority", "processing_status", "priority"),
     )
@@ -1,6 +1,6 @@
 import uuid
 from typing import Optional
-from sqlalchemy import String, ForeignKey, DateTime
+from sqlalchemy import String, ForeignKey, DateTime, Index
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
@@ -55,4 +55,13 @@ class TrackState(Base):
 
     # --- Methods ---
     def __str__(self) -> str:
-        return f"TrackState({self.status}, {self.timestamp})"
\ No newline at end of file
+        return f"TrackState({self.status}, {self.timestamp})"
+
+    # --- Table Configuration for Performance ---
+    __table_args__ = (
+        # Timelines per request / distribution, latest first
+        Index("idx_track_state_request_timestamp", "blood_request_id", "timestamp"),
+        Index(
+            "idx_track_state_distribution_timestamp", "blood_distribution_id", "timestamp"
+        ),
+    )
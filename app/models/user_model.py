@@ -231,6 +231,11 @@ class User(Base):
 
             stmt = stmt.values(is_active=False, terminated_at=func.now())
             await session.execute(stmt)
+
+            # Bulk UPDATE bypasses the flush-time change collection
+            from app.utils.principal_cache import invalidate_user_on_commit
+
+            invalidate_user_on_commit(session, self.id)
         else:
             # Fallback: try to access already loaded sessions
             try:
@@ -24,8 +24,8 @@ from app.utils.security import (
     SessionManager,
     get_current_user,
     authenticate_user,
-    cleanup_expired_refresh_tokens,
 )
+from app.utils.auth_context import get_auth_context
 from app.utils.data_wrapper import DataWrapper
 from app.utils.logging_config import (
     get_logger,
@@ -113,9 +113,6 @@ async def login(
     )
 
     try:
-        # Clean up expired refresh tokens periodically
-        background_tasks.add_task(cleanup_expired_refresh_tokens, db)
-
         # Authenticate user with enhanced security
         auth_success, user, error_message = await authenticate_user(
             db=db,
@@ -474,11 +471,16 @@ async def logout(
     )
 
     try:
-        # Get current session ID from token if available
+        # Get current session ID from the request's auth context or token
+        auth_context = get_auth_context(request)
         auth_header = request.headers.get("authorization")
         session_id = None
 
-        if auth_header and auth_header.startswith("Bearer "):
+        if auth_context is not None:
+            session_id = (
+                str(auth_context.session_id) if auth_context.session_id else None
+            )
+        elif auth_header and auth_header.startswith("Bearer "):
             try:
                 token = auth_header.split(" ")[1]
                 payload = TokenManager.decode_token(token)
@@ -603,10 +605,13 @@ async def logout_all_devices(
 
     try:
         # Get current session ID to potentially keep it active
+        auth_context = get_auth_context(request)
         auth_header = request.headers.get("authorization")
         current_session_id = None
 
-        if auth_header and auth_header.startswith("Bearer "):
+        if auth_context is not None:
+            current_session_id = auth_context.session_id
+        elif auth_header and auth_header.startswith("Bearer "):
             try:
                 token = auth_header.split(" ")[1]
                 payload = TokenManager.decode_token(token)
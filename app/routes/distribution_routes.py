@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.distribution_schema import (
     BloodDistributionCreate,
@@ -7,7 +7,10 @@ from app.schemas.distribution_schema import (
     BloodDistributionDetailResponse,
     DistributionStatus,
 )
-from app.services.distribution_service import BloodDistributionService
+from app.services.distribution_service import (
+    BloodDistributionService,
+    DISTRIBUTION_EXPORT_COLUMNS,
+)
 from app.models.user_model import User
 from app.utils.permission_checker import require_permission
 from app.utils.ip_address_finder import get_client_ip
@@ -19,9 +22,10 @@ from app.utils.logging_config import (
     log_performance_metric,
 )
 from app.utils.generic_id import get_user_blood_bank_id
+from app.utils.export import ExportFormat, export_response
+from app.utils.pagination import PaginatedResponse
 from uuid import UUID
 from typing import List, Optional
-from datetime import datetime
 import time
 
 logger = get_logger(__name__)
@@ -498,11 +502,11 @@ async def get_distribution(
         raise HTTPException(status_code=500, detail="Failed to retrieve distribution")
 
 
-@router.get("/", response_model=List[BloodDistributionDetailResponse])
-async def list_distributions(
+@router.get("/export/{export_format}")
+async def export_distributions(
+    export_format: ExportFormat,
     status: Optional[DistributionStatus] = None,
     facility_id: Optional[UUID] = None,
-    recent_days: Optional[int] = None,
     request: Request = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(
@@ -511,10 +515,102 @@ async def list_distributions(
         )
     ),
 ):
-    """List blood distributions with optional filtering and comprehensive logging"""
+    """Stream the blood bank's distributions as CSV or NDJSON"""
+    current_user_id = str(current_user.id)
+    client_ip = get_client_ip(request) if request else "unknown"
+
+    logger.info(
+        "Distribution export started",
+        extra={
+            "event_type": "distribution_export_attempt",
+            "user_id": current_user_id,
+            "export_type": export_format.value,
+            "client_ip": client_ip,
+        },
+    )
+
+    blood_bank_id = await get_user_blood_bank_id(db, current_user.id)
+    if not blood_bank_id:
+        log_security_event(
+            event_type="distribution_export_denied",
+            details={"reason": "no_blood_bank_association"},
+            user_id=current_user_id,
+            ip_address=client_ip,
+        )
+        raise HTTPException(
+            status_code=403,
+            detail="User is not associated with any blood bank",
+        )
+
+    query = BloodDistributionService(db).build_export_query(
+        blood_bank_id, status=status, facility_id=facility_id
+    )
+
+    def on_complete(export_count: int, duration_seconds: float):
+        log_audit_event(
+            action="export",
+            resource_type="blood_distribution",
+            resource_id=f"{export_format.value}_export_{export_count}_records",
+            new_values={
+                "export_type": export_format.value,
+                "records_count": export_count,
+                "blood_bank_id": str(blood_bank_id),
+            },
+            user_id=current_user_id,
+        )
+        log_performance_metric(
+            operation="distribution_export",
+            duration_seconds=duration_seconds,
+            additional_metrics={"records_exported": export_count},
+        )
+
+    return export_response(
+        query,
+        DISTRIBUTION_EXPORT_COLUMNS,
+        export_format,
+        filename="blood_distributions",
+        on_complete=on_complete,
+    )
+
+
+@router.get("/", response_model=PaginatedResponse[BloodDistributionDetailResponse])
+async def list_distributions(
+    distribution_status: Optional[DistributionStatus] = Query(
+        None, alias="status", description="Filter by distribution status"
+    ),
+    facility_id: Optional[UUID] = Query(
+        None, description="Filter by receiving facility"
+    ),
+    recent_days: Optional[int] = Query(
+        None, ge=1, description="Only distributions created in the last N days"
+    ),
+    page: int = Query(1, ge=1, description="Page number (starts from 1)"),
+    page_size: int = Query(
+        20, ge=1, le=100, description="Number of items per page (max 100)"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Cursor from next_cursor; takes precedence over page"
+    ),
+    include_total: bool = Query(
+        True, description="Compute total_items/total_pages (slower)"
+    ),
+    request: Request = None,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(
+        require_permission(
+            "facility.manage", "laboratory.manage", "blood.issue.can_view"
+        )
+    ),
+):
+    """List blood distributions with optional filtering, paginated"""
     start_time = time.time()
     current_user_id = str(current_user.id)
     client_ip = get_client_ip(request) if request else "unknown"
+    filters = {
+        "status": distribution_status.value if distribution_status else None,
+        "facility_id": str(facility_id) if facility_id else None,
+        "recent_days": recent_days,
+    }
 
     logger.info(
         "Distribution list retrieval started",
@@ -522,11 +618,9 @@ async def list_distributions(
             "event_type": "distribution_list_attempt",
             "user_id": current_user_id,
             "client_ip": client_ip,
-            "filters": {
-                "status": status.value if status else None,
-                "facility_id": str(facility_id) if facility_id else None,
-                "recent_days": recent_days,
-            },
+            "filters": filters,
+            "page": page,
+            "page_size": page_size,
         },
     )
 
@@ -558,33 +652,17 @@ async def list_distributions(
             )
 
         distribution_service = BloodDistributionService(db)
-
-        # Get all distributions for this blood bank first
-        blood_bank_distributions = (
-            await distribution_service.get_distributions_by_blood_bank(blood_bank_id)
+        result = await distribution_service.list_distributions(
+            blood_bank_id,
+            status=distribution_status,
+            facility_id=facility_id,
+            recent_days=recent_days,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total,
         )
 
-        # Apply additional filters if specified
-        if status:
-            enum_status = DistributionStatus(status)
-            filtered_distributions = [
-                d for d in blood_bank_distributions if d.status == enum_status
-            ]
-        elif facility_id:
-            filtered_distributions = [
-                d for d in blood_bank_distributions if d.dispatched_to_id == facility_id
-            ]
-        elif recent_days:
-            cutoff_date = datetime.now().replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
-            cutoff_date = cutoff_date.replace(day=cutoff_date.day - recent_days)
-            filtered_distributions = [
-                d for d in blood_bank_distributions if d.created_at >= cutoff_date
-            ]
-        else:
-            filtered_distributions = blood_bank_distributions
-
         # Calculate duration
         duration_ms = (time.time() - start_time) * 1000
 
@@ -594,8 +672,10 @@ async def list_distributions(
                 "event_type": "distribution_list_retrieved",
                 "user_id": current_user_id,
                 "blood_bank_id": str(blood_bank_id),
-                "total_distributions": len(blood_bank_distributions),
-                "filtered_distributions": len(filtered_distributions),
+                "returned_items": len(result.items),
+                "total_items": result.total_items,
+                "page": page,
+                "page_size": page_size,
                 "duration_ms": duration_ms,
             },
         )
@@ -607,32 +687,15 @@ async def list_distributions(
                 duration_seconds=duration_ms / 1000,
                 additional_metrics={
                     "slow_query": True,
-                    "result_count": len(filtered_distributions),
+                    "result_count": len(result.items),
                     "blood_bank_id": str(blood_bank_id),
-                    "filters_applied": bool(status or facility_id or recent_days),
+                    "filters_applied": bool(
+                        distribution_status or facility_id or recent_days
+                    ),
                 },
             )
 
-        # Format each distribution for response
-        response_data = [
-            BloodDistributionDetailResponse(
-                **BloodDistributionResponse.model_validate(
-                    dist, from_attributes=True
-                ).model_dump(),
-                dispatched_from_name=(
-                    dist.dispatched_from.blood_bank_name
-                    if dist.dispatched_from
-                    else None
-                ),
-                dispatched_to_name=(
-                    dist.dispatched_to.facility_name if dist.dispatched_to else None
-                ),
-                created_by_name=dist.created_by.last_name if dist.created_by else None,
-            )
-            for dist in filtered_distributions
-        ]
-
-        return response_data
+        return result
 
     except HTTPException:
         # Re-raise HTTP exceptions (already logged above)
@@ -1,5 +1,5 @@
 import time
-from app.utils.generic_id import get_user_blood_bank_id
+from app.utils.generic_id import get_user_blood_bank_id, get_user_facility_id
 from app.utils.ip_address_finder import get_client_ip
 from app.utils.logging_config import log_audit_event, log_performance_metric, log_security_event
 from fastapi import (
@@ -23,16 +23,20 @@ from app.schemas.inventory_schema import (
     BatchOperationResponse, 
     InventoryStatistics,
     BloodInventorySearchParams,
+    CompatibleFacilityStock,
+    NearbyFacilityStock,
     PaginatedFacilityResponse
 )
-from app.services.inventory_service import BloodInventoryService
+from app.services.inventory_service import BloodInventoryService, INVENTORY_EXPORT_COLUMNS
 from app.models.user_model import User
+from app.models.health_facility_model import Facility
 from app.models.inventory_model import BloodInventory
+from app.utils.export import ExportFormat, export_response
 from app.utils.pagination import PaginatedResponse, PaginationParams, get_pagination_params
 from app.utils.security import get_current_user
 from app.dependencies import get_db
 from uuid import UUID
-from typing import Optional, Annotated
+from typing import List, Optional, Annotated
 from sqlalchemy.future import select
 from datetime import datetime
 import logging
@@ -486,6 +490,249 @@ async def get_facilities_with_available_blood(
         )
 
 
+@router.get(
+    "/facilities/compatible-stock",
+    response_model=PaginatedResponse[CompatibleFacilityStock],
+)
+async def search_compatible_stock(
+    request: Request,
+    recipient_type: Annotated[
+        str, Query(description="Recipient's blood type (e.g., A+)")
+    ],
+    blood_product: Annotated[
+        str, Query(description="Blood product needed (e.g., Red Blood Cells)")
+    ],
+    min_units: Annotated[
+        int, Query(ge=1, description="Minimum compatible units a facility must hold")
+    ] = 1,
+    pagination: PaginationParams = Depends(get_pagination_params),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(
+        require_permission(
+            "any"
+        )
+    ),
+):
+    """
+    Facilities (excluding your own blood bank) holding blood the recipient can
+    receive. Red cell products include every compatible donor type; other
+    products match the exact type. Ranked by exact-type units, then by all
+    compatible units.
+    """
+    start_time = time.time()
+    client_ip = get_client_ip(request)
+    user_id = str(current_user.id)
+
+    logger.info(
+        "Compatible stock search started",
+        extra={
+            "event_type": "compatible_stock_search_attempt",
+            "user_id": user_id,
+            "recipient_type": recipient_type,
+            "blood_product": blood_product,
+            "min_units": min_units,
+            "page": pagination.page,
+            "page_size": pagination.page_size,
+            "client_ip": client_ip,
+        },
+    )
+
+    try:
+        user_blood_bank_id = await get_user_blood_bank_id(db, current_user.id)
+
+        blood_service = BloodInventoryService(db)
+        result = await blood_service.search_compatible_stock(
+            recipient_type=recipient_type,
+            blood_product=blood_product,
+            min_units=min_units,
+            pagination=pagination,
+            exclude_blood_bank_id=user_blood_bank_id,
+        )
+
+        duration_ms = (time.time() - start_time) * 1000
+
+        logger.info(
+            "Compatible stock search successful",
+            extra={
+                "event_type": "compatible_stock_search_success",
+                "user_id": user_id,
+                "recipient_type": recipient_type,
+                "blood_product": blood_product,
+                "facilities_found": len(result.items),
+                "duration_ms": duration_ms,
+            },
+        )
+
+        if duration_ms > 1000:  # More than 1 second
+            log_performance_metric(
+                operation="compatible_stock_search",
+                duration_seconds=duration_ms / 1000,
+                additional_metrics={
+                    "slow_query": True,
+                    "recipient_type": recipient_type,
+                    "blood_product": blood_product,
+                    "page_size": pagination.page_size,
+                },
+            )
+
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        duration_ms = (time.time() - start_time) * 1000
+
+        logger.error(
+            "Compatible stock search failed",
+            extra={
+                "event_type": "compatible_stock_search_error",
+                "user_id": user_id,
+                "recipient_type": recipient_type,
+                "blood_product": blood_product,
+                "error": str(e),
+                "duration_ms": duration_ms,
+            },
+            exc_info=True,
+        )
+
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not search compatible stock",
+        )
+
+
+@router.get("/facilities/nearest-stock", response_model=List[NearbyFacilityStock])
+async def find_nearest_facilities_with_stock(
+    request: Request,
+    blood_type: Annotated[str, Query(description="Blood type needed (e.g., O-)")],
+    blood_product: Annotated[
+        str, Query(description="Blood product needed (e.g., Red Blood Cells)")
+    ],
+    min_units: Annotated[
+        int, Query(ge=1, description="Minimum unexpired units a facility must hold")
+    ] = 1,
+    latitude: Annotated[
+        Optional[float],
+        Query(ge=-90, le=90, description="Search origin; defaults to your facility"),
+    ] = None,
+    longitude: Annotated[
+        Optional[float],
+        Query(ge=-180, le=180, description="Search origin; defaults to your facility"),
+    ] = None,
+    limit: Annotated[int, Query(ge=1, le=50, description="Facilities to return")] = 10,
+    max_radius_km: Annotated[
+        float, Query(gt=0, le=5000, description="Give up beyond this distance")
+    ] = 800.0,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(
+        require_permission(
+            "any"
+        )
+    ),
+):
+    """
+    Closest facilities (excluding your own blood bank) holding at least
+    min_units of the requested blood type and product, nearest first, with
+    distance and available quantity.
+    """
+    start_time = time.time()
+    client_ip = get_client_ip(request)
+    user_id = str(current_user.id)
+
+    logger.info(
+        "Nearest facility stock search started",
+        extra={
+            "event_type": "nearest_stock_search_attempt",
+            "user_id": user_id,
+            "blood_type": blood_type,
+            "blood_product": blood_product,
+            "min_units": min_units,
+            "client_ip": client_ip,
+        },
+    )
+
+    try:
+        if (latitude is None) != (longitude is None):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Provide both latitude and longitude, or neither",
+            )
+
+        if latitude is None:
+            facility = await db.get(Facility, get_user_facility_id(current_user))
+            if not facility or facility.latitude is None or facility.longitude is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Your facility has no coordinates; provide latitude and longitude",
+                )
+            latitude, longitude = facility.latitude, facility.longitude
+
+        user_blood_bank_id = await get_user_blood_bank_id(db, current_user.id)
+
+        blood_service = BloodInventoryService(db)
+        result = await blood_service.find_nearest_facilities_with_stock(
+            latitude=latitude,
+            longitude=longitude,
+            blood_type=blood_type,
+            blood_product=blood_product,
+            min_units=min_units,
+            limit=limit,
+            max_radius_km=max_radius_km,
+            exclude_blood_bank_id=user_blood_bank_id,
+        )
+
+        duration_ms = (time.time() - start_time) * 1000
+
+        logger.info(
+            "Nearest facility stock search successful",
+            extra={
+                "event_type": "nearest_stock_search_success",
+                "user_id": user_id,
+                "blood_type": blood_type,
+                "blood_product": blood_product,
+                "facilities_found": len(result),
+                "duration_ms": duration_ms,
+            },
+        )
+
+        if duration_ms > 1000:  # More than 1 second
+            log_performance_metric(
+                operation="nearest_stock_search",
+                duration_seconds=duration_ms / 1000,
+                additional_metrics={
+                    "slow_query": True,
+                    "blood_type": blood_type,
+                    "blood_product": blood_product,
+                    "max_radius_km": max_radius_km,
+                },
+            )
+
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        duration_ms = (time.time() - start_time) * 1000
+
+        logger.error(
+            "Nearest facility stock search failed",
+            extra={
+                "event_type": "nearest_stock_search_error",
+                "user_id": user_id,
+                "blood_type": blood_type,
+                "blood_product": blood_product,
+                "error": str(e),
+                "duration_ms": duration_ms,
+            },
+            exc_info=True,
+        )
+
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not search nearby facility stock",
+        )
+
+
 @router.patch("/batch", response_model=BatchOperationResponse)
 async def batch_update_blood_units(
     batch_data: BloodInventoryBatchUpdate,
@@ -1035,7 +1282,8 @@ async def facility_blood_inventory(
             current_page=result.current_page,
             page_size=result.page_size,
             has_next=result.has_next,
-            has_prev=result.has_prev
+            has_prev=result.has_prev,
+            next_cursor=result.next_cursor
         )
         
     except HTTPException:
@@ -1095,28 +1343,8 @@ async def advanced_search_blood_units(
     try:
         blood_service = BloodInventoryService(db)
         
-        # Convert search params to service method parameters
-        result = await blood_service.get_paginated_blood_units(
-            pagination=pagination,
-            blood_type=search_params.blood_types[0] if search_params.blood_types else None,
-            blood_product=search_params.blood_products[0] if search_params.blood_products else None,
-            expiry_date_from=datetime.combine(search_params.expiry_date_from, datetime.min.time()) if search_params.expiry_date_from else None,
-            expiry_date_to=datetime.combine(search_params.expiry_date_to, datetime.min.time()) if search_params.expiry_date_to else None,
-            search_term=search_params.search_term
-        )
-        
-        # Additional filtering for complex criteria
-        if search_params.blood_types and len(search_params.blood_types) > 1:
-            result.items = [item for item in result.items if item.blood_type in search_params.blood_types]
-        
-        if search_params.blood_products and len(search_params.blood_products) > 1:
-            result.items = [item for item in result.items if item.blood_product in search_params.blood_products]
-        
-        if search_params.min_quantity is not None:
-            result.items = [item for item in result.items if item.quantity >= search_params.min_quantity]
-        
-        if search_params.max_quantity is not None:
-            result.items = [item for item in result.items if item.quantity <= search_params.max_quantity]
+        # All filters, pagination and counts run in the database
+        result = await blood_service.search_blood_units(search_params, pagination)
         
         # Transform to detailed response
         detailed_items = [
@@ -1137,6 +1365,7 @@ async def advanced_search_blood_units(
             extra={
                 "event_type": "advanced_blood_search_completed",
                 "results_count": results_count,
+                "total_items": result.total_items,
                 "total_filters": len([f for f in [
                     search_params.blood_types,
                     search_params.blood_products,
@@ -1162,14 +1391,17 @@ async def advanced_search_blood_units(
         
         return PaginatedResponse(
             items=detailed_items,
-            total_items=len(detailed_items),
-            total_pages=(len(detailed_items) + pagination.page_size - 1) // pagination.page_size,
-            current_page=pagination.page,
-            page_size=pagination.page_size,
-            has_next=pagination.page * pagination.page_size < len(detailed_items),
-            has_prev=pagination.page > 1
+            total_items=result.total_items,
+            total_pages=result.total_pages,
+            current_page=result.current_page,
+            page_size=result.page_size,
+            has_next=result.has_next,
+            has_prev=result.has_prev,
+            next_cursor=result.next_cursor
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         # Log unexpected errors
         duration_ms = (time.time() - start_time) * 1000
@@ -1782,9 +2014,10 @@ async def get_inventory_statistics(
         raise HTTPException(status_code=500, detail="Failed to retrieve inventory statistics")
 
 
-@router.get("/export/csv")
-async def export_inventory_csv(
+@router.get("/export/{export_format}")
+async def export_inventory(
     request: Request,
+    export_format: ExportFormat = Path(..., description="csv or ndjson"),
     blood_type: Optional[str] = Query(None, description="Filter by blood type"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_permission(
@@ -1793,28 +2026,26 @@ async def export_inventory_csv(
     ))
 ):
     """
-    Export blood inventory data as CSV with comprehensive logging.
-    Supports filtering and is optimized for large datasets.
+    Export blood inventory data as CSV or NDJSON with comprehensive logging.
+    Rows are streamed from a server-side cursor, so memory stays flat
+    regardless of inventory size.
     """
     start_time = time.time()
     user_id = str(current_user.id)
     client_ip = get_client_ip(request)
     
     logger.info(
-        "Inventory CSV export started",
+        "Inventory export started",
         extra={
-            "event_type": "inventory_csv_export_attempt",
+            "event_type": "inventory_export_attempt",
             "user_id": user_id,
+            "export_type": export_format.value,
             "blood_type_filter": blood_type,
             "client_ip": client_ip
         }
     )
     
     try:
-        from fastapi.responses import StreamingResponse
-        import csv
-        import io
-        
         blood_bank_id = await get_user_blood_bank_id(db, current_user.id)
         
         if not blood_bank_id:
@@ -1823,14 +2054,14 @@ async def export_inventory_csv(
                 details={
                     "reason": "no_blood_bank_access",
                     "user_id": user_id,
-                    "export_type": "csv"
+                    "export_type": export_format.value
                 },
                 user_id=user_id,
                 ip_address=client_ip
             )
             
             logger.warning(
-                "Inventory CSV export denied - no blood bank access",
+                "Inventory export denied - no blood bank access",
                 extra={
                     "event_type": "inventory_export_denied",
                     "user_id": user_id,
@@ -1843,102 +2074,51 @@ async def export_inventory_csv(
                 detail="You do not belong to any facility or blood bank. Please contact admin."
             )
         
-        blood_service = BloodInventoryService(db)
-        
-        # Get all units (without pagination for export)
-        if blood_type:
-            units = await blood_service.get_blood_units_by_type(blood_type)
-        else:
-            units = await blood_service.get_blood_units_by_bank(blood_bank_id)
-        
-        # Filter by blood bank if needed
-        if blood_bank_id:
-            units = [unit for unit in units if unit.blood_bank_id == blood_bank_id]
-        
-        # Create CSV content
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            'ID', 'Blood Product', 'Blood Type', 'Quantity', 'Expiry Date',
-            'Blood Bank', 'Added By', 'Created At', 'Updated At'
-        ])
-        
-        # Write data
-        export_count = 0
-        for unit in units:
-            writer.writerow([
-                str(unit.id),
-                unit.blood_product,
-                unit.blood_type,
-                unit.quantity,
-                unit.expiry_date.isoformat(),
-                unit.blood_bank.blood_bank_name if unit.blood_bank else '',
-                unit.added_by.last_name if unit.added_by else '',
-                unit.created_at.isoformat(),
-                unit.updated_at.isoformat()
-            ])
-            export_count += 1
-        
-        output.seek(0)
-        
-        # Calculate duration
-        duration_ms = (time.time() - start_time) * 1000
-        
-        # Log successful export
-        log_security_event(
-            event_type="inventory_exported",
-            details={
-                "export_type": "csv",
-                "records_exported": export_count,
-                "blood_type_filter": blood_type,
-                "blood_bank_id": str(blood_bank_id),
-                "duration_ms": duration_ms
-            },
-            user_id=user_id,
-            ip_address=client_ip
-        )
-        
-        log_audit_event(
-            action="export",
-            resource_type="blood_inventory",
-            resource_id=f"csv_export_{export_count}_records",
-            new_values={
-                "export_type": "csv",
-                "records_count": export_count,
-                "blood_type_filter": blood_type,
-                "blood_bank_id": str(blood_bank_id)
-            },
-            user_id=user_id
-        )
-        
-        logger.info(
-            "Inventory CSV export successful",
-            extra={
-                "event_type": "inventory_csv_exported",
-                "user_id": user_id,
-                "records_exported": export_count,
-                "blood_type_filter": blood_type,
-                "duration_ms": duration_ms
-            }
-        )
-        
-        # Log performance metrics
-        log_performance_metric(
-            operation="inventory_csv_export",
-            duration_seconds=duration_ms,
-            additional_metrics={
-                "records_exported": export_count,
-                "export_rate": export_count / (duration_ms / 1000) if duration_ms > 0 else 0,
-                "file_size_estimate": len(output.getvalue())
-            }
-        )
+        query = BloodInventoryService(db).build_export_query(blood_bank_id, blood_type)
+
+        def on_complete(export_count: int, duration_seconds: float):
+            # Runs after the last chunk has been streamed
+            log_security_event(
+                event_type="inventory_exported",
+                details={
+                    "export_type": export_format.value,
+                    "records_exported": export_count,
+                    "blood_type_filter": blood_type,
+                    "blood_bank_id": str(blood_bank_id),
+                    "duration_ms": duration_seconds * 1000
+                },
+                user_id=user_id,
+                ip_address=client_ip
+            )
+            
+            log_audit_event(
+                action="export",
+                resource_type="blood_inventory",
+                resource_id=f"{export_format.value}_export_{export_count}_records",
+                new_values={
+                    "export_type": export_format.value,
+                    "records_count": export_count,
+                    "blood_type_filter": blood_type,
+                    "blood_bank_id": str(blood_bank_id)
+                },
+                user_id=user_id
+            )
+            
+            log_performance_metric(
+                operation="inventory_export",
+                duration_seconds=duration_seconds,
+                additional_metrics={
+                    "records_exported": export_count,
+                    "export_rate": export_count / duration_seconds if duration_seconds > 0 else 0,
+                }
+            )
         
-        return StreamingResponse(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            media_type='text/csv',
-            headers={'Content-Disposition': 'attachment; filename=blood_inventory.csv'}
+        return export_response(
+            query,
+            INVENTORY_EXPORT_COLUMNS,
+            export_format,
+            filename="blood_inventory",
+            on_complete=on_complete,
         )
         
     except HTTPException:
@@ -1949,9 +2129,9 @@ async def export_inventory_csv(
         duration_ms = (time.time() - start_time) * 1000
         
         logger.error(
-            "Inventory CSV export failed due to unexpected error",
+            "Inventory export failed due to unexpected error",
             extra={
-                "event_type": "inventory_csv_export_error",
+                "event_type": "inventory_export_error",
                 "user_id": user_id,
                 "blood_type_filter": blood_type,
                 "error": str(e),
@@ -1960,4 +2140,4 @@ async def export_inventory_csv(
             exc_info=True
         )
         
-        raise HTTPException(status_code=500, detail="CSV export failed")
+        raise HTTPException(status_code=500, detail="Export failed")
@@ -21,10 +21,17 @@ from app.schemas.notification_schema import (
     NotificationBatchUpdate,
     NotificationStats,
 )
+from app.utils.export import (
+    ExportColumn,
+    ExportFormat,
+    export_response,
+    export_select,
+)
 from app.utils.pagination import (
     PaginatedResponse,
     PaginationParams,
     get_pagination_params,
+    paginate_query,
 )
 from typing import Optional, List
 from uuid import UUID
@@ -32,6 +39,14 @@ from uuid import UUID
 logger = get_logger(__name__)
 router = APIRouter(prefix="/notifications", tags=["Notifications"])
 
+NOTIFICATION_EXPORT_COLUMNS = [
+    ExportColumn("id", "ID", Notification.id),
+    ExportColumn("title", "Title", Notification.title),
+    ExportColumn("message", "Message", Notification.message),
+    ExportColumn("is_read", "Read", Notification.is_read),
+    ExportColumn("created_at", "Created At", Notification.created_at),
+]
+
 
 @router.get("/sse/stream")
 async def sse_notifications(
@@ -776,7 +791,11 @@ async def broadcast_notification(
     return {
         "success": True,
         "sent_count": sent_count,
-        "message": f"Notification sent to {sent_count} connections",
+        "message": (
+            f"Notification sent to {sent_count} connections"
+            if sent_count
+            else "Notification published to all workers"
+        ),
     }
 
 
@@ -794,6 +813,8 @@ async def get_user_notifications(
     Query Parameters:
         - page: Page number (default: 1)
         - page_size: Items per page (default: 20, max: 100)
+        - cursor: next_cursor from a previous page (keyset paging)
+        - include_total: Set false to skip counting (default: true)
         - is_read: Filter by read status (optional)
     """
     user_id = str(current_user.id)
@@ -817,33 +838,15 @@ async def get_user_notifications(
         if is_read is not None:
             query = query.where(Notification.is_read == is_read)
 
-        # Order by created_at desc (newest first)
-        query = query.order_by(Notification.created_at.desc())
-
-        # Get total count
-        count_query = (
-            select(func.count())
-            .select_from(Notification)
-            .where(Notification.user_id == current_user.id)
+        # Newest first; keyset cursors page by (created_at, id)
+        page = await paginate_query(
+            db,
+            query,
+            pagination,
+            sort_column=Notification.created_at,
+            id_column=Notification.id,
         )
-        if is_read is not None:
-            count_query = count_query.where(Notification.is_read == is_read)
-
-        total_result = await db.execute(count_query)
-        total_items = total_result.scalar()
-
-        # Apply pagination
-        offset = (pagination.page - 1) * pagination.page_size
-        query = query.offset(offset).limit(pagination.page_size)
-
-        # Execute query
-        result = await db.execute(query)
-        notifications = result.scalars().all()
-
-        # Calculate pagination metadata
-        total_pages = (total_items + pagination.page_size - 1) // pagination.page_size
-        has_next = pagination.page < total_pages
-        has_prev = pagination.page > 1
+        notifications = page.items
 
         logger.info(
             f"Retrieved {len(notifications)} notifications for user {user_id}",
@@ -851,20 +854,14 @@ async def get_user_notifications(
                 "event_type": "notifications_retrieved",
                 "user_id": user_id,
                 "count": len(notifications),
-                "total": total_items,
+                "total": page.total_items,
             },
         )
 
-        return PaginatedResponse(
-            items=notifications,
-            total_items=total_items,
-            total_pages=total_pages,
-            current_page=pagination.page,
-            page_size=pagination.page_size,
-            has_next=has_next,
-            has_prev=has_prev,
-        )
+        return page
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(
             f"Error fetching notifications for user {user_id}: {str(e)}",
@@ -881,6 +878,43 @@ async def get_user_notifications(
         )
 
 
+@router.get("/export/{export_format}")
+async def export_user_notifications(
+    export_format: ExportFormat,
+    is_read: Optional[bool] = None,
+    current_user: User = Depends(get_current_user),
+):
+    """Stream the current user's notifications as CSV or NDJSON, newest first."""
+    query = export_select(NOTIFICATION_EXPORT_COLUMNS).where(
+        Notification.user_id == current_user.id
+    )
+    if is_read is not None:
+        query = query.where(Notification.is_read == is_read)
+    query = query.order_by(Notification.created_at.desc(), Notification.id.desc())
+
+    user_id = str(current_user.id)
+
+    def on_complete(export_count: int, duration_seconds: float):
+        logger.info(
+            f"Exported {export_count} notifications for user {user_id}",
+            extra={
+                "event_type": "notifications_exported",
+                "user_id": user_id,
+                "export_type": export_format.value,
+                "count": export_count,
+                "duration_ms": duration_seconds * 1000,
+            },
+        )
+
+    return export_response(
+        query,
+        NOTIFICATION_EXPORT_COLUMNS,
+        export_format,
+        filename="notifications",
+        on_complete=on_complete,
+    )
+
+
 @router.get("/stats", response_model=NotificationStats)
 async def get_notification_stats(
     request: Request,
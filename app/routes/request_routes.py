@@ -16,7 +16,7 @@ from app.schemas.request_schema import (
     RequestDirection,
 )
 from app.utils.permission_checker import require_permission
-from app.services.request_service import BloodRequestService
+from app.services.request_service import BloodRequestService, REQUEST_EXPORT_COLUMNS
 from app.models.request_model import RequestStatus, ProcessingStatus
 from app.utils.logging_config import (
     get_logger,
@@ -25,6 +25,7 @@ from app.utils.logging_config import (
     log_performance_metric,
 )
 from app.utils.ip_address_finder import get_client_ip
+from app.utils.export import ExportFormat, export_response
 
 # Get logger for this module
 logger = get_logger(__name__)
@@ -234,6 +235,12 @@ async def list_facility_requests(
     page_size: int = Query(
         10, ge=1, le=100, description="Number of items per page (max 100)"
     ),
+    cursor: Optional[str] = Query(
+        None, description="Cursor from next_cursor; takes precedence over page"
+    ),
+    include_total: bool = Query(
+        True, description="Compute total_items/total_pages (slower)"
+    ),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(
         require_permission(
@@ -268,6 +275,8 @@ async def list_facility_requests(
             processing_status=processing_status.value if processing_status else None,
             page=page,
             page_size=page_size,
+            cursor=cursor,
+            include_total=include_total,
         )
 
         duration_ms = (time.time() - start_time) * 1000
@@ -306,6 +315,8 @@ async def list_facility_requests(
 
         return result
 
+    except HTTPException:
+        raise
     except Exception as e:
         duration_ms = (time.time() - start_time) * 1000
 
@@ -323,9 +334,90 @@ async def list_facility_requests(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.get("/groups", response_model=List[BloodRequestGroupResponse])
+@router.get("/export/{export_format}")
+async def export_facility_requests(
+    export_format: ExportFormat,
+    option: Optional[RequestDirection] = Query(
+        RequestDirection.ALL,
+        description="Filter requests by direction: 'received', 'sent', or 'all'",
+    ),
+    request_status: Optional[RequestStatus] = Query(
+        None, description="Filter by request status"
+    ),
+    processing_status: Optional[ProcessingStatus] = Query(
+        None, description="Filter by processing status"
+    ),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(
+        require_permission(
+            "facility.manage", "laboratory.manage", "blood.inventory.manage"
+        )
+    ),
+):
+    """Stream the facility's requests as CSV or NDJSON, same filters as listing."""
+    current_user_id = str(current_user.id)
+
+    logger.info(
+        "Facility requests export started",
+        extra={
+            "event_type": "facility_requests_export_attempt",
+            "current_user_id": current_user_id,
+            "export_type": export_format.value,
+            "option": option.value if option else "all",
+        },
+    )
+
+    query = await BloodRequestService(db).build_export_query(
+        user_id=current_user.id,
+        option=option.value if option else RequestDirection.ALL.value,
+        request_status=request_status.value if request_status else None,
+        processing_status=processing_status.value if processing_status else None,
+    )
+    if query is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not associated with any facility",
+        )
+
+    def on_complete(export_count: int, duration_seconds: float):
+        log_audit_event(
+            action="export",
+            resource_type="blood_request",
+            resource_id=f"{export_format.value}_export_{export_count}_records",
+            new_values={
+                "export_type": export_format.value,
+                "records_count": export_count,
+            },
+            user_id=current_user_id,
+        )
+        log_performance_metric(
+            operation="facility_requests_export",
+            duration_seconds=duration_seconds,
+            additional_metrics={"records_exported": export_count},
+        )
+
+    return export_response(
+        query,
+        REQUEST_EXPORT_COLUMNS,
+        export_format,
+        filename="blood_requests",
+        on_complete=on_complete,
+    )
+
+
+@router.get("/groups", response_model=PaginatedResponse[BloodRequestGroupResponse])
 async def list_my_request_groups(
     request: Request,
+    page: int = Query(1, ge=1, description="Page number (starts from 1)"),
+    page_size: int = Query(
+        10, ge=1, le=100, description="Number of groups per page (max 100)"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Cursor from next_cursor; takes precedence over page"
+    ),
+    include_total: bool = Query(
+        True, description="Compute total_items/total_pages (slower)"
+    ),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(
         require_permission(
@@ -333,7 +425,7 @@ async def list_my_request_groups(
         )
     ),
 ):
-    """List request groups made by the current user."""
+    """List request groups made by the current user, newest first."""
     start_time = time.time()
     current_user_id = str(current_user.id)
 
@@ -342,12 +434,20 @@ async def list_my_request_groups(
         extra={
             "event_type": "request_groups_access",
             "current_user_id": current_user_id,
+            "page": page,
+            "page_size": page_size,
         },
     )
 
     try:
         service = BloodRequestService(db)
-        groups = await service.list_request_groups_by_user(user_id=current_user.id)
+        groups = await service.list_request_groups_by_user(
+            user_id=current_user.id,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total,
+        )
 
         duration_ms = (time.time() - start_time) * 1000
 
@@ -356,13 +456,15 @@ async def list_my_request_groups(
             extra={
                 "event_type": "request_groups_accessed",
                 "current_user_id": current_user_id,
-                "group_count": len(groups),
+                "group_count": len(groups.items),
                 "duration_ms": duration_ms,
             },
         )
 
         return groups
 
+    except HTTPException:
+        raise
     except Exception as e:
         duration_ms = (time.time() - start_time) * 1000
 
@@ -934,10 +1036,22 @@ async def delete_blood_request(
         raise HTTPException(status_code=500, detail="Blood request deletion failed")
 
 
-@router.get("/status/{status}", response_model=List[BloodRequestResponse])
+@router.get(
+    "/status/{status}", response_model=PaginatedResponse[BloodRequestResponse]
+)
 async def list_requests_by_status(
     status: str,
     request: Request,
+    page: int = Query(1, ge=1, description="Page number (starts from 1)"),
+    page_size: int = Query(
+        10, ge=1, le=100, description="Number of items per page (max 100)"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Cursor from next_cursor; takes precedence over page"
+    ),
+    include_total: bool = Query(
+        True, description="Compute total_items/total_pages (slower)"
+    ),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(
         require_permission(
@@ -955,6 +1069,8 @@ async def list_requests_by_status(
             "event_type": "requests_by_status_access",
             "current_user_id": current_user_id,
             "status": status,
+            "page": page,
+            "page_size": page_size,
         },
     )
 
@@ -976,11 +1092,14 @@ async def list_requests_by_status(
 
         service = BloodRequestService(db)
 
-        # Get all requests by status, then filter by user
-        all_requests = await service.list_requests_by_status(request_status)
-        user_requests = [
-            req for req in all_requests if req.requester_id == current_user.id
-        ]
+        result = await service.list_requests_by_status(
+            request_status,
+            requester_id=current_user.id,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total,
+        )
 
         duration_ms = (time.time() - start_time) * 1000
 
@@ -990,8 +1109,9 @@ async def list_requests_by_status(
                 "event_type": "requests_by_status_accessed",
                 "current_user_id": current_user_id,
                 "status": status,
-                "request_count": len(user_requests),
-                "total_matching_status": len(all_requests),
+                "returned_items": len(result.items),
+                "page": page,
+                "page_size": page_size,
                 "duration_ms": duration_ms,
             },
         )
@@ -1004,12 +1124,12 @@ async def list_requests_by_status(
                 additional_metrics={
                     "slow_query": True,
                     "status_filter": status,
-                    "user_results": len(user_requests),
-                    "total_results": len(all_requests),
+                    "page_size": page_size,
+                    "returned_items": len(result.items),
                 },
             )
 
-        return user_requests
+        return result
 
     except HTTPException:
         raise
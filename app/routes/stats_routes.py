@@ -9,7 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 # Utility imports for caching and security
 from app.schemas.base_schema import BloodProduct, BloodType
-from app.utils.cache_manager import cache_key, manual_cache_get, manual_cache_set
+from app.utils.cache_manager import cache, cache_key, facility_tag
 from app.utils.permission_checker import require_permission
 
 # Application-specific imports
@@ -499,7 +499,6 @@ async def get_request_chart_get(
 
             # Generate cache key
             cache_key_str = cache_key(
-                "request_chart",
                 facility_id,
                 from_date.isoformat() if from_date else None,
                 to_date.isoformat() if to_date else None,
@@ -508,9 +507,58 @@ async def get_request_chart_get(
                 request_direction.value if request_direction else None,
             )
 
-            # Check cache first
-            cached_result = manual_cache_get(cache_key_str)
-            if cached_result:
+            computed = False
+
+            async def load_chart() -> RequestChartResponse:
+                nonlocal computed
+                computed = True
+
+                # Fetch fresh data using new service with timeout
+                chart_data = await asyncio.wait_for(
+                    RequestTrackingService(db).get_request_chart_data(
+                        facility_id=facility_id,
+                        from_date=from_date,
+                        to_date=to_date,
+                        selected_blood_products=blood_products,
+                        selected_blood_types=blood_types,
+                        request_direction=(
+                            request_direction.value if request_direction else None
+                        ),
+                    ),
+                    timeout=30.0,
+                )
+
+                # Build metadata
+                actual_from_date = from_date or (datetime.now() - timedelta(days=7))
+                actual_to_date = to_date or datetime.now()
+
+                metadata = RequestChartMetadata(
+                    totalRecords=len(chart_data),
+                    dateRange={
+                        "from": actual_from_date.isoformat(),
+                        "to": actual_to_date.isoformat(),
+                    },
+                    bloodProducts=(
+                        [bp.value for bp in blood_products] if blood_products else []
+                    ),
+                    bloodTypes=[bt.value for bt in blood_types] if blood_types else None,
+                )
+
+                return RequestChartResponse(
+                    success=True, data=chart_data, meta=metadata
+                )
+
+            # Concurrent misses for the same chart share one computation; the
+            # entry is dropped when a request involving this facility changes
+            response = await cache.get_or_set(
+                cache_key_str,
+                load_chart,
+                ttl=300,
+                namespace="request_chart",
+                tags=[facility_tag(facility_id)],
+            )
+
+            if not computed:
                 logger.info(
                     "Request chart data returned from cache",
                     extra={
@@ -519,45 +567,7 @@ async def get_request_chart_get(
                         "execution_time_seconds": round(time.time() - start_time, 4),
                     },
                 )
-                return cached_result
-
-            # Fetch fresh data using new service with timeout
-            chart_data = await asyncio.wait_for(
-                RequestTrackingService(db).get_request_chart_data(
-                    facility_id=facility_id,
-                    from_date=from_date,
-                    to_date=to_date,
-                    selected_blood_products=blood_products,
-                    selected_blood_types=blood_types,
-                    request_direction=(
-                        request_direction.value if request_direction else None
-                    ),
-                ),
-                timeout=30.0,
-            )
-
-            # Build metadata
-            actual_from_date = from_date or (datetime.now() - timedelta(days=7))
-            actual_to_date = to_date or datetime.now()
-
-            metadata = RequestChartMetadata(
-                totalRecords=len(chart_data),
-                dateRange={
-                    "from": actual_from_date.isoformat(),
-                    "to": actual_to_date.isoformat(),
-                },
-                bloodProducts=(
-                    [bp.value for bp in blood_products] if blood_products else []
-                ),
-                bloodTypes=[bt.value for bt in blood_types] if blood_types else None,
-            )
-
-            response = RequestChartResponse(
-                success=True, data=chart_data, meta=metadata
-            )
-
-            # Cache the result
-            manual_cache_set(cache_key_str, response, ttl=300)
+                return response
 
             # Log performance
             execution_time = time.time() - start_time
@@ -567,7 +577,7 @@ async def get_request_chart_get(
                 additional_metrics={
                     "facility_id": str(facility_id),
                     "user_id": str(current_user.id),
-                    "data_points": len(chart_data),
+                    "data_points": len(response.data),
                     "cached": False,
                 },
             )
@@ -579,7 +589,7 @@ async def get_request_chart_get(
                     "user_id": str(current_user.id),
                     "facility_id": str(facility_id),
                     "execution_time_seconds": round(execution_time, 4),
-                    "data_points": len(chart_data),
+                    "data_points": len(response.data),
                     "cached": False,
                 },
             )
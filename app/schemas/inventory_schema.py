@@ -381,9 +381,67 @@ class PaginatedFacilityResponse(PaginatedResponse[FacilityWithBloodAvailability]
     pass
 
 
+class NearbyFacilityStock(BaseModel):
+    facility_id: UUID
+    facility_name: str
+    latitude: float
+    longitude: float
+    distance_km: float = Field(..., description="Great-circle distance from the origin")
+    available_quantity: int = Field(
+        ..., description="Unexpired units matching the requested type/product"
+    )
+
+
+class CompatibleFacilityStock(BaseModel):
+    facility_id: UUID
+    facility_name: str
+    exact_match_quantity: int = Field(
+        ..., description="Units of exactly the recipient's blood type"
+    )
+    available_quantity: int = Field(
+        ..., description="Units across all compatible donor types"
+    )
+    compatible_types: List[str] = Field(
+        ..., description="Compatible donor types the facility holds"
+    )
+
+
 # Utility functions for working with blood data
+def _build_compatibility_tables(donor_recipient_map: Dict[str, List[str]]):
+    """Bit per type, donor/recipient masks and donor search order per recipient"""
+    type_bits = {blood_type: 1 << i for i, blood_type in enumerate(donor_recipient_map)}
+    donor_masks = {
+        donor: sum(type_bits[recipient] for recipient in recipients)
+        for donor, recipients in donor_recipient_map.items()
+    }
+    recipient_masks = {
+        recipient: sum(
+            bit for donor, bit in type_bits.items() if donor_masks[donor] & type_bits[recipient]
+        )
+        for recipient in type_bits
+    }
+    # Recipient's own type first, then the other donors in map order
+    compatible_donors = {
+        recipient: (recipient,)
+        + tuple(
+            donor
+            for donor, bit in type_bits.items()
+            if donor != recipient and recipient_masks[recipient] & bit
+        )
+        for recipient in type_bits
+    }
+    return type_bits, donor_masks, recipient_masks, compatible_donors
+
+
 class BloodCompatibility:
-    """Utility class for blood type compatibility checks"""
+    """
+    Red cell compatibility checks backed by precomputed bitmasks.
+
+    Each blood type owns one bit; DONOR_MASKS[donor] has the bits of every
+    recipient it can give to and RECIPIENT_MASKS[recipient] the bits of every
+    donor it can take from, so a check is one AND and the donor list for a
+    search is a precomputed tuple.
+    """
 
     DONOR_RECIPIENT_MAP = {
         "O-": ["O-", "O+", "A-", "A+", "B-", "B+", "AB-", "AB+"],
@@ -396,36 +454,46 @@ class BloodCompatibility:
         "AB+": ["AB+"],
     }
 
+    # Products whose compatibility follows the red cell map; other products
+    # (whole blood, plasma, platelets, ...) are matched on the exact type
+    RED_CELL_PRODUCTS = frozenset({"Red Blood Cells", "Red Cells"})
+
+    TYPE_BITS, DONOR_MASKS, RECIPIENT_MASKS, COMPATIBLE_DONORS = (
+        _build_compatibility_tables(DONOR_RECIPIENT_MAP)
+    )
+
+    @classmethod
+    def _check_type(cls, blood_type: str, role: str) -> None:
+        if blood_type not in cls.TYPE_BITS:
+            raise ValueError(f"Invalid {role} blood type: {blood_type}")
+
     @classmethod
     def can_donate_to(cls, donor_type: str, recipient_type: str) -> bool:
         """Check if donor blood type can donate to recipient blood type"""
-        if donor_type not in BloodType.get_values():
-            raise ValueError(f"Invalid donor blood type: {donor_type}")
-        if recipient_type not in BloodType.get_values():
-            raise ValueError(f"Invalid recipient blood type: {recipient_type}")
-
-        return recipient_type in cls.DONOR_RECIPIENT_MAP.get(donor_type, [])
+        cls._check_type(donor_type, "donor")
+        cls._check_type(recipient_type, "recipient")
+        return bool(cls.DONOR_MASKS[donor_type] & cls.TYPE_BITS[recipient_type])
 
     @classmethod
     def get_compatible_donors(cls, recipient_type: str) -> List[str]:
         """Get list of blood types that can donate to the recipient"""
-        if recipient_type not in BloodType.get_values():
-            raise ValueError(f"Invalid recipient blood type: {recipient_type}")
-
-        compatible_donors = []
-        for donor_type, compatible_recipients in cls.DONOR_RECIPIENT_MAP.items():
-            if recipient_type in compatible_recipients:
-                compatible_donors.append(donor_type)
-
-        return compatible_donors
+        cls._check_type(recipient_type, "recipient")
+        mask = cls.RECIPIENT_MASKS[recipient_type]
+        return [donor for donor, bit in cls.TYPE_BITS.items() if mask & bit]
 
     @classmethod
     def get_compatible_recipients(cls, donor_type: str) -> List[str]:
         """Get list of blood types that can receive from the donor"""
-        if donor_type not in BloodType.get_values():
-            raise ValueError(f"Invalid donor blood type: {donor_type}")
+        cls._check_type(donor_type, "donor")
+        return list(cls.DONOR_RECIPIENT_MAP[donor_type])
 
-        return cls.DONOR_RECIPIENT_MAP.get(donor_type, [])
+    @classmethod
+    def donor_types_for(cls, recipient_type: str, blood_product: str) -> tuple:
+        """Donor types to search for a recipient, exact type first"""
+        cls._check_type(recipient_type, "recipient")
+        if blood_product in cls.RED_CELL_PRODUCTS:
+            return cls.COMPATIBLE_DONORS[recipient_type]
+        return (recipient_type,)
 
 
 # Service layer utility functions for better integration
@@ -562,6 +630,8 @@ __all__ = [
     "BloodInventorySearchParams",
     "FacilityWithBloodAvailability",
     "PaginatedFacilityResponse",
+    "NearbyFacilityStock",
+    "CompatibleFacilityStock",
     "BloodTypeOptions",
     "BloodProductOptions",
     "BloodInventoryDropdownOptions",
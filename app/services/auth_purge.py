@@ -0,0 +1,158 @@
+"""
+Scheduled purge of expired authentication records.
+
+Expired refresh tokens used to be cleaned up by a background task queued on
+every login, which loaded all expired rows into the ORM and deleted them one
+by one on the request's (already closed) session. The scheduler now runs this
+job instead: each table is purged with set-based
+
+    DELETE FROM t WHERE id IN (SELECT id FROM t WHERE <expired> LIMIT :chunk)
+
+statements, committed per chunk so locks stay short, and bounded per run so a
+large backlog is worked off over several runs rather than in one long burst.
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, or_, select
+
+from app.config import settings
+from app.models.device_model import DeviceRegistration
+from app.models.user_model import RefreshToken, UserSession
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class AuthRecordPurger:
+    """Deletes expired tokens, ended sessions and stale device registrations"""
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        max_rows_per_run: int = 50000,
+        retention_days: int = 30,
+    ):
+        self.chunk_size = chunk_size
+        self.max_rows_per_run = max_rows_per_run
+        self.retention = timedelta(days=retention_days)
+        self._stats = {
+            "runs": 0,
+            "failed_runs": 0,
+            "rows_removed": 0,
+            "refresh_tokens_removed": 0,
+            "user_sessions_removed": 0,
+            "device_registrations_removed": 0,
+            "truncated_runs": 0,
+            "run_time_total": 0.0,
+            "last_run_ms": 0.0,
+        }
+
+    def targets(self, now: datetime) -> List[Tuple[str, Any, Any]]:
+        """(name, model, condition) for each purged table"""
+        cutoff = now - self.retention
+        return [
+            ("refresh_tokens", RefreshToken, RefreshToken.expires_at < now),
+            (
+                "user_sessions",
+                UserSession,
+                or_(
+                    UserSession.terminated_at < cutoff,
+                    UserSession.expires_at < cutoff,
+                ),
+            ),
+            # Verified registrations stay as the device's ownership record
+            (
+                "device_registrations",
+                DeviceRegistration,
+                and_(
+                    DeviceRegistration.status != "verified",
+                    DeviceRegistration.expires_at < cutoff,
+                ),
+            ),
+        ]
+
+    async def run(
+        self, session_factory=None, now: Optional[datetime] = None
+    ) -> Dict[str, int]:
+        """Purge every table once; returns rows removed per table"""
+        if session_factory is None:
+            from app.database import async_session as session_factory
+
+        start_time = time.perf_counter()
+        now = now or datetime.now(timezone.utc)
+        budget = self.max_rows_per_run
+        removed: Dict[str, int] = {}
+
+        try:
+            for name, model, condition in self.targets(now):
+                removed[name] = await self._purge(
+                    session_factory, model, condition, budget
+                )
+                budget -= removed[name]
+        except Exception as e:
+            self._stats["failed_runs"] += 1
+            logger.error(
+                "Auth record purge failed",
+                extra={
+                    "event_type": "auth_purge_failed",
+                    "removed": removed,
+                    "error": str(e),
+                },
+                exc_info=True,
+            )
+            return removed
+        finally:
+            duration = time.perf_counter() - start_time
+            self._stats["runs"] += 1
+            self._stats["run_time_total"] += duration
+            self._stats["last_run_ms"] = round(duration * 1000, 3)
+            for name, count in removed.items():
+                self._stats[f"{name}_removed"] += count
+                self._stats["rows_removed"] += count
+
+        if budget <= 0:
+            self._stats["truncated_runs"] += 1
+        logger.info(
+            "Auth records purged",
+            extra={
+                "event_type": "auth_purge_completed",
+                "removed": removed,
+                "budget_exhausted": budget <= 0,
+                "duration_ms": self._stats["last_run_ms"],
+            },
+        )
+        return removed
+
+    async def _purge(self, session_factory, model, condition, budget: int) -> int:
+        removed = 0
+        while removed < budget:
+            chunk = min(self.chunk_size, budget - removed)
+            ids = select(model.id).where(condition).limit(chunk)
+            async with session_factory() as session:
+                result = await session.execute(
+                    delete(model)
+                    .where(model.id.in_(ids.scalar_subquery()))
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+            removed += result.rowcount
+            if result.rowcount < chunk:
+                break
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        total_time = stats.pop("run_time_total")
+        stats["avg_run_ms"] = round(total_time / (stats["runs"] or 1) * 1000, 3)
+        return stats
+
+
+# Global purger instance
+auth_record_purger = AuthRecordPurger(
+    chunk_size=settings.AUTH_PURGE_CHUNK_SIZE,
+    max_rows_per_run=settings.AUTH_PURGE_MAX_ROWS_PER_RUN,
+    retention_days=settings.AUTH_PURGE_RETENTION_DAYS,
+)
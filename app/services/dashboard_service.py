@@ -1,191 +1,141 @@
 """
 Dashboard Service - Real-time dashboard metrics calculation
+
+Services record what changed (units added/removed, requests created,
+distributions delivered) in a DashboardDeltas and apply it inside their own
+transaction, so today's DashboardDailySummary row is adjusted atomically with
+the change itself. The scheduler's full recompute only reconciles drift.
 """
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from datetime import date, timedelta
+from datetime import date
 from uuid import UUID
-from typing import Dict, Any
-from app.models.inventory_model import BloodInventory
-from app.models.distribution_model import BloodDistribution
-from app.models.request_model import BloodRequest, DashboardDailySummary
+from typing import Dict, List, Optional, Tuple
+from app.models.blood_bank_model import BloodBank
+from app.models.request_model import DashboardDailySummary
 from app.utils.logging_config import get_logger
-from app.database import async_session
+from app.utils.upsert import dialect_insert
 
 logger = get_logger(__name__)
 
 
-async def refresh_facility_dashboard_metrics(
-    session: AsyncSession, facility_id: UUID, today: date = None
+async def apply_dashboard_delta(
+    session: AsyncSession,
+    facility_id: UUID,
+    day: date,
+    stock: int = 0,
+    transferred: int = 0,
+    requests: int = 0,
 ) -> None:
     """
-    Immediately refresh dashboard metrics for a single facility.
-    Call this after creating requests, adding inventory, or issuing blood.
-
-    Args:
-        session: Active database session
-        facility_id: The facility to refresh metrics for
-        today: The date to refresh (defaults to today)
-    """
-    if today is None:
-        today = date.today()
-
-    logger.info(f"Refreshing dashboard metrics for facility {facility_id}")
-
-    try:
-        # --- Stock ---
-        stock_query = (
-            select(func.coalesce(func.sum(BloodInventory.quantity), 0))
-            .join(BloodInventory.blood_bank)
-            .where(BloodInventory.blood_bank.has(facility_id=facility_id))
-        )
-        total_stock = (await session.execute(stock_query)).scalar_one()
-
-        # --- Transferred (delivered today) ---
-        # Count blood SENT FROM this facility to other facilities (outgoing/issued blood)
-        # This represents distributions your facility has fulfilled/issued
-        # Note: We need to JOIN blood_banks because dispatched_from_id is a blood_bank_id,
-        #       not a facility_id. We match on blood_bank.facility_id == facility_id
-        transferred_query = (
-            select(func.coalesce(func.sum(BloodDistribution.quantity), 0))
-            .select_from(BloodDistribution)
-            .join(BloodDistribution.dispatched_from)  # Join to blood_banks table
-            .where(
-                BloodDistribution.dispatched_from.has(
-                    facility_id=facility_id
-                ),  # Match blood bank's facility
-                BloodDistribution.date_delivered.is_not(None),
-                func.date(BloodDistribution.date_delivered) == today,
-            )
-        )
-        total_transferred = (await session.execute(transferred_query)).scalar_one()
-
-        # --- Requests (created today) ---
-        # Count requests RECEIVED BY this facility (incoming requests to fulfill)
-        # This represents blood requests sent TO your facility that you need to fulfill
-        # Note: Using func.date() instead of cast() for SQLite compatibility
-        requests_query = select(func.count(BloodRequest.id)).where(
-            BloodRequest.facility_id == facility_id,
-            func.date(BloodRequest.created_at) == today,
-        )
-        total_requests = (await session.execute(requests_query)).scalar_one()
-
-        # --- Upsert into DashboardDailySummary ---
-        existing = await session.execute(
-            select(DashboardDailySummary).where(
-                DashboardDailySummary.facility_id == facility_id,
-                DashboardDailySummary.date == today,
-            )
-        )
-        existing_summary = existing.scalar_one_or_none()
-
-        if existing_summary:
-            existing_summary.total_stock = total_stock
-            existing_summary.total_transferred = total_transferred
-            existing_summary.total_requests = total_requests
-            logger.info(
-                f"Updated dashboard metrics for facility {facility_id}: "
-                f"stock={total_stock}, transferred={total_transferred}, requests={total_requests}"
-            )
-        else:
-            summary = DashboardDailySummary(
-                facility_id=facility_id,
-                date=today,
-                total_stock=total_stock,
-                total_transferred=total_transferred,
-                total_requests=total_requests,
-            )
-            session.add(summary)
-            logger.info(
-                f"Created dashboard metrics for facility {facility_id}: "
-                f"stock={total_stock}, transferred={total_transferred}, requests={total_requests}"
-            )
-
-        await session.commit()
-        logger.info(
-            f"Dashboard metrics refreshed successfully for facility {facility_id}"
-        )
-
-    except Exception as e:
-        logger.error(
-            f"Error refreshing dashboard metrics for facility {facility_id}: {str(e)}"
-        )
-        await session.rollback()
-        # Don't raise - dashboard refresh failures shouldn't block main operations
-
+    Atomically add deltas to a facility's summary row for `day`.
 
-async def get_realtime_dashboard_summary(
-    session: AsyncSession, facility_id: UUID
-) -> Dict[str, Any]:
+    A single INSERT ... ON CONFLICT DO UPDATE: an existing row is incremented
+    in place; a new row starts from the most recent earlier stock level (stock
+    is a running balance, transferred/requests are per-day counts).
     """
-    Get dashboard summary with REAL-TIME data (not cached).
-    Shows cumulative stats for the last 7 days.
-
-    Returns the same format as StatsService.get_dashboard_summary()
-    """
-    today = date.today()
-    seven_days_ago = today - timedelta(days=7)
-
-    # Calculate real-time metrics
-    # Stock (current total, not time-bound)
-    stock_query = (
-        select(func.coalesce(func.sum(BloodInventory.quantity), 0))
-        .join(BloodInventory.blood_bank)
-        .where(BloodInventory.blood_bank.has(facility_id=facility_id))
-    )
-    total_stock = (await session.execute(stock_query)).scalar_one()
-
-    # Transferred in last 7 days - blood SENT FROM this facility (issued/fulfilled)
-    # Note: We need to JOIN blood_banks because dispatched_from_id is a blood_bank_id,
-    #       not a facility_id. We match on blood_bank.facility_id == facility_id
-    transferred_query = (
-        select(func.coalesce(func.sum(BloodDistribution.quantity), 0))
-        .select_from(BloodDistribution)
-        .join(BloodDistribution.dispatched_from)  # Join to blood_banks table
-        .where(
-            BloodDistribution.dispatched_from.has(
-                facility_id=facility_id
-            ),  # Match blood bank's facility
-            BloodDistribution.date_delivered.is_not(None),
-            func.date(BloodDistribution.date_delivered) >= seven_days_ago,
-        )
+    summary = DashboardDailySummary
+    carried_stock = (
+        select(summary.total_stock)
+        .where(summary.facility_id == facility_id, summary.date < day)
+        .order_by(summary.date.desc())
+        .limit(1)
+        .scalar_subquery()
     )
-    total_transferred = (await session.execute(transferred_query)).scalar_one()
 
-    # Requests in last 7 days - requests RECEIVED BY this facility (to fulfill)
-    # Note: Using func.date() instead of cast() for SQLite compatibility
-    requests_query = select(func.count(BloodRequest.id)).where(
-        BloodRequest.facility_id == facility_id,
-        func.date(BloodRequest.created_at) >= seven_days_ago,
+    statement = dialect_insert(session.bind.dialect.name, summary).values(
+        facility_id=facility_id,
+        date=day,
+        total_stock=func.coalesce(carried_stock, 0) + stock,
+        total_transferred=transferred,
+        total_requests=requests,
     )
-    total_requests = (await session.execute(requests_query)).scalar_one()
-
-    # Return in the same format as cached version
-    return {
-        "stock": {"value": total_stock, "change": 0.0, "direction": "neutral"},
-        "transferred": {
-            "value": total_transferred,
-            "change": 0.0,
-            "direction": "neutral",
+    statement = statement.on_conflict_do_update(
+        index_elements=["facility_id", "date"],
+        set_={
+            "total_stock": summary.total_stock + stock,
+            "total_transferred": summary.total_transferred + transferred,
+            "total_requests": summary.total_requests + requests,
+            "updated_at": func.now(),
         },
-        "requests": {"value": total_requests, "change": 0.0, "direction": "neutral"},
-    }
+    )
+    await session.execute(statement)
 
 
-async def async_refresh_facility_dashboard_metrics(
-    facility_id: UUID, today: date = None
-) -> None:
+class DashboardDeltas:
     """
-    Non-blocking wrapper to refresh dashboard metrics using an independent DB session.
-    Use this from request/distribution handlers to update the cached DashboardDailySummary
-    without holding or re-using the caller's DB session.
+    Collects dashboard counter deltas for one unit of work.
+
+    Deltas can be keyed by facility or by blood bank (inventory only knows its
+    bank); bank ids are resolved to facilities in one query when applied.
+    Call `apply()` before the caller's commit so the summary moves with the
+    change or not at all.
     """
-    try:
-        async with async_session() as session:
-            await refresh_facility_dashboard_metrics(session, facility_id, today)
-    except Exception as e:
-        # Log and continue - dashboard refresh must not crash caller
-        logger.warning(
-            f"async_refresh_facility_dashboard_metrics failed for {facility_id}: {e}"
-        )
+
+    def __init__(self):
+        self._by_facility: Dict[Tuple[UUID, date], List[int]] = {}
+        self._by_bank: Dict[Tuple[UUID, date], List[int]] = {}
+
+    def add(
+        self,
+        facility_id: Optional[UUID],
+        stock: int = 0,
+        transferred: int = 0,
+        requests: int = 0,
+        day: Optional[date] = None,
+    ) -> None:
+        if facility_id is not None:
+            self._accumulate(
+                self._by_facility, facility_id, day, stock, transferred, requests
+            )
+
+    def add_for_bank(
+        self,
+        blood_bank_id: Optional[UUID],
+        stock: int = 0,
+        transferred: int = 0,
+        day: Optional[date] = None,
+    ) -> None:
+        if blood_bank_id is not None:
+            self._accumulate(self._by_bank, blood_bank_id, day, stock, transferred, 0)
+
+    def __bool__(self) -> bool:
+        return bool(self._by_facility or self._by_bank)
+
+    async def apply(self, session: AsyncSession) -> None:
+        """Apply all collected deltas in the session's current transaction"""
+        pending = dict(self._by_facility)
+
+        if self._by_bank:
+            bank_ids = {bank_id for bank_id, _ in self._by_bank}
+            result = await session.execute(
+                select(BloodBank.id, BloodBank.facility_id).where(
+                    BloodBank.id.in_(bank_ids)
+                )
+            )
+            bank_facilities = {row.id: row.facility_id for row in result}
+            for (bank_id, day), values in self._by_bank.items():
+                facility_id = bank_facilities.get(bank_id)
+                if facility_id is not None:
+                    totals = pending.setdefault((facility_id, day), [0, 0, 0])
+                    pending[(facility_id, day)] = [
+                        a + b for a, b in zip(totals, values)
+                    ]
+
+        for (facility_id, day), (stock, transferred, requests) in pending.items():
+            if stock or transferred or requests:
+                await apply_dashboard_delta(
+                    session, facility_id, day, stock, transferred, requests
+                )
+
+        self._by_facility.clear()
+        self._by_bank.clear()
+
+    @staticmethod
+    def _accumulate(target, key_id, day, stock, transferred, requests) -> None:
+        key = (key_id, day or date.today())
+        totals = target.setdefault(key, [0, 0, 0])
+        totals[0] += stock
+        totals[1] += transferred
+        totals[2] += requests
@@ -1,15 +1,18 @@
-import asyncio
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import func, and_, desc
 from sqlalchemy.orm import joinedload, selectinload
 from fastapi import HTTPException
 from uuid import UUID
-from datetime import datetime, timedelta
-from typing import Optional, List
-from app.models.distribution_model import BloodDistribution
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Tuple
+from app.models.distribution_model import BloodDistribution, DistributionAllocation
 from app.models.inventory_model import BloodInventory
+from app.models.blood_bank_model import BloodBank
+from app.models.health_facility_model import Facility
+from app.models.user_model import User
 from app.schemas.distribution_schema import (
+    BloodDistributionDetailResponse,
     BloodDistributionUpdate,
     DistributionStats,
     DistributionStatus,
@@ -17,15 +20,60 @@ from app.schemas.distribution_schema import (
 from app.models.tracking_model import TrackState
 from app.schemas.tracking_schema import TrackStateStatus
 from app.schemas.request_schema import ProcessingStatus
+from app.services.dashboard_service import DashboardDeltas
+from app.services.inventory_allocator import inventory_allocator
 from app.utils.generators import (
     calculate_expiry_date,
     generate_batch_number,
     generate_tracking_number,
 )
+from app.utils.export import ExportColumn, export_select
+from app.utils.pagination import PaginatedResponse, PaginationParams, paginate_query
 import logging
 
 logger = logging.getLogger(__name__)
 
+DISTRIBUTION_EXPORT_COLUMNS = [
+    ExportColumn("id", "ID", BloodDistribution.id),
+    ExportColumn("tracking_number", "Tracking Number", BloodDistribution.tracking_number),
+    ExportColumn("blood_product", "Blood Product", BloodDistribution.blood_product),
+    ExportColumn("blood_type", "Blood Type", BloodDistribution.blood_type),
+    ExportColumn("quantity", "Quantity", BloodDistribution.quantity),
+    ExportColumn("status", "Status", BloodDistribution.status),
+    ExportColumn("dispatched_from", "Dispatched From", BloodBank.blood_bank_name),
+    ExportColumn("dispatched_to", "Dispatched To", Facility.facility_name),
+    ExportColumn("created_by", "Created By", User.last_name),
+    ExportColumn("date_dispatched", "Date Dispatched", BloodDistribution.date_dispatched),
+    ExportColumn("date_delivered", "Date Delivered", BloodDistribution.date_delivered),
+    ExportColumn("batch_number", "Batch Number", BloodDistribution.batch_number),
+    ExportColumn("expiry_date", "Expiry Date", BloodDistribution.expiry_date),
+    ExportColumn("created_at", "Created At", BloodDistribution.created_at),
+]
+
+
+# Columns of BloodDistributionResponse, selected directly for list views
+DISTRIBUTION_LIST_COLUMNS = [
+    BloodDistribution.id,
+    BloodDistribution.blood_product,
+    BloodDistribution.blood_type,
+    BloodDistribution.quantity,
+    BloodDistribution.notes,
+    BloodDistribution.batch_number,
+    BloodDistribution.expiry_date,
+    BloodDistribution.temperature_maintained,
+    BloodDistribution.blood_product_id,
+    BloodDistribution.request_id,
+    BloodDistribution.dispatched_from_id,
+    BloodDistribution.dispatched_to_id,
+    BloodDistribution.created_by_id,
+    BloodDistribution.status,
+    BloodDistribution.date_dispatched,
+    BloodDistribution.date_delivered,
+    BloodDistribution.tracking_number,
+    BloodDistribution.created_at,
+    BloodDistribution.updated_at,
+]
+
 
 class BloodDistributionService:
     def __init__(self, db: AsyncSession):
@@ -74,25 +122,17 @@ class BloodDistributionService:
         quantity = blood_request.quantity_requested
         dispatched_to_id = blood_request.source_facility_id
 
-        # Try to find matching inventory automatically (FIFO - First In First Out)
-        inventory_result = await self.db.execute(
-            select(BloodInventory)
-            .where(
-                and_(
-                    BloodInventory.blood_bank_id == blood_bank_id,
-                    BloodInventory.blood_product == blood_product,
-                    BloodInventory.blood_type == blood_type,
-                    BloodInventory.quantity >= quantity,
-                )
-            )
-            .order_by(BloodInventory.expiry_date.asc())  # Use oldest inventory first
+        # Atomically reserve stock first-expired-first-out, split across as
+        # many lots as needed; concurrent issues cannot oversell a lot
+        allocations = await inventory_allocator.allocate(
+            self.db, blood_bank_id, blood_product, blood_type, quantity
         )
-        inventory_item = inventory_result.scalars().first()
+        deltas = DashboardDeltas()
 
-        if inventory_item:
-            # Deduct from inventory
-            inventory_item.quantity -= quantity
-            blood_product_id = inventory_item.id
+        if allocations:
+            deltas.add_for_bank(blood_bank_id, stock=-quantity)
+            # The earliest-expiring lot remains the distribution's product
+            blood_product_id = allocations[0].inventory_id
         else:
             # No matching inventory found - try to resolve an existing inventory record
             # for the same product/type in this blood bank. If none exists, create a
@@ -159,6 +199,20 @@ class BloodDistributionService:
         )
 
         self.db.add(new_distribution)
+        for allocation in allocations or []:
+            new_distribution.allocations.append(
+                DistributionAllocation(
+                    inventory_id=allocation.inventory_id,
+                    quantity=allocation.quantity,
+                    lot_expiry_date=allocation.expiry_date,
+                )
+            )
+        if not allocations:
+            # Nothing was reserved; an explicit zero share keeps _release_stock
+            # from treating this as a legacy distribution and restocking it
+            new_distribution.allocations.append(
+                DistributionAllocation(inventory_id=blood_product_id, quantity=0)
+            )
 
         # Let the caller handle the commit if needed
         await self.db.flush()
@@ -189,6 +243,7 @@ class BloodDistributionService:
         # Update related blood request processing status to "initiated"
         await self._update_request_processing_status(new_distribution)
 
+        await deltas.apply(self.db)
         await self.db.commit()
 
         # Send instant notification to BOTH facilities
@@ -244,37 +299,6 @@ class BloodDistributionService:
                 f"Failed to send distribution notification: {str(notify_error)}"
             )
 
-        # Refresh dashboard metrics asynchronously for both facilities (non-blocking)
-        try:
-            from app.services.dashboard_service import (
-                async_refresh_facility_dashboard_metrics,
-            )
-
-            # Refresh for the facility that dispatched (their stock decreased)
-            if (
-                new_distribution.dispatched_from
-                and new_distribution.dispatched_from.facility_id
-            ):
-                asyncio.create_task(
-                    async_refresh_facility_dashboard_metrics(
-                        new_distribution.dispatched_from.facility_id
-                    )
-                )
-            # Refresh for the facility that received (their transferred count increased)
-            if new_distribution.dispatched_to_id:
-                asyncio.create_task(
-                    async_refresh_facility_dashboard_metrics(
-                        new_distribution.dispatched_to_id
-                    )
-                )
-        except Exception as dashboard_error:
-            # Don't fail the operation if dashboard refresh scheduling fails
-            import logging
-
-            logging.getLogger(__name__).warning(
-                f"Failed to schedule dashboard refresh: {dashboard_error}"
-            )
-
         return new_distribution
 
     async def get_distribution(
@@ -309,6 +333,7 @@ class BloodDistributionService:
 
         # Save the old status before any changes
         old_status = distribution.status
+        deltas = DashboardDeltas()
 
         # Special handling for status changes
         if "status" in update_dict:
@@ -349,26 +374,21 @@ class BloodDistributionService:
             # Handle returns - add back to inventory if marked as returned
             if (
                 new_status == DistributionStatus.RETURNED
+                and old_status != DistributionStatus.RETURNED
                 and distribution.blood_product_id
             ):
-                inventory_result = await self.db.execute(
-                    select(BloodInventory).where(
-                        BloodInventory.id == distribution.blood_product_id
-                    )
-                )
-                inventory_item = inventory_result.scalar_one_or_none()
-
-                if inventory_item:
-                    inventory_item.quantity += distribution.quantity
-                else:
-                    # Create a new inventory entry if the original was deleted
+                reserved, unrestored = await self._release_stock(distribution)
+                if reserved:
+                    deltas.add_for_bank(distribution.dispatched_from_id, stock=reserved)
+                for units, lot_expiry_date in unrestored:
+                    # Create a new inventory entry for units whose lot was deleted
                     new_inventory = BloodInventory(
                         blood_product=distribution.blood_product,
                         blood_type=distribution.blood_type,
-                        quantity=distribution.quantity,
+                        quantity=units,
                         blood_bank_id=distribution.dispatched_from_id,
                         added_by_id=distribution.created_by_id,
-                        expiry_date=distribution.expiry_date,
+                        expiry_date=lot_expiry_date or distribution.expiry_date,
                     )
                     self.db.add(new_inventory)
 
@@ -422,42 +442,23 @@ class BloodDistributionService:
                 created_by_id=distribution.created_by_id,
             )
             self.db.add(track_state)
-        await self.db.commit()
-        await self.db.refresh(distribution)
 
-        # IMPORTANT: Refresh dashboard metrics when status changes to DELIVERED
-        # This ensures the "transferred" count updates immediately
+        # Delivered units count as transferred for the dispatching facility,
+        # on the day they were delivered
         if (
-            new_status == DistributionStatus.DELIVERED
+            distribution.status == DistributionStatus.DELIVERED
             and old_status != DistributionStatus.DELIVERED
         ):
-            try:
-                from app.services.dashboard_service import (
-                    async_refresh_facility_dashboard_metrics,
-                )
+            delivered_on = distribution.date_delivered or datetime.now()
+            deltas.add_for_bank(
+                distribution.dispatched_from_id,
+                transferred=distribution.quantity,
+                day=delivered_on.date(),
+            )
 
-                # Refresh for the facility that dispatched (their transferred count increased)
-                if (
-                    distribution.dispatched_from
-                    and distribution.dispatched_from.facility_id
-                ):
-                    asyncio.create_task(
-                        async_refresh_facility_dashboard_metrics(
-                            distribution.dispatched_from.facility_id
-                        )
-                    )
-                # Refresh for the facility that received (they got new stock)
-                if distribution.dispatched_to_id:
-                    asyncio.create_task(
-                        async_refresh_facility_dashboard_metrics(
-                            distribution.dispatched_to_id
-                        )
-                    )
-            except Exception as dashboard_error:
-                # Don't fail the operation if dashboard refresh scheduling fails
-                logger.warning(
-                    f"Failed to schedule dashboard refresh after delivery: {dashboard_error}"
-                )
+        await deltas.apply(self.db)
+        await self.db.commit()
+        await self.db.refresh(distribution)
 
         return distribution
 
@@ -478,15 +479,13 @@ class BloodDistributionService:
 
         # If linked to inventory, restore the quantity
         if distribution.blood_product_id:
-            inventory_result = await self.db.execute(
-                select(BloodInventory).where(
-                    BloodInventory.id == distribution.blood_product_id
-                )
-            )
-            inventory_item = inventory_result.scalar_one_or_none()
+            reserved, unrestored = await self._release_stock(distribution)
+            restored = reserved - sum(units for units, _ in unrestored)
 
-            if inventory_item:
-                inventory_item.quantity += distribution.quantity
+            if restored:
+                deltas = DashboardDeltas()
+                deltas.add_for_bank(distribution.dispatched_from_id, stock=restored)
+                await deltas.apply(self.db)
 
         await self.db.delete(distribution)
         await self.db.commit()
@@ -527,6 +526,94 @@ class BloodDistributionService:
         )
         return result.scalars().all()
 
+    async def list_distributions(
+        self,
+        blood_bank_id: UUID,
+        status: Optional[DistributionStatus] = None,
+        facility_id: Optional[UUID] = None,
+        recent_days: Optional[int] = None,
+        page: int = 1,
+        page_size: int = 20,
+        cursor: Optional[str] = None,
+        include_total: bool = True,
+    ) -> PaginatedResponse[BloodDistributionDetailResponse]:
+        """
+        Page the distributions sent from a blood bank, newest first.
+
+        Filters are combined in SQL and only the columns of the list view are
+        selected, with the bank/facility/creator names joined in, so a page
+        costs one query (plus one count when include_total) at any history
+        size. Pages are keyset on (created_at, id) when `cursor` is given.
+        """
+        conditions = [BloodDistribution.dispatched_from_id == blood_bank_id]
+        if status:
+            conditions.append(BloodDistribution.status == status)
+        if facility_id:
+            conditions.append(BloodDistribution.dispatched_to_id == facility_id)
+        if recent_days:
+            cutoff = datetime.now().replace(
+                hour=0, minute=0, second=0, microsecond=0
+            ) - timedelta(days=recent_days)
+            conditions.append(BloodDistribution.created_at >= cutoff)
+        final_condition = and_(*conditions)
+
+        query = (
+            select(
+                *DISTRIBUTION_LIST_COLUMNS,
+                BloodBank.blood_bank_name.label("dispatched_from_name"),
+                Facility.facility_name.label("dispatched_to_name"),
+                User.last_name.label("created_by_name"),
+            )
+            .select_from(BloodDistribution)
+            .outerjoin(BloodBank, BloodDistribution.dispatched_from_id == BloodBank.id)
+            .outerjoin(Facility, BloodDistribution.dispatched_to_id == Facility.id)
+            .outerjoin(User, BloodDistribution.created_by_id == User.id)
+            .where(final_condition)
+        )
+
+        result_page = await paginate_query(
+            self.db,
+            query,
+            PaginationParams(
+                page=page,
+                page_size=page_size,
+                cursor=cursor,
+                include_total=include_total,
+            ),
+            sort_column=BloodDistribution.created_at,
+            id_column=BloodDistribution.id,
+            count_query=select(func.count(BloodDistribution.id)).where(
+                final_condition
+            ),
+            scalars=False,
+        )
+        result_page.items = [
+            BloodDistributionDetailResponse.model_validate(dict(row._mapping))
+            for row in result_page.items
+        ]
+        return result_page
+
+    def build_export_query(
+        self,
+        blood_bank_id: UUID,
+        status: Optional[DistributionStatus] = None,
+        facility_id: Optional[UUID] = None,
+    ):
+        """Flat rows of DISTRIBUTION_EXPORT_COLUMNS sent from a blood bank"""
+        query = (
+            export_select(DISTRIBUTION_EXPORT_COLUMNS)
+            .select_from(BloodDistribution)
+            .outerjoin(BloodBank, BloodDistribution.dispatched_from_id == BloodBank.id)
+            .outerjoin(Facility, BloodDistribution.dispatched_to_id == Facility.id)
+            .outerjoin(User, BloodDistribution.created_by_id == User.id)
+            .where(BloodDistribution.dispatched_from_id == blood_bank_id)
+        )
+        if status:
+            query = query.where(BloodDistribution.status == status)
+        if facility_id:
+            query = query.where(BloodDistribution.dispatched_to_id == facility_id)
+        return query.order_by(desc(BloodDistribution.created_at), BloodDistribution.id)
+
     async def get_distributions_by_facility(
         self, facility_id: UUID
     ) -> List[BloodDistribution]:
@@ -681,6 +768,43 @@ class BloodDistributionService:
         result = await self.db.execute(query)
         return result.scalars().all()
 
+    async def _release_stock(
+        self, distribution: BloodDistribution
+    ) -> Tuple[int, List[Tuple[int, Optional[date]]]]:
+        """
+        Put a distribution's units back on the lots they were drawn from.
+
+        Distributions created before per-lot allocations were recorded have no
+        allocation rows and fall back to their single blood_product_id lot;
+        newer ones always have at least one, a zero share if nothing was
+        reserved. Returns (reserved, unrestored): the units the distribution
+        reserved, and the (units, lot expiry date) shares that could not go
+        back because their lot has since been deleted.
+        """
+        result = await self.db.execute(
+            select(
+                DistributionAllocation.inventory_id,
+                DistributionAllocation.quantity,
+                DistributionAllocation.lot_expiry_date,
+            ).where(DistributionAllocation.distribution_id == distribution.id)
+        )
+        shares = result.all() or [
+            (distribution.blood_product_id, distribution.quantity, None)
+        ]
+
+        reserved = 0
+        unrestored: List[Tuple[int, Optional[date]]] = []
+        for inventory_id, units, lot_expiry_date in shares:
+            if not units:
+                continue
+            reserved += units
+            if not (
+                inventory_id
+                and await inventory_allocator.release(self.db, inventory_id, units)
+            ):
+                unrestored.append((units, lot_expiry_date))
+        return reserved, unrestored
+
     async def _update_request_processing_status(self, distribution: BloodDistribution):
         """Update the related blood request's processing status when distribution is created/updated."""
         if not distribution.request_id:
@@ -1,24 +1,46 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import joinedload
-from sqlalchemy import distinct, func, and_, or_
+from sqlalchemy import case, distinct, func, and_, or_
 from fastapi import HTTPException, status
 from uuid import UUID
 from app.models.inventory_model import BloodInventory
 from app.models.health_facility_model import Facility
 from app.models.blood_bank_model import BloodBank
+from app.models.user_model import User
+from app.schemas.base_schema import BloodProduct, SortOrder
 from app.schemas.inventory_schema import (
     BloodInventoryCreate,
+    BloodInventorySearchParams,
     BloodInventoryUpdate,
     PaginatedResponse,
+    BloodCompatibility,
+    BloodInventoryServiceUtils,
+    CompatibleFacilityStock,
     FacilityWithBloodAvailability,
+    NearbyFacilityStock,
 )
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 import asyncio
 from contextlib import asynccontextmanager
 
-from app.utils.pagination import PaginationParams
+from app.services.dashboard_service import DashboardDeltas
+from app.utils.export import ExportColumn, export_select
+from app.utils.geo import bounding_box, haversine_km
+from app.utils.pagination import PaginationParams, paginate_query
+
+INVENTORY_EXPORT_COLUMNS = [
+    ExportColumn("id", "ID", BloodInventory.id),
+    ExportColumn("blood_product", "Blood Product", BloodInventory.blood_product),
+    ExportColumn("blood_type", "Blood Type", BloodInventory.blood_type),
+    ExportColumn("quantity", "Quantity", BloodInventory.quantity),
+    ExportColumn("expiry_date", "Expiry Date", BloodInventory.expiry_date),
+    ExportColumn("blood_bank", "Blood Bank", BloodBank.blood_bank_name),
+    ExportColumn("added_by", "Added By", User.last_name),
+    ExportColumn("created_at", "Created At", BloodInventory.created_at),
+    ExportColumn("updated_at", "Updated At", BloodInventory.updated_at),
+]
 
 
 class BloodInventoryService:
@@ -47,6 +69,12 @@ class BloodInventoryService:
         )
 
         self.db.add(new_blood_unit)
+
+        # Dashboard stock moves in the same transaction as the new unit
+        deltas = DashboardDeltas()
+        deltas.add_for_bank(blood_bank_id, stock=new_blood_unit.quantity)
+        await deltas.apply(self.db)
+
         await self.db.commit()
         await self.db.refresh(new_blood_unit)
 
@@ -55,24 +83,6 @@ class BloodInventoryService:
             new_blood_unit, attribute_names=["blood_bank", "added_by"]
         )
 
-        # Refresh dashboard metrics immediately
-        try:
-            from app.services.dashboard_service import (
-                refresh_facility_dashboard_metrics,
-            )
-
-            if new_blood_unit.blood_bank and new_blood_unit.blood_bank.facility_id:
-                await refresh_facility_dashboard_metrics(
-                    self.db, new_blood_unit.blood_bank.facility_id
-                )
-        except Exception as dashboard_error:
-            # Don't fail the operation if dashboard refresh fails
-            import logging
-
-            logging.getLogger(__name__).warning(
-                f"Failed to refresh dashboard metrics: {dashboard_error}"
-            )
-
         return new_blood_unit
 
     async def get_facilities_with_available_blood(
@@ -183,6 +193,219 @@ class BloodInventoryService:
             has_prev=has_prev,
         )
 
+    async def search_compatible_stock(
+        self,
+        recipient_type: str,
+        blood_product: str,
+        min_units: int = 1,
+        pagination: PaginationParams = None,
+        exclude_blood_bank_id: Optional[UUID] = None,
+    ) -> PaginatedResponse[CompatibleFacilityStock]:
+        """
+        Facilities holding blood a recipient can receive, ranked by units of
+        the recipient's exact type, then by all compatible units.
+
+        The donor types come precomputed from BloodCompatibility, so the
+        query is a single IN over them. Which compatible types a facility
+        holds is aggregated in SQL as a bitmask (SUM of DISTINCT type bits)
+        and decoded against BloodCompatibility.TYPE_BITS. Pages by OFFSET, or
+        by keyset on the ranking when `pagination.cursor` is given.
+        """
+        blood_product = self._require_valid_blood_attributes(
+            recipient_type, blood_product
+        )
+        donor_types = BloodCompatibility.donor_types_for(recipient_type, blood_product)
+        type_bits = BloodCompatibility.TYPE_BITS
+
+        exact_quantity = func.sum(
+            case(
+                (BloodInventory.blood_type == recipient_type, BloodInventory.quantity),
+                else_=0,
+            )
+        )
+        available_quantity = func.sum(BloodInventory.quantity)
+        type_mask = func.sum(
+            distinct(
+                case(
+                    *(
+                        (BloodInventory.blood_type == donor, type_bits[donor])
+                        for donor in donor_types
+                    ),
+                    else_=0,
+                )
+            )
+        )
+
+        # Red cell stock is recorded under either product name
+        if blood_product in BloodCompatibility.RED_CELL_PRODUCTS:
+            product_condition = BloodInventory.blood_product.in_(
+                BloodCompatibility.RED_CELL_PRODUCTS
+            )
+        else:
+            product_condition = BloodInventory.blood_product == blood_product
+
+        conditions = [
+            BloodInventory.blood_type.in_(donor_types),
+            product_condition,
+            BloodInventory.quantity > 0,
+            BloodInventory.expiry_date >= datetime.now().date(),
+        ]
+        if exclude_blood_bank_id:
+            conditions.append(BloodBank.id != exclude_blood_bank_id)
+
+        stock = (
+            select(
+                Facility.id.label("facility_id"),
+                Facility.facility_name.label("facility_name"),
+                exact_quantity.label("exact_match_quantity"),
+                available_quantity.label("available_quantity"),
+                type_mask.label("type_mask"),
+            )
+            .join(BloodBank, Facility.id == BloodBank.facility_id)
+            .join(BloodInventory, BloodBank.id == BloodInventory.blood_bank_id)
+            .where(*conditions)
+            .group_by(Facility.id, Facility.facility_name)
+            .having(available_quantity >= min_units)
+            .subquery()
+        )
+
+        # The ranking is fixed: most exact-type units first
+        pagination = (pagination or PaginationParams()).model_copy(
+            update={"sort_order": SortOrder.DESC}
+        )
+        result_page = await paginate_query(
+            self.db,
+            select(stock),
+            pagination,
+            sort_column=(stock.c.exact_match_quantity, stock.c.available_quantity),
+            id_column=stock.c.facility_id,
+            scalars=False,
+        )
+        result_page.items = [
+            CompatibleFacilityStock(
+                facility_id=row.facility_id,
+                facility_name=row.facility_name,
+                exact_match_quantity=row.exact_match_quantity,
+                available_quantity=row.available_quantity,
+                compatible_types=[
+                    donor for donor in donor_types if row.type_mask & type_bits[donor]
+                ],
+            )
+            for row in result_page.items
+        ]
+        return result_page
+
+    async def find_nearest_facilities_with_stock(
+        self,
+        latitude: float,
+        longitude: float,
+        blood_type: str,
+        blood_product: str,
+        min_units: int = 1,
+        limit: int = 10,
+        max_radius_km: float = 800.0,
+        initial_radius_km: float = 25.0,
+        exclude_blood_bank_id: Optional[UUID] = None,
+    ) -> List[NearbyFacilityStock]:
+        """
+        Closest facilities holding at least `min_units` unexpired units of a
+        blood type/product, nearest first.
+
+        Searches rings of doubling radius. Each ring reads the facilities in
+        its bounding box (idx_facility_lat_lng), keeps those within the radius
+        by haversine distance and sums matching stock for just their blood
+        banks (idx_inventory_fefo), so inventory is only read near the origin.
+        A ring is final once it holds `limit` stocked facilities, since
+        everything nearer is inside it. Facilities without coordinates are
+        never returned.
+        """
+        blood_product = self._require_valid_blood_attributes(blood_type, blood_product)
+
+        # No quantity > 0 test: empty lots add nothing to the sum, and leaving
+        # it out keeps the lookup on idx_inventory_fefo
+        stock_conditions = [
+            BloodInventory.blood_type == blood_type,
+            BloodInventory.blood_product == blood_product,
+            BloodInventory.expiry_date >= datetime.now().date(),
+        ]
+        available = func.sum(BloodInventory.quantity)
+
+        checked = set()
+        stocked = []
+        radius_km = min(initial_radius_km, max_radius_km)
+        while True:
+            box = bounding_box(latitude, longitude, radius_km)
+            box_conditions = [Facility.latitude.between(box.min_lat, box.max_lat)]
+            if box.lng_range:
+                box_conditions.append(Facility.longitude.between(*box.lng_range))
+            else:
+                box_conditions.append(Facility.longitude.is_not(None))
+
+            # Keyed by blood bank id
+            in_ring = {}
+            for row in await self.db.execute(
+                select(
+                    BloodBank.id.label("blood_bank_id"),
+                    Facility.id,
+                    Facility.facility_name,
+                    Facility.latitude,
+                    Facility.longitude,
+                )
+                .join(BloodBank, Facility.id == BloodBank.facility_id)
+                .where(*box_conditions)
+            ):
+                if row.blood_bank_id in checked or row.blood_bank_id == exclude_blood_bank_id:
+                    continue
+                distance = haversine_km(latitude, longitude, row.latitude, row.longitude)
+                if distance <= radius_km:
+                    in_ring[row.blood_bank_id] = (distance, row)
+
+            if in_ring:
+                checked.update(in_ring)
+                stock = await self.db.execute(
+                    select(BloodInventory.blood_bank_id, available)
+                    .where(BloodInventory.blood_bank_id.in_(in_ring), *stock_conditions)
+                    .group_by(BloodInventory.blood_bank_id)
+                    .having(available >= min_units)
+                )
+                for blood_bank_id, quantity in stock:
+                    distance, row = in_ring[blood_bank_id]
+                    stocked.append((distance, row, quantity))
+
+            if len(stocked) >= limit or radius_km >= max_radius_km:
+                break
+            radius_km = min(radius_km * 2, max_radius_km)
+
+        stocked.sort(key=lambda entry: entry[0])
+        return [
+            NearbyFacilityStock(
+                facility_id=row.id,
+                facility_name=row.facility_name,
+                latitude=row.latitude,
+                longitude=row.longitude,
+                distance_km=round(distance, 3),
+                available_quantity=quantity,
+            )
+            for distance, row, quantity in stocked[:limit]
+        ]
+
+    def _require_valid_blood_attributes(
+        self, blood_type: str, blood_product: str
+    ) -> str:
+        """
+        422 unless both the blood type and the product are recognised.
+        Returns the product's canonical name, the form inventory stores.
+        """
+        errors = BloodInventoryServiceUtils.validate_for_service(
+            blood_type, blood_product
+        )
+        if errors:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="; ".join(errors.values()),
+            )
+        return BloodProduct.normalize_product_name(blood_product)
+
     async def _validate_blood_attributes(
         self, blood_type: Optional[str], blood_product: Optional[str]
     ):
@@ -232,6 +455,7 @@ class BloodInventoryService:
             return []
 
         created_units = []
+        deltas = DashboardDeltas()
 
         async with self.batch_transaction():
             # Process in chunks to avoid memory issues and optimize performance
@@ -254,11 +478,16 @@ class BloodInventoryService:
 
                 # Collect created units
                 created_units.extend(blood_units)
+                deltas.add_for_bank(
+                    blood_bank_id, stock=sum(unit.quantity for unit in blood_units)
+                )
 
                 # Optional: Add a small delay between chunks for very large batches
                 if len(blood_units_data) > 5000:
                     await asyncio.sleep(0.01)
 
+            await deltas.apply(self.db)
+
         return created_units
 
     async def batch_update_blood_units(
@@ -272,6 +501,7 @@ class BloodInventoryService:
             return []
 
         updated_units = []
+        deltas = DashboardDeltas()
 
         async with self.batch_transaction():
             for update_batch in [
@@ -295,12 +525,17 @@ class BloodInventoryService:
                     unit_id = update_data.pop("id")
                     if unit_id in units:
                         unit = units[unit_id]
+                        old_bank_id, old_quantity = unit.blood_bank_id, unit.quantity
                         for field, value in update_data.items():
                             setattr(unit, field, value)
+                        deltas.add_for_bank(old_bank_id, stock=-old_quantity)
+                        deltas.add_for_bank(unit.blood_bank_id, stock=unit.quantity)
                         updated_units.append(unit)
 
                 await self.db.flush()
 
+            await deltas.apply(self.db)
+
         return updated_units
 
     async def batch_delete_blood_units(self, unit_ids: List[UUID]) -> int:
@@ -312,6 +547,7 @@ class BloodInventoryService:
             return 0
 
         deleted_count = 0
+        deltas = DashboardDeltas()
 
         async with self.batch_transaction():
             for batch_ids in [
@@ -325,9 +561,12 @@ class BloodInventoryService:
                 units_to_delete = result.scalars().all()
 
                 for unit in units_to_delete:
+                    deltas.add_for_bank(unit.blood_bank_id, stock=-unit.quantity)
                     await self.db.delete(unit)
                     deleted_count += 1
 
+            await deltas.apply(self.db)
+
         return deleted_count
 
     async def get_blood_unit(self, blood_unit_id: UUID) -> Optional[BloodInventory]:
@@ -351,10 +590,16 @@ class BloodInventoryService:
             raise HTTPException(status_code=404, detail="Blood unit not found")
 
         update_data = blood_data.model_dump(exclude_unset=True)
+        old_bank_id, old_quantity = blood_unit.blood_bank_id, blood_unit.quantity
 
         for field, value in update_data.items():
             setattr(blood_unit, field, value)
 
+        deltas = DashboardDeltas()
+        deltas.add_for_bank(old_bank_id, stock=-old_quantity)
+        deltas.add_for_bank(blood_unit.blood_bank_id, stock=blood_unit.quantity)
+        await deltas.apply(self.db)
+
         await self.db.commit()
         await self.db.refresh(blood_unit)
 
@@ -366,6 +611,10 @@ class BloodInventoryService:
         if not blood_unit:
             raise HTTPException(status_code=404, detail="Blood unit not found")
 
+        deltas = DashboardDeltas()
+        deltas.add_for_bank(blood_unit.blood_bank_id, stock=-blood_unit.quantity)
+        await deltas.apply(self.db)
+
         await self.db.delete(blood_unit)
         await self.db.commit()
         return True
@@ -385,11 +634,6 @@ class BloodInventoryService:
         Get paginated blood units with comprehensive filtering and sorting
         Always filters by the user's blood bank if current_user_blood_bank_id is provided
         """
-        # Build base query with optimized joins
-        query = select(BloodInventory).options(
-            joinedload(BloodInventory.blood_bank), joinedload(BloodInventory.added_by)
-        )
-
         # Apply filters - always include the user's blood bank filter if provided
         conditions = []
 
@@ -422,47 +666,92 @@ class BloodInventoryService:
             ]
             conditions.append(or_(*search_conditions))
 
-        if conditions:
-            query = query.where(and_(*conditions))
+        return await self._paginate_blood_units(conditions, pagination)
 
-        # Apply sorting
-        if pagination.sort_by:
-            sort_column = getattr(BloodInventory, pagination.sort_by, None)
-            if sort_column:
-                if pagination.sort_order.lower() == "desc":
-                    query = query.order_by(sort_column.desc())
-            else:
-                query = query.order_by(sort_column.asc())
-        else:
-            # Default sort by creation date
-            query = query.order_by(BloodInventory.created_at.desc())
+    async def search_blood_units(
+        self,
+        search_params: BloodInventorySearchParams,
+        pagination: PaginationParams,
+    ) -> PaginatedResponse[BloodInventory]:
+        """
+        Advanced search compiled into one filtered query: IN lists for blood
+        types, products and banks plus quantity, expiry and creation ranges.
+        Pagination and totals are computed by the database over the full
+        filtered set, not over one page.
+        """
+        conditions = []
 
-        # Get total count for pagination metadata
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await self.db.execute(count_query)
-        total_items = total_result.scalar()
+        if search_params.blood_products:
+            conditions.append(
+                BloodInventory.blood_product.in_(search_params.blood_products)
+            )
 
-        # Apply pagination
-        offset = (pagination.page - 1) * pagination.page_size
-        query = query.offset(offset).limit(pagination.page_size)
+        if search_params.blood_types:
+            conditions.append(BloodInventory.blood_type.in_(search_params.blood_types))
 
-        # Execute query
-        result = await self.db.execute(query)
-        items = result.scalars().all()
+        if search_params.blood_bank_ids:
+            conditions.append(
+                BloodInventory.blood_bank_id.in_(search_params.blood_bank_ids)
+            )
 
-        # Calculate pagination metadata
-        total_pages = (total_items + pagination.page_size - 1) // pagination.page_size
-        has_next = pagination.page < total_pages
-        has_prev = pagination.page > 1
+        if search_params.min_quantity is not None:
+            conditions.append(BloodInventory.quantity >= search_params.min_quantity)
 
-        return PaginatedResponse(
-            items=items,
-            total_items=total_items,
-            total_pages=total_pages,
-            current_page=pagination.page,
-            page_size=pagination.page_size,
-            has_next=has_next,
-            has_prev=has_prev,
+        if search_params.max_quantity is not None:
+            conditions.append(BloodInventory.quantity <= search_params.max_quantity)
+
+        if search_params.expiry_date_from:
+            conditions.append(
+                BloodInventory.expiry_date >= search_params.expiry_date_from
+            )
+
+        if search_params.expiry_date_to:
+            conditions.append(BloodInventory.expiry_date <= search_params.expiry_date_to)
+
+        if search_params.created_from:
+            conditions.append(BloodInventory.created_at >= search_params.created_from)
+
+        if search_params.created_to:
+            conditions.append(BloodInventory.created_at <= search_params.created_to)
+
+        if search_params.search_term:
+            conditions.append(
+                or_(
+                    BloodInventory.blood_type.ilike(f"%{search_params.search_term}%"),
+                    BloodInventory.blood_product.ilike(
+                        f"%{search_params.search_term}%"
+                    ),
+                )
+            )
+
+        return await self._paginate_blood_units(conditions, pagination)
+
+    async def _paginate_blood_units(
+        self, conditions: List[Any], pagination: PaginationParams
+    ) -> PaginatedResponse[BloodInventory]:
+        """Run a filtered blood unit listing through paginate_query"""
+        # Build base query with optimized joins
+        query = select(BloodInventory).options(
+            joinedload(BloodInventory.blood_bank), joinedload(BloodInventory.added_by)
+        )
+        count_query = select(func.count(BloodInventory.id))
+        if conditions:
+            query = query.where(and_(*conditions))
+            count_query = count_query.where(and_(*conditions))
+
+        # Sort by the requested field (default creation date), id breaks ties
+        # so keyset cursors are stable
+        sort_column = BloodInventory.created_at
+        if pagination.sort_by:
+            sort_column = getattr(BloodInventory, pagination.sort_by, sort_column)
+
+        return await paginate_query(
+            self.db,
+            query,
+            pagination,
+            sort_column=sort_column,
+            id_column=BloodInventory.id,
+            count_query=count_query,
         )
 
     async def get_blood_units_by_bank(
@@ -486,6 +775,21 @@ class BloodInventoryService:
         )
         return result.scalars().all()
 
+    def build_export_query(
+        self, blood_bank_id: UUID, blood_type: Optional[str] = None
+    ):
+        """Flat rows of INVENTORY_EXPORT_COLUMNS for a bank, newest first"""
+        query = (
+            export_select(INVENTORY_EXPORT_COLUMNS)
+            .select_from(BloodInventory)
+            .outerjoin(BloodBank, BloodInventory.blood_bank_id == BloodBank.id)
+            .outerjoin(User, BloodInventory.added_by_id == User.id)
+            .where(BloodInventory.blood_bank_id == blood_bank_id)
+        )
+        if blood_type:
+            query = query.where(BloodInventory.blood_type == blood_type)
+        return query.order_by(BloodInventory.created_at.desc(), BloodInventory.id)
+
     async def get_expiring_blood_units(
         self, days: int = 7, pagination: Optional[PaginationParams] = None
     ) -> List[BloodInventory] | PaginatedResponse[BloodInventory]:
@@ -0,0 +1,143 @@
+"""
+Background dispatcher for SSE notification pushes.
+
+Request handlers that create blood requests or distributions used to await
+the SSE fan-out for every recipient before returning. The notification rows
+are still written inline (so they survive a crash), but the push itself is
+queued here and published by a background worker, letting the HTTP response
+go out before fan-out completes.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.notification_sse import ConnectionManager, manager
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class NotificationDispatcher:
+    """Publishes queued SSE pushes off the request path"""
+
+    def __init__(
+        self,
+        max_queue: int = 1000,
+        connection_manager: ConnectionManager = manager,
+    ):
+        self.max_queue = max_queue
+        self._manager = connection_manager
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "queued": 0,
+            "published": 0,
+            "rejected": 0,
+            "failures": 0,
+            "queue_wait_max_ms": 0.0,
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def submit(self, user_ids: List[str], message: Dict[str, Any]) -> bool:
+        """
+        Queue one push for a set of users.
+
+        Returns False when the dispatcher is not running or its queue is full
+        so callers can publish the push themselves.
+        """
+        if not self.is_running:
+            return False
+        try:
+            self._queue.put_nowait((time.perf_counter(), user_ids, message))
+        except asyncio.QueueFull:
+            self._stats["rejected"] += 1
+            logger.warning(
+                "Notification dispatch queue full",
+                extra={
+                    "event_type": "notification_dispatch_queue_full",
+                    "max_queue": self.max_queue,
+                },
+            )
+            return False
+        self._stats["queued"] += 1
+        return True
+
+    def start(self) -> None:
+        """Start the dispatch worker on the running event loop"""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            "Notification dispatcher started",
+            extra={
+                "event_type": "notification_dispatcher_started",
+                "max_queue": self.max_queue,
+            },
+        )
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Publish what is already queued (up to timeout), then stop"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Notification dispatcher stopped with pushes pending",
+                extra={
+                    "event_type": "notification_dispatch_abandoned",
+                    "pending": self._queue.qsize(),
+                },
+            )
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(
+            "Notification dispatcher stopped",
+            extra={"event_type": "notification_dispatcher_stopped", **self.get_stats()},
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        pending = self._queue.qsize() if self._queue is not None else 0
+        return {**self._stats, "pending": pending}
+
+    async def _run(self) -> None:
+        while True:
+            item: Tuple[float, List[str], Dict[str, Any]] = await self._queue.get()
+            queued_at, user_ids, message = item
+            try:
+                wait_ms = (time.perf_counter() - queued_at) * 1000
+                self._stats["queue_wait_max_ms"] = round(
+                    max(self._stats["queue_wait_max_ms"], wait_ms), 3
+                )
+                await self._manager.send_to_users(user_ids, message)
+                self._stats["published"] += 1
+            except Exception as e:
+                self._stats["failures"] += 1
+                logger.error(
+                    "Notification dispatch failed",
+                    extra={
+                        "event_type": "notification_dispatch_failed",
+                        "recipients": len(user_ids),
+                        "error": str(e),
+                    },
+                    exc_info=True,
+                )
+            finally:
+                self._queue.task_done()
+
+
+# Global dispatcher instance
+notification_dispatcher = NotificationDispatcher(
+    max_queue=settings.NOTIFICATION_DISPATCH_MAX_QUEUE
+)
@@ -2,11 +2,17 @@
 SSE Notification Manager
 
 Manages Server-Sent Events (SSE) connections for real-time notifications.
+
+Connections are local to the worker process. Messages are published through
+an SSEBroker (see app/services/sse_broker.py) so every worker receives them
+and delivers to the connections it holds.
 """
 
 import asyncio
 import logging
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional
+
+from app.services.sse_broker import InMemoryBroker, SSEBroker
 
 logger = logging.getLogger(__name__)
 
@@ -14,10 +20,26 @@ logger = logging.getLogger(__name__)
 class ConnectionManager:
     """Manages SSE connections and notifications"""
 
-    def __init__(self):
+    def __init__(self, broker: Optional[SSEBroker] = None):
         # Store connections: user_id -> list of queues
         self._connections: Dict[str, List[asyncio.Queue]] = {}
         self._lock = asyncio.Lock()
+        self._dropped = 0
+        self.broker = broker or InMemoryBroker()
+        self.broker.set_handler(self.deliver_local)
+
+    def use_broker(self, broker: SSEBroker) -> None:
+        """Swap the broker (before start), e.g. for the configured backend"""
+        self.broker = broker
+        self.broker.set_handler(self.deliver_local)
+
+    async def start(self) -> None:
+        """Subscribe this worker to the broker"""
+        await self.broker.start()
+        logger.info(f"SSE connection manager subscribed via {self.broker.name} broker")
+
+    async def stop(self) -> None:
+        await self.broker.stop()
 
     async def add_sse_connection(self, user_id: str) -> asyncio.Queue:
         """
@@ -77,51 +99,76 @@ class ConnectionManager:
 
     async def send_personal_message(self, user_id: str, message: dict) -> bool:
         """
-        Send a message to a specific user's connections.
+        Send a message to a specific user's connections on any worker.
 
         Args:
             user_id: User ID to send message to
             message: Message dictionary to send
 
         Returns:
-            bool: True if message was sent to at least one connection
+            bool: True if the message reached a local connection, or was
+            handed to a cross-process broker (delivery happens on whichever
+            worker holds the user's connections)
         """
-        if user_id not in self._connections:
-            logger.debug(f"No connections found for user {user_id}")
-            return False
+        return await self.send_to_users([user_id], message)
 
-        queues = self._connections[user_id].copy()
-        sent_count = 0
+    async def send_to_users(self, user_ids: Iterable[str], message: dict) -> bool:
+        """
+        Send one message to many users with a single broker publish.
 
-        for queue in queues:
-            try:
-                await queue.put(message)
-                sent_count += 1
-            except Exception as e:
-                logger.error(f"Failed to send message to user {user_id}: {e}")
+        Returns:
+            bool: Same meaning as send_personal_message
+        """
+        user_ids = [str(user_id) for user_id in user_ids]
+        if not user_ids:
+            return False
 
-        logger.debug(
-            f"Message sent to {sent_count} connections for user {user_id}"
-        )
-        return sent_count > 0
+        delivered = await self.broker.publish({"user_ids": user_ids, "message": message})
+        return delivered is None or delivered > 0
 
     async def broadcast(self, message: dict) -> int:
         """
-        Broadcast a message to all connected users.
+        Broadcast a message to all connected users on every worker.
 
         Args:
             message: Message dictionary to broadcast
 
         Returns:
-            int: Number of connections message was sent to
+            int: Number of connections on this worker the message was sent to
+            synchronously (0 when a cross-process broker delivers it later)
         """
-        sent_count = 0
+        sent_count = await self.broker.publish({"broadcast": True, "message": message})
+
+        logger.info(f"Broadcast message published via {self.broker.name} broker")
+        return sent_count or 0
+
+    def deliver_local(self, event: dict) -> int:
+        """
+        Fan a broker event out to this worker's queues.
+
+        Uses put_nowait so one slow client cannot stall delivery to others; a
+        full queue drops the message for that connection only.
 
-        for user_id in list(self._connections.keys()):
-            if await self.send_personal_message(user_id, message):
-                sent_count += len(self._connections.get(user_id, []))
+        Returns:
+            int: Number of local connections the message was queued for
+        """
+        message = event.get("message")
+        if event.get("broadcast"):
+            user_ids = list(self._connections.keys())
+        else:
+            user_ids = event.get("user_ids") or []
+
+        sent_count = 0
+        for user_id in user_ids:
+            for queue in self._connections.get(user_id, []).copy():
+                try:
+                    queue.put_nowait(message)
+                    sent_count += 1
+                except asyncio.QueueFull:
+                    self._dropped += 1
+                    logger.warning(f"SSE queue full for user {user_id}, message dropped")
 
-        logger.info(f"Broadcast message sent to {sent_count} connections")
+        logger.debug(f"Message delivered to {sent_count} local connections")
         return sent_count
 
     def get_stats(self) -> dict:
@@ -135,6 +182,8 @@ class ConnectionManager:
         active_users = len(self._connections)
 
         return {
+            "broker": self.broker.name,
+            "dropped_messages": self._dropped,
             "total_connections": total_connections,
             "active_users": active_users,
             "users": list(self._connections.keys()),
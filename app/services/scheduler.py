@@ -1,79 +1,162 @@
 from app.models.health_facility_model import Facility
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.executors.asyncio import AsyncIOExecutor
-from sqlalchemy import select, func, cast, Date
-from datetime import date
+from sqlalchemy import select, func, literal_column, union_all
+from datetime import date, datetime, time, timedelta
+import time as time_module
+from app.config import settings
 from app.database import async_session as async_sessionmaker
+from app.models.blood_bank_model import BloodBank
 from app.models.inventory_model import BloodInventory
 from app.models.distribution_model import BloodDistribution
 from app.models.request_model import BloodRequest, DashboardDailySummary
+from app.services.auth_purge import auth_record_purger
+from app.utils.rate_limiter import rate_limiter
+from app.utils.upsert import dialect_insert
 
 # Global scheduler instance
 scheduler = None
 
-async def refresh_dashboard_metrics():
+
+def build_dashboard_summary_select(day: date):
+    """
+    One grouped SELECT producing (facility_id, stock, transferred, requests)
+    for every facility. Facilities with no activity get zeros.
+
+    Same definitions the services apply as deltas: stock is the facility's
+    current inventory, transferred is units its blood bank delivered on `day`
+    and requests are requests it received on `day`.
+
+    The per-source rows are combined with UNION ALL and aggregated once, so
+    the statement is a single scan of each table plus one GROUP BY rather
+    than joins between aggregates.
+    """
+    day_start = datetime.combine(day, time.min)
+    day_end = day_start + timedelta(days=1)
+    zero, one = literal_column("0"), literal_column("1")
+
+    activity = union_all(
+        select(
+            Facility.id.label("facility_id"),
+            one.label("is_facility"),
+            zero.label("stock"),
+            zero.label("transferred"),
+            zero.label("requests"),
+        ),
+        select(BloodBank.facility_id, zero, BloodInventory.quantity, zero, zero).join(
+            BloodInventory, BloodInventory.blood_bank_id == BloodBank.id
+        ),
+        # Range predicates instead of CAST(... AS DATE) so the date indexes apply
+        select(BloodBank.facility_id, zero, zero, BloodDistribution.quantity, zero)
+        .join(BloodDistribution, BloodDistribution.dispatched_from_id == BloodBank.id)
+        .where(
+            BloodDistribution.date_delivered >= day_start,
+            BloodDistribution.date_delivered < day_end,
+        ),
+        select(BloodRequest.facility_id, zero, zero, zero, one).where(
+            BloodRequest.created_at >= day_start, BloodRequest.created_at < day_end
+        ),
+    ).subquery("facility_activity")
+
+    return (
+        select(
+            activity.c.facility_id,
+            func.sum(activity.c.stock).label("total_stock"),
+            func.sum(activity.c.transferred).label("total_transferred"),
+            func.sum(activity.c.requests).label("total_requests"),
+        )
+        .group_by(activity.c.facility_id)
+        # Only facilities that still exist
+        .having(func.max(activity.c.is_facility) == 1)
+    )
+
+
+async def reconcile_dashboard_metrics(
+    session_factory=async_sessionmaker, day: date = None
+) -> int:
     """
-    Compute metrics for all facilities and store them in DashboardDailySummary.
-    Runs every 5 minutes.
+    Recompute today's DashboardDailySummary for all facilities and correct
+    any rows that drifted from the delta updates applied by the services.
+    Runs periodically; returns the number of facilities that were corrected
+    (missing rows count as drift).
     """
-    print("Refreshing dashboard metrics...")
+    print("Reconciling dashboard metrics...")
     try:
-        async with async_sessionmaker() as session:  # open async db session
-            today = date.today()
-
-            # get all facility IDs using ORM
-            result = await session.execute(select(Facility.id))
-            facility_ids = [row[0] for row in result.all()]
-
-            for fid in facility_ids:
-                # --- Stock ---
-                stock_query = select(func.coalesce(func.sum(BloodInventory.quantity), 0)).join(
-                    BloodInventory.blood_bank
-                ).where(BloodInventory.blood_bank.has(facility_id=fid))
-                total_stock = (await session.execute(stock_query)).scalar_one()
-
-                # --- Transferred (delivered today) ---
-                transferred_query = select(func.coalesce(func.sum(BloodDistribution.quantity), 0)).where(
-                    BloodDistribution.dispatched_to_id == fid,
-                    BloodDistribution.date_delivered.is_not(None),
-                    cast(BloodDistribution.date_delivered, Date) == today
+        start_time = time_module.perf_counter()
+        async with session_factory() as session:  # open async db session
+            today = day or date.today()
+
+            expected = {
+                row.facility_id: (
+                    row.total_stock,
+                    row.total_transferred,
+                    row.total_requests,
                 )
-                total_transferred = (await session.execute(transferred_query)).scalar_one()
+                for row in await session.execute(build_dashboard_summary_select(today))
+            }
+            stored = {
+                row.facility_id: (
+                    row.total_stock,
+                    row.total_transferred,
+                    row.total_requests,
+                )
+                for row in await session.execute(
+                    select(
+                        DashboardDailySummary.facility_id,
+                        DashboardDailySummary.total_stock,
+                        DashboardDailySummary.total_transferred,
+                        DashboardDailySummary.total_requests,
+                    ).where(DashboardDailySummary.date == today)
+                )
+            }
+
+            drifted = [
+                {
+                    "facility_id": facility_id,
+                    "date": today,
+                    "total_stock": values[0],
+                    "total_transferred": values[1],
+                    "total_requests": values[2],
+                }
+                for facility_id, values in expected.items()
+                if stored.get(facility_id) != values
+            ]
 
-                # --- Requests (today) ---
-                requests_query = select(func.count(BloodRequest.id)).where(
-                    BloodRequest.facility_id == fid,
-                    cast(BloodRequest.created_at, Date) == today
+            if drifted:
+                statement = dialect_insert(
+                    session.bind.dialect.name, DashboardDailySummary
                 )
-                total_requests = (await session.execute(requests_query)).scalar_one()
-
-                # --- Upsert into DashboardDailySummary ---
-                existing = await session.execute(
-                    select(DashboardDailySummary).where(
-                        DashboardDailySummary.facility_id == fid,
-                        DashboardDailySummary.date == today,
-                    )
+                statement = statement.on_conflict_do_update(
+                    index_elements=["facility_id", "date"],
+                    set_={
+                        "total_stock": statement.excluded.total_stock,
+                        "total_transferred": statement.excluded.total_transferred,
+                        "total_requests": statement.excluded.total_requests,
+                        "updated_at": func.now(),
+                    },
                 )
-                existing_summary = existing.scalar_one_or_none()
-
-                if existing_summary:
-                    existing_summary.total_stock = total_stock
-                    existing_summary.total_transferred = total_transferred
-                    existing_summary.total_requests = total_requests
-                else:
-                    summary = DashboardDailySummary(
-                        facility_id=fid,
-                        date=today,
-                        total_stock=total_stock,
-                        total_transferred=total_transferred,
-                        total_requests=total_requests,
-                    )
-                    session.add(summary)
-
-            await session.commit()
-        print("Dashboard metrics refreshed.")
+                await session.execute(statement, drifted)
+                await session.commit()
+
+        duration = time_module.perf_counter() - start_time
+        missing = sum(1 for row in drifted if row["facility_id"] not in stored)
+        print(
+            f"Dashboard metrics reconciled: {len(expected)} facilities checked, "
+            f"{len(drifted) - missing} drifted, {missing} missing, "
+            f"in {duration * 1000:.1f}ms."
+        )
+        for row in drifted[:10]:
+            if row["facility_id"] in stored:
+                print(
+                    f"  drift facility={row['facility_id']} "
+                    f"stored={stored[row['facility_id']]} "
+                    f"expected={expected[row['facility_id']]}"
+                )
+        return len(drifted)
     except Exception as e:
-        print(f"Error refreshing dashboard metrics: {e}")
+        print(f"Error reconciling dashboard metrics: {e}")
+        return 0
+
 
 def start_scheduler():
     """Start the dashboard metrics scheduler"""
@@ -93,13 +176,30 @@ def start_scheduler():
     )
     
     scheduler.add_job(
-        refresh_dashboard_metrics,
+        reconcile_dashboard_metrics,
         trigger="interval",
-        minutes=5,   # run every 5 minutes
+        minutes=settings.DASHBOARD_RECONCILE_INTERVAL_MINUTES,
+        next_run_time=datetime.now(),  # seed today's rows at startup
         id="metrics_job",
         replace_existing=True,
     )
     
+    scheduler.add_job(
+        auth_record_purger.run,
+        trigger="interval",
+        minutes=settings.AUTH_PURGE_INTERVAL_MINUTES,
+        id="auth_purge_job",
+        replace_existing=True,
+    )
+    
+    scheduler.add_job(
+        rate_limiter.sweep,
+        trigger="interval",
+        seconds=settings.RATE_LIMIT_SWEEP_INTERVAL_SECONDS,
+        id="rate_limit_sweep_job",
+        replace_existing=True,
+    )
+    
     try:
         scheduler.start()
         print("Dashboard metrics scheduler started successfully")
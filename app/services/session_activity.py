@@ -0,0 +1,219 @@
+"""
+Write-behind coalescing of UserSession activity.
+
+Every authenticated request used to bump `last_activity`/`total_requests` on
+its session and commit, turning read-only GETs into write transactions on
+`user_sessions`. Routine activity is now buffered in memory per session and
+written with one executemany UPDATE every few seconds (and on shutdown).
+Security-relevant changes such as an IP change are still written immediately
+by SessionManager.validate_session.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import bindparam, update
+
+from app.config import settings
+from app.database import async_session
+from app.models.user_model import UserSession
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+_sessions = UserSession.__table__
+
+# One statement, executed with a parameter list (executemany)
+ACTIVITY_UPDATE = (
+    update(_sessions)
+    .where(_sessions.c.id == bindparam("b_session_id"))
+    .values(
+        last_activity=bindparam("b_last_activity"),
+        total_requests=_sessions.c.total_requests + bindparam("b_request_count"),
+    )
+)
+
+
+@dataclass
+class PendingActivity:
+    """Activity accumulated for one session since the last flush"""
+
+    last_activity: datetime
+    request_count: int = 0
+
+
+class SessionActivityCoalescer:
+    """Buffers session activity and flushes it in batches"""
+
+    def __init__(
+        self,
+        flush_interval_seconds: float = 10.0,
+        max_pending: int = 5000,
+        session_factory=async_session,
+    ):
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_pending = max_pending
+        self._session_factory = session_factory
+        self._pending: Dict[UUID, PendingActivity] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stats = {
+            "recorded": 0,
+            "flushes": 0,
+            "rows_flushed": 0,
+            "flush_failures": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def record(self, session_id: UUID, when: Optional[datetime] = None) -> bool:
+        """
+        Buffer one request of activity for a session.
+
+        Returns False when the coalescer is not running so callers can fall
+        back to writing the activity themselves.
+        """
+        if not self.is_running:
+            return False
+
+        when = when or datetime.now(timezone.utc)
+        pending = self._pending.get(session_id)
+        if pending is None:
+            pending = self._pending[session_id] = PendingActivity(last_activity=when)
+        elif when > pending.last_activity:
+            pending.last_activity = when
+        pending.request_count += 1
+        self._stats["recorded"] += 1
+
+        if len(self._pending) >= self.max_pending:
+            self._wake.set()
+        return True
+
+    def discard(self, session_id: UUID) -> None:
+        """Drop buffered activity for a session (e.g. after termination)"""
+        self._pending.pop(session_id, None)
+
+    async def flush(self) -> int:
+        """Write all buffered activity in a single executemany UPDATE"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            pending, self._pending = self._pending, {}
+            params = [
+                {
+                    "b_session_id": session_id,
+                    "b_last_activity": activity.last_activity,
+                    "b_request_count": activity.request_count,
+                }
+                for session_id, activity in pending.items()
+            ]
+
+            start_time = time.perf_counter()
+            try:
+                async with self._session_factory() as db:
+                    await db.execute(ACTIVITY_UPDATE, params)
+                    await db.commit()
+            except Exception as e:
+                self._stats["flush_failures"] += 1
+                self._requeue(pending)
+                logger.error(
+                    "Session activity flush failed",
+                    extra={
+                        "event_type": "session_activity_flush_failed",
+                        "pending_sessions": len(pending),
+                        "error": str(e),
+                    },
+                    exc_info=True,
+                )
+                return 0
+
+            duration_ms = (time.perf_counter() - start_time) * 1000
+            self._stats["flushes"] += 1
+            self._stats["rows_flushed"] += len(params)
+            self._stats["last_flush_ms"] = round(duration_ms, 3)
+
+            logger.debug(
+                "Session activity flushed",
+                extra={
+                    "event_type": "session_activity_flushed",
+                    "sessions": len(params),
+                    "duration_ms": duration_ms,
+                },
+            )
+            return len(params)
+
+    def start(self) -> None:
+        """Start the periodic flush loop on the running event loop"""
+        if self.is_running:
+            return
+        self._wake = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            "Session activity coalescer started",
+            extra={
+                "event_type": "session_activity_started",
+                "flush_interval_seconds": self.flush_interval_seconds,
+            },
+        )
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write whatever is still buffered"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self.flush()
+        logger.info(
+            "Session activity coalescer stopped",
+            extra={"event_type": "session_activity_stopped", **self.get_stats()},
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "pending_sessions": len(self._pending)}
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wake.wait(), timeout=self.flush_interval_seconds
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def _requeue(self, pending: Dict[UUID, PendingActivity]) -> None:
+        """Merge a failed batch back so the activity is retried next flush"""
+        for session_id, activity in pending.items():
+            current = self._pending.get(session_id)
+            if current is None:
+                if len(self._pending) < self.max_pending:
+                    self._pending[session_id] = activity
+                continue
+            current.request_count += activity.request_count
+            if activity.last_activity > current.last_activity:
+                current.last_activity = activity.last_activity
+
+
+# Global coalescer instance
+session_activity = SessionActivityCoalescer(
+    flush_interval_seconds=settings.SESSION_ACTIVITY_FLUSH_SECONDS,
+    max_pending=settings.SESSION_ACTIVITY_MAX_PENDING,
+)
@@ -0,0 +1,265 @@
+"""
+SSE pub/sub brokers.
+
+SSE connections live in a per-process ConnectionManager, but the API runs on
+several uvicorn workers, so an event raised on one worker has to reach clients
+connected to any of them. Every worker publishes events to a broker and
+subscribes to it once; the broker hands each event back to every worker, which
+fans it out to its local queues.
+
+- InMemoryBroker: single process (development, tests, serverless).
+- PostgresBroker: LISTEN/NOTIFY on the application database, no extra
+  infrastructure needed.
+"""
+
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Receives a published event on this worker; returns local deliveries
+EventHandler = Callable[[Dict[str, Any]], int]
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD_BYTES = 7900
+
+
+class SSEBroker(ABC):
+    """Publishes SSE events to every worker, including this one"""
+
+    name = "base"
+
+    def __init__(self):
+        self._handler: Optional[EventHandler] = None
+
+    def set_handler(self, handler: EventHandler) -> None:
+        self._handler = handler
+
+    async def start(self) -> None:
+        """Begin receiving events (no-op for in-process brokers)"""
+
+    async def stop(self) -> None:
+        """Stop receiving events and release connections"""
+
+    @abstractmethod
+    async def publish(self, event: Dict[str, Any]) -> Optional[int]:
+        """
+        Publish an event to all workers.
+
+        Returns the number of local connections reached when delivery is
+        synchronous, or None when delivery happens asynchronously.
+        """
+
+    def _dispatch(self, event: Dict[str, Any]) -> int:
+        if self._handler is None:
+            return 0
+        try:
+            return self._handler(event)
+        except Exception as e:
+            logger.error(
+                "SSE event dispatch failed",
+                extra={"event_type": "sse_dispatch_failed", "error": str(e)},
+                exc_info=True,
+            )
+            return 0
+
+
+class InMemoryBroker(SSEBroker):
+    """Delivers events straight to this process's connections"""
+
+    name = "memory"
+
+    async def publish(self, event: Dict[str, Any]) -> Optional[int]:
+        return self._dispatch(event)
+
+
+class PostgresBroker(SSEBroker):
+    """
+    Fan-out over PostgreSQL LISTEN/NOTIFY.
+
+    One dedicated connection LISTENs (and is re-established with backoff if it
+    drops); a second connection issues pg_notify for publishes. `connect` is
+    injectable so the broker can be exercised against a fake.
+    """
+
+    name = "postgres"
+
+    def __init__(
+        self,
+        dsn: str,
+        channel: str = "sse_events",
+        connect: Optional[Callable[[str], Awaitable[Any]]] = None,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._connect = connect
+        self._listen_task: Optional[asyncio.Task] = None
+        self._listen_conn = None
+        self._publish_conn = None
+        self._publish_lock: Optional[asyncio.Lock] = None
+        self.listening = asyncio.Event()
+        self._stats = {"published": 0, "received": 0, "reconnects": 0, "dropped": 0}
+
+    async def start(self) -> None:
+        if self._listen_task is None or self._listen_task.done():
+            self._publish_lock = asyncio.Lock()
+            self.listening = asyncio.Event()
+            self._listen_task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self) -> None:
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            try:
+                await self._listen_task
+            except asyncio.CancelledError:
+                pass
+            self._listen_task = None
+
+        for conn in (self._listen_conn, self._publish_conn):
+            await self._close_quietly(conn)
+        self._listen_conn = self._publish_conn = None
+
+    async def publish(self, event: Dict[str, Any]) -> Optional[int]:
+        for payload in self._encode(event):
+            await self._notify(payload)
+            self._stats["published"] += 1
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self._stats, "listening": self.listening.is_set()}
+
+    async def _open(self):
+        if self._connect is not None:
+            return await self._connect(self.dsn)
+
+        import asyncpg
+
+        return await asyncpg.connect(self.dsn)
+
+    async def _listen_forever(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            conn = None
+            try:
+                conn = await self._open()
+                closed = asyncio.Event()
+                conn.add_termination_listener(lambda _conn: closed.set())
+                await conn.add_listener(self.channel, self._on_notify)
+                self._listen_conn = conn
+                self.listening.set()
+                delay = self.reconnect_delay
+                logger.info(
+                    "SSE broker listening",
+                    extra={"event_type": "sse_broker_listening", "channel": self.channel},
+                )
+                await closed.wait()
+                logger.warning(
+                    "SSE broker listener connection lost",
+                    extra={"event_type": "sse_broker_disconnected", "channel": self.channel},
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(
+                    "SSE broker listener failed",
+                    extra={"event_type": "sse_broker_listen_failed", "error": str(e)},
+                )
+            finally:
+                self.listening.clear()
+                self._listen_conn = None
+                await self._close_quietly(conn)
+
+            self._stats["reconnects"] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self._stats["received"] += 1
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(
+                "Ignoring malformed SSE broker payload",
+                extra={"event_type": "sse_broker_bad_payload"},
+            )
+            return
+        self._dispatch(event)
+
+    async def _notify(self, payload: str) -> None:
+        async with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publish_conn is None or self._publish_conn.is_closed():
+                        self._publish_conn = await self._open()
+                    await self._publish_conn.execute(
+                        "SELECT pg_notify($1, $2)", self.channel, payload
+                    )
+                    return
+                except Exception:
+                    await self._close_quietly(self._publish_conn)
+                    self._publish_conn = None
+                    if attempt:
+                        raise
+
+    def _encode(self, event: Dict[str, Any]) -> List[str]:
+        """Serialize an event, splitting recipient lists that exceed NOTIFY's limit"""
+        payload = json.dumps(event, default=str, separators=(",", ":"))
+        if len(payload.encode("utf-8")) <= MAX_NOTIFY_PAYLOAD_BYTES:
+            return [payload]
+
+        user_ids = event.get("user_ids") or []
+        if len(user_ids) > 1:
+            middle = len(user_ids) // 2
+            return self._encode({**event, "user_ids": user_ids[:middle]}) + self._encode(
+                {**event, "user_ids": user_ids[middle:]}
+            )
+
+        self._stats["dropped"] += 1
+        logger.error(
+            "SSE event too large for NOTIFY, dropped",
+            extra={
+                "event_type": "sse_broker_payload_too_large",
+                "size_bytes": len(payload.encode("utf-8")),
+            },
+        )
+        return []
+
+    @staticmethod
+    async def _close_quietly(conn) -> None:
+        if conn is None:
+            return
+        try:
+            if not conn.is_closed():
+                await conn.close()
+        except Exception:
+            pass
+
+
+def create_broker(backend: str, database_url: str, channel: str) -> SSEBroker:
+    """
+    Build the broker configured by SSE_BROKER_BACKEND.
+
+    "auto" uses PostgreSQL LISTEN/NOTIFY when the database is PostgreSQL and
+    falls back to in-memory otherwise (e.g. SQLite in development).
+    """
+    if backend == "auto":
+        backend = "postgres" if database_url.startswith("postgresql") else "memory"
+
+    if backend == "postgres":
+        from sqlalchemy.engine.url import make_url
+
+        # asyncpg takes a plain libpq-style DSN, without the SQLAlchemy driver
+        url = make_url(database_url).set(drivername="postgresql")
+        return PostgresBroker(url.render_as_string(hide_password=False), channel)
+    if backend == "memory":
+        return InMemoryBroker()
+    raise ValueError(f"Unsupported SSE broker backend: {backend}")
@@ -369,88 +369,34 @@ class StatsService(BaseChartService):
         Shows cumulative stats for the last 7 days compared to the previous 7 days.
         This prevents stats from disappearing and provides meaningful trend data.
 
-        SCALABLE HYBRID APPROACH:
-        1. Try to get TODAY's data from DashboardDailySummary (fast, cached)
-        2. If not found or stale (>5 min old), trigger immediate refresh
-        3. Aggregate 7-day totals from cached daily summaries
-        4. Compare current 7 days vs previous 7 days
-
-        This scales to thousands of users because:
-        - Most requests hit the cache (O(1) lookup)
-        - Cache is automatically refreshed every 5 minutes by scheduler
-        - Only triggers refresh if cache is missing/stale
-        - Uses indexed date range queries
+        Reads only DashboardDailySummary rows, which services keep current
+        with atomic deltas and the scheduler reconciles periodically. This
+        never runs an aggregate over inventory/requests/distributions.
         """
         today = date.today()
         seven_days_ago = today - timedelta(days=7)
         fourteen_days_ago = today - timedelta(days=14)
 
-        # Try to get today's summary from cache first (FAST PATH)
-        today_query = select(DashboardDailySummary).where(
-            and_(
-                DashboardDailySummary.facility_id == facility_id,
-                DashboardDailySummary.date == today,
-            )
-        )
-        today_summary = (await self.db.execute(today_query)).scalar_one_or_none()
-
-        # Check if cache is stale (updated more than 5 minutes ago)
-        cache_is_stale = False
-        if today_summary and today_summary.updated_at:
-            cache_age_seconds = (
-                datetime.now() - today_summary.updated_at
-            ).total_seconds()
-            cache_is_stale = cache_age_seconds > 300  # 5 minutes
-
-        # If no cache or stale, trigger immediate refresh (SLOW PATH - rare)
-        if not today_summary or cache_is_stale:
-            logger.info(
-                f"Dashboard cache {'missing' if not today_summary else 'stale'} "
-                f"for facility {facility_id}, triggering refresh"
-            )
-            try:
-                from app.services.dashboard_service import (
-                    refresh_facility_dashboard_metrics,
+        # Both comparison windows in one indexed range query, oldest first
+        summaries_query = (
+            select(DashboardDailySummary)
+            .where(
+                and_(
+                    DashboardDailySummary.facility_id == facility_id,
+                    DashboardDailySummary.date >= fourteen_days_ago,
+                    DashboardDailySummary.date <= today,
                 )
-
-                await refresh_facility_dashboard_metrics(self.db, facility_id, today)
-
-                # Re-fetch the refreshed summary
-                today_summary = (
-                    await self.db.execute(today_query)
-                ).scalar_one_or_none()
-            except Exception as refresh_error:
-                logger.error(f"Failed to refresh dashboard cache: {refresh_error}")
-                # Continue with stale data or zeros
-
-        # Get last 7 days of summaries (current period)
-        current_period_query = select(DashboardDailySummary).where(
-            and_(
-                DashboardDailySummary.facility_id == facility_id,
-                DashboardDailySummary.date >= seven_days_ago,
-                DashboardDailySummary.date <= today,
             )
+            .order_by(DashboardDailySummary.date)
         )
-        current_summaries = (
-            (await self.db.execute(current_period_query)).scalars().all()
-        )
+        summaries = (await self.db.execute(summaries_query)).scalars().all()
 
-        # Get previous 7 days of summaries (comparison period)
-        previous_period_query = select(DashboardDailySummary).where(
-            and_(
-                DashboardDailySummary.facility_id == facility_id,
-                DashboardDailySummary.date >= fourteen_days_ago,
-                DashboardDailySummary.date < seven_days_ago,
-            )
-        )
-        previous_summaries = (
-            (await self.db.execute(previous_period_query)).scalars().all()
-        )
+        current_summaries = [s for s in summaries if s.date >= seven_days_ago]
+        previous_summaries = [s for s in summaries if s.date < seven_days_ago]
 
         # Aggregate current period (last 7 days)
-        current_stock = (
-            today_summary.total_stock if today_summary else 0
-        )  # Stock is current, not cumulative
+        # Stock is a running balance: use the most recent row, not a sum
+        current_stock = current_summaries[-1].total_stock if current_summaries else 0
         current_transferred = sum(s.total_transferred for s in current_summaries)
         current_requests = sum(s.total_requests for s in current_summaries)
 
@@ -583,7 +529,12 @@ class StatsService(BaseChartService):
                 BloodDistribution.blood_product,
                 BloodDistribution.blood_type,
             )
-            .order_by(func.date(BloodDistribution.date_delivered))
+            # The full group key, so the grouping pass already yields this order
+            .order_by(
+                func.date(BloodDistribution.date_delivered),
+                BloodDistribution.blood_product,
+                BloodDistribution.blood_type,
+            )
         )
 
         result = await self.db.execute(query)
@@ -696,7 +647,11 @@ class RequestTrackingService(BaseChartService):
                 BloodRequest.blood_product,
                 BloodRequest.blood_type,
             )
-            .order_by(func.date(BloodRequest.created_at))
+            .order_by(
+                func.date(BloodRequest.created_at),
+                BloodRequest.blood_product,
+                BloodRequest.blood_type,
+            )
         )
 
         result = await self.db.execute(query)
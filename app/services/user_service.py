@@ -8,7 +8,7 @@ from app.models.user_model import User
 from app.models.rbac_model import Role
 from app.schemas.user_schema import UserCreate, UserUpdate
 from app.utils.security import (
-    get_password_hash,
+    hash_password_async,
     create_verification_token,
 )
 from app.utils.email_verification import send_verification_email
@@ -45,7 +45,7 @@ class UserService:
             raise HTTPException(status_code=400, detail="Email already registered")
 
         # Password security
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await hash_password_async(user_data.password)
         facility_id = facility_id or work_facility_id
 
         verification_token = create_verification_token(
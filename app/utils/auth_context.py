@@ -0,0 +1,55 @@
+"""
+Per-request authentication context.
+
+`get_current_user` decodes the bearer token and validates the session once,
+then records the outcome on `request.state` so permission/role checkers and
+route handlers reuse it instead of decoding the JWT and hitting
+`user_sessions` again.
+
+The context lives in the ASGI scope's state, so the logging middleware can
+tag its access record with the user and session without decoding the token
+itself, and the user/session ids are bound to the logging context for any
+record written later in the request.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, MutableMapping, Optional
+from uuid import UUID
+
+from fastapi import Request
+
+from app.utils import logging_config
+
+AUTH_CONTEXT_ATTR = "auth_context"
+
+
+@dataclass
+class AuthContext:
+    """Outcome of authenticating the current request"""
+
+    user_id: UUID
+    session_id: Optional[UUID]
+    token_payload: Dict[str, Any] = field(default_factory=dict)
+    session_validated: bool = False
+    from_cache: bool = False
+
+
+def set_auth_context(request: Optional[Request], context: AuthContext) -> None:
+    """Attach the auth context to the request (no-op without a request)"""
+    if request is not None:
+        setattr(request.state, AUTH_CONTEXT_ATTR, context)
+    logging_config.user_id.set(str(context.user_id))
+    if context.session_id:
+        logging_config.session_id.set(str(context.session_id))
+
+
+def get_auth_context(request: Optional[Request]) -> Optional[AuthContext]:
+    """Return the auth context recorded for this request, if any"""
+    if request is None:
+        return None
+    return getattr(request.state, AUTH_CONTEXT_ATTR, None)
+
+
+def get_scope_auth_context(scope: MutableMapping[str, Any]) -> Optional[AuthContext]:
+    """Auth context for raw ASGI code that only has the scope"""
+    return scope.get("state", {}).get(AUTH_CONTEXT_ATTR)
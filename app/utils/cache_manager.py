@@ -1,99 +1,288 @@
-import hashlib
-import json
+"""
+In-process result cache with LRU eviction, lazy TTL expiry and tags.
+
+Entries live in one OrderedDict per namespace (e.g. "request_chart"), so
+lookups, inserts and evictions are O(1) and each namespace has its own size
+limit. Expired entries are dropped when they are next read or reach the LRU
+end of their namespace; nothing scans the whole cache on a write.
+
+Concurrent misses for the same key share a single computation
+(`get_or_set`), and entries can carry tags such as "facility:<id>" so every
+result derived from one facility's data is invalidated together. Blood
+request changes made through the ORM invalidate their facilities' tags
+automatically when the transaction commits.
+
+The cache is per process: invalidations reach the worker that performed the
+mutation immediately, other workers converge within the TTL.
+"""
+
 import asyncio
-from datetime import datetime, timedelta
-from typing import Any, Optional, Callable, Dict, Union
+import time
+from collections import OrderedDict
 from functools import wraps
+from itertools import chain
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
 import logging
 
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
 logger = logging.getLogger(__name__)
 
+DEFAULT_NAMESPACE = "default"
 
-class CacheManager:
-    """Generic cache manager with TTL support."""
+# Marks a miss, so None can be cached like any other value
+_MISSING = object()
 
-    def __init__(self, default_ttl: int = 300, max_size: int = 1000):
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self.default_ttl = default_ttl
-        self.max_size = max_size
+EntryRef = Tuple[str, Hashable]
 
-    def _generate_key(self, *args, **kwargs) -> str:
-        """Generate a consistent cache key from arguments."""
-        # Convert args and kwargs to a consistent string representation
-        key_data = {
-            "args": [str(arg) for arg in args],
-            "kwargs": {k: str(v) for k, v in sorted(kwargs.items())},
-        }
-        key_string = json.dumps(key_data, sort_keys=True)
-        return hashlib.md5(key_string.encode()).hexdigest()
 
-    def _is_expired(self, entry: Dict[str, Any]) -> bool:
-        """Check if cache entry has expired."""
-        return datetime.now() > entry["expires_at"]
+class CacheEntry:
+    __slots__ = ("value", "expires_at", "tags")
 
-    def _cleanup_expired(self):
-        """Remove expired entries."""
-        expired_keys = [
-            key for key, entry in self._cache.items() if self._is_expired(entry)
-        ]
-        for key in expired_keys:
-            del self._cache[key]
-
-    def _cleanup_lru(self):
-        """Remove least recently used entries if cache is full."""
-        if len(self._cache) >= self.max_size:
-            # Sort by last accessed time and remove oldest 10%
-            sorted_items = sorted(
-                self._cache.items(), key=lambda x: x[1]["last_accessed"]
-            )
-            items_to_remove = len(sorted_items) // 10 or 1
-            for key, _ in sorted_items[:items_to_remove]:
-                del self._cache[key]
-
-    def get(self, key: str) -> Optional[Any]:
-        """Get value from cache."""
-        if key in self._cache:
-            entry = self._cache[key]
-            if self._is_expired(entry):
-                del self._cache[key]
-                return None
-
-            # Update last accessed time
-            entry["last_accessed"] = datetime.now()
-            return entry["value"]
-        return None
-
-    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        """Set value in cache with TTL."""
-        ttl = ttl or self.default_ttl
-
-        self._cleanup_expired()
-        self._cleanup_lru()
-
-        self._cache[key] = {
-            "value": value,
-            "expires_at": datetime.now() + timedelta(seconds=ttl),
-            "last_accessed": datetime.now(),
-            "created_at": datetime.now(),
+    def __init__(self, value: Any, expires_at: float, tags: Tuple[str, ...]):
+        self.value = value
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+def _freeze(value: Any) -> Hashable:
+    """Hashable, type-preserving form of a key component"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(
+            sorted(((k, _freeze(v)) for k, v in value.items()), key=lambda kv: str(kv[0]))
+        )
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class CacheManager:
+    """LRU + TTL cache with namespaces, tags and single-flight loading."""
+
+    def __init__(
+        self,
+        default_ttl: int = 300,
+        max_size: int = 1000,
+        namespace_limits: Optional[Dict[str, int]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self.namespace_limits = dict(namespace_limits or {})
+        self._clock = clock
+        self._namespaces: Dict[str, "OrderedDict[Hashable, CacheEntry]"] = {}
+        self._tags: Dict[str, Set[EntryRef]] = {}
+        self._inflight: Dict[EntryRef, asyncio.Future] = {}
+        # Bumped by every invalidation; a load that overlaps one is not stored
+        self._epoch = 0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "coalesced": 0,
+            "stale_loads": 0,
         }
 
-    def delete(self, key: str) -> bool:
+    def _generate_key(self, *args, **kwargs) -> Hashable:
+        """Generate a consistent cache key from arguments."""
+        key = _freeze(args)
+        if kwargs:
+            key += (_freeze(kwargs),)
+        return key
+
+    def _limit(self, namespace: str) -> int:
+        return self.namespace_limits.get(namespace, self.max_size)
+
+    def _lookup(self, key: Hashable, namespace: str) -> Any:
+        entries = self._namespaces.get(namespace)
+        entry = entries.get(key) if entries is not None else None
+        if entry is None:
+            self._stats["misses"] += 1
+            return _MISSING
+
+        if entry.expires_at <= self._clock():
+            self._remove(namespace, key)
+            self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return _MISSING
+
+        entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return entry.value
+
+    def get(self, key: Hashable, namespace: str = DEFAULT_NAMESPACE) -> Optional[Any]:
+        """Get value from cache (None on a miss)."""
+        value = self._lookup(key, namespace)
+        return None if value is _MISSING else value
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        ttl: Optional[int] = None,
+        namespace: str = DEFAULT_NAMESPACE,
+        tags: Iterable[str] = (),
+    ) -> None:
+        """Set value in cache with TTL, evicting the namespace's LRU entry if full."""
+        ttl = self.default_ttl if ttl is None else ttl
+        entries = self._namespaces.setdefault(namespace, OrderedDict())
+        if key in entries:
+            self._remove(namespace, key)
+        if ttl <= 0:
+            return
+
+        limit = self._limit(namespace)
+        while len(entries) >= limit:
+            lru_key, lru_entry = next(iter(entries.items()))
+            expired = lru_entry.expires_at <= self._clock()
+            self._remove(namespace, lru_key)
+            self._stats["expirations" if expired else "evictions"] += 1
+
+        entry = CacheEntry(value, self._clock() + ttl, tuple(tags))
+        entries[key] = entry
+        for tag in entry.tags:
+            self._tags.setdefault(tag, set()).add((namespace, key))
+        self._stats["sets"] += 1
+
+    async def get_or_set(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None,
+        namespace: str = DEFAULT_NAMESPACE,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        """
+        Return the cached value or compute it with `factory`.
+
+        Concurrent misses for the same key wait for the first caller's
+        computation instead of starting their own. If that caller is
+        cancelled, a waiter takes over. A result computed while an
+        invalidation happened is returned but not cached, since it may
+        predate the change.
+        """
+        ref = (namespace, key)
+        while True:
+            value = self._lookup(key, namespace)
+            if value is not _MISSING:
+                return value
+
+            pending = self._inflight.get(ref)
+            if pending is None:
+                break
+
+            self._stats["coalesced"] += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[ref] = future
+        epoch = self._epoch
+        try:
+            value = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; don't warn when there are none
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(ref, None)
+
+        if epoch == self._epoch:
+            self.set(key, value, ttl, namespace, tags)
+        else:
+            self._stats["stale_loads"] += 1
+        future.set_result(value)
+        return value
+
+    def delete(self, key: Hashable, namespace: str = DEFAULT_NAMESPACE) -> bool:
         """Delete specific key from cache."""
-        return self._cache.pop(key, None) is not None
+        self._epoch += 1
+        return self._remove(namespace, key)
+
+    def invalidate_tag(self, tag: str) -> int:
+        """Delete every entry carrying `tag`; returns entries removed."""
+        self._epoch += 1
+        refs = self._tags.pop(tag, set())
+        removed = sum(self._remove(namespace, key) for namespace, key in refs)
+        self._stats["invalidations"] += removed
+        return removed
+
+    def invalidate_namespace(self, namespace: str) -> int:
+        """Delete every entry in a namespace; returns entries removed."""
+        self._epoch += 1
+        entries = self._namespaces.get(namespace)
+        if not entries:
+            return 0
+        removed = 0
+        for key in list(entries):
+            removed += self._remove(namespace, key)
+        self._stats["invalidations"] += removed
+        return removed
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry (maintenance; not needed for correctness)."""
+        now = self._clock()
+        expired = [
+            (namespace, key)
+            for namespace, entries in self._namespaces.items()
+            for key, entry in entries.items()
+            if entry.expires_at <= now
+        ]
+        for namespace, key in expired:
+            self._remove(namespace, key)
+        self._stats["expirations"] += len(expired)
+        return len(expired)
 
     def clear(self) -> None:
         """Clear all cache entries."""
-        self._cache.clear()
+        self._epoch += 1
+        self._namespaces.clear()
+        self._tags.clear()
+
+    def _remove(self, namespace: str, key: Hashable) -> bool:
+        entries = self._namespaces.get(namespace)
+        entry = entries.pop(key, None) if entries is not None else None
+        if entry is None:
+            return False
+        for tag in entry.tags:
+            refs = self._tags.get(tag)
+            if refs is not None:
+                refs.discard((namespace, key))
+                if not refs:
+                    del self._tags[tag]
+        return True
 
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics."""
+        lookups = self._stats["hits"] + self._stats["misses"]
         return {
-            "total_entries": len(self._cache),
+            **self._stats,
+            "total_entries": sum(len(entries) for entries in self._namespaces.values()),
+            "namespaces": {
+                namespace: len(entries) for namespace, entries in self._namespaces.items()
+            },
+            "tags": len(self._tags),
+            "inflight": len(self._inflight),
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
             "max_size": self.max_size,
             "default_ttl": self.default_ttl,
-            "expired_entries": len(
-                [k for k, v in self._cache.items() if self._is_expired(v)]
-            ),
         }
 
 
@@ -101,54 +290,42 @@ class CacheManager:
 cache = CacheManager()
 
 
-def cached(ttl: Optional[int] = None, key_prefix: str = ""):
+def cached(
+    ttl: Optional[int] = None,
+    key_prefix: str = "",
+    tags: Optional[Callable[..., Iterable[str]]] = None,
+):
     """
     Decorator to cache function results.
 
     Args:
         ttl: Time to live in seconds (uses default if None)
-        key_prefix: Prefix for cache keys
+        key_prefix: Namespace for the cached results (defaults to the function name)
+        tags: Called with the function's arguments; returns tags for the result
     """
 
     def decorator(func: Callable):
+        namespace = key_prefix or f"{func.__module__}.{func.__qualname__}"
+
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            # Generate cache key
-            base_key = cache._generate_key(*args, **kwargs)
-            cache_key = f"{key_prefix}:{base_key}" if key_prefix else base_key
-
-            # Try to get from cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
-                logger.debug(f"Cache hit for function {func.__name__}")
-                return cached_result
-
-            # Execute function
-            logger.debug(f"Cache miss for function {func.__name__}")
-            result = await func(*args, **kwargs)
-
-            # Cache result
-            cache.set(cache_key, result, ttl)
-            return result
+            return await cache.get_or_set(
+                cache._generate_key(*args, **kwargs),
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                namespace=namespace,
+                tags=tags(*args, **kwargs) if tags else (),
+            )
 
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
-            # Generate cache key
-            base_key = cache._generate_key(*args, **kwargs)
-            cache_key = f"{key_prefix}:{base_key}" if key_prefix else base_key
-
-            # Try to get from cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
-                logger.debug(f"Cache hit for function {func.__name__}")
-                return cached_result
-
-            # Execute function
-            logger.debug(f"Cache miss for function {func.__name__}")
-            result = func(*args, **kwargs)
+            key = cache._generate_key(*args, **kwargs)
+            result = cache._lookup(key, namespace)
+            if result is not _MISSING:
+                return result
 
-            # Cache result
-            cache.set(cache_key, result, ttl)
+            result = func(*args, **kwargs)
+            cache.set(key, result, ttl, namespace, tags(*args, **kwargs) if tags else ())
             return result
 
         # Return appropriate wrapper based on function type
@@ -157,24 +334,35 @@ def cached(ttl: Optional[int] = None, key_prefix: str = ""):
     return decorator
 
 
-def cache_key(*args, **kwargs) -> str:
+def cache_key(*args, **kwargs) -> Hashable:
     """Generate a cache key from arguments (utility function)."""
     return cache._generate_key(*args, **kwargs)
 
 
-def manual_cache_get(key: str) -> Optional[Any]:
+def manual_cache_get(key: Hashable, namespace: str = DEFAULT_NAMESPACE) -> Optional[Any]:
     """Manually get value from cache."""
-    return cache.get(key)
+    return cache.get(key, namespace)
 
 
-def manual_cache_set(key: str, value: Any, ttl: Optional[int] = None) -> None:
+def manual_cache_set(
+    key: Hashable,
+    value: Any,
+    ttl: Optional[int] = None,
+    namespace: str = DEFAULT_NAMESPACE,
+    tags: Iterable[str] = (),
+) -> None:
     """Manually set value in cache."""
-    cache.set(key, value, ttl)
+    cache.set(key, value, ttl, namespace, tags)
 
 
-def cache_delete(key: str) -> bool:
+def cache_delete(key: Hashable, namespace: str = DEFAULT_NAMESPACE) -> bool:
     """Delete specific cache entry."""
-    return cache.delete(key)
+    return cache.delete(key, namespace)
+
+
+def cache_invalidate_tag(tag: str) -> int:
+    """Delete every cache entry carrying a tag."""
+    return cache.invalidate_tag(tag)
 
 
 def cache_clear() -> None:
@@ -187,6 +375,49 @@ def cache_stats() -> Dict[str, Any]:
     return cache.get_stats()
 
 
+def facility_tag(facility_id: Any) -> str:
+    """Tag for results derived from one facility's data."""
+    return f"facility:{facility_id}"
+
+
+# Facility ids flushed in the current transaction, held in Session.info
+_PENDING_FACILITIES = "cache_manager.pending_facilities"
+
+
+@event.listens_for(Session, "after_flush")
+def collect_facility_changes_on_flush(session: Session, flush_context) -> None:
+    """
+    Remember facilities whose blood requests changed in this flush.
+
+    Their cached results are dropped once the transaction commits, so a
+    concurrent reader cannot re-cache pre-commit data in between. Core bulk
+    UPDATE statements bypass the unit of work and must call
+    `cache_invalidate_tag(facility_tag(...))` explicitly after committing.
+    """
+    from app.models.request_model import BloodRequest
+
+    facility_ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, BloodRequest):
+            facility_ids.update((obj.facility_id, obj.source_facility_id))
+    facility_ids.discard(None)
+    if facility_ids:
+        session.info.setdefault(_PENDING_FACILITIES, set()).update(facility_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_facility_results_on_commit(session: Session) -> None:
+    """Drop cached results for the facilities changed by the committed transaction."""
+    for facility_id in session.info.pop(_PENDING_FACILITIES, ()):
+        cache.invalidate_tag(facility_tag(facility_id))
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_facility_changes_on_rollback(session: Session) -> None:
+    """Rolled back changes never reached the database; keep the cache."""
+    session.info.pop(_PENDING_FACILITIES, None)
+
+
 # Context manager for temporary cache settings
 class temp_cache_config:
     """Temporarily change cache configuration."""
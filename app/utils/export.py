@@ -0,0 +1,182 @@
+"""
+Streaming CSV / NDJSON exports.
+
+Exports used to load every row (with joined relationships) into the session,
+render the whole file into a StringIO and only then start the response, so
+memory grew with the table and the first byte waited for the last row. Here
+rows are read from a server-side cursor (`AsyncSession.stream` with
+yield_per) as plain column tuples and encoded one partition at a time: an
+export holds at most `yield_per` rows in memory and starts sending as soon as
+the first partition arrives.
+
+The request's own session is closed before a StreamingResponse body runs, so
+the stream opens a session of its own from the session factory.
+"""
+
+import csv
+import io
+import json
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, AsyncIterator, Callable, Optional, Sequence
+from uuid import UUID
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_YIELD_PER = 1000
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+@dataclass(frozen=True)
+class ExportColumn:
+    """One exported field: NDJSON key, CSV header and the SQL expression"""
+
+    key: str
+    header: str
+    expression: Any
+
+
+def export_select(columns: Sequence[ExportColumn]) -> Select:
+    """select() of the labelled column expressions, ready for joins/filters"""
+    return select(*(column.expression.label(column.key) for column in columns))
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    return value
+
+
+async def stream_partitions(
+    session_factory: async_sessionmaker[AsyncSession],
+    query: Select,
+    yield_per: int = DEFAULT_YIELD_PER,
+) -> AsyncIterator[Sequence[Any]]:
+    """Yield lists of row tuples read through a server-side cursor"""
+    async with session_factory() as session:
+        result = await session.stream(query.execution_options(yield_per=yield_per))
+        async for partition in result.partitions():
+            yield partition
+
+
+async def encode_csv(
+    columns: Sequence[ExportColumn], partitions: AsyncIterator[Sequence[Any]]
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.header for column in columns])
+    yield buffer.getvalue().encode("utf-8")
+
+    async for rows in partitions:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            ["" if value is None else _plain(value) for value in row] for row in rows
+        )
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def encode_ndjson(
+    columns: Sequence[ExportColumn], partitions: AsyncIterator[Sequence[Any]]
+) -> AsyncIterator[bytes]:
+    keys = [column.key for column in columns]
+    async for rows in partitions:
+        yield "".join(
+            json.dumps(
+                dict(zip(keys, map(_plain, row))),
+                separators=(",", ":"),
+                ensure_ascii=False,
+            )
+            + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+ENCODERS = {ExportFormat.CSV: encode_csv, ExportFormat.NDJSON: encode_ndjson}
+
+
+async def stream_export(
+    query: Select,
+    columns: Sequence[ExportColumn],
+    export_format: ExportFormat,
+    session_factory: Optional[async_sessionmaker[AsyncSession]] = None,
+    yield_per: int = DEFAULT_YIELD_PER,
+    on_complete: Optional[Callable[[int, float], None]] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Encode the rows of `query` (built with export_select) chunk by chunk.
+
+    `on_complete(rows_exported, duration_seconds)` runs once the last chunk
+    has been produced, which is where callers log their audit trail.
+    """
+    if session_factory is None:
+        from app.database import async_session as session_factory
+
+    start_time = time.perf_counter()
+    rows_exported = 0
+
+    async def counted() -> AsyncIterator[Sequence[Any]]:
+        nonlocal rows_exported
+        async for rows in stream_partitions(session_factory, query, yield_per):
+            rows_exported += len(rows)
+            yield rows
+
+    try:
+        async for chunk in ENCODERS[export_format](columns, counted()):
+            yield chunk
+    except Exception as e:
+        # Headers are already sent; all we can do is cut the body short
+        logger.error(
+            "Export stream failed",
+            extra={
+                "event_type": "export_stream_error",
+                "export_format": export_format.value,
+                "rows_exported": rows_exported,
+                "error": str(e),
+            },
+            exc_info=True,
+        )
+        raise
+
+    if on_complete:
+        on_complete(rows_exported, time.perf_counter() - start_time)
+
+
+def export_response(
+    query: Select,
+    columns: Sequence[ExportColumn],
+    export_format: ExportFormat,
+    filename: str,
+    on_complete: Optional[Callable[[int, float], None]] = None,
+) -> StreamingResponse:
+    """StreamingResponse serving `query` as an attachment"""
+    return StreamingResponse(
+        stream_export(query, columns, export_format, on_complete=on_complete),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f"attachment; filename={filename}.{export_format.value}"
+        },
+    )
@@ -0,0 +1,46 @@
+"""
+Great-circle helpers for distance-ranked facility searches.
+
+Facilities store plain latitude/longitude floats, so "nearest" is answered in
+two steps: a bounding box (a range on the (latitude, longitude) index) cuts
+the candidates down to a small neighbourhood, then `haversine_km` ranks the
+survivors exactly. Every point within `radius_km` of the origin is inside
+`bounding_box(origin, radius_km)`, so nothing nearer can be missed.
+"""
+
+from math import asin, cos, degrees, radians, sin, sqrt
+from typing import NamedTuple, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class BoundingBox(NamedTuple):
+    min_lat: float
+    max_lat: float
+    # None when the box reaches a pole or crosses the antimeridian
+    lng_range: Optional[Tuple[float, float]]
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = radians(lat1), radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = radians(lng2 - lng1)
+    a = sin(d_phi / 2) ** 2 + cos(phi1) * cos(phi2) * sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+def bounding_box(latitude: float, longitude: float, radius_km: float) -> BoundingBox:
+    """Smallest lat/lng box containing every point within radius_km"""
+    d_lat = degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - d_lat, latitude + d_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return BoundingBox(max(min_lat, -90.0), min(max_lat, 90.0), None)
+
+    # Widest longitude span of the circle (it is reached slightly poleward of
+    # the origin, so the span is larger than radius / cos(latitude))
+    d_lng = degrees(asin(sin(radius_km / EARTH_RADIUS_KM) / cos(radians(latitude))))
+    min_lng, max_lng = longitude - d_lng, longitude + d_lng
+    if min_lng < -180 or max_lng > 180:
+        return BoundingBox(min_lat, max_lat, None)
+    return BoundingBox(min_lat, max_lat, (min_lng, max_lng))
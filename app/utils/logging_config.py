@@ -1,11 +1,19 @@
+import atexit
+import itertools
 import logging
+import queue
 import sys
 import os
 import traceback
-from logging.handlers import RotatingFileHandler, TimedRotatingFileHandler
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
 from pythonjsonlogger import jsonlogger
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from contextvars import ContextVar
 from functools import wraps
 import time
@@ -34,6 +42,21 @@ ENABLE_FILE_LOGGING = (
     == "true"
 )
 
+# Formatting and writing happen on a background thread behind a bounded queue.
+# When it is full, "drop" discards the record and "block" waits up to
+# LOG_QUEUE_BLOCK_TIMEOUT seconds for space before discarding it.
+LOG_QUEUE_ENABLED = os.getenv("LOG_QUEUE_ENABLED", "true").lower() == "true"
+LOG_QUEUE_MAX_SIZE = int(os.getenv("LOG_QUEUE_MAX_SIZE", "10000"))
+LOG_QUEUE_FULL_POLICY = os.getenv("LOG_QUEUE_FULL_POLICY", "drop").lower()
+LOG_QUEUE_BLOCK_TIMEOUT = float(os.getenv("LOG_QUEUE_BLOCK_TIMEOUT", "0.5"))
+LOG_QUEUE_BATCH_SIZE = int(os.getenv("LOG_QUEUE_BATCH_SIZE", "256"))
+
+# Share of INFO/DEBUG records kept for high-volume event types,
+# as "event_type=rate" pairs (0 drops them entirely)
+LOG_SAMPLE_RATES = os.getenv(
+    "LOG_SAMPLE_RATES", "access_granted=0.1,access_granted_role=0.1"
+)
+
 
 class ContextualJsonFormatter(jsonlogger.JsonFormatter):
     """Enhanced JSON formatter that includes contextual information"""
@@ -41,8 +64,10 @@ class ContextualJsonFormatter(jsonlogger.JsonFormatter):
     def add_fields(self, log_record, record, message_dict):
         super().add_fields(log_record, record, message_dict)
 
-        # Add timestamp in ISO format
-        log_record["timestamp"] = datetime.now(timezone.utc).isoformat() + "Z"
+        # Add timestamp in ISO format (creation time; formatting may run later)
+        log_record["timestamp"] = (
+            datetime.fromtimestamp(record.created, timezone.utc).isoformat() + "Z"
+        )
 
         # Add environment
         log_record["environment"] = ENVIRONMENT
@@ -71,6 +96,156 @@ class ContextualJsonFormatter(jsonlogger.JsonFormatter):
             log_record.update(record.extra_fields)
 
 
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "event_type=rate,..." into a mapping"""
+    rates = {}
+    for pair in filter(None, (part.strip() for part in spec.split(","))):
+        event_type, _, rate = pair.partition("=")
+        rates[event_type.strip()] = float(rate)
+    return rates
+
+
+class EventSampler(logging.Filter):
+    """
+    Keeps one in N INFO/DEBUG records of each sampled event type.
+
+    Warnings and errors are never sampled. The decision is stored on the
+    record so every handler that sees it agrees.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = {event: rate for event, rate in rates.items() if rate < 1}
+        self._intervals = {
+            event: round(1 / rate) for event, rate in self.rates.items() if rate > 0
+        }
+        self._counters = {event: itertools.count() for event in self.rates}
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        keep = getattr(record, "_sample_keep", None)
+        if keep is not None:
+            return keep
+
+        keep = True
+        if record.levelno < logging.WARNING:
+            event_type = getattr(record, "event_type", None)
+            if event_type is None:
+                extra_fields = getattr(record, "extra_fields", None)
+                if isinstance(extra_fields, dict):
+                    event_type = extra_fields.get("event_type")
+            if event_type in self.rates:
+                interval = self._intervals.get(event_type)
+                count = next(self._counters[event_type])
+                keep = interval is not None and count % interval == 0
+                if keep:
+                    record.sample_rate = self.rates[event_type]
+                else:
+                    self.sampled_out += 1
+
+        record._sample_keep = keep
+        return keep
+
+
+class DeferredFlushMixin:
+    """Lets the queue listener flush once per batch instead of once per record"""
+
+    defer_flush = False
+
+    def flush(self):
+        if not self.defer_flush:
+            super().flush()
+
+    def flush_batch(self):
+        super().flush()
+
+
+class BatchedStreamHandler(DeferredFlushMixin, logging.StreamHandler):
+    pass
+
+
+class BatchedRotatingFileHandler(DeferredFlushMixin, RotatingFileHandler):
+    pass
+
+
+class BatchedTimedRotatingFileHandler(DeferredFlushMixin, TimedRotatingFileHandler):
+    pass
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler for a bounded queue with a drop or block policy when full"""
+
+    def __init__(
+        self,
+        log_queue: queue.Queue,
+        full_policy: str = "drop",
+        block_timeout: float = 0.5,
+    ):
+        if full_policy not in ("drop", "block"):
+            raise ValueError(f"Unsupported log queue policy: {full_policy}")
+        super().__init__(log_queue)
+        self.full_policy = full_policy
+        self.block_timeout = block_timeout
+        self.enqueued = 0
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener thread cannot see this request's context variables, and
+        # mutable args could change before it formats the record
+        for name, var in (
+            ("request_id", request_id),
+            ("user_id", user_id),
+            ("session_id", session_id),
+        ):
+            value = var.get()
+            if value:
+                setattr(record, name, value)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self.full_policy == "block":
+                self.queue.put(record, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(record)
+            self.enqueued += 1
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchingQueueListener(QueueListener):
+    """Handles whatever is queued, up to batch_size records, then flushes once"""
+
+    def __init__(self, log_queue: queue.Queue, *handlers, batch_size: int = 256):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+
+    def _monitor(self):
+        stopping = False
+        while not stopping:
+            batch = [self.dequeue(True)]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+
+            for record in batch:
+                if record is self._sentinel:
+                    stopping = True
+                else:
+                    self.handle(record)
+                self.queue.task_done()
+
+            if batch == [self._sentinel]:
+                break
+            for handler in self.handlers:
+                if isinstance(handler, DeferredFlushMixin):
+                    handler.flush_batch()
+
+
 class ApplicationLogger:
     """Centralized logger class for the application"""
 
@@ -97,69 +272,134 @@ class ApplicationLogger:
             "%(asctime)s %(levelname)s %(name)s %(funcName)s:%(lineno)d %(message)s"
         )
 
+        self.sampler = EventSampler(parse_sample_rates(LOG_SAMPLE_RATES))
+        self.queue_handler: Optional[BoundedQueueHandler] = None
+        self.listener: Optional[BatchingQueueListener] = None
+
         # Console handler (always enabled)
-        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler = BatchedStreamHandler(sys.stdout)
         console_handler.setFormatter(formatter)
         console_handler.setLevel(getattr(logging, LOG_LEVEL))
-        root_logger.addHandler(console_handler)
+        self.handlers: List[logging.Handler] = [console_handler]
 
         # File handlers (if enabled and not in serverless)
         if ENABLE_FILE_LOGGING and not IS_SERVERLESS:
             os.makedirs(LOG_DIR, exist_ok=True)  # Create directory here if needed
-            self._setup_file_handlers(formatter)
+            self.handlers += self._setup_file_handlers(formatter)
+
+        if LOG_QUEUE_ENABLED:
+            self._start_queue()
+        else:
+            self._attach_handlers()
 
         # Configure third-party loggers
         self._configure_third_party_loggers()
 
-    def _setup_file_handlers(self, formatter):
-        """Set up file-based logging handlers"""
-        root_logger = logging.getLogger()
+    def _setup_file_handlers(self, formatter) -> List[logging.Handler]:
+        """
+        Set up file-based logging handlers.
 
+        All handlers sit behind the root logger; the security, performance and
+        access files only accept records from their own logger.
+        """
         # Application logs (rotating by size)
-        app_handler = RotatingFileHandler(
+        app_handler = BatchedRotatingFileHandler(
             f"{LOG_DIR}/app.log", maxBytes=10_000_000, backupCount=10  # 10MB
         )
         app_handler.setFormatter(formatter)
         app_handler.setLevel(logging.INFO)
-        root_logger.addHandler(app_handler)
 
         # Error logs (rotating by time)
-        error_handler = TimedRotatingFileHandler(
+        error_handler = BatchedTimedRotatingFileHandler(
             f"{LOG_DIR}/error.log", when="midnight", interval=1, backupCount=30
         )
         error_handler.setFormatter(formatter)
         error_handler.setLevel(logging.ERROR)
-        root_logger.addHandler(error_handler)
 
         # Security/Auth logs
-        security_handler = TimedRotatingFileHandler(
+        security_handler = BatchedTimedRotatingFileHandler(
             f"{LOG_DIR}/security.log",
             when="midnight",
             interval=1,
             backupCount=90,  # Keep security logs longer
         )
         security_handler.setFormatter(formatter)
-        security_logger = logging.getLogger("security")
-        security_logger.addHandler(security_handler)
-        security_logger.setLevel(logging.INFO)
+        security_handler.addFilter(logging.Filter("security"))
+        logging.getLogger("security").setLevel(logging.INFO)
 
         # Performance logs
-        perf_handler = RotatingFileHandler(
+        perf_handler = BatchedRotatingFileHandler(
             f"{LOG_DIR}/performance.log", maxBytes=5_000_000, backupCount=5
         )
         perf_handler.setFormatter(formatter)
-        perf_logger = logging.getLogger("performance")
-        perf_logger.addHandler(perf_handler)
-        perf_logger.setLevel(logging.INFO)
+        perf_handler.addFilter(logging.Filter("performance"))
+        logging.getLogger("performance").setLevel(logging.INFO)
 
         # Access logs (separate from uvicorn)
-        access_handler = TimedRotatingFileHandler(
+        access_handler = BatchedTimedRotatingFileHandler(
             f"{LOG_DIR}/access.log", when="midnight", interval=1, backupCount=30
         )
         access_handler.setFormatter(formatter)
-        access_logger = logging.getLogger("access")
-        access_logger.addHandler(access_handler)
-        access_logger.setLevel(logging.INFO)
+        access_handler.addFilter(logging.Filter("access"))
+        logging.getLogger("access").setLevel(logging.INFO)
+
+        return [app_handler, error_handler, security_handler, perf_handler, access_handler]
+
+    def _start_queue(self):
+        """Route records through a bounded queue to a background listener"""
+        self.queue_handler = BoundedQueueHandler(
+            queue.Queue(maxsize=LOG_QUEUE_MAX_SIZE),
+            full_policy=LOG_QUEUE_FULL_POLICY,
+            block_timeout=LOG_QUEUE_BLOCK_TIMEOUT,
+        )
+        # Sample before enqueueing so dropped records cost nothing downstream
+        self.queue_handler.addFilter(self.sampler)
+        for handler in self.handlers:
+            handler.defer_flush = True
+
+        self.listener = BatchingQueueListener(
+            self.queue_handler.queue, *self.handlers, batch_size=LOG_QUEUE_BATCH_SIZE
+        )
+        self.listener.start()
+        logging.getLogger().addHandler(self.queue_handler)
+
+    def _attach_handlers(self):
+        """Write records synchronously from the logging thread"""
+        root_logger = logging.getLogger()
+        for handler in self.handlers:
+            handler.defer_flush = False
+            handler.addFilter(self.sampler)
+            root_logger.addHandler(handler)
+
+    def shutdown(self):
+        """
+        Drain the queue, flush every handler and switch to synchronous
+        writes so records logged after shutdown are not lost. Safe to call
+        more than once.
+        """
+        listener, self.listener = self.listener, None
+        if listener is None:
+            return
+        logging.getLogger().removeHandler(self.queue_handler)
+        listener.stop()
+        self._attach_handlers()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {
+            "queued": self.listener is not None,
+            "sampled_out": self.sampler.sampled_out,
+        }
+        if self.queue_handler is not None:
+            stats.update(
+                {
+                    "queue_size": self.queue_handler.queue.qsize(),
+                    "queue_max_size": self.queue_handler.queue.maxsize,
+                    "full_policy": self.queue_handler.full_policy,
+                    "enqueued": self.queue_handler.enqueued,
+                    "dropped": self.queue_handler.dropped,
+                }
+            )
+        return stats
 
     def _configure_third_party_loggers(self):
         """Configure third-party library loggers"""
@@ -183,6 +423,14 @@ class ApplicationLogger:
 app_logger = ApplicationLogger()
 
 
+def shutdown_logging() -> None:
+    """Flush queued records to their handlers (application shutdown)"""
+    app_logger.shutdown()
+
+
+atexit.register(shutdown_logging)
+
+
 def get_logger(name: str = None) -> logging.Logger:
     """
     Get a logger instance. Use __name__ as the name parameter.
@@ -438,6 +686,7 @@ def log_api_access(
     response_time: float,
     user_id: Optional[str] = None,
     ip_address: Optional[str] = None,
+    additional_fields: Optional[Dict[str, Any]] = None,
 ):
     """Log API access"""
     access_logger = logging.getLogger("access")
@@ -453,6 +702,9 @@ def log_api_access(
     if user_id:
         log_data["user_id"] = user_id
 
+    if additional_fields:
+        log_data.update(additional_fields)
+
     access_logger.info(
         f"{method} {path} - {status_code}", extra={"extra_fields": log_data}
     )
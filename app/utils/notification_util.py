@@ -1,17 +1,43 @@
-import asyncio
 import logging
 from datetime import datetime, timezone
-from typing import List
+from typing import Any, Dict, List
 from uuid import UUID
+from sqlalchemy import insert, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from app.models.health_facility_model import Facility
 from app.models.notification_model import Notification
 from app.models.user_model import User
-from app.services.notification_sse import ConnectionManager
+from app.services.notification_dispatcher import notification_dispatcher
+from app.services.notification_sse import manager
 
 logger = logging.getLogger(__name__)
 
 
+async def push_to_users(user_ids: List[str], payload: Dict[str, Any]) -> None:
+    """
+    Hand an SSE push to the background dispatcher, publishing inline only
+    when the dispatcher is not running (tests, serverless) or is full.
+    """
+    if not notification_dispatcher.submit(user_ids, payload):
+        await manager.send_to_users(user_ids, payload)
+
+
+def facility_recipients_query(facility_ids: List[UUID]):
+    """
+    Active users of the facilities: staff (work_facility_id) and facility
+    managers (Facility.facility_manager_id), deduplicated, in one query.
+    """
+    managers = select(Facility.facility_manager_id).where(
+        Facility.id.in_(facility_ids),
+        Facility.facility_manager_id.is_not(None),
+    )
+    return select(User.id).where(
+        User.is_active == True,
+        or_(User.work_facility_id.in_(facility_ids), User.id.in_(managers)),
+    )
+
+
 async def notify(db, user_id: UUID, title: str, message: str) -> None:
     """
     Create a notification in DB and push it over SSE.
@@ -30,9 +56,8 @@ async def notify(db, user_id: UUID, title: str, message: str) -> None:
 
         # Commit to DB
         await db.commit()
-        manager = ConnectionManager()
-        # Non-blocking SSE push
-        asyncio.create_task(manager.send_personal_message(str(user_id), payload))
+        # SSE push happens off the request path
+        await push_to_users([str(user_id)], payload)
 
     except Exception as e:
         await db.rollback()
@@ -65,62 +90,34 @@ async def notify_facility(
         extra_data: Optional additional data to include in SSE payload (e.g., request_id, type)
     """
     try:
-        # Import Facility model for manager lookup
-        from app.models.health_facility_model import Facility
-
-        # Query ALL active users in the target facilities via TWO relationships:
-        # 1. Staff users: work_facility_id matches facility
-        # 2. Administrators: User.id matches Facility.facility_manager_id
-
-        # Get staff users (work_facility_id relationship)
-        staff_result = await db.execute(
-            select(User.id, User.email, User.first_name, User.last_name).where(
-                User.work_facility_id.in_(facility_ids),
-                User.is_active == True,
-            )
+        # Resolve every recipient (staff and facility managers) in one query
+        user_ids = (
+            (await db.execute(facility_recipients_query(facility_ids))).scalars().all()
         )
-        staff_users = staff_result.all()
-
-        # Get facility administrators (facility_manager_id relationship)
-        admin_result = await db.execute(
-            select(User.id, User.email, User.first_name, User.last_name)
-            .select_from(Facility)
-            .join(User, Facility.facility_manager_id == User.id)
-            .where(
-                Facility.id.in_(facility_ids),
-                User.is_active == True,
-            )
-        )
-        admin_users = admin_result.all()
-
-        # Combine both lists and remove duplicates (in case someone is both staff and admin)
-        all_users = list(
-            {user.id: user for user in (staff_users + admin_users)}.values()
-        )
-        facility_users = all_users
 
-        if not facility_users:
+        if not user_ids:
             logger.warning(
                 f"No active users found in facilities: {[str(fid)[:8] + '...' for fid in facility_ids]}"
             )
             return
 
-        # Create notification records in DB for all users
+        # Create notification records in DB for all users with one bulk insert.
         # These persist even if users are offline and can be viewed later
-        notifications = []
-        for user in facility_users:
-            notification = Notification(user_id=user.id, title=title, message=message)
-            notifications.append(notification)
-
-        db.add_all(notifications)
+        now = datetime.now(timezone.utc)
+        await db.execute(
+            insert(Notification),
+            [
+                {"user_id": user_id, "title": title, "message": message, "created_at": now}
+                for user_id in user_ids
+            ],
+        )
         await db.commit()
 
         # Prepare SSE payload with all data
-        timestamp = datetime.now(timezone.utc).isoformat()
         payload = {
             "title": title,
             "message": message,
-            "timestamp": timestamp,
+            "timestamp": now.isoformat(),
             "facility_wide": True,  # Flag to indicate this is a facility-wide notification
         }
 
@@ -128,27 +125,11 @@ async def notify_facility(
         if extra_data:
             payload.update(extra_data)
 
-        # Get SSE manager ONCE (reuse connection manager)
-        manager = ConnectionManager()
-
-        # Send to all facility users INSTANTLY using concurrent delivery
-        # This ensures INSTANT notification delivery to all connected users
-        user_ids = [str(user.id) for user in facility_users]
-
-        # Send all notifications concurrently for INSTANT delivery
-        send_tasks = [
-            manager.send_personal_message(user_id, payload) for user_id in user_ids
-        ]
-
-        # Wait for all to be sent (ensures instant delivery, not fire-and-forget)
-        results = await asyncio.gather(*send_tasks, return_exceptions=True)
-
-        # Count successful deliveries
-        success_count = sum(1 for r in results if r is True)
+        # One push for all recipients, published in the background
+        await push_to_users([str(user_id) for user_id in user_ids], payload)
 
         logger.info(
-            f"Facility-wide notification sent INSTANTLY to {success_count}/{len(facility_users)} users "
-            f"({len(staff_users)} staff + {len(admin_users)} admins) "
+            f"Facility-wide notification queued for {len(user_ids)} users "
             f"in {len(facility_ids)} facility(ies): '{title}' - {message[:50]}..."
         )
 
@@ -1,8 +1,14 @@
 # Create pagination dependency
-from typing import Annotated, Generic, List, Optional, TypeVar
+import base64
+import json
+from datetime import date, datetime
+from typing import Annotated, Any, Generic, List, Optional, TypeVar
+from uuid import UUID
 
-from fastapi import Query
+from fastapi import HTTPException, Query, status
 from pydantic import BaseModel, ConfigDict, Field, field_validator
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.base_schema import SortOrder
 
@@ -14,6 +20,12 @@ class PaginationParams(BaseModel):
     )
     sort_by: Optional[str] = Field(default=None, description="Field to sort by")
     sort_order: SortOrder = Field(default=SortOrder.DESC, description="Sort order")
+    cursor: Optional[str] = Field(
+        default=None, description="Opaque cursor from a previous page's next_cursor"
+    )
+    include_total: bool = Field(
+        default=True, description="Compute total_items/total_pages"
+    )
 
     @field_validator("sort_by")
     @classmethod
@@ -41,12 +53,15 @@ class PaginatedResponse(BaseModel, Generic[T]):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     items: List[T]
-    total_items: int
-    total_pages: int
+    # None when the client opted out of totals (include_total=false)
+    total_items: Optional[int]
+    total_pages: Optional[int]
     current_page: int
     page_size: int
     has_next: bool
     has_prev: bool
+    # Pass back as `cursor` to fetch the next page by keyset instead of OFFSET
+    next_cursor: Optional[str] = None
 
 
 def get_pagination_params(
@@ -58,7 +73,147 @@ def get_pagination_params(
     sort_order: Annotated[
         str, Query(pattern="^(asc|desc)$", description="Sort order")
     ] = "desc",
+    cursor: Annotated[
+        Optional[str],
+        Query(description="Cursor from next_cursor; takes precedence over page"),
+    ] = None,
+    include_total: Annotated[
+        bool, Query(description="Compute total_items/total_pages (slower)")
+    ] = True,
 ) -> PaginationParams:
     return PaginationParams(
-        page=page, page_size=page_size, sort_by=sort_by, sort_order=sort_order
+        page=page,
+        page_size=page_size,
+        sort_by=sort_by,
+        sort_order=sort_order,
+        cursor=cursor,
+        include_total=include_total,
+    )
+
+
+# Keyset (cursor) pagination
+#
+# OFFSET pagination makes the database walk and discard every skipped row, so
+# deep pages get linearly slower. A cursor encodes the sort key and id of the
+# last row returned; the next page is read with `(sort_key, id) < cursor`,
+# which an index on (sort_key, id) answers directly at any depth.
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode keyset values (sort key, id) as an opaque URL-safe token"""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: List[Any]) -> List[Any]:
+    """Decode a cursor back into values typed for the given columns"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor does not match sort columns")
+        return [_decode_value(v, column) for v, column in zip(values, columns)]
+    except (ValueError, TypeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        ) from e
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    return value
+
+
+def _decode_value(value: Any, column: Any) -> Any:
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is UUID:
+        return UUID(value)
+    return python_type(value)
+
+
+async def paginate_query(
+    db: AsyncSession,
+    query,
+    pagination: PaginationParams,
+    sort_column,
+    id_column,
+    count_query=None,
+    scalars: bool = True,
+) -> PaginatedResponse:
+    """
+    Paginate a select() of ORM entities by (sort_column, id_column).
+
+    With `pagination.cursor` the page is read by keyset; otherwise the classic
+    page/page_size OFFSET contract applies. Either way `next_cursor` is
+    returned so clients can switch to cursor paging after the first page.
+    Totals cost an extra count(*) and are skipped when include_total is False.
+    sort_column must be non-nullable for keyset comparisons to be exact.
+    With scalars=False the items are rows (e.g. of an aggregate subquery)
+    and the sort/id values are read from their labelled columns. A tuple of
+    sort columns ranks by each in turn, all in the same direction.
+    """
+    descending = pagination.sort_order == SortOrder.DESC
+    page_size = pagination.page_size
+    sort_columns = (
+        list(sort_column) if isinstance(sort_column, (list, tuple)) else [sort_column]
+    )
+    keyset_columns = [*sort_columns, id_column]
+
+    total_items = None
+    if pagination.include_total:
+        if count_query is None:
+            count_query = select(func.count()).select_from(
+                query.order_by(None).subquery()
+            )
+        total_items = (await db.execute(count_query)).scalar() or 0
+
+    if descending:
+        query = query.order_by(*(column.desc() for column in keyset_columns))
+    else:
+        query = query.order_by(*(column.asc() for column in keyset_columns))
+
+    if pagination.cursor:
+        last_values = decode_cursor(pagination.cursor, keyset_columns)
+        keyset = tuple_(*keyset_columns)
+        boundary = tuple_(*last_values)
+        query = query.where(keyset < boundary if descending else keyset > boundary)
+    else:
+        query = query.offset((pagination.page - 1) * page_size)
+
+    # One extra row tells us whether another page exists without counting
+    result = await db.execute(query.limit(page_size + 1))
+    items = list((result.scalars() if scalars else result).unique().all())
+    has_next = len(items) > page_size
+    items = items[:page_size]
+
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        next_cursor = encode_cursor(
+            [getattr(last, column.key) for column in keyset_columns]
+        )
+
+    total_pages = None
+    if total_items is not None:
+        total_pages = (total_items + page_size - 1) // page_size
+
+    return PaginatedResponse(
+        items=items,
+        total_items=total_items,
+        total_pages=total_pages,
+        current_page=pagination.page,
+        page_size=page_size,
+        has_next=has_next,
+        has_prev=bool(pagination.cursor) or pagination.page > 1,
+        next_cursor=next_cursor,
     )
@@ -0,0 +1,234 @@
+"""
+Bounded worker pool for Argon2 password hashing.
+
+Argon2 with `time_cost=3, memory_cost=64MiB` takes tens of milliseconds of
+CPU per call. Running it inline in an async handler blocks the event loop, so
+a burst of logins stalls every other request and SSE stream. Hash, verify and
+rehash calls are instead submitted to a small thread or process pool. Once the
+pool and its queue are full new calls are rejected with 429 so login storms
+degrade gracefully instead of piling up.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from argon2 import PasswordHasher
+from argon2.exceptions import HashingError, VerificationError, VerifyMismatchError
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.utils.logging_config import get_logger, log_performance_metric
+
+logger = get_logger(__name__)
+
+# Argon2 password hashing configuration
+ph = PasswordHasher(
+    time_cost=3, memory_cost=65536, parallelism=1, hash_len=32, salt_len=16
+)
+
+
+class PasswordPoolSaturated(Exception):
+    """Raised when the hashing pool and its queue are full"""
+
+
+# Worker functions. They are module level so a process pool can pickle them
+# and return (result, seconds spent hashing) so queue wait can be derived.
+
+
+def _timed_hash(password: str) -> Tuple[str, float]:
+    start_time = time.perf_counter()
+    hashed = ph.hash(password)
+    return hashed, time.perf_counter() - start_time
+
+
+def _timed_verify(hashed_password: str, plain_password: str) -> Tuple[bool, float]:
+    start_time = time.perf_counter()
+    try:
+        ph.verify(hashed_password, plain_password)
+        return True, time.perf_counter() - start_time
+    except VerifyMismatchError:
+        return False, time.perf_counter() - start_time
+
+
+class PasswordHashPool:
+    """Runs Argon2 work off the event loop with a queue-depth limit"""
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_queue: int = 32,
+        executor_type: str = "thread",
+    ):
+        if executor_type not in ("thread", "process"):
+            raise ValueError(f"Unsupported password hash executor: {executor_type}")
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.executor_type = executor_type
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats = {
+            "completed": 0,
+            "rejected": 0,
+            "errors": 0,
+            "queue_wait_total": 0.0,
+            "queue_wait_max": 0.0,
+            "hash_time_total": 0.0,
+            "hash_time_max": 0.0,
+        }
+
+    @property
+    def capacity(self) -> int:
+        """Calls allowed at once: running on a worker plus waiting in queue"""
+        return self.max_workers + self.max_queue
+
+    async def hash(self, password: str) -> str:
+        """Hash a plaintext password on the pool"""
+        return await self._run("password_hash", _timed_hash, password)
+
+    async def verify(self, hashed_password: str, plain_password: str) -> bool:
+        """Verify a plaintext password against a hash on the pool"""
+        return await self._run(
+            "password_verify", _timed_verify, hashed_password, plain_password
+        )
+
+    def shutdown(self) -> None:
+        """Release the worker pool (recreated lazily on next use)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            in_flight = self._in_flight
+
+        completed = stats["completed"] or 1
+        return {
+            "executor": self.executor_type,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": in_flight,
+            "queued": max(0, in_flight - self.max_workers),
+            "completed": stats["completed"],
+            "rejected": stats["rejected"],
+            "errors": stats["errors"],
+            "avg_queue_wait_ms": round(stats["queue_wait_total"] / completed * 1000, 3),
+            "max_queue_wait_ms": round(stats["queue_wait_max"] * 1000, 3),
+            "avg_hash_time_ms": round(stats["hash_time_total"] / completed * 1000, 3),
+            "max_hash_time_ms": round(stats["hash_time_max"] * 1000, 3),
+        }
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="argon2"
+                )
+        return self._executor
+
+    def _acquire(self, operation: str) -> Executor:
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._stats["rejected"] += 1
+                rejected = True
+            else:
+                self._in_flight += 1
+                rejected = False
+                executor = self._get_executor()
+
+        if rejected:
+            logger.warning(
+                "Password hashing pool saturated",
+                extra={
+                    "event_type": "password_pool_saturated",
+                    "operation": operation,
+                    "capacity": self.capacity,
+                },
+            )
+            raise PasswordPoolSaturated(operation)
+        return executor
+
+    async def _run(self, operation: str, func: Callable, *args) -> Any:
+        executor = self._acquire(operation)
+        start_time = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, hash_time = await loop.run_in_executor(executor, func, *args)
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        total_time = time.perf_counter() - start_time
+        queue_wait = max(0.0, total_time - hash_time)
+        with self._lock:
+            self._stats["completed"] += 1
+            self._stats["queue_wait_total"] += queue_wait
+            self._stats["queue_wait_max"] = max(self._stats["queue_wait_max"], queue_wait)
+            self._stats["hash_time_total"] += hash_time
+            self._stats["hash_time_max"] = max(self._stats["hash_time_max"], hash_time)
+
+        log_performance_metric(
+            operation,
+            total_time,
+            {
+                "queue_wait_ms": round(queue_wait * 1000, 3),
+                "hash_time_ms": round(hash_time * 1000, 3),
+            },
+        )
+        return result
+
+
+# Global pool instance
+password_pool = PasswordHashPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+    executor_type=settings.PASSWORD_HASH_EXECUTOR,
+)
+
+
+def _too_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Authentication service is busy. Please retry shortly.",
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a plaintext password using Argon2 without blocking the event loop"""
+    try:
+        return await password_pool.hash(password)
+    except PasswordPoolSaturated:
+        raise _too_busy()
+    except HashingError as e:
+        logger.error(
+            "Password hashing failed",
+            extra={"event_type": "password_hashing_failed", "error": str(e)},
+        )
+        raise HTTPException(status_code=500, detail="Password hashing failed") from e
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against an Argon2 hash without blocking the event loop"""
+    try:
+        return await password_pool.verify(hashed_password, plain_password)
+    except PasswordPoolSaturated:
+        raise _too_busy()
+    except VerificationError as e:
+        logger.error(
+            "Password verification error",
+            extra={"event_type": "password_verification_error", "error": str(e)},
+        )
+        return False
@@ -8,6 +8,7 @@ from app.utils.security import (
 )
 from app.dependencies import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.utils.auth_context import get_auth_context
 from app.utils.logging_config import get_logger, log_security_event
 
 logger = get_logger(__name__)
@@ -272,6 +273,9 @@ async def validate_user_session(
     """
     Validate user session for high-security operations.
 
+    When get_current_user already validated the session for this request the
+    recorded auth context is reused, so no second decode or lookup happens.
+
     Args:
         db: Database session
         current_user: Current authenticated user
@@ -281,6 +285,31 @@ async def validate_user_session(
         bool: True if session is valid, False otherwise
     """
     try:
+        # Reuse the outcome of get_current_user for this request if recorded
+        auth_context = get_auth_context(request)
+        if auth_context is not None and auth_context.user_id == current_user.id:
+            if auth_context.session_id is None:
+                logger.warning(
+                    "Session validation failed - token has no session",
+                    extra={
+                        "event_type": "session_validation_failed",
+                        "user_id": str(current_user.id),
+                        "reason": "missing_session_id",
+                    },
+                )
+                return False
+
+            if auth_context.session_validated:
+                logger.debug(
+                    "Session validation reused from request context",
+                    extra={
+                        "event_type": "session_validation_success",
+                        "user_id": str(current_user.id),
+                        "from_cache": auth_context.from_cache,
+                    },
+                )
+                return True
+
         # Extract session information from request
 
         authorization_header = request.headers.get("authorization")
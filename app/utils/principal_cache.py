@@ -0,0 +1,650 @@
+"""
+Principal cache for the authentication hot path.
+
+`get_current_user` resolves the same user, role/permission graph, facility
+chain and session on every authenticated request. This module keeps an
+immutable snapshot of that graph per (user id, session id) so repeat requests
+are served without touching the database until the entry expires or a
+user/role/session/facility mutation invalidates it.
+
+Entries live in an in-process LRU (L1). An optional `PrincipalCacheBackend`
+(L2) shares them between workers; L1 entries then live at most
+`local_ttl_seconds`, and invalidations delete the shared copies as well, so
+other workers converge within that window instead of the full TTL.
+"""
+
+import asyncio
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.blood_bank_model import BloodBank
+from app.models.health_facility_model import Facility
+from app.models.rbac_model import Permission, Role
+from app.models.user_model import User, UserSession
+from app.utils.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+PrincipalKey = Tuple[UUID, Optional[UUID]]
+FieldSnapshot = Tuple[Tuple[str, Any], ...]
+
+# Session columns whose change must drop a cached principal immediately
+SESSION_SECURITY_FIELDS = (
+    "is_active",
+    "is_suspicious",
+    "expires_at",
+    "terminated_at",
+    "ip_address",
+)
+
+
+def _snapshot_fields(obj) -> FieldSnapshot:
+    """Copy the loaded column values of an ORM instance without lazy loading"""
+    state = inspect(obj)
+    loaded = state.dict
+    return tuple(
+        (attr.key, loaded[attr.key])
+        for attr in state.mapper.column_attrs
+        if attr.key in loaded
+    )
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and getattr(value, "tzinfo", None) is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+@dataclass(frozen=True)
+class FacilitySnapshot:
+    """Immutable copy of a facility row and its blood bank"""
+
+    fields: FieldSnapshot
+    blood_bank: Optional[FieldSnapshot] = None
+
+    @classmethod
+    def from_facility(cls, facility: Optional[Facility]) -> Optional["FacilitySnapshot"]:
+        if facility is None:
+            return None
+        blood_bank = inspect(facility).dict.get("blood_bank")
+        return cls(
+            fields=_snapshot_fields(facility),
+            blood_bank=_snapshot_fields(blood_bank) if blood_bank else None,
+        )
+
+    @property
+    def id(self) -> Optional[UUID]:
+        return dict(self.fields).get("id")
+
+    @property
+    def blood_bank_id(self) -> Optional[UUID]:
+        return dict(self.blood_bank).get("id") if self.blood_bank else None
+
+    def to_facility(self) -> Facility:
+        facility = Facility(**dict(self.fields))
+        if self.blood_bank:
+            facility.blood_bank = BloodBank(**dict(self.blood_bank))
+        return facility
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Immutable snapshot of an authenticated user and the session it uses"""
+
+    user_id: UUID
+    session_id: Optional[UUID]
+    email: str
+    is_active: bool
+    status: bool
+    locked_until: Optional[datetime]
+    role_names: FrozenSet[str]
+    permission_names: FrozenSet[str]
+    facility_id: Optional[UUID]
+    work_facility_id: Optional[UUID]
+    blood_bank_id: Optional[UUID]
+    session_ip: Optional[str]
+    session_expires_at: Optional[datetime]
+    user_fields: FieldSnapshot
+    roles: Tuple[Tuple[FieldSnapshot, Tuple[FieldSnapshot, ...]], ...]
+    facility: Optional[FacilitySnapshot]
+    work_facility: Optional[FacilitySnapshot]
+    expires_at: float
+
+    @property
+    def key(self) -> PrincipalKey:
+        return (self.user_id, self.session_id)
+
+    @property
+    def is_locked(self) -> bool:
+        if self.locked_until is None:
+            return False
+        return datetime.now(timezone.utc) < self.locked_until
+
+    @property
+    def session_expired(self) -> bool:
+        if self.session_id is None:
+            return False
+        if self.session_expires_at is None:
+            return True
+        return datetime.now(timezone.utc) > self.session_expires_at
+
+    def has_permission(self, perm_name: str) -> bool:
+        return perm_name in self.permission_names
+
+    def has_role(self, role_name: str) -> bool:
+        return role_name in self.role_names
+
+    @classmethod
+    def from_user(
+        cls,
+        user: User,
+        session: Optional[UserSession] = None,
+        ttl_seconds: Optional[int] = None,
+    ) -> "Principal":
+        """Build a snapshot from a user loaded with roles and facility chains"""
+        ttl = ttl_seconds if ttl_seconds is not None else settings.PRINCIPAL_CACHE_TTL_SECONDS
+        facility = FacilitySnapshot.from_facility(user.facility)
+        work_facility = FacilitySnapshot.from_facility(user.work_facility)
+
+        roles = tuple(
+            (
+                _snapshot_fields(role),
+                tuple(_snapshot_fields(perm) for perm in role.permissions),
+            )
+            for role in user.roles
+        )
+
+        return cls(
+            user_id=user.id,
+            session_id=session.id if session is not None else None,
+            email=user.email,
+            is_active=bool(user.is_active),
+            status=bool(user.status),
+            locked_until=_as_utc(user.locked_until),
+            role_names=frozenset(role.name for role in user.roles),
+            permission_names=frozenset(
+                perm.name for role in user.roles for perm in role.permissions
+            ),
+            facility_id=facility.id if facility else None,
+            work_facility_id=user.work_facility_id,
+            blood_bank_id=(
+                (facility.blood_bank_id if facility else None)
+                or (work_facility.blood_bank_id if work_facility else None)
+            ),
+            session_ip=session.ip_address if session is not None else None,
+            session_expires_at=(
+                _as_utc(session.expires_at) if session is not None else None
+            ),
+            user_fields=_snapshot_fields(user),
+            roles=roles,
+            facility=facility,
+            work_facility=work_facility,
+            expires_at=time.monotonic() + ttl,
+        )
+
+    def to_user(self) -> User:
+        """
+        Hydrate a fresh, session-less User graph from the snapshot.
+
+        A new object graph is built per call so request handlers never share
+        mutable state; the objects are transient and never added to a session.
+        """
+        user = User(**dict(self.user_fields))
+        user.roles = [
+            Role(
+                **dict(role_fields),
+                permissions=[Permission(**dict(p)) for p in permission_fields],
+            )
+            for role_fields, permission_fields in self.roles
+        ]
+        if self.facility:
+            user.facility = self.facility.to_facility()
+        if self.work_facility:
+            user.work_facility = self.work_facility.to_facility()
+        return user
+
+
+class PrincipalCacheBackend(ABC):
+    """
+    Shared (L2) store for pickled principals.
+
+    Payloads are pickles, so the store must be private to the deployment.
+    """
+
+    name = "abstract"
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Return the payload stored under `key`, or None if missing/expired."""
+
+    @abstractmethod
+    async def set(
+        self, key: str, payload: bytes, ttl: int, groups: Iterable[str] = ()
+    ) -> None:
+        """Store `payload` for `ttl` seconds, indexed under each group."""
+
+    @abstractmethod
+    async def delete_group(self, group: str) -> int:
+        """Delete every key indexed under `group`; returns keys removed."""
+
+
+class InMemoryPrincipalCacheBackend(PrincipalCacheBackend):
+    """
+    Process-local reference backend.
+
+    Shares principals between `PrincipalCache` instances in one process (e.g.
+    in tests); a multi-worker deployment plugs in a networked store instead.
+    """
+
+    name = "memory"
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._entries: Dict[str, Tuple[bytes, float, Tuple[str, ...]]] = {}
+        self._groups: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        payload, expires_at, _ = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            return None
+        return payload
+
+    async def set(
+        self, key: str, payload: bytes, ttl: int, groups: Iterable[str] = ()
+    ) -> None:
+        self._remove(key)
+        groups = tuple(groups)
+        self._entries[key] = (payload, self._clock() + ttl, groups)
+        for group in groups:
+            self._groups.setdefault(group, set()).add(key)
+
+    async def delete_group(self, group: str) -> int:
+        keys = self._groups.pop(group, set())
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for group in entry[2]:
+            keys = self._groups.get(group)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._groups[group]
+
+
+# Every shared entry is indexed under this group so clear() reaches L2 too
+ALL_PRINCIPALS = "principals"
+
+
+def _principal_key(key: PrincipalKey) -> str:
+    return f"principal:{key[0]}:{key[1]}"
+
+
+def _principal_groups(principal: "Principal") -> Tuple[str, ...]:
+    groups = [ALL_PRINCIPALS, f"user:{principal.user_id}"]
+    if principal.session_id is not None:
+        groups.append(f"session:{principal.session_id}")
+    groups += [f"role:{name}" for name in principal.role_names]
+    groups += [
+        f"facility:{facility_id}"
+        for facility_id in {principal.facility_id, principal.work_facility_id}
+        if facility_id is not None
+    ]
+    return tuple(groups)
+
+
+class PrincipalCache:
+    """
+    Bounded LRU of principals with TTL expiry and targeted invalidation.
+
+    Secondary indexes by user, session, role and facility keep every
+    invalidation proportional to the number of affected entries. `lookup` and
+    `store` add the optional shared tier; `get` and `put` are L1 only.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = 60,
+        max_entries: int = 10000,
+        backend: Optional[PrincipalCacheBackend] = None,
+        local_ttl_seconds: int = 10,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.backend = backend
+        self.local_ttl_seconds = local_ttl_seconds
+        self._entries: "OrderedDict[PrincipalKey, Principal]" = OrderedDict()
+        self._by_user: Dict[UUID, Set[PrincipalKey]] = {}
+        self._by_session: Dict[UUID, PrincipalKey] = {}
+        self._by_role: Dict[str, Set[PrincipalKey]] = {}
+        self._by_facility: Dict[UUID, Set[PrincipalKey]] = {}
+        # Flush events may fire from the greenlet worker thread
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; see store()
+        self._generation = 0
+        self._backend_tasks: Set[asyncio.Task] = set()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "stale_loads": 0,
+            "l2_hits": 0,
+            "l2_misses": 0,
+            "l2_errors": 0,
+        }
+
+    @property
+    def generation(self) -> int:
+        """Capture before loading a principal and pass it to store()"""
+        return self._generation
+
+    def get(self, user_id: UUID, session_id: Optional[UUID]) -> Optional[Principal]:
+        key = (user_id, session_id)
+        with self._lock:
+            principal = self._entries.get(key)
+            if principal is None:
+                self._stats["misses"] += 1
+                return None
+
+            if principal.expires_at <= time.monotonic() or principal.session_expired:
+                self._discard(key)
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return principal
+
+    async def lookup(
+        self, user_id: UUID, session_id: Optional[UUID]
+    ) -> Optional[Principal]:
+        """Return a cached principal from L1, falling back to the shared tier"""
+        principal = self.get(user_id, session_id)
+        if principal is not None or self.backend is None:
+            return principal
+
+        try:
+            payload = await self.backend.get(_principal_key((user_id, session_id)))
+        except Exception as e:
+            self._backend_failed("get", e)
+            return None
+        if payload is None:
+            self._stats["l2_misses"] += 1
+            return None
+
+        self._stats["l2_hits"] += 1
+        principal = pickle.loads(payload)
+        if principal.session_expired:
+            return None
+        # The monotonic deadline is per process; restart it for this worker
+        principal = replace(
+            principal, expires_at=time.monotonic() + self.local_ttl_seconds
+        )
+        self.put(principal)
+        return principal
+
+    async def store(self, principal: Principal, generation: Optional[int] = None) -> None:
+        """
+        Cache a freshly loaded principal in L1 and the shared tier.
+
+        Pass the `generation` read before the load: if an invalidation ran in
+        the meantime the principal may predate it, so it is not cached.
+        """
+        if generation is not None and generation != self._generation:
+            self._stats["stale_loads"] += 1
+            return
+        self.put(principal)
+        if self.backend is None:
+            return
+
+        ttl = self.ttl_seconds
+        if principal.session_expires_at is not None:
+            remaining = principal.session_expires_at - datetime.now(timezone.utc)
+            ttl = min(ttl, int(remaining.total_seconds()))
+        if ttl <= 0:
+            return
+        try:
+            await self.backend.set(
+                _principal_key(principal.key),
+                pickle.dumps(principal),
+                ttl,
+                _principal_groups(principal),
+            )
+        except Exception as e:
+            self._backend_failed("set", e)
+
+    def put(self, principal: Principal) -> None:
+        if self.backend is not None:
+            local_deadline = time.monotonic() + self.local_ttl_seconds
+            if principal.expires_at > local_deadline:
+                principal = replace(principal, expires_at=local_deadline)
+        key = principal.key
+        with self._lock:
+            self._discard(key)
+            while len(self._entries) >= self.max_entries:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self._stats["evictions"] += 1
+
+            self._entries[key] = principal
+            self._by_user.setdefault(principal.user_id, set()).add(key)
+            if principal.session_id is not None:
+                self._by_session[principal.session_id] = key
+            for role_name in principal.role_names:
+                self._by_role.setdefault(role_name, set()).add(key)
+            for facility_id in {principal.facility_id, principal.work_facility_id}:
+                if facility_id is not None:
+                    self._by_facility.setdefault(facility_id, set()).add(key)
+
+    def discard(self, user_id: UUID, session_id: Optional[UUID]) -> None:
+        with self._lock:
+            self._discard((user_id, session_id))
+
+    def invalidate_user(self, user_id: UUID) -> int:
+        """Drop every principal of a user, whatever session it was cached for"""
+        with self._lock:
+            removed = self._invalidate(self._by_user.get(user_id, ()))
+        self._delete_shared(f"user:{user_id}")
+        return removed
+
+    def invalidate_session(self, session_id: UUID) -> int:
+        with self._lock:
+            key = self._by_session.get(session_id)
+            removed = self._invalidate((key,) if key else ())
+        self._delete_shared(f"session:{session_id}")
+        return removed
+
+    def invalidate_role(self, role_name: str) -> int:
+        with self._lock:
+            removed = self._invalidate(self._by_role.get(role_name, ()))
+        self._delete_shared(f"role:{role_name}")
+        return removed
+
+    def invalidate_facility(self, facility_id: UUID) -> int:
+        with self._lock:
+            removed = self._invalidate(self._by_facility.get(facility_id, ()))
+        self._delete_shared(f"facility:{facility_id}")
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._by_user.clear()
+            self._by_session.clear()
+            self._by_role.clear()
+            self._by_facility.clear()
+        self._delete_shared(ALL_PRINCIPALS)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "backend": self.backend.name if self.backend else None,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+    def _invalidate(self, keys) -> int:
+        """Drop the given keys (called with lock held)"""
+        # Loads in flight may predate this change even if nothing was cached
+        self._generation += 1
+        keys = list(keys)
+        for key in keys:
+            self._discard(key)
+        self._stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def _delete_shared(self, group: str) -> None:
+        """Delete the shared copies in the background (invalidations are sync)"""
+        if self.backend is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Synchronous session outside the event loop; L2 expires by TTL
+            return
+
+        async def delete():
+            try:
+                await self.backend.delete_group(group)
+            except Exception as e:
+                self._backend_failed("delete_group", e)
+
+        task = loop.create_task(delete())
+        self._backend_tasks.add(task)
+        task.add_done_callback(self._backend_tasks.discard)
+
+    def _backend_failed(self, operation: str, error: Exception) -> None:
+        # The shared tier is an optimization: degrade to L1 + database
+        self._stats["l2_errors"] += 1
+        logger.warning(
+            "Principal cache backend operation failed",
+            extra={
+                "event_type": "principal_cache_backend_error",
+                "operation": operation,
+                "error": str(error),
+            },
+        )
+
+    def _discard(self, key: PrincipalKey) -> None:
+        """Remove an entry and its index references (called with lock held)"""
+        principal = self._entries.pop(key, None)
+        if principal is None:
+            return
+
+        self._remove_from_index(self._by_user, principal.user_id, key)
+        if principal.session_id is not None:
+            self._by_session.pop(principal.session_id, None)
+        for role_name in principal.role_names:
+            self._remove_from_index(self._by_role, role_name, key)
+        for facility_id in {principal.facility_id, principal.work_facility_id}:
+            if facility_id is not None:
+                self._remove_from_index(self._by_facility, facility_id, key)
+
+    @staticmethod
+    def _remove_from_index(index: Dict[Any, Set[PrincipalKey]], name, key) -> None:
+        keys = index.get(name)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[name]
+
+
+# Global principal cache instance
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+)
+
+
+def _session_security_changed(user_session: UserSession) -> bool:
+    attrs = inspect(user_session).attrs
+    return any(attrs[name].history.has_changes() for name in SESSION_SECURITY_FIELDS)
+
+
+# Principal invalidations flushed in the current transaction, held in Session.info
+_PENDING_INVALIDATIONS = "principal_cache.pending_invalidations"
+
+
+@event.listens_for(Session, "after_flush")
+def collect_principal_changes_on_flush(session: Session, flush_context) -> None:
+    """
+    Remember cached principals affected by ORM mutations in this flush.
+
+    Covers user/role/session/facility changes made through the ORM, including
+    the admin panel. They are dropped once the transaction commits, so a
+    concurrent load cannot re-cache the pre-commit rows in between. Core bulk
+    UPDATE statements bypass the unit of work and must call
+    `invalidate_user_on_commit` (or the `principal_cache.invalidate_*` hooks
+    after committing) explicitly.
+    """
+    pending = set()
+    for obj in chain(session.dirty, session.deleted):
+        if isinstance(obj, User):
+            if obj in session.deleted or session.is_modified(obj):
+                pending.add(("user", obj.id))
+        elif isinstance(obj, UserSession):
+            if obj in session.deleted or _session_security_changed(obj):
+                pending.add(("session", obj.id))
+        elif isinstance(obj, Role):
+            # A rename must also reach principals cached under the old name
+            for role_name in {obj.name, *inspect(obj).attrs.name.history.deleted}:
+                pending.add(("role", role_name))
+        elif isinstance(obj, Permission):
+            pending.add(("all", None))
+        elif isinstance(obj, Facility):
+            pending.add(("facility", obj.id))
+        elif isinstance(obj, BloodBank):
+            pending.add(("facility", obj.facility_id))
+    if pending:
+        session.info.setdefault(_PENDING_INVALIDATIONS, set()).update(pending)
+
+
+def invalidate_user_on_commit(session, user_id: UUID) -> None:
+    """Drop a user's cached principals when `session` commits (for bulk updates)"""
+    session.info.setdefault(_PENDING_INVALIDATIONS, set()).add(("user", user_id))
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_principals_on_commit(session: Session) -> None:
+    """Drop cached principals changed by the committed transaction."""
+    pending = session.info.pop(_PENDING_INVALIDATIONS, ())
+    if ("all", None) in pending:
+        principal_cache.clear()
+        return
+    for kind, value in pending:
+        getattr(principal_cache, f"invalidate_{kind}")(value)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_principal_changes_on_rollback(session: Session) -> None:
+    """Rolled back changes never reached the database; keep the cache."""
+    session.info.pop(_PENDING_INVALIDATIONS, None)
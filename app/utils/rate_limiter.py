@@ -0,0 +1,310 @@
+"""
+Sliding-window rate limiting shared by the HTTP middlewares.
+
+RateLimitMiddleware used to rebuild its whole per-IP dict of request
+timestamps on every request, and SecurityMiddleware kept a list of floats per
+IP that was only trimmed when that IP came back. Both now go through one
+RateLimiter that keeps a fixed-size sliding-window counter per (policy,
+client):
+
+    estimate = previous_window_count * (1 - elapsed / window) + current_count
+
+A request costs one O(1) counter update regardless of how many clients are
+tracked, and a counter stops mattering two windows after its last request.
+
+- InMemoryRateLimitStore: per-process counters; idle keys are swept a few at
+  a time on each hit, oldest first.
+- DatabaseRateLimitStore: one atomic upsert per request on the shared
+  `rate_limit_counters` table, so limits hold across workers. Idle rows are
+  removed by the scheduler.
+"""
+
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import case, delete
+
+from app.config import settings
+from app.models.rate_limit_model import RateLimitCounter
+from app.utils.logging_config import get_logger
+from app.utils.upsert import dialect_insert
+
+logger = get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """Requests allowed per window for the paths it covers"""
+
+    name: str
+    limit: int
+    window_seconds: int = 60
+    path_prefixes: Tuple[str, ...] = ()
+
+    def matches(self, path: str) -> bool:
+        return any(path.startswith(prefix) for prefix in self.path_prefixes)
+
+
+@dataclass(frozen=True)
+class RateLimitDecision:
+    allowed: bool
+    policy: RateLimitPolicy
+    requests_in_window: float
+    remaining: int
+    retry_after: int
+
+
+class RateLimitStore(ABC):
+    """Holds the per-key window counters"""
+
+    name = "base"
+
+    @abstractmethod
+    async def hit(self, key: str, window_seconds: int, now: float) -> Tuple[int, int]:
+        """Count one request; returns (current window count, previous window count)"""
+
+    @abstractmethod
+    async def sweep(self, now: float) -> int:
+        """Drop counters that can no longer affect a limit; returns keys removed"""
+
+    def tracked_keys(self) -> Optional[int]:
+        return None
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """
+    Counters for this process only.
+
+    Keys are kept in one OrderedDict per window length, ordered by last hit,
+    so the stalest key is always at the front and sweeping never scans live
+    keys.
+    """
+
+    name = "memory"
+
+    def __init__(self, sweep_batch: int = 8):
+        self.sweep_batch = sweep_batch
+        # window_seconds -> key -> [window_index, current_count, previous_count]
+        self._counters: Dict[int, "OrderedDict[str, List[int]]"] = {}
+
+    async def hit(self, key: str, window_seconds: int, now: float) -> Tuple[int, int]:
+        counters = self._counters.setdefault(window_seconds, OrderedDict())
+        window_index = int(now // window_seconds)
+        self._evict(counters, window_index, self.sweep_batch)
+
+        counter = counters.get(key)
+        if counter is None:
+            counter = counters[key] = [window_index, 0, 0]
+        else:
+            counters.move_to_end(key)
+            if counter[0] != window_index:
+                previous = counter[1] if counter[0] == window_index - 1 else 0
+                counter[:] = [window_index, 0, previous]
+        counter[1] += 1
+        return counter[1], counter[2]
+
+    async def sweep(self, now: float) -> int:
+        return sum(
+            self._evict(counters, int(now // window_seconds))
+            for window_seconds, counters in self._counters.items()
+        )
+
+    def tracked_keys(self) -> Optional[int]:
+        return sum(len(counters) for counters in self._counters.values())
+
+    @staticmethod
+    def _evict(counters, window_index: int, limit: Optional[int] = None) -> int:
+        evicted = 0
+        while counters and (limit is None or evicted < limit):
+            key, counter = next(iter(counters.items()))
+            if counter[0] >= window_index - 1:
+                break
+            del counters[key]
+            evicted += 1
+        return evicted
+
+
+class DatabaseRateLimitStore(RateLimitStore):
+    """Counters in the shared database, updated with one upsert per request"""
+
+    name = "database"
+
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+
+    def _sessions(self):
+        if self._session_factory is None:
+            from app.database import async_session
+
+            self._session_factory = async_session
+        return self._session_factory()
+
+    async def hit(self, key: str, window_seconds: int, now: float) -> Tuple[int, int]:
+        window_index = int(now // window_seconds)
+        counters = RateLimitCounter.__table__
+        c = counters.c
+
+        async with self._sessions() as session:
+            statement = dialect_insert(session.bind.dialect.name, counters).values(
+                key=key,
+                window_index=window_index,
+                current_count=1,
+                previous_count=0,
+                expires_at=(window_index + 2) * window_seconds,
+            )
+            # SET expressions all read the row as it was before the update
+            statement = statement.on_conflict_do_update(
+                index_elements=[c.key],
+                set_={
+                    "previous_count": case(
+                        (c.window_index == window_index, c.previous_count),
+                        (c.window_index == window_index - 1, c.current_count),
+                        else_=0,
+                    ),
+                    "current_count": case(
+                        (c.window_index == window_index, c.current_count + 1),
+                        else_=1,
+                    ),
+                    "window_index": statement.excluded.window_index,
+                    "expires_at": statement.excluded.expires_at,
+                },
+            ).returning(c.current_count, c.previous_count)
+
+            current_count, previous_count = (await session.execute(statement)).one()
+            await session.commit()
+        return current_count, previous_count
+
+    async def sweep(self, now: float) -> int:
+        async with self._sessions() as session:
+            result = await session.execute(
+                delete(RateLimitCounter).where(RateLimitCounter.expires_at <= int(now))
+            )
+            await session.commit()
+        return result.rowcount
+
+
+class RateLimiter:
+    """Applies the first matching policy to each (client, path)"""
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        default_policy: RateLimitPolicy,
+        policies: Sequence[RateLimitPolicy] = (),
+    ):
+        self.store = store
+        self.default_policy = default_policy
+        self.policies = list(policies)
+        self._stats = {
+            "checks": 0,
+            "rejected": 0,
+            "store_errors": 0,
+            "swept_keys": 0,
+            "check_time_total": 0.0,
+        }
+
+    def policy_for(self, path: str) -> RateLimitPolicy:
+        for policy in self.policies:
+            if policy.matches(path):
+                return policy
+        return self.default_policy
+
+    async def hit(
+        self, client: str, path: str, now: Optional[float] = None
+    ) -> RateLimitDecision:
+        """Count a request from `client` to `path` and decide whether it may proceed"""
+        start_time = time.perf_counter()
+        now = time.time() if now is None else now
+        policy = self.policy_for(path)
+        window = policy.window_seconds
+
+        try:
+            current_count, previous_count = await self.store.hit(
+                f"{policy.name}:{client}", window, now
+            )
+        except Exception as e:
+            # Fail open: an unavailable store must not take the API down
+            self._stats["store_errors"] += 1
+            logger.error(
+                "Rate limit store unavailable",
+                extra={
+                    "event_type": "rate_limit_store_error",
+                    "store": self.store.name,
+                    "error": str(e),
+                },
+            )
+            return RateLimitDecision(True, policy, 0, policy.limit, 0)
+
+        elapsed = now % window
+        estimate = previous_count * (window - elapsed) / window + current_count
+        allowed = estimate <= policy.limit
+
+        self._stats["checks"] += 1
+        self._stats["check_time_total"] += time.perf_counter() - start_time
+        if not allowed:
+            self._stats["rejected"] += 1
+
+        return RateLimitDecision(
+            allowed=allowed,
+            policy=policy,
+            requests_in_window=round(estimate, 2),
+            remaining=max(0, math.floor(policy.limit - estimate)),
+            retry_after=0 if allowed else max(1, math.ceil(window - elapsed)),
+        )
+
+    async def sweep(self, now: Optional[float] = None) -> int:
+        """Remove idle counters from the store"""
+        try:
+            removed = await self.store.sweep(time.time() if now is None else now)
+        except Exception as e:
+            logger.error(
+                "Rate limit sweep failed",
+                extra={"event_type": "rate_limit_sweep_failed", "error": str(e)},
+                exc_info=True,
+            )
+            return 0
+        self._stats["swept_keys"] += removed
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        total_time = stats.pop("check_time_total")
+        stats["store"] = self.store.name
+        stats["tracked_keys"] = self.store.tracked_keys()
+        stats["avg_check_us"] = round(total_time / (stats["checks"] or 1) * 1e6, 2)
+        return stats
+
+
+def create_rate_limit_store(backend: str) -> RateLimitStore:
+    """Build the store configured by RATE_LIMIT_BACKEND"""
+    if backend == "memory":
+        return InMemoryRateLimitStore()
+    if backend == "database":
+        return DatabaseRateLimitStore()
+    raise ValueError(f"Unsupported rate limit backend: {backend}")
+
+
+def create_rate_limiter(store: Optional[RateLimitStore] = None) -> RateLimiter:
+    """Limiter with the login and general policies from settings"""
+    return RateLimiter(
+        store or create_rate_limit_store(settings.RATE_LIMIT_BACKEND),
+        default_policy=RateLimitPolicy(
+            "general", settings.RATE_LIMIT_REQUESTS_PER_MINUTE
+        ),
+        policies=[
+            RateLimitPolicy(
+                "login",
+                settings.LOGIN_RATE_LIMIT_PER_MINUTE,
+                # auth_routes serves login under the /users/auth router prefix
+                path_prefixes=(f"{settings.API_PREFIX}/users/auth/login",),
+            )
+        ],
+    )
+
+
+# Global rate limiter instance
+rate_limiter = create_rate_limiter()
@@ -1,6 +1,5 @@
 import ipaddress
 import uuid
-from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError, HashingError, VerificationError
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
@@ -22,6 +21,10 @@ from sqlalchemy.exc import SQLAlchemyError
 from app.models.health_facility_model import Facility
 from uuid import uuid4
 from app.utils.logging_config import get_logger, log_security_event
+from app.utils.principal_cache import Principal, principal_cache
+from app.utils.auth_context import AuthContext, set_auth_context
+from app.services.session_activity import ACTIVITY_UPDATE, session_activity
+from app.utils.password_pool import ph, hash_password_async, verify_password_async
 
 
 load_dotenv()
@@ -29,11 +32,6 @@ load_dotenv()
 # Get logger for security module
 logger = get_logger(__name__)
 
-# Argon2 password hashing configuration
-ph = PasswordHasher(
-    time_cost=3, memory_cost=65536, parallelism=1, hash_len=32, salt_len=16
-)
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 # JWT configuration
@@ -276,7 +274,12 @@ class SessionManager:
     async def validate_session(
         db: AsyncSession, session_id: UUID, request: Request
     ) -> Optional[UserSession]:
-        """Validate session and update activity"""
+        """
+        Validate session and record activity.
+
+        Routine activity is buffered by the session activity coalescer and
+        written in batches; an IP change is written (and flagged) immediately.
+        """
 
         result = await db.execute(
             select(UserSession)
@@ -292,10 +295,10 @@ class SessionManager:
         current_ip = (
             getattr(request.client, "host", "unknown") if request.client else "unknown"
         )
-        session.update_activity(current_ip)
 
         # Security monitoring
         if session.ip_address != current_ip:
+            session.update_activity(current_ip)
             log_security_event(
                 event_type="ip_change_detected",
                 user_id=str(session.user_id),
@@ -307,8 +310,12 @@ class SessionManager:
                 },
             )
             session.mark_suspicious("ip_change")
+            await db.commit()
+        elif not session_activity.record(session.id):
+            # Coalescer not running (e.g. serverless): write through
+            session.update_activity(current_ip)
+            await db.commit()
 
-        await db.commit()
         return session
 
     @staticmethod
@@ -768,13 +775,13 @@ async def authenticate_user(
         if not user.is_verified:
             return False, user, "Email not verified"
 
-        if not verify_password(password, user.password):
+        if not await verify_password_async(password, user.password):
             await handle_failed_login(db, user, ip_address, user_agent)
             return False, user, "Invalid email or password"
 
         if needs_rehash(user.password):
             try:
-                user.password = get_password_hash(password)
+                user.password = await hash_password_async(password)
                 logger.info(
                     "Password rehashed with updated parameters",
                     extra={"event_type": "password_rehashed", "user_id": str(user.id)},
@@ -792,6 +799,9 @@ async def authenticate_user(
         await handle_successful_login(db, user, ip_address, user_agent)
         return True, user, None
 
+    except HTTPException:
+        raise
+
     except SQLAlchemyError as e:
         logger.error(
             f"Database error during authentication: {type(e).__name__}",
@@ -850,6 +860,23 @@ def verify_token_and_extract_data(token: str) -> dict:
         raise HTTPException(status_code=400, detail="Invalid token")
 
 
+def _ensure_account_usable(account: Union[User, Principal]) -> None:
+    """Reject inactive or locked accounts (works on users and cached principals)"""
+    if not account.is_active or not account.status:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Account is inactive",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if account.is_locked:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Account is temporarily locked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
 async def get_current_user(
     db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme),
@@ -875,6 +902,46 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
+        user_uuid = UUID(user_id)
+        session_uuid = UUID(session_id) if session_id else None
+
+        # Hot path: serve the principal snapshot without touching the database.
+        # An IP change falls through to full validation so it is still logged.
+        principal = await principal_cache.lookup(user_uuid, session_uuid)
+        if principal is not None:
+            current_ip = (
+                getattr(request.client, "host", "unknown")
+                if request and request.client
+                else "unknown"
+            )
+            if session_uuid and request and principal.session_ip != current_ip:
+                principal_cache.discard(user_uuid, session_uuid)
+            else:
+                _ensure_account_usable(principal)
+                if session_uuid and not session_activity.record(session_uuid):
+                    # Coalescer not running (e.g. serverless): write through
+                    await db.execute(
+                        ACTIVITY_UPDATE,
+                        {
+                            "b_session_id": session_uuid,
+                            "b_last_activity": datetime.now(timezone.utc),
+                            "b_request_count": 1,
+                        },
+                    )
+                    await db.commit()
+                set_auth_context(
+                    request,
+                    AuthContext(
+                        user_id=user_uuid,
+                        session_id=session_uuid,
+                        token_payload=payload,
+                        session_validated=session_uuid is not None,
+                        from_cache=True,
+                    ),
+                )
+                return principal.to_user()
+
+        generation = principal_cache.generation
         result = await db.execute(
             select(User)
             .options(
@@ -882,7 +949,7 @@ async def get_current_user(
                 selectinload(User.facility).selectinload(Facility.blood_bank),
                 selectinload(User.work_facility).selectinload(Facility.blood_bank),
             )
-            .where(User.id == UUID(user_id))
+            .where(User.id == user_uuid)
         )
         user = result.scalar_one_or_none()
 
@@ -893,24 +960,13 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        if not user.is_active or not user.status:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Account is inactive",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-
-        if user.is_locked:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Account is temporarily locked",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        _ensure_account_usable(user)
 
         # Validate session if session ID is in token and request is available
+        session = None
         if session_id and request:
             session = await SessionManager.validate_session(
-                db, UUID(session_id), request
+                db, session_uuid, request
             )
             if not session:
                 logger.warning(
@@ -927,6 +983,20 @@ async def get_current_user(
                     headers={"WWW-Authenticate": "Bearer"},
                 )
 
+        # Sessionless tokens (or calls without a request) are cached under the
+        # user alone; they never carried session validation in the first place.
+        if session is not None or not session_id:
+            await principal_cache.store(Principal.from_user(user, session), generation)
+
+        set_auth_context(
+            request,
+            AuthContext(
+                user_id=user_uuid,
+                session_id=session_uuid,
+                token_payload=payload,
+                session_validated=session is not None,
+            ),
+        )
         return user
 
     except (JWTError, ValueError) as e:
@@ -939,38 +1009,3 @@ async def get_current_user(
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-
-
-async def cleanup_expired_refresh_tokens(db: AsyncSession) -> int:
-    """Clean up expired refresh tokens from database"""
-    try:
-        result = await db.execute(
-            select(RefreshToken).where(
-                RefreshToken.expires_at < datetime.now(timezone.utc)
-            )
-        )
-        expired_tokens = result.scalars().all()
-
-        count = len(expired_tokens)
-
-        for token in expired_tokens:
-            await db.delete(token)
-
-        await db.commit()
-
-        if count > 0:
-            logger.info(
-                "Expired refresh tokens cleaned up",
-                extra={"event_type": "refresh_tokens_cleaned", "tokens_removed": count},
-            )
-
-        return count
-
-    except Exception as e:
-        logger.error(
-            "Failed to cleanup expired refresh tokens",
-            extra={"event_type": "refresh_token_cleanup_failed", "error": str(e)},
-            exc_info=True,
-        )
-        await db.rollback()
-        return 0
@@ -0,0 +1,19 @@
+"""
+Dialect-aware INSERT ... ON CONFLICT helpers.
+
+PostgreSQL (production) and SQLite (development/tests) both support
+`ON CONFLICT DO UPDATE`, but SQLAlchemy exposes it through each dialect's own
+`insert()` construct. `dialect_insert` picks the right one for the session's
+bind so callers can write a single upsert statement.
+"""
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def dialect_insert(dialect_name: str, table):
+    """Return an ON CONFLICT capable insert() for the given dialect"""
+    if dialect_name == "postgresql":
+        return postgresql.insert(table)
+    if dialect_name == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"Upsert is not supported on dialect '{dialect_name}'")
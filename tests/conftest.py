@@ -4,12 +4,13 @@ Provides test database setup, authentication helpers, and data fixtures.
 """
 
 import pytest
+import pytest_asyncio
 import asyncio
 import sys
 from pathlib import Path
 from typing import AsyncGenerator, Generator
 from fastapi.testclient import TestClient
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 import os
@@ -38,6 +39,7 @@ from app.models.health_facility_model import Facility
 from app.models.request_model import BloodRequest
 from app.services.user_service import UserService
 from app.dependencies import get_db
+from app.utils.rate_limiter import InMemoryRateLimitStore, rate_limiter
 
 # Test database URL (in-memory SQLite for fast tests)
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -82,6 +84,44 @@ async def db_session(test_db_setup) -> AsyncGenerator[AsyncSession, None]:
         await session.rollback()
 
 
+@pytest_asyncio.fixture
+async def engine(request, tmp_path) -> AsyncGenerator[AsyncEngine, None]:
+    """
+    A fresh database with the schema created, disposed after the test.
+
+    In memory by default, with every session sharing one connection.
+    Parametrize indirectly with "file" for a file database where each session
+    gets its own connection, as in production, so concurrent writers contend.
+    """
+    if getattr(request, "param", "memory") == "file":
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'test.db'}",
+            connect_args={"timeout": 30},
+        )
+    else:
+        engine = create_async_engine(
+            TEST_DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine: AsyncEngine) -> async_sessionmaker:
+    """Session factory bound to the test's fresh database."""
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits(monkeypatch):
+    """Start every test with empty counters on the app's shared rate limiter."""
+    monkeypatch.setattr(rate_limiter, "store", InMemoryRateLimitStore())
+
+
 @pytest.fixture
 def client(db_session: AsyncSession) -> TestClient:
     """Create test client with overridden database dependency."""
@@ -0,0 +1,166 @@
+"""
+Tests for the scheduled purge of expired tokens, sessions and registrations.
+"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from sqlalchemy import event, func, insert, select
+
+from app.models.device_model import DeviceRegistration
+from app.models.user_model import RefreshToken, User, UserSession
+from app.services.auth_purge import AuthRecordPurger
+
+NOW = datetime(2026, 3, 14, 12, 0, tzinfo=timezone.utc)
+
+
+async def seed_user(session_factory):
+    user_id = uuid.uuid4()
+    async with session_factory() as db:
+        await db.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "email": "admin@hospital.gh",
+                    "first_name": "Kwame",
+                    "last_name": "Osei",
+                    "password": "hash",
+                }
+            ],
+        )
+        await db.commit()
+    return user_id
+
+
+def token(user_id, expires_at):
+    return {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "token_hash": uuid.uuid4().hex,
+        "expires_at": expires_at,
+        "absolute_expires_at": expires_at,
+        "last_used_at": expires_at - timedelta(days=7),
+    }
+
+
+def user_session(user_id, expires_at, terminated_at=None):
+    return {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "session_token": uuid.uuid4().hex,
+        "expires_at": expires_at,
+        "terminated_at": terminated_at,
+        "is_active": terminated_at is None,
+    }
+
+
+def registration(user_id, expires_at, status):
+    return {
+        "id": uuid.uuid4(),
+        "user_id": user_id,
+        "registration_token": uuid.uuid4().hex,
+        "device_fingerprint": "f" * 64,
+        "challenge_id": "c",
+        "challenge_data": "{}",
+        "verification_method": "email",
+        "device_data": {},
+        "status": status,
+        "expires_at": expires_at,
+    }
+
+
+async def remaining_ids(session_factory, model):
+    async with session_factory() as db:
+        return set((await db.execute(select(model.id))).scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_purge_removes_only_expired_records(session_factory):
+    user_id = await seed_user(session_factory)
+    old = NOW - timedelta(days=45)
+
+    tokens = [
+        token(user_id, NOW - timedelta(minutes=1)),
+        token(user_id, NOW + timedelta(days=3)),
+    ]
+    sessions = [
+        user_session(user_id, NOW + timedelta(days=1), terminated_at=old),
+        user_session(user_id, old),
+        user_session(user_id, NOW + timedelta(days=1), NOW - timedelta(days=2)),
+        user_session(user_id, NOW + timedelta(hours=1)),
+    ]
+    registrations = [
+        registration(user_id, old, "pending"),
+        registration(user_id, old, "failed"),
+        registration(user_id, old, "verified"),
+        registration(user_id, NOW - timedelta(days=1), "pending"),
+    ]
+    async with session_factory() as db:
+        await db.execute(insert(RefreshToken), tokens)
+        await db.execute(insert(UserSession), sessions)
+        await db.execute(insert(DeviceRegistration), registrations)
+        await db.commit()
+
+    purger = AuthRecordPurger(chunk_size=10, retention_days=30)
+    removed = await purger.run(session_factory, now=NOW)
+
+    assert removed == {
+        "refresh_tokens": 1,
+        "user_sessions": 2,
+        "device_registrations": 2,
+    }
+    assert await remaining_ids(session_factory, RefreshToken) == {tokens[1]["id"]}
+    assert await remaining_ids(session_factory, UserSession) == {
+        sessions[2]["id"],
+        sessions[3]["id"],
+    }
+    assert await remaining_ids(session_factory, DeviceRegistration) == {
+        registrations[2]["id"],
+        registrations[3]["id"],
+    }
+
+    stats = purger.get_stats()
+    assert stats["runs"] == 1
+    assert stats["rows_removed"] == 5
+    assert stats["user_sessions_removed"] == 2
+    assert stats["truncated_runs"] == 0
+
+
+@pytest.mark.asyncio
+async def test_purge_deletes_in_bounded_chunks(engine, session_factory):
+    user_id = await seed_user(session_factory)
+    async with session_factory() as db:
+        await db.execute(
+            insert(RefreshToken),
+            [token(user_id, NOW - timedelta(hours=i + 1)) for i in range(2500)],
+        )
+        await db.commit()
+
+    deletes = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("DELETE"):
+            deletes.append(statement)
+
+    purger = AuthRecordPurger(chunk_size=1000, max_rows_per_run=1200)
+    first = await purger.run(session_factory, now=NOW)
+    first_deletes = len(deletes)
+    second = await purger.run(session_factory, now=NOW)
+    third = await purger.run(session_factory, now=NOW)
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    # 1000 + 200 rows; the budget is spent before the other tables
+    assert first == {"refresh_tokens": 1200, "user_sessions": 0, "device_registrations": 0}
+    assert first_deletes == 2
+    assert second["refresh_tokens"] == 1200
+    assert third["refresh_tokens"] == 100
+    assert all("LIMIT" in statement for statement in deletes)
+
+    async with session_factory() as db:
+        left = (await db.execute(select(func.count(RefreshToken.id)))).scalar()
+    assert left == 0
+    assert purger.get_stats()["truncated_runs"] == 2
@@ -0,0 +1,191 @@
+"""
+SQL statement budget for authenticated endpoints.
+
+get_current_user records the decoded token and validated session on the
+request so require_permission(validate_session=True) does not decode the JWT
+or look the session up a second time. These tests count the statements a
+protected request issues, both cold (principal cache empty) and warm.
+"""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.dependencies import get_db
+from app.main import app
+from app.models.rbac_model import Role
+from app.models.user_model import User
+from app.services.session_activity import session_activity
+from app.utils.create_user_roles import seed_roles_and_permissions
+from app.utils.principal_cache import principal_cache
+from app.utils.security import get_password_hash
+
+PASSWORD = "SecurePass123!"
+
+
+class StatementCounter:
+    """Records every SQL statement sent through an engine."""
+
+    def __init__(self, engine):
+        self.statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(" ".join(statement.split()))
+
+    def reset(self):
+        self.statements.clear()
+
+    def matching(self, prefix: str, table: str = None):
+        return [
+            s
+            for s in self.statements
+            if s.upper().startswith(prefix) and (table is None or table in s)
+        ]
+
+    @property
+    def writes(self):
+        return [
+            s
+            for s in self.statements
+            if s.upper().startswith(("INSERT", "UPDATE", "DELETE"))
+        ]
+
+
+@pytest.fixture
+def budget_env():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with session_factory() as db:
+            await seed_roles_and_permissions(db)
+            await db.commit()
+
+    asyncio.run(setup())
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+            if session.in_transaction():
+                await session.commit()
+
+    app.dependency_overrides[get_db] = override_get_db
+    with TestClient(app) as client:
+        yield client, engine, session_factory
+    app.dependency_overrides.clear()
+    principal_cache.clear()
+
+
+def create_user(client, session_factory, role_name: str) -> dict:
+    email = f"{role_name}_{uuid4().hex[:8]}@hospital.gh"
+
+    async def insert():
+        async with session_factory() as db:
+            role = (
+                await db.execute(select(Role).where(Role.name == role_name))
+            ).scalar_one()
+            user = User(
+                email=email,
+                first_name="Kofi",
+                last_name="Boateng",
+                password=get_password_hash(PASSWORD),
+                is_verified=True,
+            )
+            user.roles = [role]
+            db.add(user)
+            await db.commit()
+
+    client.portal.call(insert)
+    response = client.post(
+        "/api/users/auth/login", json={"email": email, "password": PASSWORD}
+    )
+    assert response.status_code == 200, response.text
+    token = response.json()["data"]["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+class TestProtectedEndpointQueryBudget:
+    def test_cold_request_validates_session_once(self, budget_env):
+        client, engine, session_factory = budget_env
+        headers = create_user(client, session_factory, "facility_administrator")
+        counter = StatementCounter(engine)
+
+        principal_cache.clear()
+        counter.reset()
+        response = client.get("/api/notifications/sse/stats", headers=headers)
+
+        assert response.status_code == 200, response.text
+        assert len(counter.matching("SELECT", "FROM user_sessions")) == 1
+        assert counter.writes == []
+
+    def test_warm_request_issues_no_auth_queries(self, budget_env):
+        client, engine, session_factory = budget_env
+        headers = create_user(client, session_factory, "facility_administrator")
+        counter = StatementCounter(engine)
+
+        client.get("/api/notifications/sse/stats", headers=headers)
+        counter.reset()
+        response = client.get("/api/notifications/sse/stats", headers=headers)
+
+        assert response.status_code == 200, response.text
+        assert counter.statements == []
+
+    def test_route_queries_are_only_cost_after_auth(self, budget_env):
+        client, engine, session_factory = budget_env
+        headers = create_user(client, session_factory, "staff")
+        counter = StatementCounter(engine)
+
+        principal_cache.clear()
+        counter.reset()
+        response = client.get("/api/requests/my-requests", headers=headers)
+        assert response.status_code == 200, response.text
+        assert len(counter.matching("SELECT", "FROM user_sessions")) == 1
+        assert counter.writes == []
+
+        counter.reset()
+        response = client.get("/api/requests/my-requests", headers=headers)
+        assert response.status_code == 200, response.text
+        assert counter.matching("SELECT", "FROM user_sessions") == []
+        assert counter.matching("SELECT", "FROM users") == []
+        assert counter.writes == []
+
+    def test_warm_request_writes_activity_without_coalescer(
+        self, budget_env, monkeypatch
+    ):
+        client, engine, session_factory = budget_env
+        headers = create_user(client, session_factory, "facility_administrator")
+        counter = StatementCounter(engine)
+
+        client.get("/api/notifications/sse/stats", headers=headers)
+        # As in serverless deployments, where the coalescer never starts
+        monkeypatch.setattr(session_activity, "record", lambda *args: False)
+        counter.reset()
+        response = client.get("/api/notifications/sse/stats", headers=headers)
+
+        assert response.status_code == 200, response.text
+        assert counter.matching("SELECT", "FROM user_sessions") == []
+        assert len(counter.writes) == 1
+        assert counter.writes[0].startswith("UPDATE user_sessions")
+
+    def test_terminated_session_is_rejected(self, budget_env):
+        client, engine, session_factory = budget_env
+        headers = create_user(client, session_factory, "facility_administrator")
+
+        assert client.get("/api/notifications/sse/stats", headers=headers).status_code == 200
+        assert client.post("/api/users/auth/logout", headers=headers).status_code == 200
+        response = client.get("/api/notifications/sse/stats", headers=headers)
+
+        assert response.status_code == 401
@@ -0,0 +1,273 @@
+"""
+Tests for the LRU + TTL result cache: eviction, expiry, tags, single-flight
+loading and ORM-driven invalidation, plus a write-cost benchmark.
+"""
+
+import asyncio
+import time
+import uuid
+
+import pytest
+from sqlalchemy import insert
+
+from app.models.health_facility_model import Facility
+from app.models.request_model import BloodRequest
+from app.utils import cache_manager
+from app.utils.cache_manager import CacheManager, cached, facility_tag
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_is_per_namespace():
+    cache = CacheManager(max_size=3, namespace_limits={"charts": 2})
+
+    for key in "abc":
+        cache.set(key, key.upper())
+    assert cache.get("a") == "A"  # a is now most recently used
+    cache.set("d", "D")
+    assert cache.get("b") is None
+    assert [cache.get(k) for k in "acd"] == ["A", "C", "D"]
+
+    for key in "xyz":
+        cache.set(key, key, namespace="charts")
+    assert cache.get("x", namespace="charts") is None
+    assert cache.get("z", namespace="charts") == "z"
+    # Same key, different namespace
+    assert cache.get("z") is None
+
+    stats = cache.get_stats()
+    assert stats["evictions"] == 2
+    assert stats["namespaces"] == {"default": 3, "charts": 2}
+
+
+@pytest.mark.asyncio
+async def test_ttl_expires_lazily_and_none_is_cacheable():
+    clock = FakeClock()
+    cache = CacheManager(default_ttl=60, clock=clock)
+    cache.set(("chart", 1), {"points": []})
+    cache.set("short", 1, ttl=5)
+    cache.set("later", 2, ttl=600)
+
+    clock.now += 30
+    assert cache.get(("chart", 1)) == {"points": []}
+    assert cache.get("short") is None
+
+    clock.now += 31
+    assert cache.get(("chart", 1)) is None
+    assert cache.purge_expired() == 0
+    assert cache.get_stats()["total_entries"] == 1
+    assert cache.get("later") == 2
+
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return None
+
+    assert await cache.get_or_set("empty", load) is None
+    assert await cache.get_or_set("empty", load) is None
+
+    assert len(calls) == 1
+    assert cache.get_stats()["expirations"] == 2
+
+
+def test_tag_invalidation_spans_namespaces():
+    cache = CacheManager()
+    first, second = uuid.uuid4(), uuid.uuid4()
+    cache.set("week", 1, namespace="request_chart", tags=[facility_tag(first)])
+    cache.set("month", 2, namespace="request_chart", tags=[facility_tag(second)])
+    cache.set("summary", 3, namespace="dashboard", tags=[facility_tag(first), "global"])
+
+    assert cache.invalidate_tag(facility_tag(first)) == 2
+    assert cache.get("week", namespace="request_chart") is None
+    assert cache.get("summary", namespace="dashboard") is None
+    assert cache.get("month", namespace="request_chart") == 2
+    # The removed entry no longer holds its other tags
+    assert cache.invalidate_tag("global") == 0
+
+    cache.set("month", 5, namespace="request_chart")
+    assert cache.invalidate_tag(facility_tag(second)) == 0
+    assert cache.invalidate_namespace("request_chart") == 1
+    assert cache.get_stats()["tags"] == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_computation():
+    cache = CacheManager()
+    calls = []
+
+    async def load_chart():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"points": [1, 2, 3]}
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("database timeout")
+
+    results = await asyncio.gather(
+        *(cache.get_or_set("chart", load_chart, namespace="request_chart") for _ in range(50))
+    )
+    assert all(result is results[0] for result in results)
+    assert len(calls) == 1
+
+    calls.clear()
+    outcomes = await asyncio.gather(
+        *(cache.get_or_set("broken", failing) for _ in range(5)),
+        return_exceptions=True,
+    )
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert len(calls) == 1
+    # Failures are not cached
+    assert cache.get("broken") is None
+
+    # A cancelled leader hands the computation to a waiter
+    calls.clear()
+    leader = asyncio.create_task(cache.get_or_set("slow", load_chart))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.get_or_set("slow", load_chart))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert await waiter == {"points": [1, 2, 3]}
+    assert len(calls) == 2
+
+    stats = cache.get_stats()
+    assert stats["coalesced"] == 49 + 4 + 1
+    assert stats["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_a_load_is_not_overwritten():
+    cache = CacheManager()
+
+    gate = asyncio.Event()
+
+    async def load_chart():
+        await gate.wait()
+        return "before the change"
+
+    load = asyncio.create_task(
+        cache.get_or_set("week", load_chart, tags=[facility_tag(1)])
+    )
+    await asyncio.sleep(0)
+    # The data changes (and is invalidated) while the old copy loads
+    cache.invalidate_tag(facility_tag(1))
+    gate.set()
+    assert await load == "before the change"
+    assert cache.get("week") is None
+
+    assert cache.get_stats()["stale_loads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_decorator_keys_on_arguments(monkeypatch):
+    monkeypatch.setattr(cache_manager, "cache", CacheManager())
+    calls = []
+
+    @cached(ttl=60, tags=lambda facility_id, **_: [facility_tag(facility_id)])
+    async def chart(facility_id, blood_types=None):
+        calls.append((facility_id, blood_types))
+        return len(calls)
+
+    assert await chart(1, blood_types=["O+", "A-"]) == 1
+    assert await chart(1, blood_types=["O+", "A-"]) == 1
+    assert await chart(1, blood_types=["O+"]) == 2
+    assert await chart(2) == 3
+    cache_manager.cache.invalidate_tag(facility_tag(1))
+    assert await chart(1, blood_types=["O+", "A-"]) == 4
+    assert await chart(2) == 3
+
+
+@pytest.mark.asyncio
+async def test_committed_request_changes_invalidate_facility_charts(session_factory):
+    requester, source, other = (uuid.uuid4() for _ in range(3))
+    async with session_factory() as db:
+        await db.execute(
+            insert(Facility),
+            [
+                {
+                    "id": facility_id,
+                    "facility_name": f"Facility {i}",
+                    "facility_email": f"facility{i}@hospital.gh",
+                    "facility_digital_address": "GA-123-4567",
+                }
+                for i, facility_id in enumerate((requester, source, other))
+            ],
+        )
+        await db.commit()
+
+    for facility_id in (requester, source, other):
+        cache_manager.cache.set(
+            ("chart", facility_id),
+            "cached",
+            namespace="request_chart",
+            tags=[facility_tag(facility_id)],
+        )
+
+    def charts():
+        return [
+            cache_manager.cache.get(("chart", facility_id), namespace="request_chart")
+            for facility_id in (requester, source, other)
+        ]
+
+    def blood_request(facility_id, source_facility_id):
+        return BloodRequest(
+            request_group_id=uuid.uuid4(),
+            blood_type="O+",
+            blood_product="Whole Blood",
+            quantity_requested=2,
+            requester_id=uuid.uuid4(),
+            facility_id=facility_id,
+            source_facility_id=source_facility_id,
+        )
+
+    async with session_factory() as db:
+        db.add(blood_request(requester, source))
+        await db.flush()
+        # Uncommitted, so other readers may still be served the old charts
+        after_flush = charts()
+        await db.commit()
+    after_commit = charts()
+
+    async with session_factory() as db:
+        db.add(blood_request(other, other))
+        await db.flush()
+        await db.rollback()
+        assert not db.sync_session.info
+    after_rollback = charts()
+
+    cache_manager.cache.invalidate_namespace("request_chart")
+
+    assert after_flush == ["cached"] * 3
+    assert after_commit == [None, None, "cached"]
+    assert after_rollback == [None, None, "cached"]
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+def test_set_cost_does_not_grow_with_cache_size():
+    samples = 20_000
+
+    def avg_set_seconds(size):
+        cache = CacheManager(max_size=size)
+        for i in range(size):
+            cache.set(("chart", i), i, tags=[facility_tag(i % 50)])
+        start = time.perf_counter()
+        for i in range(samples):
+            # Every write evicts the least recently used entry
+            cache.set(("chart", size + i), i, tags=[facility_tag(i % 50)])
+        return (time.perf_counter() - start) / samples
+
+    small, large = avg_set_seconds(1_000), avg_set_seconds(100_000)
+    print(
+        f"\nper-set cost: {small * 1e6:.2f}us at 1k entries, "
+        f"{large * 1e6:.2f}us at 100k entries"
+    )
+    assert large < small * 3
@@ -0,0 +1,219 @@
+"""
+Tests for the bitmask blood compatibility table and the compatibility-aware
+facility stock search.
+"""
+
+import itertools
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, insert
+
+from app.models.blood_bank_model import BloodBank
+from app.models.health_facility_model import Facility
+from app.models.inventory_model import BloodInventory
+from app.schemas.inventory_schema import BloodCompatibility
+from app.services.inventory_service import BloodInventoryService
+from app.utils.pagination import PaginationParams
+
+FRESH = date.today() + timedelta(days=30)
+EXPIRED = date.today() - timedelta(days=1)
+RBC = "Red Blood Cells"
+
+
+async def seed(session_factory, stock):
+    """stock: {facility name: [(blood_type, product, quantity, expiry)]}"""
+    facilities, banks, inventory, bank_ids = [], [], [], {}
+    for i, (name, units) in enumerate(stock.items()):
+        facility_id, bank_id = uuid.uuid4(), uuid.uuid4()
+        bank_ids[name] = bank_id
+        facilities.append(
+            {
+                "id": facility_id,
+                "facility_name": name,
+                "facility_email": f"facility{i}@hospital.gh",
+                "facility_digital_address": "GA-123-4567",
+            }
+        )
+        banks.append(
+            {
+                "id": bank_id,
+                "facility_id": facility_id,
+                "blood_bank_name": f"{name} Bank",
+                "phone": "0244000000",
+                "email": f"bank{i}@hospital.gh",
+            }
+        )
+        inventory += [
+            {
+                "blood_bank_id": bank_id,
+                "blood_type": blood_type,
+                "blood_product": product,
+                "quantity": quantity,
+                "expiry_date": expiry,
+            }
+            for blood_type, product, quantity, expiry in units
+        ]
+    async with session_factory() as db:
+        await db.execute(insert(Facility), facilities)
+        await db.execute(insert(BloodBank), banks)
+        await db.execute(insert(BloodInventory), inventory)
+        await db.commit()
+    return bank_ids
+
+
+class TestCompatibilityTable:
+    def test_bitmask_checks_agree_with_the_donor_map(self):
+        types = list(BloodCompatibility.DONOR_RECIPIENT_MAP)
+        for donor, recipient in itertools.product(types, repeat=2):
+            expected = recipient in BloodCompatibility.DONOR_RECIPIENT_MAP[donor]
+            assert BloodCompatibility.can_donate_to(donor, recipient) is expected
+            assert (donor in BloodCompatibility.get_compatible_donors(recipient)) is expected
+
+        assert BloodCompatibility.get_compatible_donors("O-") == ["O-"]
+        assert len(BloodCompatibility.get_compatible_donors("AB+")) == 8
+        with pytest.raises(ValueError):
+            BloodCompatibility.can_donate_to("C+", "A+")
+
+    def test_donor_search_order_and_product_scope(self):
+        assert BloodCompatibility.donor_types_for("A-", RBC) == ("A-", "O-")
+        assert BloodCompatibility.donor_types_for("B+", "Red Cells") == (
+            "B+",
+            "O-",
+            "O+",
+            "B-",
+        )
+        # Non red cell products are matched on the exact type only
+        assert BloodCompatibility.donor_types_for("B+", "Fresh Frozen Plasma") == ("B+",)
+
+
+class TestCompatibleStockSearch:
+    @pytest.mark.asyncio
+    async def test_ranks_exact_matches_first_then_by_quantity(
+        self, engine, session_factory
+    ):
+        stock = {
+            "Exact Small": [("A+", RBC, 2, FRESH), ("O+", RBC, 1, FRESH)],
+            "Exact Large": [("A+", RBC, 5, FRESH)],
+            "Donors Only": [("O-", RBC, 9, FRESH), ("A-", RBC, 4, FRESH)],
+            "Incompatible": [("B+", RBC, 30, FRESH), ("AB+", RBC, 30, FRESH)],
+            "Wrong Product": [("A+", "Platelets", 30, FRESH)],
+            "Expired": [("A+", RBC, 30, EXPIRED)],
+            "Own Bank": [("A+", RBC, 50, FRESH)],
+        }
+
+        bank_ids = await seed(session_factory, stock)
+        statements = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        async with session_factory() as db:
+            service = BloodInventoryService(db)
+            page = await service.search_compatible_stock(
+                "A+", RBC, exclude_blood_bank_id=bank_ids["Own Bank"]
+            )
+            enough = await service.search_compatible_stock(
+                "A+", RBC, min_units=4, exclude_blood_bank_id=bank_ids["Own Bank"]
+            )
+            plasma = await service.search_compatible_stock("A+", "Platelets")
+            # Lowercase products still resolve to red cells compatibility
+            lowercase = await service.search_compatible_stock(
+                "A+", "red blood cells", exclude_blood_bank_id=bank_ids["Own Bank"]
+            )
+
+        assert [f.facility_name for f in page.items] == [
+            "Exact Large",
+            "Exact Small",
+            "Donors Only",
+        ]
+        assert page.total_items == 3
+        exact_small, donors_only = page.items[1], page.items[2]
+        assert (exact_small.exact_match_quantity, exact_small.available_quantity) == (2, 3)
+        assert exact_small.compatible_types == ["A+", "O+"]
+        assert (donors_only.exact_match_quantity, donors_only.available_quantity) == (0, 13)
+        assert donors_only.compatible_types == ["O-", "A-"]
+
+        assert [f.facility_name for f in enough.items] == ["Exact Large", "Donors Only"]
+        assert [f.compatible_types for f in plasma.items] == [["A+"]]
+        assert lowercase.items == page.items
+
+        # The compatible types go to the database as one IN list
+        search = next(s for s, _ in statements if "GROUP BY" in s and "ORDER BY" in s)
+        assert search.count("blood_type IN (") == 1
+
+    @pytest.mark.asyncio
+    async def test_pagination_and_validation(self, session_factory):
+        stock = {
+            f"Facility {i:02d}": [("O-", RBC, 1 + i, FRESH), ("O+", RBC, 1, FRESH)]
+            for i in range(7)
+        }
+
+        await seed(session_factory, stock)
+        async with session_factory() as db:
+            service = BloodInventoryService(db)
+            pages = [
+                await service.search_compatible_stock(
+                    "O+", RBC, pagination=PaginationParams(page=page, page_size=3)
+                )
+                for page in (1, 2, 3)
+            ]
+            untotalled = await service.search_compatible_stock(
+                "O+", RBC, pagination=PaginationParams(page_size=3, include_total=False)
+            )
+            cursor_pages, cursor = [], None
+            while True:
+                page = await service.search_compatible_stock(
+                    "O+",
+                    RBC,
+                    pagination=PaginationParams(
+                        page_size=3, cursor=cursor, include_total=False
+                    ),
+                )
+                cursor_pages.append(page)
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+            with pytest.raises(HTTPException) as invalid:
+                await service.search_compatible_stock("Z+", RBC)
+
+        # All have one exact (O+) unit, so more O- ranks higher
+        names = [f.facility_name for page in pages for f in page.items]
+        assert names == [f"Facility {i:02d}" for i in range(6, -1, -1)]
+        # Keyset pages walk the same ranking
+        assert [[f.facility_name for f in page.items] for page in cursor_pages] == [
+            [f.facility_name for f in page.items] for page in pages
+        ]
+        assert [(p.has_next, p.has_prev) for p in pages] == [
+            (True, False),
+            (True, True),
+            (False, True),
+        ]
+        assert pages[0].total_pages == 3
+        assert untotalled.total_items is None and untotalled.has_next
+        assert invalid.value.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_red_cell_product_names_are_searched_together(
+        self, session_factory
+    ):
+        stock = {
+            "Long Name": [("A+", RBC, 3, FRESH)],
+            "Short Name": [("A+", "Red Cells", 2, FRESH), ("O-", RBC, 4, FRESH)],
+            "Plasma": [("A+", "Fresh Frozen Plasma", 9, FRESH)],
+        }
+
+        await seed(session_factory, stock)
+        async with session_factory() as db:
+            service = BloodInventoryService(db)
+            by_long = await service.search_compatible_stock("A+", RBC)
+            by_short = await service.search_compatible_stock("A+", "Red Cells")
+
+        assert [
+            (f.facility_name, f.exact_match_quantity, f.available_quantity)
+            for f in by_long.items
+        ] == [("Long Name", 3, 3), ("Short Name", 2, 6)]
+        assert by_short.items == by_long.items
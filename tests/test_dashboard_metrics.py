@@ -0,0 +1,277 @@
+"""
+Tests for dashboard summary deltas and the set-based reconciliation job,
+plus a reconciliation benchmark.
+"""
+
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert, select, update
+
+from app.models.blood_bank_model import BloodBank
+from app.models.distribution_model import BloodDistribution
+from app.models.health_facility_model import Facility
+from app.models.inventory_model import BloodInventory
+from app.models.request_model import BloodRequest, DashboardDailySummary
+from app.schemas.distribution_schema import DistributionStatus
+from app.schemas.inventory_schema import BloodInventoryCreate, BloodInventoryUpdate
+from app.services.dashboard_service import DashboardDeltas, apply_dashboard_delta
+from app.services.inventory_service import BloodInventoryService
+from app.services.scheduler import reconcile_dashboard_metrics
+
+TODAY = date(2026, 3, 14)
+NOON = datetime(2026, 3, 14, 12, 0)
+
+
+def facility_rows(count: int):
+    return [
+        {
+            "id": uuid.uuid4(),
+            "facility_name": f"Facility {i}",
+            "facility_email": f"facility{i}@hospital.gh",
+            "facility_digital_address": "GA-123-4567",
+        }
+        for i in range(count)
+    ]
+
+
+def bank_row(facility_id, index: int):
+    return {
+        "id": uuid.uuid4(),
+        "facility_id": facility_id,
+        "blood_bank_name": f"Bank {index}",
+        "phone": "0244000000",
+        "email": f"bank{index}@hospital.gh",
+    }
+
+
+def inventory_row(bank_id, quantity: int):
+    return {
+        "id": uuid.uuid4(),
+        "blood_bank_id": bank_id,
+        "blood_product": "Whole Blood",
+        "blood_type": "O+",
+        "quantity": quantity,
+        "expiry_date": TODAY + timedelta(days=20),
+    }
+
+
+def request_row(facility_id, created_at: datetime):
+    return {
+        "id": uuid.uuid4(),
+        "request_group_id": uuid.uuid4(),
+        "blood_type": "O+",
+        "blood_product": "Whole Blood",
+        "quantity_requested": 1,
+        "requester_id": uuid.uuid4(),
+        "facility_id": facility_id,
+        "source_facility_id": facility_id,
+        "created_at": created_at,
+    }
+
+
+def distribution_row(bank_id, facility_id, quantity: int, delivered_at):
+    return {
+        "id": uuid.uuid4(),
+        "blood_product": "Whole Blood",
+        "blood_type": "O+",
+        "quantity": quantity,
+        "status": DistributionStatus.DELIVERED,
+        "dispatched_from_id": bank_id,
+        "dispatched_to_id": facility_id,
+        "date_delivered": delivered_at,
+    }
+
+
+async def load_summaries(session_factory):
+    async with session_factory() as session:
+        rows = (await session.execute(select(DashboardDailySummary))).scalars().all()
+        return {row.facility_id: row for row in rows}
+
+
+@pytest.mark.asyncio
+async def test_reconcile_recomputes_all_facilities_with_fixed_statement_count(
+    engine, session_factory
+):
+    facilities = facility_rows(3)
+    banks = [bank_row(facilities[0]["id"], 0)]
+    async with session_factory() as session:
+        await session.execute(insert(Facility), facilities)
+        await session.execute(insert(BloodBank), banks)
+        await session.execute(
+            insert(BloodInventory),
+            [inventory_row(banks[0]["id"], 10), inventory_row(banks[0]["id"], 5)],
+        )
+        await session.execute(
+            insert(BloodDistribution),
+            [
+                distribution_row(banks[0]["id"], facilities[1]["id"], 4, NOON),
+                distribution_row(
+                    banks[0]["id"], facilities[1]["id"], 7, NOON - timedelta(days=1)
+                ),
+                distribution_row(banks[0]["id"], facilities[1]["id"], 9, None),
+            ],
+        )
+        await session.execute(
+            insert(BloodRequest),
+            [
+                request_row(facilities[0]["id"], NOON),
+                request_row(facilities[0]["id"], NOON + timedelta(hours=11)),
+                request_row(facilities[0]["id"], NOON - timedelta(days=1)),
+            ],
+        )
+        await session.commit()
+
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+    assert await reconcile_dashboard_metrics(session_factory, day=TODAY) == 3
+    # Two SELECTs and one bulk upsert, independent of the facility count
+    assert len(statements) == 3
+
+    summaries = await load_summaries(session_factory)
+    assert len(summaries) == 3
+    first, second, third = (summaries[f["id"]] for f in facilities)
+    # Transferred counts units the facility's own bank delivered today
+    assert (first.total_stock, first.total_transferred, first.total_requests) == (15, 4, 2)
+    assert (second.total_stock, second.total_transferred, second.total_requests) == (0, 0, 0)
+    assert (third.total_stock, third.total_transferred, third.total_requests) == (0, 0, 0)
+
+    # No drift: nothing is written
+    statements.clear()
+    assert await reconcile_dashboard_metrics(session_factory, day=TODAY) == 0
+    assert len(statements) == 2
+
+    # Drift is corrected in place instead of inserting duplicates
+    async with session_factory() as session:
+        await session.execute(update(BloodInventory).values(quantity=1))
+        await session.commit()
+    assert await reconcile_dashboard_metrics(session_factory, day=TODAY) == 1
+
+    summaries = await load_summaries(session_factory)
+    assert len(summaries) == 3
+    assert summaries[facilities[0]["id"]].total_stock == 2
+
+
+@pytest.mark.asyncio
+async def test_delta_increments_today_and_carries_stock_forward(session_factory):
+    (facility,) = facility_rows(1)
+    async with session_factory() as session:
+        await session.execute(insert(Facility), [facility])
+        await apply_dashboard_delta(
+            session, facility["id"], TODAY - timedelta(days=2), stock=20, requests=1
+        )
+        await apply_dashboard_delta(session, facility["id"], TODAY, stock=-3)
+        await apply_dashboard_delta(
+            session, facility["id"], TODAY, transferred=3, requests=2
+        )
+        await session.commit()
+
+        rows = (
+            await session.execute(
+                select(DashboardDailySummary).order_by(DashboardDailySummary.date)
+            )
+        ).scalars().all()
+
+    assert [(r.date, r.total_stock, r.total_transferred, r.total_requests) for r in rows] == [
+        (TODAY - timedelta(days=2), 20, 0, 1),
+        (TODAY, 17, 3, 2),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_deltas_resolve_blood_banks_and_net_out(session_factory):
+    facilities = facility_rows(2)
+    banks = [bank_row(f["id"], i) for i, f in enumerate(facilities)]
+    async with session_factory() as session:
+        await session.execute(insert(Facility), facilities)
+        await session.execute(insert(BloodBank), banks)
+
+        deltas = DashboardDeltas()
+        deltas.add_for_bank(banks[0]["id"], stock=5, day=TODAY)
+        deltas.add_for_bank(banks[0]["id"], stock=-5, day=TODAY)
+        deltas.add_for_bank(banks[1]["id"], stock=-2, transferred=2, day=TODAY)
+        deltas.add(facilities[1]["id"], requests=1, day=TODAY)
+        await deltas.apply(session)
+        await session.commit()
+
+    summaries = await load_summaries(session_factory)
+    assert list(summaries) == [facilities[1]["id"]]
+    row = summaries[facilities[1]["id"]]
+    assert (row.total_stock, row.total_transferred, row.total_requests) == (-2, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_inventory_service_deltas_match_reconciliation(session_factory):
+    (facility,) = facility_rows(1)
+    bank = bank_row(facility["id"], 0)
+    async with session_factory() as session:
+        await session.execute(insert(Facility), [facility])
+        await session.execute(insert(BloodBank), [bank])
+        await session.commit()
+
+    today = date.today()
+    async with session_factory() as session:
+        service = BloodInventoryService(session)
+        unit = await service.create_blood_unit(
+            BloodInventoryCreate(
+                blood_product="Whole Blood",
+                blood_type="O+",
+                quantity=10,
+                expiry_date=today + timedelta(days=20),
+            ),
+            blood_bank_id=bank["id"],
+            added_by_id=None,
+        )
+        await service.batch_create_blood_units(
+            [
+                BloodInventoryCreate(
+                    blood_product="Whole Blood",
+                    blood_type="A+",
+                    quantity=q,
+                    expiry_date=today + timedelta(days=20),
+                )
+                for q in (4, 6)
+            ],
+            blood_bank_id=bank["id"],
+            added_by_id=None,
+        )
+        await service.update_blood_unit(unit.id, BloodInventoryUpdate(quantity=7))
+
+    summaries = await load_summaries(session_factory)
+    assert summaries[facility["id"]].total_stock == 17
+    assert await reconcile_dashboard_metrics(session_factory, day=today) == 0
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+@pytest.mark.parametrize("facility_count", [10, 1_000, 10_000])
+@pytest.mark.asyncio
+async def test_refresh_benchmark(facility_count, session_factory):
+    facilities = facility_rows(facility_count)
+    banks = [bank_row(f["id"], i) for i, f in enumerate(facilities)]
+    async with session_factory() as session:
+        await session.execute(insert(Facility), facilities)
+        await session.execute(insert(BloodBank), banks)
+        await session.execute(
+            insert(BloodInventory),
+            [inventory_row(b["id"], q) for b in banks for q in (3, 4)],
+        )
+        await session.execute(
+            insert(BloodRequest), [request_row(f["id"], NOON) for f in facilities]
+        )
+        await session.commit()
+
+    start_time = time.perf_counter()
+    await reconcile_dashboard_metrics(session_factory, day=TODAY)
+    duration = time.perf_counter() - start_time
+    print(f"\nreconcile_dashboard_metrics: {facility_count} facilities in {duration * 1000:.1f}ms")
+
+    summaries = await load_summaries(session_factory)
+    assert len(summaries) == facility_count
+    assert all(s.total_stock == 7 and s.total_requests == 1 for s in summaries.values())
@@ -0,0 +1,158 @@
+"""
+Tests for the paginated blood distribution list: SQL-side filters, cursor
+paging and a query count that does not grow with the result size.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert
+
+from app.models.blood_bank_model import BloodBank
+from app.models.distribution_model import BloodDistribution
+from app.models.health_facility_model import Facility
+from app.models.user_model import User
+from app.schemas.distribution_schema import DistributionStatus
+from app.services.distribution_service import BloodDistributionService
+
+STATUSES = [
+    DistributionStatus.PENDING_RECEIVE,
+    DistributionStatus.IN_TRANSIT,
+    DistributionStatus.DELIVERED,
+]
+
+
+async def seed(session_factory, distributions: int):
+    """One bank sending to two facilities, one distribution per day"""
+    facility_ids = [uuid.uuid4(), uuid.uuid4()]
+    bank_id, other_bank_id, user_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    now = datetime.now()
+    async with session_factory() as db:
+        await db.execute(
+            insert(Facility),
+            [
+                {
+                    "id": facility_id,
+                    "facility_name": f"Facility {i}",
+                    "facility_email": f"facility{i}@hospital.gh",
+                    "facility_digital_address": "GA-123-4567",
+                }
+                for i, facility_id in enumerate(facility_ids)
+            ],
+        )
+        await db.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "email": "bank@hospital.gh",
+                    "first_name": "Efua",
+                    "last_name": "Owusu",
+                    "password": "hash",
+                    "work_facility_id": facility_ids[0],
+                }
+            ],
+        )
+        await db.execute(
+            insert(BloodBank),
+            [
+                {
+                    "id": id_,
+                    "facility_id": facility_ids[i],
+                    "blood_bank_name": f"Bank {i}",
+                    "phone": "0244000000",
+                    "email": f"bank{i}@hospital.gh",
+                }
+                for i, id_ in enumerate((bank_id, other_bank_id))
+            ],
+        )
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "blood_product": "Whole Blood",
+                "blood_type": "O+",
+                "quantity": 1,
+                "status": STATUSES[i % len(STATUSES)],
+                "dispatched_from_id": bank_id,
+                "dispatched_to_id": facility_ids[i % 2],
+                "created_by_id": user_id,
+                "created_at": now - timedelta(days=i, minutes=1),
+                "updated_at": now - timedelta(days=i, minutes=1),
+            }
+            for i in range(distributions)
+        ]
+        # Another bank's traffic must never show up
+        rows.append({**rows[0], "id": uuid.uuid4(), "dispatched_from_id": other_bank_id})
+        await db.execute(insert(BloodDistribution), rows)
+        await db.commit()
+    return bank_id, facility_ids
+
+
+@pytest.mark.asyncio
+async def test_filters_compose_in_sql_and_pages_walk_by_cursor(session_factory):
+    bank_id, facility_ids = await seed(session_factory, distributions=30)
+
+    async with session_factory() as db:
+        service = BloodDistributionService(db)
+        first = await service.list_distributions(bank_id, page_size=12)
+        assert (first.total_items, first.total_pages) == (30, 3)
+        item = first.items[0]
+        assert (item.dispatched_from_name, item.dispatched_to_name) == (
+            "Bank 0",
+            "Facility 0",
+        )
+        assert item.created_by_name == "Owusu"
+
+        seen = [d.id for d in first.items]
+        cursor = first.next_cursor
+        while cursor:
+            page = await service.list_distributions(
+                bank_id, page_size=12, cursor=cursor, include_total=False
+            )
+            seen += [d.id for d in page.items]
+            cursor = page.next_cursor
+        assert len(seen) == len(set(seen)) == 30
+
+        # Filters combine instead of the first one winning
+        delivered_to_second = await service.list_distributions(
+            bank_id,
+            status=DistributionStatus.DELIVERED,
+            facility_id=facility_ids[1],
+        )
+        assert delivered_to_second.total_items == 5
+        assert all(
+            d.status == DistributionStatus.DELIVERED
+            and d.dispatched_to_id == facility_ids[1]
+            for d in delivered_to_second.items
+        )
+
+        # 40 days always crosses a month start, where replace(day=...) broke
+        recent = await service.list_distributions(bank_id, recent_days=40)
+        assert recent.total_items == 30
+        recent = await service.list_distributions(bank_id, recent_days=10)
+        cutoff = datetime.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        ) - timedelta(days=10)
+        assert recent.total_items in (10, 11)
+        assert all(d.created_at >= cutoff for d in recent.items)
+
+
+@pytest.mark.parametrize("distributions", [5, 200])
+@pytest.mark.asyncio
+async def test_query_count_is_constant(distributions, engine, session_factory):
+    bank_id, _ = await seed(session_factory, distributions=distributions)
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async with session_factory() as db:
+        page = await BloodDistributionService(db).list_distributions(
+            bank_id, page_size=100
+        )
+
+    assert len(page.items) == min(distributions, 100)
+    # One count and one page query, whatever the page holds
+    assert len(statements) == 2
@@ -0,0 +1,264 @@
+"""
+Tests for the streaming CSV / NDJSON export pipeline.
+"""
+
+import csv
+import io
+import json
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+from sqlalchemy import insert, text
+
+from app.models.blood_bank_model import BloodBank
+from app.models.distribution_model import BloodDistribution
+from app.models.health_facility_model import Facility
+from app.models.inventory_model import BloodInventory
+from app.models.user_model import User
+from app.schemas.distribution_schema import DistributionStatus
+from app.services.distribution_service import (
+    DISTRIBUTION_EXPORT_COLUMNS,
+    BloodDistributionService,
+)
+from app.services.inventory_service import (
+    INVENTORY_EXPORT_COLUMNS,
+    BloodInventoryService,
+)
+from app.utils.export import ExportFormat, stream_export
+
+
+async def seed_bank(session_factory, name="KBTH"):
+    facility_id, bank_id, user_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    async with session_factory() as db:
+        await db.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "email": f"stores@{name.lower()}.gh",
+                    "first_name": "Ama",
+                    "last_name": "Asante",
+                    "password": "hash",
+                }
+            ],
+        )
+        await db.execute(
+            insert(Facility),
+            [
+                {
+                    "id": facility_id,
+                    "facility_name": "Korle Bu",
+                    "facility_email": f"{name.lower()}@hospital.gh",
+                    "facility_digital_address": "GA-222-1111",
+                }
+            ],
+        )
+        await db.execute(
+            insert(BloodBank),
+            [
+                {
+                    "id": bank_id,
+                    "facility_id": facility_id,
+                    "blood_bank_name": f"{name} Bank",
+                    "phone": "0244000000",
+                    "email": f"bank@{name.lower()}.gh",
+                }
+            ],
+        )
+        await db.commit()
+    return facility_id, bank_id, user_id
+
+
+async def collect(chunks) -> bytes:
+    return b"".join([chunk async for chunk in chunks])
+
+
+@pytest.mark.asyncio
+async def test_inventory_export_csv_and_ndjson(session_factory):
+    _, bank_id, user_id = await seed_bank(session_factory)
+    _, other_bank, _ = await seed_bank(session_factory, "Ridge")
+    async with session_factory() as db:
+        await db.execute(
+            insert(BloodInventory),
+            [
+                {
+                    "blood_bank_id": bank_id,
+                    "blood_product": "Whole Blood",
+                    "blood_type": blood_type,
+                    "quantity": i + 1,
+                    "expiry_date": date(2027, 1, 1 + i),
+                    "added_by_id": user_id if i % 2 else None,
+                    "created_at": datetime(2026, 9, 1, 8, i),
+                }
+                for i, blood_type in enumerate(["O+", "A+", "O+", "B-", "O+"])
+            ]
+            + [
+                {
+                    "blood_bank_id": other_bank,
+                    "blood_product": "Platelets",
+                    "blood_type": "O+",
+                    "quantity": 9,
+                    "expiry_date": date(2027, 2, 1),
+                }
+            ],
+        )
+        await db.commit()
+
+    async with session_factory() as db:
+        query = BloodInventoryService(db).build_export_query(bank_id, "O+")
+
+    completed = []
+    body = await collect(
+        stream_export(
+            query,
+            INVENTORY_EXPORT_COLUMNS,
+            ExportFormat.CSV,
+            session_factory=session_factory,
+            yield_per=2,
+            on_complete=lambda count, _: completed.append(count),
+        )
+    )
+    header, *rows = list(csv.reader(io.StringIO(body.decode())))
+    assert header == [
+        "ID",
+        "Blood Product",
+        "Blood Type",
+        "Quantity",
+        "Expiry Date",
+        "Blood Bank",
+        "Added By",
+        "Created At",
+        "Updated At",
+    ]
+    # Newest first, only this bank's O+ lots
+    assert [row[3] for row in rows] == ["5", "3", "1"]
+    assert rows[0][4] == "2027-01-05"
+    assert rows[0][5] == "KBTH Bank"
+    assert [row[6] for row in rows] == ["", "", ""]
+    assert rows[0][7] == "2026-09-01T08:04:00"
+    assert completed == [3]
+
+    body = await collect(
+        stream_export(
+            BloodInventoryService(None).build_export_query(bank_id),
+            INVENTORY_EXPORT_COLUMNS,
+            ExportFormat.NDJSON,
+            session_factory=session_factory,
+        )
+    )
+    records = [json.loads(line) for line in body.decode().splitlines()]
+    assert len(records) == 5
+    assert records[1]["blood_type"] == "B-"
+    assert records[1]["added_by"] == "Asante"
+    assert records[0]["added_by"] is None
+    assert records[0]["quantity"] == 5
+    assert uuid.UUID(records[0]["id"])
+
+
+@pytest.mark.asyncio
+async def test_distribution_export_filters_and_serializes_enums(session_factory):
+    facility_id, bank_id, user_id = await seed_bank(session_factory)
+    async with session_factory() as db:
+        await db.execute(
+            insert(BloodDistribution),
+            [
+                {
+                    "blood_product": "Whole Blood",
+                    "blood_type": "O-",
+                    "quantity": 2,
+                    "status": status,
+                    "dispatched_from_id": bank_id,
+                    "dispatched_to_id": facility_id,
+                    "created_by_id": user_id,
+                }
+                for status in (
+                    DistributionStatus.PENDING_RECEIVE,
+                    DistributionStatus.IN_TRANSIT,
+                    DistributionStatus.IN_TRANSIT,
+                )
+            ],
+        )
+        await db.commit()
+
+    body = await collect(
+        stream_export(
+            BloodDistributionService(None).build_export_query(
+                bank_id, status=DistributionStatus.IN_TRANSIT
+            ),
+            DISTRIBUTION_EXPORT_COLUMNS,
+            ExportFormat.NDJSON,
+            session_factory=session_factory,
+        )
+    )
+    records = [json.loads(line) for line in body.decode().splitlines()]
+    assert len(records) == 2
+    assert {r["status"] for r in records} == {DistributionStatus.IN_TRANSIT.value}
+    assert records[0]["dispatched_from"] == "KBTH Bank"
+    assert records[0]["dispatched_to"] == "Korle Bu"
+    assert records[0]["created_by"] == "Asante"
+    assert records[0]["date_delivered"] is None
+
+
+def current_rss_bytes() -> int:
+    for line in Path("/proc/self/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) * 1024
+    raise RuntimeError("VmRSS not reported")
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+@pytest.mark.skipif(
+    not Path("/proc/self/status").exists(), reason="needs /proc to read RSS"
+)
+@pytest.mark.parametrize("engine", ["file"], indirect=True)
+@pytest.mark.asyncio
+async def test_million_row_export_runs_in_constant_memory(engine, session_factory):
+    rows = 1_000_000
+    ceiling = 32 * 1024 * 1024
+
+    _, bank_id, _ = await seed_bank(session_factory)
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "WITH RECURSIVE n(i) AS "
+                "(SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :rows) "
+                "INSERT INTO blood_inventory (id, blood_product, blood_type, "
+                "quantity, expiry_date, blood_bank_id, created_at, updated_at) "
+                # Leading letter: the UUID column has numeric affinity
+                "SELECT 'a' || substr(lower(hex(randomblob(16))), 2), "
+                "'Whole Blood', 'O+', "
+                "1 + i % 50, '2027-01-01', :bank, CURRENT_TIMESTAMP, "
+                "CURRENT_TIMESTAMP FROM n"
+            ),
+            {"rows": rows, "bank": bank_id.hex},
+        )
+
+    for export_format in ExportFormat:
+        query = BloodInventoryService(None).build_export_query(bank_id)
+        baseline = current_rss_bytes()
+        peak = baseline
+        exported_bytes = 0
+        lines = 0
+        async for chunk in stream_export(
+            query,
+            INVENTORY_EXPORT_COLUMNS,
+            export_format,
+            session_factory=session_factory,
+        ):
+            exported_bytes += len(chunk)
+            lines += chunk.count(b"\n")
+            peak = max(peak, current_rss_bytes())
+
+        header_lines = 1 if export_format == ExportFormat.CSV else 0
+        print(
+            f"\n{export_format.value}: {lines - header_lines} rows, "
+            f"{exported_bytes / 2**20:.0f} MiB streamed, "
+            f"RSS growth {(peak - baseline) / 2**20:.1f} MiB"
+        )
+        assert lines == rows + header_lines
+        # The body is several times the ceiling; only a stream fits under it
+        assert exported_bytes > 3 * ceiling
+        assert peak - baseline < ceiling
@@ -0,0 +1,522 @@
+"""
+Tests for atomic, first-expired-first-out stock allocation.
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import date, timedelta
+
+import pytest
+
+from sqlalchemy import delete, func, insert, select
+
+from app.models.blood_bank_model import BloodBank
+from app.models.distribution_model import BloodDistribution, DistributionAllocation
+from app.models.health_facility_model import Facility
+from app.models.inventory_model import BloodInventory
+from app.models.request_model import BloodRequest, DashboardDailySummary
+from app.models.user_model import User
+from app.schemas.distribution_schema import BloodDistributionUpdate, DistributionStatus
+from app.schemas.request_schema import RequestStatus
+from app.services.distribution_service import BloodDistributionService
+from app.services.inventory_allocator import InventoryAllocator
+
+TODAY = date.today()
+
+
+def expires_in(days: int) -> date:
+    return TODAY + timedelta(days=days)
+
+
+# A file database so every session gets its own connection, as in
+# production, and writers really contend
+pytestmark = pytest.mark.parametrize("engine", ["file"], indirect=True)
+
+
+async def seed_bank(session_factory, lots):
+    """One facility with one bank holding the given (quantity, expiry) lots"""
+    facility_id, bank_id, user_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    lot_ids = [uuid.uuid4() for _ in lots]
+    async with session_factory() as db:
+        await db.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "email": "lab@hospital.gh",
+                    "first_name": "Kojo",
+                    "last_name": "Boateng",
+                    "password": "hash",
+                    "work_facility_id": facility_id,
+                }
+            ],
+        )
+        await db.execute(
+            insert(Facility),
+            [
+                {
+                    "id": facility_id,
+                    "facility_name": "Tamale Teaching",
+                    "facility_email": "tth@hospital.gh",
+                    "facility_digital_address": "NT-123-4567",
+                }
+            ],
+        )
+        await db.execute(
+            insert(BloodBank),
+            [
+                {
+                    "id": bank_id,
+                    "facility_id": facility_id,
+                    "blood_bank_name": "TTH Bank",
+                    "phone": "0244000000",
+                    "email": "bank@hospital.gh",
+                }
+            ],
+        )
+        await db.execute(
+            insert(BloodInventory),
+            [
+                {
+                    "id": lot_id,
+                    "blood_bank_id": bank_id,
+                    "blood_product": "Whole Blood",
+                    "blood_type": "O+",
+                    "quantity": quantity,
+                    "expiry_date": expiry,
+                }
+                for lot_id, (quantity, expiry) in zip(lot_ids, lots)
+            ],
+        )
+        await db.commit()
+    return facility_id, bank_id, user_id, lot_ids
+
+
+async def lot_quantities(session_factory, lot_ids):
+    async with session_factory() as db:
+        rows = await db.execute(
+            select(BloodInventory.id, BloodInventory.quantity).where(
+                BloodInventory.id.in_(lot_ids)
+            )
+        )
+        return dict(rows.all())
+
+
+@pytest.mark.asyncio
+async def test_hundreds_of_parallel_issues_never_oversell_a_lot(session_factory):
+    _, bank_id, _, (lot_id,) = await seed_bank(session_factory, [(200, expires_in(30))])
+    allocator = InventoryAllocator()
+
+    async def issue():
+        async with session_factory() as db:
+            allocation = await allocator.allocate(db, bank_id, "Whole Blood", "O+", 1)
+            await db.commit()
+            return allocation
+
+    results = await asyncio.gather(*(issue() for _ in range(300)))
+    allocations = [a for a in results if a is not None]
+
+    assert len(allocations) == 200
+    # Every unit handed out once: remaining counts are 199..0, each seen once
+    assert all(len(a) == 1 for a in allocations)
+    assert sorted(a[0].remaining for a in allocations) == list(range(200))
+    assert await lot_quantities(session_factory, [lot_id]) == {lot_id: 0}
+
+    stats = allocator.get_stats()
+    assert stats["allocated"] == 200
+    assert stats["units_allocated"] == 200
+    assert stats["insufficient"] == 100
+
+
+@pytest.mark.asyncio
+async def test_contended_lot_falls_through_to_next_expiry(session_factory):
+    _, bank_id, _, (soon, later) = await seed_bank(
+        session_factory, [(9, expires_in(10)), (9, expires_in(60))]
+    )
+    allocator = InventoryAllocator()
+
+    async def issue():
+        async with session_factory() as db:
+            allocation = await allocator.allocate(db, bank_id, "Whole Blood", "O+", 3)
+            await db.commit()
+            return allocation
+
+    results = await asyncio.gather(*(issue() for _ in range(10)))
+    allocations = [a for a in results if a is not None]
+
+    assert len(allocations) == 6
+    by_lot = {soon: 0, later: 0}
+    for allocation in allocations:
+        for share in allocation:
+            by_lot[share.inventory_id] += share.quantity
+    assert by_lot == {soon: 9, later: 9}
+    assert await lot_quantities(session_factory, [soon, later]) == {
+        soon: 0,
+        later: 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_issue_releases_its_reservation(session_factory):
+    _, bank_id, _, (lot_id,) = await seed_bank(session_factory, [(5, expires_in(30))])
+    allocator = InventoryAllocator()
+
+    async with session_factory() as db:
+        assert await allocator.allocate(db, bank_id, "Whole Blood", "O+", 5)
+        await db.rollback()
+
+    assert await lot_quantities(session_factory, [lot_id]) == {lot_id: 5}
+
+    async with session_factory() as db:
+        assert await allocator.release(db, lot_id, 2) is True
+        assert await allocator.release(db, uuid.uuid4(), 2) is False
+        await db.commit()
+
+    assert await lot_quantities(session_factory, [lot_id]) == {lot_id: 7}
+
+
+@pytest.mark.asyncio
+async def test_parallel_create_distribution_deducts_each_unit_once(
+    session_factory, monkeypatch
+):
+    facility_id, bank_id, user_id, (lot_id,) = await seed_bank(
+        session_factory, [(20, expires_in(30))]
+    )
+    request_ids = [uuid.uuid4() for _ in range(30)]
+    async with session_factory() as db:
+        await db.execute(
+            insert(BloodRequest),
+            [
+                {
+                    "id": request_id,
+                    "request_group_id": uuid.uuid4(),
+                    "blood_type": "O+",
+                    "blood_product": "Whole Blood",
+                    "quantity_requested": 1,
+                    "request_status": RequestStatus.ACCEPTED,
+                    "requester_id": user_id,
+                    "facility_id": facility_id,
+                    "source_facility_id": facility_id,
+                }
+                for request_id in request_ids
+            ],
+        )
+        await db.commit()
+
+    allocator = InventoryAllocator()
+    monkeypatch.setattr(
+        "app.services.distribution_service.inventory_allocator", allocator
+    )
+
+    async def issue(request_id):
+        async with session_factory() as db:
+            await BloodDistributionService(db).create_distribution(
+                request_id=request_id, blood_bank_id=bank_id, created_by_id=user_id
+            )
+
+    await asyncio.gather(*(issue(request_id) for request_id in request_ids))
+
+    assert await lot_quantities(session_factory, [lot_id]) == {lot_id: 0}
+    assert allocator.get_stats()["units_allocated"] == 20
+    async with session_factory() as db:
+        distributions = (
+            await db.execute(select(func.count(BloodDistribution.id)))
+        ).scalar()
+        allocated = (
+            await db.execute(select(func.sum(DistributionAllocation.quantity)))
+        ).scalar()
+    assert distributions == 30
+    assert allocated == 20
+
+
+@pytest.mark.asyncio
+async def test_request_is_split_across_lots_earliest_expiry_first(session_factory):
+    _, bank_id, _, (expired, late, soon, empty, middle) = await seed_bank(
+        session_factory,
+        [
+            (50, TODAY - timedelta(days=1)),
+            (10, expires_in(40)),
+            (2, expires_in(5)),
+            (0, expires_in(1)),
+            (3, expires_in(20)),
+        ],
+    )
+    allocator = InventoryAllocator()
+
+    async with session_factory() as db:
+        allocations = await allocator.allocate(db, bank_id, "Whole Blood", "O+", 7)
+        await db.commit()
+
+    assert [(a.inventory_id, a.quantity) for a in allocations] == [
+        (soon, 2),
+        (middle, 3),
+        (late, 2),
+    ]
+    assert [a.expiry_date for a in allocations] == sorted(
+        a.expiry_date for a in allocations
+    )
+    assert await lot_quantities(
+        session_factory, [expired, late, soon, empty, middle]
+    ) == {expired: 50, late: 8, soon: 0, empty: 0, middle: 0}
+    assert allocator.get_stats()["lots_allocated"] == 3
+
+
+@pytest.mark.asyncio
+async def test_insufficient_unexpired_stock_reserves_nothing(session_factory):
+    _, bank_id, _, lot_ids = await seed_bank(
+        session_factory,
+        [(4, expires_in(3)), (3, expires_in(9)), (40, TODAY - timedelta(days=2))],
+    )
+    allocator = InventoryAllocator()
+
+    async with session_factory() as db:
+        assert await allocator.allocate(db, bank_id, "Whole Blood", "O+", 8) is None
+        await db.commit()
+
+    assert await lot_quantities(session_factory, lot_ids) == dict(
+        zip(lot_ids, [4, 3, 40])
+    )
+    assert allocator.get_stats()["insufficient"] == 1
+
+
+@pytest.mark.asyncio
+async def test_deleted_distribution_returns_units_to_each_lot(
+    session_factory, monkeypatch
+):
+    facility_id, bank_id, user_id, (soon, later) = await seed_bank(
+        session_factory, [(2, expires_in(7)), (5, expires_in(21))]
+    )
+    request_id = uuid.uuid4()
+    async with session_factory() as db:
+        await db.execute(
+            insert(BloodRequest),
+            [
+                {
+                    "id": request_id,
+                    "request_group_id": uuid.uuid4(),
+                    "blood_type": "O+",
+                    "blood_product": "Whole Blood",
+                    "quantity_requested": 4,
+                    "request_status": RequestStatus.ACCEPTED,
+                    "requester_id": user_id,
+                    "facility_id": facility_id,
+                    "source_facility_id": facility_id,
+                }
+            ],
+        )
+        await db.commit()
+
+    monkeypatch.setattr(
+        "app.services.distribution_service.inventory_allocator",
+        InventoryAllocator(),
+    )
+
+    async with session_factory() as db:
+        distribution = await BloodDistributionService(db).create_distribution(
+            request_id=request_id, blood_bank_id=bank_id, created_by_id=user_id
+        )
+
+    assert distribution.blood_product_id == soon
+    assert await lot_quantities(session_factory, [soon, later]) == {
+        soon: 0,
+        later: 3,
+    }
+    async with session_factory() as db:
+        shares = (
+            await db.execute(
+                select(
+                    DistributionAllocation.inventory_id,
+                    DistributionAllocation.quantity,
+                ).where(DistributionAllocation.distribution_id == distribution.id)
+            )
+        ).all()
+    assert sorted(shares, key=lambda s: s[1]) == [(soon, 2), (later, 2)]
+
+    async with session_factory() as db:
+        await BloodDistributionService(db).delete_distribution(distribution.id)
+
+    assert await lot_quantities(session_factory, [soon, later]) == {
+        soon: 2,
+        later: 5,
+    }
+
+
+@pytest.mark.asyncio
+async def test_deleting_an_unreserved_distribution_restores_nothing(
+    session_factory, monkeypatch
+):
+    facility_id, bank_id, user_id, (lot,) = await seed_bank(
+        session_factory, [(2, expires_in(7))]
+    )
+    request_id = uuid.uuid4()
+    async with session_factory() as db:
+        await db.execute(
+            insert(BloodRequest),
+            [
+                {
+                    "id": request_id,
+                    "request_group_id": uuid.uuid4(),
+                    "blood_type": "O+",
+                    "blood_product": "Whole Blood",
+                    "quantity_requested": 4,
+                    "request_status": RequestStatus.ACCEPTED,
+                    "requester_id": user_id,
+                    "facility_id": facility_id,
+                    "source_facility_id": facility_id,
+                }
+            ],
+        )
+        await db.commit()
+
+    monkeypatch.setattr(
+        "app.services.distribution_service.inventory_allocator",
+        InventoryAllocator(),
+    )
+
+    # Too little stock: the distribution is recorded but reserves nothing
+    async with session_factory() as db:
+        distribution = await BloodDistributionService(db).create_distribution(
+            request_id=request_id, blood_bank_id=bank_id, created_by_id=user_id
+        )
+    assert distribution.blood_product_id == lot
+    assert await lot_quantities(session_factory, [lot]) == {lot: 2}
+
+    async with session_factory() as db:
+        await BloodDistributionService(db).delete_distribution(distribution.id)
+
+    # Not mistaken for a legacy distribution and restocked with 4 units
+    assert await lot_quantities(session_factory, [lot]) == {lot: 2}
+
+
+async def return_distribution(session_factory, distribution_id):
+    """Dispatch a distribution, then mark it returned"""
+    for status in (DistributionStatus.IN_TRANSIT, DistributionStatus.RETURNED):
+        async with session_factory() as db:
+            await BloodDistributionService(db).update_distribution(
+                distribution_id, BloodDistributionUpdate(status=status)
+            )
+
+
+async def bank_stock(session_factory, bank_id):
+    """Units per lot at a bank, and the dashboard's running stock total"""
+    async with session_factory() as db:
+        lots = (
+            await db.execute(
+                select(BloodInventory.quantity).where(
+                    BloodInventory.blood_bank_id == bank_id
+                )
+            )
+        ).scalars()
+        dashboard = (
+            await db.execute(select(func.sum(DashboardDailySummary.total_stock)))
+        ).scalar()
+        return sorted(lots), dashboard or 0
+
+
+@pytest.mark.asyncio
+async def test_returned_distribution_restocks_only_reserved_units(
+    session_factory, monkeypatch
+):
+    facility_id, bank_id, user_id, (soon, later) = await seed_bank(
+        session_factory, [(2, expires_in(7)), (5, expires_in(21))]
+    )
+    reserved_id, unreserved_id = uuid.uuid4(), uuid.uuid4()
+    async with session_factory() as db:
+        await db.execute(
+            insert(BloodRequest),
+            [
+                {
+                    "id": request_id,
+                    "request_group_id": uuid.uuid4(),
+                    "blood_type": "O+",
+                    "blood_product": "Whole Blood",
+                    "quantity_requested": quantity,
+                    "request_status": RequestStatus.ACCEPTED,
+                    "requester_id": user_id,
+                    "facility_id": facility_id,
+                    "source_facility_id": facility_id,
+                }
+                for request_id, quantity in ((reserved_id, 4), (unreserved_id, 9))
+            ],
+        )
+        await db.commit()
+
+    monkeypatch.setattr(
+        "app.services.distribution_service.inventory_allocator",
+        InventoryAllocator(),
+    )
+
+    async with session_factory() as db:
+        reserved = await BloodDistributionService(db).create_distribution(
+            request_id=reserved_id, blood_bank_id=bank_id, created_by_id=user_id
+        )
+    async with session_factory() as db:
+        # Only 3 units left: recorded against a lot, but nothing reserved
+        unreserved = await BloodDistributionService(db).create_distribution(
+            request_id=unreserved_id, blood_bank_id=bank_id, created_by_id=user_id
+        )
+    assert unreserved.blood_product_id is not None
+    assert await bank_stock(session_factory, bank_id) == ([0, 3], -4)
+
+    await return_distribution(session_factory, unreserved.id)
+
+    # Not restocked with 9 units conjured from nowhere
+    assert await bank_stock(session_factory, bank_id) == ([0, 3], -4)
+
+    # The later lot goes away while its 2 units are out
+    async with session_factory() as db:
+        await db.execute(delete(BloodInventory).where(BloodInventory.id == later))
+        await db.commit()
+
+    await return_distribution(session_factory, reserved.id)
+
+    # 2 units back on the surviving lot, 2 on a new lot for the deleted one
+    assert await lot_quantities(session_factory, [soon, later]) == {soon: 2}
+    assert await bank_stock(session_factory, bank_id) == ([2, 2], 0)
+    async with session_factory() as db:
+        recreated = (
+            await db.execute(
+                select(BloodInventory.expiry_date).where(
+                    BloodInventory.blood_bank_id == bank_id,
+                    BloodInventory.id != soon,
+                )
+            )
+        ).scalar_one()
+    # Keeps the deleted lot's own expiry, not the distribution's earliest one
+    assert recreated == expires_in(21)
+
+    # Marking it returned again restocks nothing further
+    async with session_factory() as db:
+        await BloodDistributionService(db).update_distribution(
+            reserved.id,
+            BloodDistributionUpdate(status=DistributionStatus.RETURNED),
+        )
+    assert await bank_stock(session_factory, bank_id) == ([2, 2], 0)
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_picking_cost_does_not_grow_with_lot_count(session_factory):
+    # Thousands of single-unit lots, the shape of a bank after many returns
+    _, bank_id, _, _ = await seed_bank(
+        session_factory, [(1, expires_in(1 + i % 90)) for i in range(5000)]
+    )
+    allocator = InventoryAllocator()
+
+    start = time.perf_counter()
+    async with session_factory() as db:
+        for _ in range(100):
+            allocations = await allocator.allocate(db, bank_id, "Whole Blood", "O+", 5)
+            assert len(allocations) == 5
+        await db.commit()
+    elapsed = time.perf_counter() - start
+
+    stats = allocator.get_stats()
+    print(
+        f"\n100 five-lot allocations over 5000 lots: {elapsed * 1000:.1f}ms, "
+        f"avg pick {stats['avg_pick_ms']}ms"
+    )
+    assert stats["lots_allocated"] == 500
+    assert stats["avg_pick_ms"] < 50
@@ -0,0 +1,166 @@
+"""
+Tests for the SQL-compiled advanced blood unit search.
+"""
+
+import uuid
+from datetime import date, timedelta
+
+import pytest
+
+from sqlalchemy import event, insert
+
+from app.models.blood_bank_model import BloodBank
+from app.models.health_facility_model import Facility
+from app.models.inventory_model import BloodInventory
+from app.schemas.inventory_schema import BloodInventorySearchParams
+from app.services.inventory_service import BloodInventoryService
+from app.utils.pagination import PaginationParams
+
+EXPIRY = date(2026, 5, 1)
+TYPES = ["O+", "O-", "A+", "B+"]
+PRODUCTS = ["Whole Blood", "Platelets", "Fresh Frozen Plasma"]
+
+
+async def seed_inventory(session_factory):
+    """Two banks, every product/type combination, quantities 1-5"""
+    facility_id = uuid.uuid4()
+    bank_ids = [uuid.uuid4(), uuid.uuid4()]
+    rows = [
+        {
+            "blood_bank_id": bank_id,
+            "blood_product": product,
+            "blood_type": blood_type,
+            "quantity": quantity,
+            "expiry_date": EXPIRY + timedelta(days=quantity),
+        }
+        for bank_id in bank_ids
+        for product in PRODUCTS
+        for blood_type in TYPES
+        for quantity in range(1, 6)
+    ]
+    async with session_factory() as db:
+        await db.execute(
+            insert(Facility),
+            [
+                {
+                    "id": facility_id,
+                    "facility_name": "Komfo Anokye",
+                    "facility_email": "kath@hospital.gh",
+                    "facility_digital_address": "AK-123-4567",
+                }
+            ],
+        )
+        await db.execute(
+            insert(BloodBank),
+            [
+                {
+                    "id": bank_id,
+                    "facility_id": facility_id,
+                    "blood_bank_name": f"Bank {i}",
+                    "phone": "0244000000",
+                    "email": f"bank{i}@hospital.gh",
+                }
+                for i, bank_id in enumerate(bank_ids)
+            ],
+        )
+        await db.execute(insert(BloodInventory), rows)
+        await db.commit()
+    return bank_ids, rows
+
+
+def matches(row, params: BloodInventorySearchParams) -> bool:
+    return (
+        (not params.blood_types or row["blood_type"] in params.blood_types)
+        and (not params.blood_products or row["blood_product"] in params.blood_products)
+        and (not params.blood_bank_ids or row["blood_bank_id"] in params.blood_bank_ids)
+        and (params.min_quantity is None or row["quantity"] >= params.min_quantity)
+        and (params.max_quantity is None or row["quantity"] <= params.max_quantity)
+        and (
+            params.expiry_date_from is None
+            or row["expiry_date"] >= params.expiry_date_from
+        )
+        and (params.expiry_date_to is None or row["expiry_date"] <= params.expiry_date_to)
+    )
+
+
+@pytest.mark.asyncio
+async def test_multi_value_filters_paginate_over_full_result(session_factory):
+    bank_ids, rows = await seed_inventory(session_factory)
+    params = BloodInventorySearchParams(
+        blood_types=["O+", "O-", "A+"],
+        blood_products=["Whole Blood", "Platelets"],
+        blood_bank_ids=[bank_ids[0]],
+        min_quantity=2,
+        max_quantity=4,
+        expiry_date_to=EXPIRY + timedelta(days=3),
+    )
+    expected = [row for row in rows if matches(row, params)]
+    assert len(expected) == 12
+
+    async with session_factory() as db:
+        service = BloodInventoryService(db)
+        found = []
+        for page_number in (1, 2, 3):
+            page = await service.search_blood_units(
+                params, PaginationParams(page=page_number, page_size=5)
+            )
+            assert page.total_items == 12
+            assert page.total_pages == 3
+            found += page.items
+
+    assert [len(found[:5]), len(found[5:10]), len(found[10:])] == [5, 5, 2]
+    assert len({unit.id for unit in found}) == 12
+    for unit in found:
+        assert unit.blood_type in params.blood_types
+        assert unit.blood_product in params.blood_products
+        assert unit.blood_bank_id == bank_ids[0]
+        assert 2 <= unit.quantity <= 3
+
+
+@pytest.mark.asyncio
+async def test_product_type_search_uses_composite_index(engine, session_factory):
+    bank_ids, _ = await seed_inventory(session_factory)
+
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "FROM blood_inventory" in statement:
+            statements.append((statement, parameters))
+
+    async with session_factory() as db:
+        service = BloodInventoryService(db)
+        for params in (
+            BloodInventorySearchParams(
+                blood_types=["O+", "A+"], blood_products=["Whole Blood", "Platelets"]
+            ),
+            BloodInventorySearchParams(
+                blood_types=["O-"],
+                blood_products=["Platelets"],
+                blood_bank_ids=bank_ids,
+            ),
+        ):
+            await service.search_blood_units(params, PaginationParams(page_size=5))
+
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    # Count and page query for each search
+    assert len(statements) == 4
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = (
+                await conn.exec_driver_sql(
+                    "EXPLAIN QUERY PLAN " + statement, parameters
+                )
+            ).all()
+            inventory_steps = [
+                row[-1] for row in plan if "blood_inventory" in row[-1]
+            ]
+            assert inventory_steps, plan
+            # With bank ids as well, the FEFO index seeks equally well
+            assert all(
+                "USING INDEX idx_inventory_product_type_bank" in step
+                or "USING INDEX idx_inventory_fefo (blood_bank_id=? AND "
+                "blood_product=? AND blood_type=?)" in step
+                for step in inventory_steps
+            ), inventory_steps
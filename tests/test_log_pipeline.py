@@ -0,0 +1,147 @@
+"""
+Tests for the queued logging pipeline: bounded queue, sampling and batched
+flushes on the listener thread.
+"""
+
+import io
+import json
+import logging
+import queue
+import threading
+import time
+
+import pytest
+
+from app.utils.logging_config import (
+    BatchedStreamHandler,
+    BatchingQueueListener,
+    BoundedQueueHandler,
+    ContextualJsonFormatter,
+    EventSampler,
+    LogContext,
+    parse_sample_rates,
+)
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+        super().flush()
+
+
+class SlowHandler(logging.Handler):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.threads.add(threading.get_ident())
+        self.records.append(self.format(record))
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(f"tests.log_pipeline.{name}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+
+def test_records_are_formatted_off_the_calling_thread_with_context():
+    log_queue = queue.Queue(maxsize=100)
+    slow = SlowHandler(delay=0.02)
+    slow.setFormatter(ContextualJsonFormatter("%(levelname)s %(name)s %(message)s"))
+    listener = BatchingQueueListener(log_queue, slow)
+    logger = make_logger("context", BoundedQueueHandler(log_queue))
+
+    listener.start()
+    try:
+        start = time.perf_counter()
+        with LogContext(req_id="req-1", usr_id="user-1"):
+            for i in range(10):
+                logger.info("unit %s issued", i, extra={"event_type": "issue"})
+        elapsed = time.perf_counter() - start
+    finally:
+        listener.stop()
+
+    # Ten 20ms emits ran on the listener thread, not in the caller
+    assert elapsed < 0.1
+    assert threading.get_ident() not in slow.threads
+
+    records = [json.loads(line) for line in slow.records]
+    assert [r["message"] for r in records] == [f"unit {i} issued" for i in range(10)]
+    assert {r["request_id"] for r in records} == {"req-1"}
+    assert {r["user_id"] for r in records} == {"user-1"}
+
+
+def test_full_queue_drop_and_block_policies():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=2), full_policy="drop")
+    logger = make_logger("drop", handler)
+    for i in range(5):
+        logger.warning("record %s", i)
+    assert (handler.enqueued, handler.dropped) == (2, 3)
+
+    handler = BoundedQueueHandler(
+        queue.Queue(maxsize=1), full_policy="block", block_timeout=0.05
+    )
+    logger = make_logger("block", handler)
+    logger.warning("fits")
+    start = time.perf_counter()
+    logger.warning("waits, then is dropped")
+    assert time.perf_counter() - start >= 0.05
+    assert (handler.enqueued, handler.dropped) == (1, 1)
+
+    with pytest.raises(ValueError):
+        BoundedQueueHandler(queue.Queue(), full_policy="spill")
+
+
+def test_sampler_keeps_one_in_n_of_sampled_events():
+    sampler = EventSampler(parse_sample_rates("access_granted=0.1, noisy=0"))
+    assert sampler.rates == {"access_granted": 0.1, "noisy": 0.0}
+
+    stream, other = io.StringIO(), io.StringIO()
+    handlers = [logging.StreamHandler(stream), logging.StreamHandler(other)]
+    for handler in handlers:
+        handler.addFilter(sampler)
+    logger = make_logger("sampling", handlers[0])
+    logger.addHandler(handlers[1])
+
+    for i in range(100):
+        logger.info("granted", extra={"event_type": "access_granted"})
+    for i in range(5):
+        logger.info("noise", extra={"extra_fields": {"event_type": "noisy"}})
+    logger.warning("denied", extra={"event_type": "access_granted"})
+    logger.info("login", extra={"event_type": "user_login"})
+
+    lines = stream.getvalue().splitlines()
+    assert lines.count("granted") == 10
+    assert "noise" not in lines
+    assert lines[-2:] == ["denied", "login"]
+    # Both handlers saw the same sample
+    assert other.getvalue() == stream.getvalue()
+    assert sampler.sampled_out == 95
+
+
+def test_listener_flushes_once_per_batch():
+    log_queue = queue.Queue()
+    stream = CountingStream()
+    handler = BatchedStreamHandler(stream)
+    handler.defer_flush = True
+    logger = make_logger("batches", BoundedQueueHandler(log_queue))
+
+    for i in range(1000):
+        logger.info("record %s", i)
+    listener = BatchingQueueListener(log_queue, handler, batch_size=256)
+    listener.start()
+    listener.stop()
+
+    assert len(stream.getvalue().splitlines()) == 1000
+    # 1000 records (plus the stop sentinel) in batches of up to 256
+    assert stream.flushes == 4
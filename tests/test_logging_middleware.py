@@ -0,0 +1,243 @@
+"""
+Tests for the pure-ASGI request logging middleware.
+"""
+
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.middlewares.logging_middleware import LoggingMiddleware
+from app.utils import logging_config
+from app.utils.auth_context import AuthContext, set_auth_context
+from app.utils.security import TokenManager
+
+USER_ID = uuid.uuid4()
+SESSION_ID = uuid.uuid4()
+
+
+class RecordingHandler(logging.Handler):
+    """Keeps records with the logging context bound when they were written"""
+
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(
+            (
+                record,
+                logging_config.request_id.get(),
+                logging_config.user_id.get(),
+            )
+        )
+
+
+@contextmanager
+def capture(*names):
+    handler = RecordingHandler()
+    loggers = [logging.getLogger(name) for name in names]
+    levels = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    try:
+        yield handler.records
+    finally:
+        for logger, level in zip(loggers, levels):
+            logger.removeHandler(handler)
+            logger.setLevel(level)
+
+
+async def fake_current_user(request: Request):
+    set_auth_context(request, AuthContext(user_id=USER_ID, session_id=SESSION_ID))
+    return USER_ID
+
+
+def make_app(middleware=LoggingMiddleware):
+    app = FastAPI()
+    app.add_middleware(middleware)
+
+    @app.get("/api/me")
+    async def me(request: Request, user_id=Depends(fake_current_user)):
+        logging.getLogger("tests.handler").info("inside handler")
+        return {"user_id": str(user_id), "request_id": request.state.request_id}
+
+    @app.get("/api/public")
+    async def public():
+        return {"ok": True}
+
+    return app
+
+
+async def request(app, path, headers=None):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, headers=headers or {})
+
+
+def access_fields(records):
+    return [
+        record.extra_fields
+        for record, _, _ in records
+        if record.name == "access"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_access_record_uses_auth_context_without_decoding(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("the logging middleware must not decode tokens")
+
+    monkeypatch.setattr(TokenManager, "decode_token", fail)
+
+    with capture("access", "tests.handler") as records:
+        response = await request(
+            make_app(),
+            "/api/me?page=2",
+            headers={"Authorization": "Bearer abc.def.ghi", "x-forwarded-for": "41.66.1.2"},
+        )
+        await request(make_app(), "/api/public")
+
+    assert response.status_code == 200
+
+    [me, public] = access_fields(records)
+    assert me["user_id"] == str(USER_ID)
+    assert me["session_id"] == str(SESSION_ID)
+    assert me["status_code"] == 200
+    assert me["query_params"] == {"page": "2"}
+    assert me["ip_address"] == "41.66.1.2"
+    assert me["response_bytes"] == len(response.content)
+    assert me["action"] == "request_completed"
+    assert "user_id" not in public
+
+    # Records written inside the handler carry the request and user ids
+    [(_, request_id, user_id)] = [r for r in records if r[0].name == "tests.handler"]
+    assert request_id == response.json()["request_id"]
+    assert user_id == str(USER_ID)
+
+
+@pytest.mark.asyncio
+async def test_streaming_responses_pass_through_chunk_by_chunk():
+    sent = []
+
+    async def events():
+        for i in range(3):
+            # Every earlier chunk has already reached the client's send()
+            assert len(sent) == i
+            yield f"data: {i}\n\n".encode()
+
+    app = FastAPI()
+    app.add_middleware(LoggingMiddleware)
+
+    @app.get("/api/stream")
+    async def stream():
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    messages = iter([{"type": "http.request", "body": b""}])
+
+    async def receive():
+        return next(messages, {"type": "http.disconnect"})
+
+    async def send(message):
+        if message["type"] == "http.response.body" and message.get("body"):
+            sent.append(message["body"])
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/stream",
+        "raw_path": b"/api/stream",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 5000),
+        "server": ("test", 80),
+    }
+    with capture("access") as records:
+        await app(scope, receive, send)
+
+    assert sent == [b"data: 0\n\n", b"data: 1\n\n", b"data: 2\n\n"]
+    [fields] = access_fields(records)
+    assert fields["response_bytes"] == sum(map(len, sent))
+    assert fields["ip_address"] == "127.0.0.1"
+
+
+@pytest.mark.asyncio
+async def test_unhandled_errors_are_logged_and_reraised():
+    async def broken_app(scope, receive, send):
+        raise RuntimeError("boom")
+
+    middleware = LoggingMiddleware(broken_app)
+    scope = {"type": "http", "method": "POST", "path": "/api/x", "headers": []}
+    with capture("app.middlewares.logging_middleware") as records:
+        with pytest.raises(RuntimeError):
+            await middleware(scope, None, None)
+
+    [(record, _, _)] = records
+    assert record.extra_fields["action"] == "request_failed"
+    assert record.extra_fields["error_type"] == "RuntimeError"
+
+
+class LegacyLoggingMiddleware(BaseHTTPMiddleware):
+    """The previous stack: BaseHTTPMiddleware that decodes the JWT per request"""
+
+    async def dispatch(self, request, call_next):
+        user_id = None
+        auth_header = request.headers.get("authorization")
+        if auth_header and auth_header.startswith("Bearer "):
+            try:
+                payload = TokenManager.decode_token(auth_header.split(" ")[1])
+                user_id = payload.get("sub")
+            except Exception:
+                pass
+
+        request.state.request_id = str(uuid.uuid4())
+        with logging_config.LogContext(req_id=request.state.request_id, usr_id=user_id):
+            start_time = time.time()
+            logging.getLogger(__name__).info("Incoming request")
+            response = await call_next(request)
+            logging_config.log_api_access(
+                method=request.method,
+                path=request.url.path,
+                status_code=response.status_code,
+                response_time=time.time() - start_time,
+                user_id=user_id,
+            )
+            return response
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_pure_asgi_middleware_serves_more_requests_per_second():
+    requests = 2000
+    token = TokenManager.create_access_token({"sub": str(USER_ID)})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def requests_per_second(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for _ in range(50):
+                await client.get("/api/me", headers=headers)
+            start = time.perf_counter()
+            for _ in range(requests):
+                response = await client.get("/api/me", headers=headers)
+                assert response.status_code == 200
+            return requests / (time.perf_counter() - start)
+
+    # Both stacks write their access records to the same in-memory handler
+    with capture("access"):
+        legacy = await requests_per_second(make_app(LegacyLoggingMiddleware))
+        current = await requests_per_second(make_app(LoggingMiddleware))
+
+    print(f"\nreq/s: BaseHTTPMiddleware {legacy:.0f}, pure ASGI {current:.0f}")
+    assert current > legacy
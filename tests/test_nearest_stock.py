@@ -0,0 +1,227 @@
+"""
+Tests for the distance-ranked nearest facility stock search, plus a benchmark
+at 10k facilities.
+"""
+
+import random
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+from math import asin, atan2, cos, degrees, radians, sin
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+
+from app.models.blood_bank_model import BloodBank
+from app.models.health_facility_model import Facility
+from app.models.inventory_model import BloodInventory
+from app.services.inventory_service import BloodInventoryService
+from app.utils.geo import bounding_box, haversine_km
+
+ACCRA = (5.6037, -0.1870)
+KUMASI = (6.6885, -1.6244)
+FRESH = date.today() + timedelta(days=30)
+
+
+async def seed(session_factory, sites):
+    """sites: (latitude, longitude, [(blood_type, product, quantity, expiry)])"""
+    facilities, banks, inventory = [], [], []
+    for i, (latitude, longitude, units) in enumerate(sites):
+        facility_id, bank_id = uuid.uuid4(), uuid.uuid4()
+        facilities.append(
+            {
+                "id": facility_id,
+                "facility_name": f"Facility {i}",
+                "facility_email": f"facility{i}@hospital.gh",
+                "facility_digital_address": "GA-123-4567",
+                "latitude": latitude,
+                "longitude": longitude,
+            }
+        )
+        banks.append(
+            {
+                "id": bank_id,
+                "facility_id": facility_id,
+                "blood_bank_name": f"Bank {i}",
+                "phone": "0244000000",
+                "email": f"bank{i}@hospital.gh",
+            }
+        )
+        inventory += [
+            {
+                "blood_bank_id": bank_id,
+                "blood_type": blood_type,
+                "blood_product": product,
+                "quantity": quantity,
+                "expiry_date": expiry,
+            }
+            for blood_type, product, quantity, expiry in units
+        ]
+    async with session_factory() as db:
+        await db.execute(insert(Facility), facilities)
+        await db.execute(insert(BloodBank), banks)
+        if inventory:
+            await db.execute(insert(BloodInventory), inventory)
+        await db.commit()
+    return [bank["id"] for bank in banks]
+
+
+def o_negative(quantity, expiry=FRESH):
+    return ("O-", "Red Blood Cells", quantity, expiry)
+
+
+def test_haversine_and_bounding_box():
+    assert haversine_km(*ACCRA, *KUMASI) == pytest.approx(200, abs=5)
+    assert haversine_km(*ACCRA, *ACCRA) == 0
+
+    for origin in (ACCRA, (60.0, 10.0), (-45.0, 170.0)):
+        box = bounding_box(*origin, 100)
+        for bearing in range(0, 360, 5):
+            # Walk ~99.9 km along each bearing and check the point is inside
+            lat, lng = origin
+            d = 99.9 / 6371.0088
+            b = radians(bearing)
+            phi = radians(lat)
+            phi2 = asin(sin(phi) * cos(d) + cos(phi) * sin(d) * cos(b))
+            lng2 = lng + degrees(
+                atan2(sin(b) * sin(d) * cos(phi), cos(d) - sin(phi) * sin(phi2))
+            )
+            point = (degrees(phi2), lng2)
+            assert haversine_km(*origin, *point) == pytest.approx(99.9, abs=0.01)
+            assert box.min_lat <= point[0] <= box.max_lat
+            if box.lng_range:
+                assert box.lng_range[0] <= point[1] <= box.lng_range[1]
+
+    # Near the antimeridian the longitude bound is dropped rather than wrapped
+    assert bounding_box(0.0, 179.9, 50).lng_range is None
+
+
+@pytest.mark.asyncio
+async def test_nearest_facilities_are_ranked_and_filtered(session_factory):
+    sites = [
+        (5.61, -0.19, [o_negative(2)]),  # ~1 km, too little stock
+        (5.62, -0.20, [o_negative(3), o_negative(3)]),  # ~2 km, 6 units
+        (5.70, -0.25, [o_negative(8, expiry=date.today() - timedelta(days=1))]),
+        (5.80, -0.30, [("O-", "Whole Blood", 9, FRESH)]),  # wrong product
+        (6.00, -0.50, [o_negative(5)]),  # ~56 km
+        (KUMASI[0], KUMASI[1], [o_negative(20)]),  # ~200 km
+        (None, None, [o_negative(50)]),  # no coordinates
+        (5.603, -0.187, [o_negative(40)]),  # the caller's own bank
+    ]
+    bank_ids = await seed(session_factory, sites)
+
+    async with session_factory() as db:
+        service = BloodInventoryService(db)
+        nearest = await service.find_nearest_facilities_with_stock(
+            *ACCRA,
+            blood_type="O-",
+            blood_product="Red Blood Cells",
+            min_units=5,
+            exclude_blood_bank_id=bank_ids[-1],
+        )
+        capped = await service.find_nearest_facilities_with_stock(
+            *ACCRA,
+            blood_type="O-",
+            blood_product="Red Blood Cells",
+            min_units=5,
+            max_radius_km=100,
+            exclude_blood_bank_id=bank_ids[-1],
+        )
+        top_one = await service.find_nearest_facilities_with_stock(
+            *ACCRA,
+            blood_type="O-",
+            blood_product="Red Blood Cells",
+            limit=1,
+        )
+        # Products are accepted in any case and matched on the stored name
+        lowercase = await service.find_nearest_facilities_with_stock(
+            *ACCRA,
+            blood_type="O-",
+            blood_product="red blood cells",
+            min_units=5,
+            exclude_blood_bank_id=bank_ids[-1],
+        )
+        with pytest.raises(HTTPException) as invalid:
+            await service.find_nearest_facilities_with_stock(
+                *ACCRA, blood_type="Z+", blood_product="Red Blood Cells"
+            )
+
+    assert [f.facility_name for f in nearest] == ["Facility 1", "Facility 4", "Facility 5"]
+    assert [f.available_quantity for f in nearest] == [6, 5, 20]
+    assert nearest[0].distance_km == pytest.approx(
+        haversine_km(*ACCRA, 5.62, -0.20), abs=0.001
+    )
+    assert nearest == sorted(nearest, key=lambda f: f.distance_km)
+    assert [f.facility_name for f in capped] == ["Facility 1", "Facility 4"]
+    assert [f.facility_name for f in top_one] == ["Facility 7"]
+    assert lowercase == nearest
+    assert invalid.value.status_code == 422
+
+
+def ghana_sites(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        (
+            rng.uniform(4.7, 11.1),
+            rng.uniform(-3.2, 1.1),
+            [
+                o_negative(rng.randint(0, 12)),
+                ("A+", "Whole Blood", rng.randint(1, 12), FRESH),
+            ],
+        )
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ring_search_matches_brute_force(session_factory):
+    sites = ghana_sites(600)
+    await seed(session_factory, sites)
+    async with session_factory() as db:
+        service = BloodInventoryService(db)
+        for origin in (ACCRA, KUMASI, (10.0, -2.5)):
+            found = await service.find_nearest_facilities_with_stock(
+                *origin,
+                blood_type="O-",
+                blood_product="Red Blood Cells",
+                min_units=6,
+                limit=8,
+            )
+            expected = sorted(
+                haversine_km(*origin, lat, lng)
+                for lat, lng, units in sites
+                if units[0][2] >= 6 and haversine_km(*origin, lat, lng) <= 800
+            )[:8]
+            assert [f.distance_km for f in found] == pytest.approx(expected, abs=0.001)
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_nearest_search_at_10k_facilities(session_factory):
+    await seed(session_factory, ghana_sites(10_000))
+    rng = random.Random(11)
+    timings = []
+    async with session_factory() as db:
+        service = BloodInventoryService(db)
+        for _ in range(30):
+            origin = (rng.uniform(5.0, 10.5), rng.uniform(-2.8, 0.8))
+            start = time.perf_counter()
+            found = await service.find_nearest_facilities_with_stock(
+                *origin,
+                blood_type="O-",
+                blood_product="Red Blood Cells",
+                min_units=4,
+                limit=10,
+            )
+            timings.append(time.perf_counter() - start)
+            assert len(found) == 10
+
+    median = statistics.median(timings)
+    print(
+        f"\nnearest stock at 10k facilities: median {median * 1000:.1f}ms, "
+        f"max {max(timings) * 1000:.1f}ms"
+    )
+    assert median < 0.020
@@ -0,0 +1,200 @@
+"""
+Tests for the facility notification pipeline: one recipient query, one bulk
+insert, and SSE pushes handed to the background dispatcher.
+"""
+
+import asyncio
+import time
+import uuid
+
+import pytest
+from sqlalchemy import event, insert, select
+
+from app.models.health_facility_model import Facility
+from app.models.notification_model import Notification
+from app.models.user_model import User
+from app.services import notification_dispatcher as dispatcher_module
+from app.services.notification_dispatcher import NotificationDispatcher
+from app.services.notification_sse import ConnectionManager
+from app.services.sse_broker import InMemoryBroker
+from app.utils import notification_util
+from app.utils.notification_util import notify_facility
+
+
+class SlowBroker(InMemoryBroker):
+    """In-memory broker with a fixed publish latency, like a remote broker"""
+
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    async def publish(self, event):
+        await asyncio.sleep(self.delay)
+        return await super().publish(event)
+
+
+def user_row(facility_id=None, is_active=True):
+    return {
+        "id": uuid.uuid4(),
+        "email": f"user_{uuid.uuid4().hex[:8]}@hospital.gh",
+        "first_name": "Ama",
+        "last_name": "Mensah",
+        "password": "hash",
+        "is_active": is_active,
+        "work_facility_id": facility_id,
+    }
+
+
+async def seed_facility(session_factory, staff_count: int):
+    facility_id = uuid.uuid4()
+    manager_row = user_row()
+    staff = [user_row(facility_id) for _ in range(staff_count)]
+    inactive = user_row(facility_id, is_active=False)
+    async with session_factory() as db:
+        await db.execute(insert(User), [manager_row, inactive, *staff])
+        await db.execute(
+            insert(Facility),
+            [
+                {
+                    "id": facility_id,
+                    "facility_name": "Korle Bu",
+                    "facility_email": "kb@hospital.gh",
+                    "facility_digital_address": "GA-123-4567",
+                    "facility_manager_id": manager_row["id"],
+                }
+            ],
+        )
+        await db.commit()
+    recipients = {str(manager_row["id"])} | {str(u["id"]) for u in staff}
+    return facility_id, recipients
+
+
+def use_manager(monkeypatch, connection_manager, dispatcher):
+    monkeypatch.setattr(notification_util, "manager", connection_manager)
+    monkeypatch.setattr(notification_util, "notification_dispatcher", dispatcher)
+
+
+@pytest.mark.asyncio
+async def test_recipients_and_rows_use_one_select_and_one_insert(
+    monkeypatch, engine, session_factory
+):
+    facility_id, recipients = await seed_facility(session_factory, 5)
+
+    connection_manager = ConnectionManager()
+    use_manager(monkeypatch, connection_manager, NotificationDispatcher())
+    queues = {
+        user_id: await connection_manager.add_sse_connection(user_id)
+        for user_id in recipients
+    }
+
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.lstrip().split()[0].upper())
+
+    async with session_factory() as db:
+        await notify_facility(
+            db, [facility_id], "Stock low", "O- below threshold",
+            extra_data={"type": "stock_alert"},
+        )
+
+    assert statements == ["SELECT", "INSERT"]
+
+    async with session_factory() as db:
+        rows = (await db.execute(select(Notification))).scalars().all()
+    assert {str(row.user_id) for row in rows} == recipients
+    assert all(row.is_read is False for row in rows)
+
+    for queue in queues.values():
+        message = queue.get_nowait()
+        assert message["title"] == "Stock low"
+        assert message["type"] == "stock_alert"
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_returns_before_fan_out_completes(
+    monkeypatch, session_factory
+):
+    facility_id, recipients = await seed_facility(session_factory, 3)
+
+    connection_manager = ConnectionManager(SlowBroker(delay=0.2))
+    dispatcher = NotificationDispatcher(connection_manager=connection_manager)
+    use_manager(monkeypatch, connection_manager, dispatcher)
+    user_id = next(iter(recipients))
+    queue = await connection_manager.add_sse_connection(user_id)
+
+    dispatcher.start()
+    start_time = time.perf_counter()
+    async with session_factory() as db:
+        await notify_facility(db, [facility_id], "Shipment", "In transit")
+    elapsed = time.perf_counter() - start_time
+
+    assert elapsed < 0.2
+    assert queue.empty()
+
+    await dispatcher.stop()
+    assert queue.get_nowait()["title"] == "Shipment"
+    assert dispatcher.get_stats()["published"] == 1
+
+
+@pytest.mark.asyncio
+async def test_full_dispatch_queue_falls_back_to_inline_publish(monkeypatch):
+    connection_manager = ConnectionManager()
+    dispatcher = NotificationDispatcher(
+        max_queue=1, connection_manager=connection_manager
+    )
+    use_manager(monkeypatch, connection_manager, dispatcher)
+    queue = await connection_manager.add_sse_connection("u1")
+
+    assert dispatcher.submit(["u1"], {"n": 0}) is False
+
+    dispatcher.start()
+    assert dispatcher.submit(["u1"], {"n": 1}) is True
+    await notification_util.push_to_users(["u1"], {"n": 2})
+
+    # The second push was published inline, ahead of the queued one
+    assert queue.get_nowait() == {"n": 2}
+    await dispatcher.stop()
+    assert queue.get_nowait() == {"n": 1}
+    assert dispatcher.get_stats()["rejected"] == 1
+
+
+def test_global_dispatcher_uses_global_manager():
+    assert dispatcher_module.notification_dispatcher._manager is notification_util.manager
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_notify_facility_p99_benchmark(monkeypatch, session_factory):
+    """Request-path latency of notify_facility with inline vs background push"""
+
+    async def measure(session_factory, facility_id, runs=50):
+        latencies = []
+        for _ in range(runs):
+            start_time = time.perf_counter()
+            async with session_factory() as db:
+                await notify_facility(db, [facility_id], "Request", "New request")
+            latencies.append(time.perf_counter() - start_time)
+        latencies.sort()
+        return latencies[int(len(latencies) * 0.99) - 1]
+
+    facility_id, _ = await seed_facility(session_factory, 200)
+
+    connection_manager = ConnectionManager(SlowBroker(delay=0.01))
+    dispatcher = NotificationDispatcher(connection_manager=connection_manager)
+    use_manager(monkeypatch, connection_manager, dispatcher)
+
+    # Not started: every push is published inline
+    inline_p99 = await measure(session_factory, facility_id)
+
+    dispatcher.start()
+    background_p99 = await measure(session_factory, facility_id)
+    await dispatcher.stop(timeout=30)
+
+    print(
+        f"\nnotify_facility p99: inline {inline_p99 * 1000:.1f}ms, "
+        f"background {background_p99 * 1000:.1f}ms"
+    )
+    assert background_p99 < inline_p99
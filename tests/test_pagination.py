@@ -0,0 +1,225 @@
+"""
+Tests for keyset (cursor) pagination alongside the page/page_size contract.
+"""
+
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, insert, select
+
+from app.models.blood_bank_model import BloodBank
+from app.models.health_facility_model import Facility
+from app.models.inventory_model import BloodInventory
+from app.models.notification_model import Notification
+from app.models.user_model import User
+from app.services.inventory_service import BloodInventoryService
+from app.utils.pagination import (
+    PaginationParams,
+    decode_cursor,
+    encode_cursor,
+    paginate_query,
+)
+
+START = datetime(2026, 3, 14, 8, 0)
+
+
+async def seed_notifications(session_factory, count: int):
+    user_id = uuid.uuid4()
+    async with session_factory() as db:
+        await db.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "email": "nurse@hospital.gh",
+                    "first_name": "Efua",
+                    "last_name": "Owusu",
+                    "password": "hash",
+                }
+            ],
+        )
+        # Pairs of rows share a timestamp so the id tie-breaker matters
+        await db.execute(
+            insert(Notification),
+            [
+                {
+                    "user_id": user_id,
+                    "title": f"n{i}",
+                    "message": "m",
+                    "created_at": START + timedelta(minutes=i // 2),
+                }
+                for i in range(count)
+            ],
+        )
+        await db.commit()
+    return user_id
+
+
+def notification_query(user_id):
+    return select(Notification).where(Notification.user_id == user_id)
+
+
+async def walk(db, query, pagination: PaginationParams, **columns):
+    pages = []
+    while True:
+        page = await paginate_query(db, query, pagination, **columns)
+        pages.append(page)
+        if not page.next_cursor:
+            return pages
+        pagination = pagination.model_copy(update={"cursor": page.next_cursor})
+
+
+def test_cursor_round_trips_typed_values():
+    values = [datetime(2026, 3, 14, 9, 30, 15, 123), uuid.uuid4()]
+    cursor = encode_cursor(values)
+    assert decode_cursor(cursor, [Notification.created_at, Notification.id]) == values
+    assert decode_cursor(
+        encode_cursor([date(2026, 4, 1), 7]),
+        [BloodInventory.expiry_date, BloodInventory.quantity],
+    ) == [date(2026, 4, 1), 7]
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor([1, 2, 3])])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, [Notification.created_at, Notification.id])
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("sort_order", ["desc", "asc"])
+@pytest.mark.asyncio
+async def test_cursor_pages_match_offset_pages(sort_order, session_factory):
+    user_id = await seed_notifications(session_factory, 23)
+    columns = {
+        "sort_column": Notification.created_at,
+        "id_column": Notification.id,
+    }
+
+    async with session_factory() as db:
+        offset_ids = []
+        for page_number in range(1, 6):
+            page = await paginate_query(
+                db,
+                notification_query(user_id),
+                PaginationParams(page=page_number, page_size=5, sort_order=sort_order),
+                **columns,
+            )
+            offset_ids += [n.id for n in page.items]
+            assert page.total_items == 23 and page.total_pages == 5
+            assert page.has_next == (page_number < 5)
+
+        pages = await walk(
+            db,
+            notification_query(user_id),
+            PaginationParams(page_size=5, sort_order=sort_order, include_total=False),
+            **columns,
+        )
+
+    cursor_ids = [n.id for page in pages for n in page.items]
+    assert len(pages) == 5
+    assert cursor_ids == offset_ids
+    assert len(set(cursor_ids)) == 23
+    assert all(page.total_items is None for page in pages)
+    assert [page.has_prev for page in pages] == [False, True, True, True, True]
+
+
+@pytest.mark.asyncio
+async def test_cursor_page_reads_by_keyset_without_count(engine, session_factory):
+    user_id = await seed_notifications(session_factory, 12)
+
+    async with session_factory() as db:
+        first = await paginate_query(
+            db,
+            notification_query(user_id),
+            PaginationParams(page_size=5, include_total=False),
+            sort_column=Notification.created_at,
+            id_column=Notification.id,
+        )
+
+        statements = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        await paginate_query(
+            db,
+            notification_query(user_id),
+            PaginationParams(
+                page_size=5, cursor=first.next_cursor, include_total=False
+            ),
+            sort_column=Notification.created_at,
+            id_column=Notification.id,
+        )
+
+    # One keyset-filtered read; SQLite renders OFFSET, but it is 0
+    ((statement, parameters),) = statements
+    assert "(notifications.created_at, notifications.id) <" in statement
+    assert "count(" not in statement.lower()
+    assert parameters[-2:] == (6, 0)
+
+
+@pytest.mark.asyncio
+async def test_blood_units_cursor_by_expiry_date(session_factory):
+    facility_id, bank_id = uuid.uuid4(), uuid.uuid4()
+    async with session_factory() as db:
+        await db.execute(
+            insert(Facility),
+            [
+                {
+                    "id": facility_id,
+                    "facility_name": "Ridge",
+                    "facility_email": "ridge@hospital.gh",
+                    "facility_digital_address": "GA-123-4567",
+                }
+            ],
+        )
+        await db.execute(
+            insert(BloodBank),
+            [
+                {
+                    "id": bank_id,
+                    "facility_id": facility_id,
+                    "blood_bank_name": "Ridge Bank",
+                    "phone": "0244000000",
+                    "email": "bank@hospital.gh",
+                }
+            ],
+        )
+        await db.execute(
+            insert(BloodInventory),
+            [
+                {
+                    "blood_bank_id": bank_id,
+                    "blood_product": "Whole Blood",
+                    "blood_type": "O+",
+                    "quantity": 1,
+                    "expiry_date": date(2026, 4, 1) + timedelta(days=i % 4),
+                }
+                for i in range(10)
+            ],
+        )
+        await db.commit()
+
+    async with session_factory() as db:
+        service = BloodInventoryService(db)
+        pagination = PaginationParams(
+            page_size=4, sort_by="expiry_date", sort_order="asc"
+        )
+        units = []
+        while True:
+            page = await service.get_paginated_blood_units(
+                pagination=pagination, current_user_blood_bank_id=bank_id
+            )
+            units += page.items
+            if not page.next_cursor:
+                break
+            pagination = pagination.model_copy(
+                update={"cursor": page.next_cursor, "include_total": False}
+            )
+
+    assert len({u.id for u in units}) == 10
+    expiry_dates = [u.expiry_date for u in units]
+    assert expiry_dates == sorted(expiry_dates)
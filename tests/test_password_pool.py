@@ -0,0 +1,78 @@
+"""
+Tests for the bounded Argon2 worker pool.
+"""
+
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils import password_pool as pool_module
+from app.utils.password_pool import (
+    PasswordHashPool,
+    PasswordPoolSaturated,
+    hash_password_async,
+    verify_password_async,
+)
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_round_trip():
+    pool = PasswordHashPool(max_workers=2, max_queue=2)
+    hashed = await pool.hash("SecurePass123!")
+    assert await pool.verify(hashed, "SecurePass123!") is True
+    assert await pool.verify(hashed, "WrongPass123!") is False
+
+    stats = pool.get_stats()
+    assert stats["completed"] == 3
+    assert stats["in_flight"] == 0
+    assert stats["avg_hash_time_ms"] > 0
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_event_loop_keeps_running_while_hashing():
+    pool = PasswordHashPool(max_workers=2, max_queue=4)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.gather(*(pool.hash("SecurePass123!") for _ in range(4)))
+    task.cancel()
+    pool.shutdown()
+    assert ticks > 4
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_rejects_new_work():
+    pool = PasswordHashPool(max_workers=1, max_queue=1)
+    results = await asyncio.gather(
+        *(pool.hash("SecurePass123!") for _ in range(4)), return_exceptions=True
+    )
+    pool.shutdown()
+
+    rejected = [r for r in results if isinstance(r, PasswordPoolSaturated)]
+    assert len(rejected) == 2
+    assert pool.get_stats()["rejected"] == 2
+    assert pool.get_stats()["completed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_saturation_surfaces_as_429(monkeypatch):
+    saturated = PasswordHashPool(max_workers=1, max_queue=0)
+    saturated._in_flight = saturated.capacity
+    monkeypatch.setattr(pool_module, "password_pool", saturated)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await hash_password_async("SecurePass123!")
+    assert exc_info.value.status_code == 429
+    assert "Retry-After" in exc_info.value.headers
+
+    with pytest.raises(HTTPException) as exc_info:
+        await verify_password_async("SecurePass123!", "$argon2id$invalid")
+    assert exc_info.value.status_code == 429
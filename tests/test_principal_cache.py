@@ -0,0 +1,336 @@
+"""
+Tests for the authenticated principal cache used by get_current_user.
+Covers snapshot hydration, TTL expiry, LRU eviction, targeted invalidation,
+the shared backend tier and the commit-time invalidation hooks.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.models.blood_bank_model import BloodBank
+from app.models.health_facility_model import Facility
+from app.models.rbac_model import Permission, Role
+from app.models.user_model import User, UserSession
+from app.utils.principal_cache import (
+    InMemoryPrincipalCacheBackend,
+    Principal,
+    PrincipalCache,
+    principal_cache,
+)
+
+
+@pytest.fixture
+def sync_session():
+    """Synchronous in-memory session; flush events fire the same way as async."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine, expire_on_commit=False) as session:
+        yield session
+    engine.dispose()
+
+
+def make_user(session: Session, role_name: str = "lab_manager") -> User:
+    facility = Facility(
+        facility_name="Korle Bu",
+        facility_email=f"kb_{uuid4().hex[:6]}@hospital.gh",
+        facility_digital_address="GA-123-4567",
+    )
+    facility.blood_bank = BloodBank(
+        blood_bank_name="KB Bank",
+        phone="0244000000",
+        email=f"bank_{uuid4().hex[:6]}@hospital.gh",
+    )
+    role = Role(
+        name=f"{role_name}_{uuid4().hex[:6]}",
+        permissions=[Permission(name=f"blood.view_{uuid4().hex[:6]}")],
+    )
+    user = User(
+        email=f"user_{uuid4().hex[:8]}@hospital.gh",
+        first_name="Ama",
+        last_name="Mensah",
+        password="hash",
+        roles=[role],
+        work_facility=facility,
+    )
+    session.add(user)
+    session.commit()
+    return user
+
+
+def make_session(session: Session, user: User) -> UserSession:
+    user_session = UserSession(
+        user_id=user.id,
+        session_token=str(uuid4()),
+        ip_address="testclient",
+        expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
+    )
+    session.add(user_session)
+    session.commit()
+    return user_session
+
+
+class TestPrincipalSnapshot:
+    def test_snapshot_captures_authorization_data(self, sync_session):
+        user = make_user(sync_session)
+        principal = Principal.from_user(user)
+
+        permission = user.roles[0].permissions[0].name
+        assert principal.has_permission(permission)
+        assert principal.has_role(user.roles[0].name)
+        assert principal.work_facility_id == user.work_facility_id
+        assert principal.blood_bank_id == user.work_facility.blood_bank.id
+        assert not principal.is_locked
+
+    def test_to_user_hydrates_detached_graph(self, sync_session):
+        user = make_user(sync_session)
+        hydrated = Principal.from_user(user).to_user()
+
+        assert hydrated is not user
+        assert hydrated.id == user.id
+        assert hydrated.email == user.email
+        assert hydrated.has_permission(user.roles[0].permissions[0].name)
+        assert hydrated.work_facility.blood_bank.id == user.work_facility.blood_bank.id
+        assert hydrated.facility is None
+        assert hydrated not in sync_session
+
+    def test_locked_until_is_evaluated_at_read_time(self, sync_session):
+        user = make_user(sync_session)
+        user.locked_until = datetime.now(timezone.utc) + timedelta(minutes=5)
+        assert Principal.from_user(user).is_locked
+
+        user.locked_until = datetime.now(timezone.utc) - timedelta(minutes=5)
+        assert not Principal.from_user(user).is_locked
+
+
+class TestPrincipalCache:
+    def test_hit_and_miss_counters(self, sync_session):
+        cache = PrincipalCache(ttl_seconds=60, max_entries=10)
+        user = make_user(sync_session)
+
+        assert cache.get(user.id, None) is None
+        cache.put(Principal.from_user(user))
+        assert cache.get(user.id, None) is not None
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["size"] == 1
+
+    def test_entries_expire_after_ttl(self, sync_session):
+        cache = PrincipalCache(ttl_seconds=60, max_entries=10)
+        user = make_user(sync_session)
+        cache.put(Principal.from_user(user, ttl_seconds=0))
+
+        time.sleep(0.01)
+        assert cache.get(user.id, None) is None
+        assert cache.get_stats()["expired"] == 1
+
+    def test_expired_session_is_not_served(self, sync_session):
+        cache = PrincipalCache()
+        user = make_user(sync_session)
+        user_session = make_session(sync_session, user)
+        user_session.expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+
+        cache.put(Principal.from_user(user, user_session))
+        assert cache.get(user.id, user_session.id) is None
+
+    def test_least_recently_used_entry_is_evicted(self, sync_session):
+        cache = PrincipalCache(ttl_seconds=60, max_entries=2)
+        users = [make_user(sync_session) for _ in range(3)]
+
+        cache.put(Principal.from_user(users[0]))
+        cache.put(Principal.from_user(users[1]))
+        cache.get(users[0].id, None)  # refresh recency of the first entry
+        cache.put(Principal.from_user(users[2]))
+
+        assert cache.get(users[0].id, None) is not None
+        assert cache.get(users[1].id, None) is None
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_targeted_invalidation(self, sync_session):
+        cache = PrincipalCache()
+        user = make_user(sync_session)
+        other = make_user(sync_session)
+        user_session = make_session(sync_session, user)
+
+        cache.put(Principal.from_user(user, user_session))
+        cache.put(Principal.from_user(other))
+
+        assert cache.invalidate_session(user_session.id) == 1
+        assert cache.get(user.id, user_session.id) is None
+        assert cache.get(other.id, None) is not None
+
+        assert cache.invalidate_role(other.roles[0].name) == 1
+        assert cache.get(other.id, None) is None
+
+        cache.put(Principal.from_user(user))
+        assert cache.invalidate_facility(user.work_facility_id) == 1
+        assert cache.get_stats()["size"] == 0
+
+
+class TestSharedTier:
+    @pytest.mark.asyncio
+    async def test_shared_backend_serves_other_workers(self, sync_session):
+        backend = InMemoryPrincipalCacheBackend()
+        workers = [
+            PrincipalCache(backend=backend, local_ttl_seconds=60) for _ in range(2)
+        ]
+        user = make_user(sync_session)
+        user_session = make_session(sync_session, user)
+
+        await workers[0].store(Principal.from_user(user, user_session))
+        shared = await workers[1].lookup(user.id, user_session.id)
+        assert shared.to_user().email == user.email
+        assert workers[1].get_stats()["l2_hits"] == 1
+
+        # Worker 0's invalidation deletes the shared copy; worker 1 keeps
+        # its local one until local_ttl_seconds lapses
+        workers[0].invalidate_user(user.id)
+        await asyncio.sleep(0)
+        assert await workers[0].lookup(user.id, user_session.id) is None
+        assert workers[1].get(user.id, user_session.id) is not None
+
+    @pytest.mark.asyncio
+    async def test_local_entries_are_capped_by_local_ttl(self, sync_session):
+        cache = PrincipalCache(
+            ttl_seconds=60, backend=InMemoryPrincipalCacheBackend(), local_ttl_seconds=0
+        )
+        user = make_user(sync_session)
+
+        await cache.store(Principal.from_user(user))
+        time.sleep(0.01)
+        assert cache.get(user.id, None) is None
+        # Still served from the shared tier
+        assert await cache.lookup(user.id, None) is not None
+
+    @pytest.mark.asyncio
+    async def test_backend_errors_degrade_to_local_cache(self, sync_session):
+        class BrokenBackend(InMemoryPrincipalCacheBackend):
+            async def get(self, key):
+                raise ConnectionError("cache unavailable")
+
+            async def set(self, key, payload, ttl, groups=()):
+                raise ConnectionError("cache unavailable")
+
+        cache = PrincipalCache(backend=BrokenBackend())
+        user = make_user(sync_session)
+        other = make_user(sync_session)
+
+        await cache.store(Principal.from_user(user))
+        assert await cache.lookup(user.id, None) is not None
+        assert await cache.lookup(other.id, None) is None
+
+        assert cache.get_stats()["l2_errors"] == 2
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_a_load_is_not_overwritten(self, sync_session):
+        backend = InMemoryPrincipalCacheBackend()
+        cache = PrincipalCache(backend=backend)
+        user = make_user(sync_session)
+
+        gate = asyncio.Event()
+
+        async def load():
+            generation = cache.generation
+            await gate.wait()
+            await cache.store(Principal.from_user(user), generation)
+
+        loading = asyncio.create_task(load())
+        await asyncio.sleep(0)
+        # The user changes (and is invalidated) while the old copy loads
+        cache.invalidate_user(user.id)
+        gate.set()
+        await loading
+
+        assert await cache.lookup(user.id, None) is None
+
+        assert cache.get_stats()["stale_loads"] == 1
+
+
+class TestCommitInvalidation:
+    def setup_method(self):
+        principal_cache.clear()
+
+    def test_user_update_invalidates(self, sync_session):
+        user = make_user(sync_session)
+        principal_cache.put(Principal.from_user(user))
+
+        user.is_active = False
+        sync_session.commit()
+
+        assert principal_cache.get(user.id, None) is None
+
+    def test_session_termination_invalidates(self, sync_session):
+        user = make_user(sync_session)
+        user_session = make_session(sync_session, user)
+        principal_cache.put(Principal.from_user(user, user_session))
+
+        user_session.terminate("user_logout")
+        sync_session.commit()
+
+        assert principal_cache.get(user.id, user_session.id) is None
+
+    def test_session_activity_does_not_invalidate(self, sync_session):
+        user = make_user(sync_session)
+        user_session = make_session(sync_session, user)
+        principal_cache.put(Principal.from_user(user, user_session))
+
+        user_session.update_activity("testclient")
+        sync_session.commit()
+
+        assert principal_cache.get(user.id, user_session.id) is not None
+
+    def test_role_permission_change_invalidates(self, sync_session):
+        user = make_user(sync_session)
+        principal_cache.put(Principal.from_user(user))
+
+        user.roles[0].permissions.append(Permission(name=f"extra_{uuid4().hex[:6]}"))
+        sync_session.commit()
+
+        assert principal_cache.get(user.id, None) is None
+
+    def test_role_rename_invalidates_holders_of_the_old_name(self, sync_session):
+        user = make_user(sync_session)
+        principal_cache.put(Principal.from_user(user))
+
+        # Only the role row changes; its holders are cached under the old name
+        user.roles[0].name = f"renamed_{uuid4().hex[:6]}"
+        sync_session.commit()
+
+        assert principal_cache.get(user.id, None) is None
+
+    @pytest.mark.asyncio
+    async def test_load_between_flush_and_commit_is_not_cached(self, sync_session):
+        user = make_user(sync_session)
+        committed = Principal.from_user(user)
+
+        user.is_active = False
+        sync_session.flush()
+
+        # A concurrent miss still reads the committed, active row and caches it
+        await principal_cache.store(committed, principal_cache.generation)
+        assert principal_cache.get(user.id, None) is not None
+
+        # Another one starts loading before the commit and stores after it
+        generation = principal_cache.generation
+        sync_session.commit()
+        await principal_cache.store(committed, generation)
+
+        assert principal_cache.get(user.id, None) is None
+
+    def test_rolled_back_change_keeps_cached_principal(self, sync_session):
+        user = make_user(sync_session)
+        principal_cache.put(Principal.from_user(user))
+
+        user.is_active = False
+        sync_session.flush()
+        sync_session.rollback()
+
+        assert principal_cache.get(user.id, None) is not None
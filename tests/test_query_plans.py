@@ -0,0 +1,361 @@
+"""
+EXPLAIN regression suite for the hot distribution, notification and track
+state queries.
+
+Every query the services issue for these tables is captured while running the
+real service code against seeded, ANALYZEd tables, then re-run under
+EXPLAIN QUERY PLAN. A full scan of a hot table, or a temp B-tree to satisfy
+ORDER BY, fails the test and names the offending statement.
+"""
+
+import re
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from sqlalchemy import event, insert, select, text
+
+from app.models.blood_bank_model import BloodBank
+from app.models.distribution_model import BloodDistribution
+from app.models.health_facility_model import Facility
+from app.models.notification_model import Notification
+from app.models.request_model import BloodRequest
+from app.models.tracking_model import TrackState
+from app.models.user_model import User
+from app.schemas.distribution_schema import DistributionStatus
+from app.schemas.request_schema import RequestStatus
+from app.services.distribution_service import BloodDistributionService
+from app.services.stats_service import StatsService
+from app.services.tracking_service import TrackStateService
+from app.utils.pagination import PaginationParams, paginate_query
+
+HOT_TABLES = {"blood_distributions", "notifications", "track_states", "blood_banks"}
+FACILITIES = 25
+DISTRIBUTIONS = 20_000
+NOTIFICATIONS = 20_000
+REQUESTS = 2_000
+TRACK_STATES = 20_000
+NOW = datetime(2026, 3, 14, 12, 0)
+STATUSES = list(DistributionStatus)
+
+
+async def seed(session_factory):
+    facility_ids = [uuid.uuid4() for _ in range(FACILITIES)]
+    bank_ids = [uuid.uuid4() for _ in range(FACILITIES)]
+    user_ids = [uuid.uuid4() for _ in range(FACILITIES * 2)]
+    request_ids = [uuid.uuid4() for _ in range(REQUESTS)]
+    distribution_ids = [uuid.uuid4() for _ in range(DISTRIBUTIONS)]
+
+    async with session_factory() as db:
+        await db.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "email": f"user{i}@hospital.gh",
+                    "first_name": "Yaw",
+                    "last_name": f"Mensah{i}",
+                    "password": "hash",
+                    "work_facility_id": facility_ids[i % FACILITIES],
+                }
+                for i, user_id in enumerate(user_ids)
+            ],
+        )
+        await db.execute(
+            insert(Facility),
+            [
+                {
+                    "id": facility_id,
+                    "facility_name": f"Facility {i}",
+                    "facility_email": f"facility{i}@hospital.gh",
+                    "facility_digital_address": f"GA-{i:03d}-0000",
+                }
+                for i, facility_id in enumerate(facility_ids)
+            ],
+        )
+        await db.execute(
+            insert(BloodBank),
+            [
+                {
+                    "id": bank_id,
+                    "facility_id": facility_ids[i],
+                    "blood_bank_name": f"Bank {i}",
+                    "phone": "0244000000",
+                    "email": f"bank{i}@hospital.gh",
+                }
+                for i, bank_id in enumerate(bank_ids)
+            ],
+        )
+        await db.execute(
+            insert(BloodRequest),
+            [
+                {
+                    "id": request_id,
+                    "request_group_id": request_id,
+                    "blood_type": "O+",
+                    "blood_product": "Whole Blood",
+                    "quantity_requested": 1,
+                    "request_status": RequestStatus.ACCEPTED,
+                    "requester_id": user_ids[i % len(user_ids)],
+                    "facility_id": facility_ids[i % FACILITIES],
+                    "source_facility_id": facility_ids[(i + 1) % FACILITIES],
+                    "created_at": NOW - timedelta(hours=i),
+                }
+                for i, request_id in enumerate(request_ids)
+            ],
+        )
+        await db.execute(
+            insert(BloodDistribution),
+            [
+                {
+                    "id": distribution_id,
+                    "blood_product": "Whole Blood",
+                    "blood_type": "O+",
+                    "quantity": 1 + i % 4,
+                    "status": STATUSES[i % len(STATUSES)],
+                    "tracking_number": f"TRK{i:09d}",
+                    "expiry_date": date(2026, 3, 1) + timedelta(days=i % 120),
+                    "dispatched_from_id": bank_ids[i % FACILITIES],
+                    "dispatched_to_id": facility_ids[(i * 7) % FACILITIES],
+                    "request_id": request_ids[i % REQUESTS],
+                    "created_at": NOW - timedelta(minutes=25 * i),
+                    "date_delivered": (
+                        NOW - timedelta(minutes=25 * i - 90) if i % 3 else None
+                    ),
+                }
+                for i, distribution_id in enumerate(distribution_ids)
+            ],
+        )
+        await db.execute(
+            insert(Notification),
+            [
+                {
+                    "user_id": user_ids[i % len(user_ids)],
+                    "title": "Request update",
+                    "message": "m",
+                    "is_read": i % 4 == 0,
+                    "created_at": NOW - timedelta(minutes=i),
+                }
+                for i in range(NOTIFICATIONS)
+            ],
+        )
+        await db.execute(
+            insert(TrackState),
+            [
+                {
+                    "status": "dispatched",
+                    "blood_request_id": request_ids[i % REQUESTS],
+                    "blood_distribution_id": distribution_ids[i % DISTRIBUTIONS],
+                    "created_by_id": user_ids[i % len(user_ids)],
+                    "timestamp": NOW - timedelta(minutes=i),
+                }
+                for i in range(TRACK_STATES)
+            ],
+        )
+        await db.execute(text("ANALYZE"))
+        await db.commit()
+
+    return {
+        "facility_id": facility_ids[3],
+        "bank_id": bank_ids[3],
+        "user_id": user_ids[5],
+        "request_id": request_ids[11],
+        "distribution_id": distribution_ids[42],
+        "tracking_number": "TRK000000042",
+    }
+
+
+@contextmanager
+def capture(engine):
+    """Record (statement, parameters) for every query touching a hot table"""
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        if any(table in statement for table in HOT_TABLES):
+            statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+
+def plan_problems(steps, allow_sort=False):
+    problems = []
+    for step in steps:
+        scan = re.match(r"SCAN (\w+?)(_\d+)?\b", step)
+        if scan and scan.group(1) in HOT_TABLES:
+            problems.append(f"full scan: {step}")
+        if not allow_sort and "USE TEMP B-TREE FOR ORDER BY" in step:
+            problems.append(f"extra sort: {step}")
+    return problems
+
+
+async def explain_all(engine, statements, allow_sort=False):
+    report = []
+    async with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = await conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + statement, parameters
+            )
+            problems = plan_problems([row[-1] for row in plan], allow_sort)
+            if problems:
+                report.append(f"{' '.join(statement.split())}\n  " + "\n  ".join(problems))
+    return report
+
+
+def hot_queries(ids):
+    """(name, coroutine factory, allow_sort) for each hot service query"""
+    facility_id, bank_id, user_id = ids["facility_id"], ids["bank_id"], ids["user_id"]
+
+    def notifications(is_read=None, cursor=False):
+        async def run(db):
+            query = select(Notification).where(Notification.user_id == user_id)
+            if is_read is not None:
+                query = query.where(Notification.is_read == is_read)
+            columns = {
+                "sort_column": Notification.created_at,
+                "id_column": Notification.id,
+            }
+            page = await paginate_query(
+                db, query, PaginationParams(page_size=20), **columns
+            )
+            if cursor:
+                await paginate_query(
+                    db,
+                    query,
+                    PaginationParams(page_size=20, cursor=page.next_cursor),
+                    **columns,
+                )
+
+        return run
+
+    async def notification_counts(db):
+        for condition in (
+            [Notification.user_id == user_id],
+            [Notification.user_id == user_id, Notification.is_read == False],  # noqa: E712
+        ):
+            await db.execute(
+                select(text("count(*)")).select_from(Notification).where(*condition)
+            )
+
+    return [
+        (
+            "distributions by bank",
+            lambda db: BloodDistributionService(db).get_distributions_by_blood_bank(
+                bank_id
+            ),
+            False,
+        ),
+        (
+            "distribution list page",
+            lambda db: BloodDistributionService(db).list_distributions(
+                bank_id, page_size=20
+            ),
+            False,
+        ),
+        (
+            "distributions by facility",
+            lambda db: BloodDistributionService(db).get_distributions_by_facility(
+                facility_id
+            ),
+            False,
+        ),
+        (
+            "distributions by status",
+            lambda db: BloodDistributionService(db).get_distributions_by_status(
+                DistributionStatus.IN_TRANSIT
+            ),
+            False,
+        ),
+        (
+            "distribution stats",
+            lambda db: BloodDistributionService(db).get_distribution_stats(bank_id),
+            False,
+        ),
+        (
+            "expiring distributions",
+            lambda db: BloodDistributionService(db).get_expiring_distributions(
+                blood_bank_id=bank_id
+            ),
+            False,
+        ),
+        (
+            "distribution export",
+            lambda db: db.execute(
+                BloodDistributionService(db).build_export_query(bank_id)
+            ),
+            False,
+        ),
+        (
+            "distribution chart",
+            lambda db: StatsService(db).get_distribution_chart_data(
+                bank_id, NOW - timedelta(days=30), NOW
+            ),
+            False,
+        ),
+        ("notifications", notifications(), False),
+        ("unread notifications", notifications(is_read=False), False),
+        ("notifications by cursor", notifications(cursor=True), False),
+        ("notification counts", notification_counts, False),
+        (
+            "request timeline",
+            lambda db: TrackStateService(db).get_track_state(ids["request_id"]),
+            False,
+        ),
+        (
+            "latest distribution state",
+            lambda db: TrackStateService(db).get_latest_state_for_distribution(
+                ids["distribution_id"]
+            ),
+            False,
+        ),
+        # tracking_number is not unique, so that shipment's few states are sorted
+        (
+            "shipment timeline",
+            lambda db: TrackStateService(db).get_track_states_for_distribution(
+                ids["tracking_number"]
+            ),
+            True,
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_hot_queries_use_indexes_without_extra_sorts(engine, session_factory):
+    ids = await seed(session_factory)
+
+    report = []
+    for name, run, allow_sort in hot_queries(ids):
+        with capture(engine) as statements:
+            async with session_factory() as db:
+                await run(db)
+        assert statements, f"{name}: no hot-table query captured"
+        report += [
+            f"[{name}] {problem}"
+            for problem in await explain_all(engine, statements, allow_sort)
+        ]
+
+    assert not report, "\n\n".join(report)
+
+
+def test_plan_checker_flags_scans_and_sorts():
+    assert plan_problems(["SCAN blood_distributions"]) == [
+        "full scan: SCAN blood_distributions"
+    ]
+    assert plan_problems(["SCAN track_states USING INDEX sqlite_autoindex_1"])
+    assert plan_problems(["SCAN blood_banks_1"])
+    assert plan_problems(["USE TEMP B-TREE FOR ORDER BY"]) == [
+        "extra sort: USE TEMP B-TREE FOR ORDER BY"
+    ]
+    assert not plan_problems(["USE TEMP B-TREE FOR ORDER BY"], allow_sort=True)
+    assert not plan_problems(
+        [
+            "SEARCH notifications USING INDEX idx_notification_user_created (user_id=?)",
+            "SCAN facilities",
+            "USE TEMP B-TREE FOR GROUP BY",
+        ]
+    )
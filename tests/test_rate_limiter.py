@@ -0,0 +1,195 @@
+"""
+Tests for the sliding-window rate limiter, its stores and middleware.
+"""
+
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.middlewares.rate_limit_middleware import RateLimitMiddleware
+from app.models.rate_limit_model import RateLimitCounter
+from app.utils.rate_limiter import (
+    DatabaseRateLimitStore,
+    InMemoryRateLimitStore,
+    RateLimiter,
+    RateLimitPolicy,
+    create_rate_limiter,
+)
+
+# Start of fixed window 100 for 60 second windows
+T0 = 6000.0
+
+GENERAL = RateLimitPolicy("general", 5)
+LOGIN = RateLimitPolicy("login", 2, path_prefixes=("/api/users/auth/login",))
+
+
+async def hits(limiter, client, path, now, count):
+    return [await limiter.hit(client, path, now) for _ in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_sliding_window_weights_previous_window():
+    limiter = RateLimiter(InMemoryRateLimitStore(), GENERAL)
+
+    decisions = await hits(limiter, "10.0.0.1", "/api/users", T0, 6)
+    assert [d.allowed for d in decisions] == [True] * 5 + [False]
+    assert decisions[4].remaining == 0
+    assert decisions[5].retry_after == 60
+
+    # Just into the next window most of the previous count still applies
+    assert not (await limiter.hit("10.0.0.1", "/api/users", T0 + 61)).allowed
+
+    # Half way through: 6 * 0.5 + 2
+    decision = await limiter.hit("10.0.0.1", "/api/users", T0 + 90)
+    assert decision.allowed
+    assert decision.requests_in_window == 5
+
+    # A window with no requests in between resets the history
+    decision = await limiter.hit("10.0.0.1", "/api/users", T0 + 240)
+    assert decision.allowed and decision.requests_in_window == 1
+
+    assert (await limiter.hit("10.0.0.2", "/api/users", T0 + 1)).allowed
+    assert limiter.get_stats()["rejected"] == 2
+
+
+@pytest.mark.asyncio
+async def test_login_policy_is_counted_separately():
+    limiter = RateLimiter(InMemoryRateLimitStore(), GENERAL, [LOGIN])
+    assert limiter.policy_for("/api/users/auth/login") is LOGIN
+    assert limiter.policy_for("/api/users/auth/refresh") is GENERAL
+
+    logins = await hits(limiter, "10.0.0.1", "/api/users/auth/login", T0, 3)
+    assert [d.allowed for d in logins] == [True, True, False]
+    assert logins[-1].policy is LOGIN
+
+    others = await hits(limiter, "10.0.0.1", "/api/inventory", T0, 5)
+    assert all(d.allowed for d in others)
+
+
+def test_configured_login_policy_covers_the_login_route():
+    from app.main import app
+
+    limiter = create_rate_limiter(InMemoryRateLimitStore())
+
+    assert limiter.policy_for(app.url_path_for("login")).name == "login"
+    assert limiter.policy_for(app.url_path_for("refresh_token")).name == "general"
+
+
+@pytest.mark.asyncio
+async def test_memory_store_sweeps_idle_keys():
+    store = InMemoryRateLimitStore(sweep_batch=8)
+    limiter = RateLimiter(store, GENERAL)
+    for i in range(1000):
+        await limiter.hit(f"client-{i}", "/", T0)
+    await limiter.hit("client-recent", "/", T0 + 60)
+    assert store.tracked_keys() == 1001
+
+    # Two windows later the old counters cannot affect any limit
+    await limiter.hit("client-new", "/", T0 + 120)
+    assert store.tracked_keys() == 1002 - 8
+
+    assert await limiter.sweep(T0 + 120) == 992
+    assert store.tracked_keys() == 2
+    assert limiter.get_stats()["swept_keys"] == 992
+
+    # The survivor still carries its previous window
+    assert (await limiter.hit("client-recent", "/", T0 + 120)).requests_in_window == 2
+
+
+@pytest.mark.asyncio
+async def test_database_store_shares_counts_between_workers(session_factory):
+    workers = [
+        RateLimiter(DatabaseRateLimitStore(session_factory), GENERAL)
+        for _ in range(2)
+    ]
+
+    decisions = []
+    for i in range(6):
+        decisions.append(await workers[i % 2].hit("10.0.0.1", "/", T0))
+    assert [d.allowed for d in decisions] == [True] * 5 + [False]
+
+    decision = await workers[0].hit("10.0.0.1", "/", T0 + 90)
+    assert decision.allowed and decision.requests_in_window == 4
+    await workers[1].hit("10.0.0.9", "/", T0)
+
+    async with session_factory() as db:
+        row = await db.get(RateLimitCounter, "general:10.0.0.1")
+    assert (row.window_index, row.current_count, row.previous_count) == (101, 1, 6)
+
+    assert await workers[0].sweep(T0 + 120) == 1
+    async with session_factory() as db:
+        keys = (await db.execute(select(RateLimitCounter.key))).scalars().all()
+    assert keys == ["general:10.0.0.1"]
+
+
+@pytest.mark.asyncio
+async def test_store_errors_fail_open():
+    class BrokenStore(InMemoryRateLimitStore):
+        async def hit(self, key, window_seconds, now):
+            raise ConnectionError("database unavailable")
+
+    limiter = RateLimiter(BrokenStore(), GENERAL)
+    assert (await limiter.hit("10.0.0.1", "/", T0)).allowed
+    assert limiter.get_stats()["store_errors"] == 1
+
+
+def test_middleware_rejects_with_retry_after():
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, max_requests=2)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert [client.get("/ping").status_code for _ in range(2)] == [200, 200]
+
+    response = client.get("/ping")
+    assert response.status_code == 429
+    assert response.json()["error"] == "rate_limit_exceeded"
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
+
+
+def test_application_rate_limits_requests(monkeypatch):
+    from app.main import create_application
+
+    monkeypatch.setattr(
+        "app.middlewares.rate_limit_middleware.rate_limiter",
+        RateLimiter(InMemoryRateLimitStore(), RateLimitPolicy("general", 2)),
+    )
+    client = TestClient(create_application())
+    assert [client.get("/").status_code for _ in range(2)] == [200, 200]
+
+    response = client.get("/")
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_hit_cost_is_constant_in_tracked_clients():
+    clients = 100_000
+    samples = 20_000
+
+    async def avg_hit_seconds(limiter, tracked):
+        for i in range(tracked):
+            await limiter.hit(f"10.{i // 65536}.{i // 256 % 256}.{i % 256}", "/", T0)
+        start = time.perf_counter()
+        for i in range(samples):
+            await limiter.hit(f"10.0.0.{i % 256}", "/", T0 + 1)
+        return (time.perf_counter() - start) / samples
+
+    small = await avg_hit_seconds(RateLimiter(InMemoryRateLimitStore(), GENERAL), 1_000)
+    store = InMemoryRateLimitStore()
+    large = await avg_hit_seconds(RateLimiter(store, GENERAL), clients)
+    assert store.tracked_keys() == clients
+
+    print(
+        f"\nper-hit cost: {small * 1e6:.2f}us at 1k clients, "
+        f"{large * 1e6:.2f}us at {clients // 1000}k clients"
+    )
+    assert large < small * 3
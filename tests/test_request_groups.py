@@ -0,0 +1,222 @@
+"""
+Tests for SQL-side request group aggregation and pagination, plus a
+benchmark at 100k requests for one user.
+"""
+
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import selectinload
+
+from app.models.health_facility_model import Facility
+from app.models.request_model import BloodRequest
+from app.models.user_model import User
+from app.schemas.request_schema import ProcessingStatus, RequestStatus
+from app.services.request_service import BloodRequestService
+
+START = datetime(2026, 3, 14, 8, 0)
+STATUSES = [
+    RequestStatus.PENDING,
+    RequestStatus.ACCEPTED,
+    RequestStatus.REJECTED,
+    RequestStatus.CANCELLED,
+]
+
+
+async def seed(session_factory, groups: int, facilities: int = 3):
+    """
+    `groups` groups, each sent to every facility with rotating statuses;
+    accepted requests have been fulfilled
+    """
+    requester_id = uuid.uuid4()
+    facility_ids = [uuid.uuid4() for _ in range(facilities)]
+    async with session_factory() as db:
+        await db.execute(
+            insert(Facility),
+            [
+                {
+                    "id": facility_id,
+                    "facility_name": f"Facility {i}",
+                    "facility_email": f"facility{i}@hospital.gh",
+                    "facility_digital_address": "GA-123-4567",
+                }
+                for i, facility_id in enumerate(facility_ids)
+            ],
+        )
+        await db.execute(
+            insert(User),
+            [
+                {
+                    "id": requester_id,
+                    "email": "lab@hospital.gh",
+                    "first_name": "Kofi",
+                    "last_name": "Boateng",
+                    "password": "hash",
+                    "work_facility_id": facility_ids[0],
+                }
+            ],
+        )
+        rows = []
+        for g in range(groups):
+            group_id = uuid.uuid4()
+            created_at = START + timedelta(minutes=g)
+            for f, facility_id in enumerate(facility_ids):
+                status = STATUSES[(g + f) % len(STATUSES)]
+                rows.append(
+                    {
+                        "id": uuid.uuid4(),
+                        "request_group_id": group_id,
+                        "is_master_request": f == 0,
+                        "blood_type": "O+",
+                        "blood_product": "Whole Blood",
+                        "quantity_requested": 2,
+                        "request_status": status,
+                        "processing_status": (
+                            ProcessingStatus.COMPLETED
+                            if status == RequestStatus.ACCEPTED
+                            else ProcessingStatus.PENDING
+                        ),
+                        "requester_id": requester_id,
+                        "facility_id": facility_ids[0],
+                        "source_facility_id": facility_id,
+                        "created_at": created_at,
+                        "updated_at": created_at + timedelta(seconds=f),
+                    }
+                )
+        for i in range(0, len(rows), 5000):
+            await db.execute(insert(BloodRequest), rows[i : i + 5000])
+        await db.commit()
+    return requester_id
+
+
+def count_selects(engine):
+    statements = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    return statements
+
+
+@pytest.mark.asyncio
+async def test_groups_are_aggregated_and_paged_by_cursor(session_factory):
+    requester_id = await seed(session_factory, groups=7)
+
+    async with session_factory() as db:
+        service = BloodRequestService(db)
+        first = await service.list_request_groups_by_user(requester_id, page_size=3)
+        assert (first.total_items, first.total_pages, first.has_next) == (7, 3, True)
+
+        group = first.items[0]
+        # Newest group first: g=6 -> statuses rejected, cancelled, pending
+        assert group.created_at == START + timedelta(minutes=6)
+        assert group.quantity_requested == 6
+        assert group.total_facilities == 1
+        assert (
+            group.pending_count,
+            group.approved_count,
+            group.rejected_count,
+            group.fulfilled_count,
+            group.cancelled_count,
+        ) == (1, 0, 1, 0, 1)
+        # g=5 -> accepted (and fulfilled), rejected, cancelled
+        second = first.items[1]
+        assert (second.approved_count, second.fulfilled_count) == (1, 1)
+        assert group.updated_at == START + timedelta(minutes=6, seconds=2)
+        assert len(group.related_requests) == 2
+        assert group.master_request.requester_name == "Kofi Boateng"
+
+        seen = [g.request_group_id for g in first.items]
+        cursor = first.next_cursor
+        while cursor:
+            page = await service.list_request_groups_by_user(
+                requester_id, page_size=3, cursor=cursor, include_total=False
+            )
+            assert page.total_items is None
+            seen += [g.request_group_id for g in page.items]
+            cursor = page.next_cursor
+        assert len(seen) == len(set(seen)) == 7
+
+        # OFFSET pages agree with the cursor walk
+        third = await service.list_request_groups_by_user(
+            requester_id, page=3, page_size=3
+        )
+        assert [g.request_group_id for g in third.items] == seen[6:]
+        assert not third.has_next
+
+        with pytest.raises(HTTPException):
+            await service.list_request_groups_by_user(requester_id, cursor="bogus")
+
+        empty = await service.list_request_groups_by_user(uuid.uuid4())
+        assert (empty.items, empty.total_items) == ([], 0)
+
+
+@pytest.mark.asyncio
+async def test_details_are_loaded_only_for_the_page(engine, session_factory):
+    requester_id = await seed(session_factory, groups=50)
+    statements = count_selects(engine)
+
+    async with session_factory() as db:
+        await BloodRequestService(db).list_request_groups_by_user(
+            requester_id, page_size=5
+        )
+
+    detail = [
+        s
+        for s in statements
+        if s.lstrip().startswith("SELECT blood_requests.")
+        and "request_group_id IN (" in s
+    ]
+    assert len(detail) == 1
+    # Five groups of three requests, not all 150 rows
+    assert detail[0].count("?") == 5 + 1
+
+
+async def legacy_list_groups(db, requester_id):
+    """The previous implementation: load every request and group in Python"""
+    result = await db.execute(
+        select(BloodRequest)
+        .options(
+            selectinload(BloodRequest.target_facility),
+            selectinload(BloodRequest.source_facility),
+            selectinload(BloodRequest.requester).options(
+                selectinload(User.facility), selectinload(User.work_facility)
+            ),
+        )
+        .where(BloodRequest.requester_id == requester_id)
+        .order_by(BloodRequest.request_group_id.desc(), BloodRequest.created_at)
+    )
+    groups = {}
+    for request in result.scalars().all():
+        groups.setdefault(request.request_group_id, []).append(request)
+    return groups
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_first_page_at_100k_requests_per_user(session_factory):
+    requester_id = await seed(session_factory, groups=25_000, facilities=4)
+
+    async with session_factory() as db:
+        start = time.perf_counter()
+        page = await BloodRequestService(db).list_request_groups_by_user(
+            requester_id, page_size=20
+        )
+        paged = time.perf_counter() - start
+        assert page.total_items == 25_000 and len(page.items) == 20
+
+    async with session_factory() as db:
+        start = time.perf_counter()
+        legacy = await legacy_list_groups(db, requester_id)
+        full = time.perf_counter() - start
+        assert len(legacy) == 25_000
+
+    print(f"\n100k requests: first page {paged * 1000:.0f}ms, load-all {full * 1000:.0f}ms")
+    assert paged < full
@@ -0,0 +1,170 @@
+"""
+Tests for requester-scoped status listing and SQL-side request statistics.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, text
+
+from app.models.health_facility_model import Facility
+from app.models.request_model import BloodRequest
+from app.models.user_model import User
+from app.schemas.request_schema import ProcessingStatus, RequestStatus
+from app.services.request_service import BloodRequestService
+
+START = datetime(2026, 5, 2, 9, 0)
+
+
+async def seed(session_factory):
+    """Two requesters; Ama's groups have mixed statuses, Kofi's are all pending"""
+    facility_ids = [uuid.uuid4(), uuid.uuid4()]
+    ama, kofi = uuid.uuid4(), uuid.uuid4()
+    async with session_factory() as db:
+        await db.execute(
+            insert(Facility),
+            [
+                {
+                    "id": facility_id,
+                    "facility_name": f"Facility {i}",
+                    "facility_email": f"facility{i}@hospital.gh",
+                    "facility_digital_address": "GA-123-4567",
+                }
+                for i, facility_id in enumerate(facility_ids)
+            ],
+        )
+        await db.execute(
+            insert(User),
+            [
+                {
+                    "id": user_id,
+                    "email": f"{name.lower()}@hospital.gh",
+                    "first_name": name,
+                    "last_name": "Mensah",
+                    "password": "hash",
+                    "work_facility_id": facility_ids[0],
+                }
+                for user_id, name in ((ama, "Ama"), (kofi, "Kofi"))
+            ],
+        )
+
+        def request(requester_id, group_id, status, minutes, **extra):
+            return {
+                "id": uuid.uuid4(),
+                "request_group_id": group_id,
+                "blood_type": "A+",
+                "blood_product": "Whole Blood",
+                "quantity_requested": 1,
+                "request_status": status,
+                "requester_id": requester_id,
+                "facility_id": facility_ids[0],
+                "source_facility_id": facility_ids[1],
+                "created_at": START + timedelta(minutes=minutes),
+                **extra,
+            }
+
+        groups = [uuid.uuid4() for _ in range(4)]
+        rows = [
+            # group 0: pending + accepted (completed)
+            request(ama, groups[0], RequestStatus.PENDING, 0),
+            request(
+                ama,
+                groups[0],
+                RequestStatus.ACCEPTED,
+                0,
+                processing_status=ProcessingStatus.COMPLETED,
+            ),
+            # group 1: pending + rejected
+            request(ama, groups[1], RequestStatus.PENDING, 1),
+            request(ama, groups[1], RequestStatus.REJECTED, 1),
+            # group 2: cancelled only
+            request(ama, groups[2], RequestStatus.CANCELLED, 2),
+            # group 3: pending
+            request(ama, groups[3], RequestStatus.PENDING, 3),
+        ]
+        rows += [
+            request(kofi, uuid.uuid4(), RequestStatus.PENDING, 10 + i) for i in range(5)
+        ]
+        await db.execute(insert(BloodRequest), rows)
+        await db.commit()
+    return ama, kofi
+
+
+@pytest.mark.asyncio
+async def test_status_listing_is_scoped_and_paginated(session_factory):
+    ama, kofi = await seed(session_factory)
+
+    async with session_factory() as db:
+        service = BloodRequestService(db)
+        first = await service.list_requests_by_status(
+            RequestStatus.PENDING, requester_id=ama, page_size=2
+        )
+        assert (first.total_items, first.has_next) == (3, True)
+        assert all(r.requester_id == ama for r in first.items)
+        # Newest first
+        assert first.items[0].created_at == START + timedelta(minutes=3)
+
+        rest = await service.list_requests_by_status(
+            RequestStatus.PENDING,
+            requester_id=ama,
+            page_size=2,
+            cursor=first.next_cursor,
+            include_total=False,
+        )
+        assert len(rest.items) == 1 and not rest.has_next
+        ids = {r.id for r in first.items} | {r.id for r in rest.items}
+        assert len(ids) == 3
+
+        kofi_pending = await service.list_requests_by_status(
+            RequestStatus.PENDING, requester_id=kofi, page_size=10
+        )
+        assert kofi_pending.total_items == 5
+
+        # Facility scope sees both requesters
+        facility_id = first.items[0].facility_id
+        received = await service.list_requests_by_status(
+            RequestStatus.PENDING, facility_id=facility_id, page_size=20
+        )
+        assert received.total_items == 8
+
+        with pytest.raises(ValueError):
+            await service.list_requests_by_status(RequestStatus.PENDING)
+
+
+@pytest.mark.asyncio
+async def test_statistics_count_groups_in_sql(session_factory):
+    ama, kofi = await seed(session_factory)
+
+    async with session_factory() as db:
+        service = BloodRequestService(db)
+        stats = await service.get_request_statistics(ama)
+        empty = await service.get_request_statistics(uuid.uuid4())
+
+    assert stats == {
+        "total_request_groups": 4,
+        "total_individual_requests": 6,
+        "pending_groups": 3,
+        "approved_groups": 1,
+        "fulfilled_groups": 1,
+        "rejected_groups": 1,
+        "cancelled_groups": 1,
+    }
+    assert set(empty.values()) == {0}
+
+
+@pytest.mark.asyncio
+async def test_requester_status_query_uses_the_composite_index(engine):
+    async with engine.connect() as conn:
+        plan = await conn.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT id FROM blood_requests "
+                "WHERE requester_id = :requester AND request_status = :status "
+                "ORDER BY created_at DESC"
+            ),
+            {"requester": uuid.uuid4().hex, "status": "PENDING"},
+        )
+        details = " ".join(row[-1] for row in plan)
+
+    assert "idx_request_requester_status_date" in details
+    assert "TEMP B-TREE" not in details
@@ -0,0 +1,112 @@
+"""
+Tests for write-behind batching of UserSession activity.
+"""
+
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+
+from sqlalchemy import event, select
+
+from app.models.user_model import User, UserSession
+from app.services.session_activity import SessionActivityCoalescer
+
+
+async def make_sessions(session_factory, count: int):
+    async with session_factory() as db:
+        user = User(
+            email=f"user_{uuid4().hex[:8]}@hospital.gh",
+            first_name="Yaw",
+            last_name="Asante",
+            password="hash",
+        )
+        db.add(user)
+        await db.flush()
+        sessions = [
+            UserSession(
+                user_id=user.id,
+                session_token=str(uuid4()),
+                ip_address="10.0.0.1",
+                expires_at=datetime.now(timezone.utc) + timedelta(hours=1),
+            )
+            for _ in range(count)
+        ]
+        db.add_all(sessions)
+        await db.commit()
+        return [s.id for s in sessions]
+
+
+async def load_session(session_factory, session_id):
+    async with session_factory() as db:
+        return (
+            await db.execute(select(UserSession).where(UserSession.id == session_id))
+        ).scalar_one()
+
+
+def test_record_is_ignored_until_started():
+    coalescer = SessionActivityCoalescer()
+    assert coalescer.record(uuid4()) is False
+    assert coalescer.get_stats()["pending_sessions"] == 0
+
+
+@pytest.mark.asyncio
+async def test_activity_is_coalesced_into_one_batch(engine, session_factory):
+    session_ids = await make_sessions(session_factory, 3)
+
+    updates = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE"):
+            updates.append((executemany, len(parameters) if executemany else 1))
+
+    coalescer = SessionActivityCoalescer(
+        flush_interval_seconds=3600, session_factory=session_factory
+    )
+    coalescer.start()
+    latest = datetime.now(timezone.utc) + timedelta(minutes=1)
+    for _ in range(5):
+        coalescer.record(session_ids[0])
+    coalescer.record(session_ids[0], when=latest)
+    coalescer.record(session_ids[1])
+
+    assert updates == []
+    assert coalescer.get_stats()["pending_sessions"] == 2
+
+    await coalescer.stop()
+
+    assert updates == [(True, 2)]
+    first = await load_session(session_factory, session_ids[0])
+    second = await load_session(session_factory, session_ids[1])
+    untouched = await load_session(session_factory, session_ids[2])
+    assert first.total_requests == 6
+    assert first.last_activity.replace(tzinfo=timezone.utc) == latest
+    assert second.total_requests == 1
+    assert untouched.total_requests == 0
+    assert coalescer.get_stats()["rows_flushed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_activity_for_retry(session_factory):
+    (session_id,) = await make_sessions(session_factory, 1)
+
+    def broken_factory():
+        raise RuntimeError("database unavailable")
+
+    coalescer = SessionActivityCoalescer(
+        flush_interval_seconds=3600, session_factory=broken_factory
+    )
+    coalescer.start()
+    coalescer.record(session_id)
+    coalescer.record(session_id)
+
+    assert await coalescer.flush() == 0
+    assert coalescer.get_stats()["pending_sessions"] == 1
+    assert coalescer.get_stats()["flush_failures"] == 1
+
+    coalescer._session_factory = session_factory
+    await coalescer.stop()
+
+    stored = await load_session(session_factory, session_id)
+    assert stored.total_requests == 2
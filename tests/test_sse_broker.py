@@ -0,0 +1,191 @@
+"""
+Tests for SSE fan-out through the pluggable broker.
+"""
+
+import asyncio
+from typing import Dict, List
+
+import pytest
+
+from app.services import sse_broker
+from app.services.notification_sse import ConnectionManager
+from app.services.sse_broker import (
+    InMemoryBroker,
+    PostgresBroker,
+    create_broker,
+)
+
+
+class FakeHub:
+    """Stands in for the PostgreSQL server's NOTIFY channel registry"""
+
+    def __init__(self):
+        self.listeners: Dict[str, List] = {}
+        self.connections: List["FakeConnection"] = []
+        self.notifies: List[str] = []
+
+    async def connect(self, dsn: str) -> "FakeConnection":
+        conn = FakeConnection(self)
+        self.connections.append(conn)
+        return conn
+
+
+class FakeConnection:
+    def __init__(self, hub: FakeHub):
+        self.hub = hub
+        self.closed = False
+        self._on_terminate = []
+
+    def add_termination_listener(self, callback) -> None:
+        self._on_terminate.append(callback)
+
+    async def add_listener(self, channel: str, callback) -> None:
+        self.hub.listeners.setdefault(channel, []).append((self, callback))
+
+    async def execute(self, query: str, channel: str, payload: str) -> None:
+        assert query == "SELECT pg_notify($1, $2)"
+        assert len(payload.encode("utf-8")) < 8000
+        self.hub.notifies.append(payload)
+        for conn, callback in list(self.hub.listeners.get(channel, [])):
+            if not conn.closed:
+                asyncio.get_running_loop().call_soon(
+                    callback, conn, 1, channel, payload
+                )
+
+    def terminate(self) -> None:
+        """Simulate the server dropping the connection"""
+        self.closed = True
+        for callback in self._on_terminate:
+            callback(self)
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+async def drain(queue: asyncio.Queue) -> list:
+    await asyncio.sleep(0.01)
+    messages = []
+    while not queue.empty():
+        messages.append(queue.get_nowait())
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_in_memory_broker_delivers_personal_and_broadcast_messages():
+    manager = ConnectionManager()
+    first = await manager.add_sse_connection("u1")
+    second = await manager.add_sse_connection("u1")
+    other = await manager.add_sse_connection("u2")
+
+    assert await manager.send_personal_message("u1", {"n": 1}) is True
+    assert await manager.send_personal_message("nobody", {"n": 2}) is False
+    assert await manager.broadcast({"n": 3}) == 3
+
+    assert await drain(first) == [{"n": 1}, {"n": 3}]
+    assert await drain(second) == [{"n": 1}, {"n": 3}]
+    assert await drain(other) == [{"n": 3}]
+    assert manager.get_stats()["broker"] == "memory"
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_only_for_that_connection():
+    manager = ConnectionManager()
+    slow = await manager.add_sse_connection("slow")
+    fast = await manager.add_sse_connection("fast")
+    for i in range(slow.maxsize):
+        slow.put_nowait({"backlog": i})
+
+    await manager.send_to_users(["slow", "fast"], {"n": 1})
+
+    assert await drain(fast) == [{"n": 1}]
+    assert manager.get_stats()["dropped_messages"] == 1
+
+
+@pytest.mark.asyncio
+async def test_postgres_broker_fans_out_across_workers():
+    hub = FakeHub()
+    workers = [
+        ConnectionManager(PostgresBroker("postgresql://db", connect=hub.connect))
+        for _ in range(2)
+    ]
+    for worker in workers:
+        await worker.start()
+    for worker in workers:
+        await asyncio.wait_for(worker.broker.listening.wait(), 1)
+
+    on_first = await workers[0].add_sse_connection("u1")
+    on_second = await workers[1].add_sse_connection("u2")
+
+    # Published on worker 0, the recipient is connected to worker 1
+    assert await workers[0].send_personal_message("u2", {"n": 1}) is True
+    await workers[1].broadcast({"n": 2})
+
+    assert await drain(on_first) == [{"n": 2}]
+    assert await drain(on_second) == [{"n": 1}, {"n": 2}]
+    assert len(hub.notifies) == 2
+
+    for worker in workers:
+        await worker.stop()
+    assert all(conn.closed for conn in hub.connections)
+
+
+@pytest.mark.asyncio
+async def test_oversized_recipient_list_is_split_across_notifies(monkeypatch):
+    monkeypatch.setattr(sse_broker, "MAX_NOTIFY_PAYLOAD_BYTES", 200)
+    hub = FakeHub()
+    manager = ConnectionManager(PostgresBroker("postgresql://db", connect=hub.connect))
+    await manager.start()
+    await asyncio.wait_for(manager.broker.listening.wait(), 1)
+
+    user_ids = [f"user-{i:04d}" for i in range(40)]
+    queues = [await manager.add_sse_connection(u) for u in user_ids]
+
+    await manager.send_to_users(user_ids, {"title": "Stock low"})
+
+    assert len(hub.notifies) > 1
+    assert all(len(p.encode("utf-8")) <= 200 for p in hub.notifies)
+    for queue in queues:
+        assert await drain(queue) == [{"title": "Stock low"}]
+
+    await manager.stop()
+
+
+@pytest.mark.asyncio
+async def test_listener_reconnects_after_connection_loss():
+    hub = FakeHub()
+    broker = PostgresBroker(
+        "postgresql://db", connect=hub.connect, reconnect_delay=0.01
+    )
+    manager = ConnectionManager(broker)
+    await manager.start()
+    await asyncio.wait_for(broker.listening.wait(), 1)
+
+    hub.listeners["sse_events"][0][0].terminate()
+    await asyncio.sleep(0.05)
+    await asyncio.wait_for(broker.listening.wait(), 1)
+    assert broker.get_stats()["reconnects"] == 1
+
+    queue = await manager.add_sse_connection("u1")
+    await manager.send_personal_message("u1", {"n": 1})
+    assert await drain(queue) == [{"n": 1}]
+
+    await manager.stop()
+
+
+def test_create_broker_selects_backend():
+    pg = create_broker(
+        "auto", "postgresql+asyncpg://app:secret@db:5432/bank", "events"
+    )
+    assert isinstance(pg, PostgresBroker)
+    assert pg.dsn == "postgresql://app:secret@db:5432/bank"
+    assert pg.channel == "events"
+
+    assert isinstance(
+        create_broker("auto", "sqlite+aiosqlite:///./dev.db", "events"),
+        InMemoryBroker,
+    )
+    with pytest.raises(ValueError):
+        create_broker("redis", "sqlite+aiosqlite:///./dev.db", "events")